@@ -0,0 +1,1139 @@
+"""
+Micro-benchmarks for server hot paths.
+
+Each benchmark runs in-process against an in-memory SQLite database (or no
+database at all), so it can be run without a PostgreSQL instance:
+
+    python scripts/bench.py site-list --rows 20000
+"""
+
+import argparse
+import datetime as dt
+import os
+import random
+import sys
+import time
+import tracemalloc
+import uuid
+from typing import Callable, Tuple
+
+# This is a standalone script, so we need to set up the path
+# to import from the server directory.
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from server.domain.models import Base, Site, User
+from server.domain.schemas import SiteOut, SiteStatus, UserRole
+
+
+def print_result(label: str, seconds: float, peak_bytes: int) -> None:
+    print(
+        f"  {label:<28} {seconds * 1000:>10.1f} ms   "
+        f"peak {peak_bytes / 1024 / 1024:>8.2f} MiB"
+    )
+
+
+def measure(fn: Callable[[], object]) -> Tuple[float, int]:
+    """
+    Runs fn twice and returns (elapsed seconds, peak traced bytes).
+    Timing is taken without tracemalloc, which would otherwise dominate it.
+    """
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def sqlite_sessionmaker() -> sessionmaker:
+    """Creates an in-memory SQLite database with the ops schema mapped to main."""
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+        execution_options={"schema_translate_map": {"ops": None}},
+    )
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine, autoflush=False, autocommit=False)
+
+
+# --- Benchmarks ---
+
+
+def bench_site_list(args: argparse.Namespace) -> None:
+    """ORM list path vs. row DTO list path for GET /org/sites."""
+    from server.domain.repositories import site_repo
+
+    SessionLocal = sqlite_sessionmaker()
+    now = dt.datetime.utcnow()
+    with SessionLocal() as db:
+        db.add(
+            User(
+                id="bench-user",
+                email="bench@example.com",
+                name="Bench",
+                hashed_password="x",
+                role=UserRole.SAFETY_MANAGER,
+            )
+        )
+        db.commit()
+        db.execute(
+            insert(Site),
+            [
+                {
+                    "id": f"site-{i}",
+                    "name": f"Site {i}",
+                    "address": f"{i} Main St",
+                    "start_date": dt.date(2025, 1, 1),
+                    "end_date": dt.date(2025, 12, 31),
+                    "status": SiteStatus.ACTIVE,
+                    "requested_by_id": "bench-user",
+                    "requested_at": now,
+                    "created_at": now,
+                    "updated_at": now,
+                }
+                for i in range(args.rows)
+            ],
+        )
+        db.commit()
+
+    def orm_path() -> None:
+        with SessionLocal() as db:
+            sites = site_repo.get_multi_for_user(db)
+            [SiteOut.model_validate(site) for site in sites]
+
+    def row_path() -> None:
+        with SessionLocal() as db:
+            rows = site_repo.list_rows_for_user(db)
+            [SiteOut.model_validate(row) for row in rows]
+
+    print(f"site-list: {args.rows} rows, best of {args.repeat}")
+    for label, fn in (("ORM instances", orm_path), ("row DTOs", row_path)):
+        runs = [measure(fn) for _ in range(args.repeat)]
+        print_result(label, min(r[0] for r in runs), min(r[1] for r in runs))
+
+
+def bench_conditional_get(args: argparse.Namespace) -> None:
+    """Dashboard polling of GET /org/owners/{ownerId}/cranes with and without ETags."""
+    from fastapi.testclient import TestClient
+    from sqlalchemy import update
+
+    from server.database import get_db
+    from server.domain.models import Crane, CraneModel, Org
+    from server.domain.schemas import CraneStatus, OrgType
+    from server.main import app
+
+    SessionLocal = sqlite_sessionmaker()
+    with SessionLocal() as db:
+        db.add(Org(id="org-1", name="Owner", type=OrgType.OWNER))
+        db.add(
+            CraneModel(id="model-1", model_name="SS1926", max_lifting_capacity_ton_m=18)
+        )
+        db.commit()
+        db.execute(
+            insert(Crane),
+            [
+                {
+                    "id": f"crane-{i}",
+                    "owner_org_id": "org-1",
+                    "model_id": "model-1",
+                    "serial_no": f"S-{i}",
+                    "status": CraneStatus.NORMAL,
+                }
+                for i in range(args.rows)
+            ],
+        )
+        db.commit()
+
+    def override_get_db():
+        with SessionLocal() as db:
+            yield db
+
+    app.dependency_overrides[get_db] = override_get_db
+    client = TestClient(app)
+    url = "/api/v1/org/owners/org-1/cranes"
+
+    def poll(conditional: bool) -> Tuple[float, int]:
+        etag = None
+        not_modified = 0
+        start = time.process_time()
+        for i in range(args.polls):
+            if i % args.change_every == 0:
+                # Simulate a write between polls (count stays, updated_at moves)
+                with SessionLocal() as db:
+                    db.execute(
+                        update(Crane)
+                        .where(Crane.id == "crane-0")
+                        .values(
+                            updated_at=dt.datetime.utcnow() + dt.timedelta(seconds=i)
+                        )
+                    )
+                    db.commit()
+            headers = {"If-None-Match": etag} if conditional and etag else {}
+            response = client.get(url, headers=headers)
+            if response.status_code == 304:
+                not_modified += 1
+            etag = response.headers.get("ETag")
+        return time.process_time() - start, not_modified
+
+    print(
+        f"conditional-get: {args.rows} cranes, {args.polls} polls, "
+        f"1 change every {args.change_every} polls"
+    )
+    for label, conditional in (("unconditional", False), ("If-None-Match", True)):
+        cpu, not_modified = poll(conditional)
+        print(
+            f"  {label:<16} CPU {cpu * 1000:>9.1f} ms total, "
+            f"{cpu / args.polls * 1000:>6.2f} ms/poll, {not_modified} x 304"
+        )
+    app.dependency_overrides.pop(get_db, None)
+
+
+def bench_compression(args: argparse.Namespace) -> None:
+    """Bytes on wire and CPU per response for each encoding/level on a fleet list."""
+    import json
+
+    from server.middleware.compression import available_encodings, make_compressor
+
+    rng = random.Random(42)
+    models = [f"model-{uuid.UUID(int=rng.getrandbits(128))}" for _ in range(12)]
+
+    def timestamp() -> str:
+        return (
+            dt.datetime(2025, 1, 1) + dt.timedelta(seconds=rng.randrange(30_000_000))
+        ).isoformat()
+
+    fleet = [
+        {
+            "id": str(uuid.UUID(int=rng.getrandbits(128))),
+            "owner_org_id": f"org-owner-{rng.randrange(1, 6):02d}",
+            "serial_no": f"DY-{rng.randrange(10**8):08d}",
+            "status": rng.choice(["NORMAL", "REPAIR", "INBOUND"]),
+            "model": {
+                "id": rng.choice(models),
+                "model_name": f"SS{rng.randrange(1000, 3000)}",
+                "max_lifting_capacity_ton_m": rng.randrange(10, 30),
+                "max_working_height_m": round(rng.uniform(15, 30), 2),
+                "max_working_radius_m": round(rng.uniform(12, 25), 2),
+                "optional_specs": rng.sample(["SUB WINCH", "SUB BOOM", "DY-CABIN"], 2),
+            },
+            "created_at": timestamp(),
+            "updated_at": timestamp(),
+        }
+        for _ in range(args.rows)
+    ]
+    body = json.dumps(fleet).encode()
+    levels = {"gzip": (1, 6, 9), "br": (1, 4, 6, 11), "zstd": (1, 3, 9, 19)}
+
+    print(f"compression: {args.rows}-crane list, {len(body) / 1024:.0f} KiB raw JSON")
+    for encoding in available_encodings():
+        for level in levels[encoding]:
+            compressor_levels = {"gzip": level, "br": level, "zstd": level}
+            start = time.process_time()
+            for _ in range(args.repeat):
+                compressor = make_compressor(encoding, compressor_levels)
+                compressed = compressor.compress(body) + compressor.finish()
+            cpu = (time.process_time() - start) / args.repeat
+            print(
+                f"  {encoding:<5} level {level:<3} {len(compressed) / 1024:>9.1f} KiB "
+                f"({len(compressed) / len(body):>6.1%})   CPU {cpu * 1000:>7.2f} ms"
+            )
+
+
+def rss_bytes() -> int:
+    """Current resident set size of this process (Linux)."""
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def bench_export(args: argparse.Namespace) -> None:
+    """RSS while streaming a gzip-compressed NDJSON attendance export."""
+    import tempfile
+    from contextlib import contextmanager
+
+    from server.domain.models import DriverAttendance
+    from server.domain.schemas import ExportFormat
+    from server.domain.services.export_service import ExportService
+    from server.middleware.compression import make_compressor
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(
+            f"sqlite:///{tmp}/export.db",
+            execution_options={"schema_translate_map": {"ops": None}},
+        )
+        Base.metadata.create_all(bind=engine)
+        start_day = dt.date(2000, 1, 1)
+        batch = 50_000
+        with engine.begin() as conn:
+            for offset in range(0, args.rows, batch):
+                conn.execute(
+                    insert(DriverAttendance),
+                    [
+                        {
+                            "id": f"att-{i:09d}",
+                            "driver_assignment_id": f"da-{i % 1000:04d}",
+                            "work_date": start_day + dt.timedelta(days=i // 1000),
+                            "check_in_at": dt.datetime(2000, 1, 1, 8)
+                            + dt.timedelta(days=i // 1000),
+                            "check_out_at": dt.datetime(2000, 1, 1, 17)
+                            + dt.timedelta(days=i // 1000),
+                        }
+                        for i in range(offset, min(offset + batch, args.rows))
+                    ],
+                )
+        factory = sessionmaker(bind=engine)
+
+        @contextmanager
+        def session_scope():
+            with factory() as session:
+                yield session
+
+        service = ExportService(session_factory=session_scope)
+        stmt, columns = service.attendance_stmt()
+        compressor = make_compressor("gzip", {"gzip": 6})
+
+        print(
+            f"export: {args.rows} attendance rows, NDJSON + gzip, "
+            f"batch {service.batch_size}"
+        )
+        baseline = rss_bytes()
+        samples = []
+        raw = wire = 0
+        start = time.perf_counter()
+        for index, chunk in enumerate(
+            service.stream(stmt, columns, ExportFormat.NDJSON)
+        ):
+            raw += len(chunk)
+            wire += len(compressor.compress(chunk)) + len(compressor.flush())
+            if index % max(1, args.rows // service.batch_size // 10) == 0:
+                samples.append((index * service.batch_size, rss_bytes()))
+        wire += len(compressor.finish())
+        elapsed = time.perf_counter() - start
+        samples.append((args.rows, rss_bytes()))
+
+        mib = 1024 * 1024
+        for rows_done, rss in samples:
+            print(f"  {rows_done:>10} rows   RSS {rss / mib:>8.1f} MiB")
+        print(
+            f"  baseline RSS {baseline / mib:.1f} MiB, max growth "
+            f"{(max(rss for _, rss in samples) - baseline) / mib:.1f} MiB"
+        )
+        print(
+            f"  {raw / mib:.0f} MiB NDJSON -> {wire / mib:.0f} MiB gzip "
+            f"in {elapsed:.1f} s "
+            f"({args.rows / elapsed:,.0f} rows/s)"
+        )
+        engine.dispose()
+
+
+def workflow_requests(run: int, ids: dict) -> list:
+    """The workflow B1..E3 as batch sub-requests (one date window per run)."""
+    start = dt.date(2030, 1, 1) + dt.timedelta(days=200 * run)
+    end = start + dt.timedelta(days=90)
+    return [
+        {
+            "id": "B1",
+            "method": "POST",
+            "path": "/org/sites",
+            "body": {
+                "name": f"Bench Site {run}",
+                "address": "123 Test Street",
+                "start_date": str(start),
+                "end_date": str(end),
+                "requested_by_id": ids["sm"],
+            },
+        },
+        {
+            "id": "B2",
+            "method": "PATCH",
+            "path": "/org/sites/${B1.body.id}",
+            "body": {"status": "ACTIVE", "approved_by_id": ids["mfr"]},
+        },
+        {"id": "C1", "method": "GET", "path": f"/org/owners/{ids['owner_org']}/cranes"},
+        {
+            "id": "C3",
+            "method": "POST",
+            "path": "/ops/crane-deployments",
+            "body": {
+                "site_id": "${B1.body.id}",
+                "crane_id": "${C1.body.0.id}",
+                "safety_manager_id": ids["sm"],
+                "start_date": str(start),
+                "end_date": str(end),
+            },
+        },
+        {
+            "id": "D1",
+            "method": "POST",
+            "path": "/ops/driver-deployments",
+            "body": {
+                "site_crane_id": "${C3.body.assignment_id}",
+                "driver_id": ids["driver"],
+                "start_date": str(start),
+                "end_date": str(end),
+            },
+        },
+        {
+            "id": "D2",
+            "method": "POST",
+            "path": "/ops/driver-attendance-logs",
+            "body": {
+                "driver_assignment_id": "${D1.body.driver_assignment_id}",
+                "work_date": str(start),
+                "check_in_at": f"{start}T08:00:00Z",
+                "check_out_at": f"{start}T17:00:00Z",
+            },
+        },
+        {
+            "id": "E1",
+            "method": "POST",
+            "path": "/compliance/document-requests",
+            "body": {
+                "site_id": "${B1.body.id}",
+                "driver_id": ids["driver"],
+                "requested_by_id": ids["sm"],
+                "due_date": str(end),
+            },
+        },
+        {
+            "id": "E2",
+            "method": "POST",
+            "path": "/compliance/document-items",
+            "body": {
+                "request_id": "${E1.body.request_id}",
+                "doc_type": "Safety Certificate",
+                "file_url": "https://example.com/safety-cert.pdf",
+            },
+        },
+        {
+            "id": "E3",
+            "method": "POST",
+            "path": "/compliance/document-items/${E2.body.item_id}/review",
+            "body": {
+                "item_id": "${E2.body.item_id}",
+                "reviewer_id": ids["sm"],
+                "approve": True,
+            },
+        },
+    ]
+
+
+def bench_batch(args: argparse.Namespace) -> None:
+    """B1..E3 workflow: sequential calls vs one /batch call over a simulated RTT."""
+    from fastapi.testclient import TestClient
+    from sqlalchemy import event
+
+    from server.api.batch import resolve_references
+    from server.database import db_manager
+    from server.domain.models import Crane, CraneModel, Org
+    from server.domain.schemas import OrgType
+    from server.main import app
+
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+        execution_options={"schema_translate_map": {"ops": None}},
+    )
+
+    @event.listens_for(engine, "connect")
+    def _no_implicit_transactions(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def _begin(conn):
+        conn.exec_driver_sql("BEGIN")
+
+    Base.metadata.create_all(bind=engine)
+    db_manager.engine = engine
+    db_manager.SessionLocal = sessionmaker(
+        bind=engine, autoflush=False, autocommit=False
+    )
+    ids = {"sm": "u-sm", "mfr": "u-mfr", "driver": "u-drv", "owner_org": "org-owner"}
+    with db_manager.SessionLocal() as db:
+        for key, role in (
+            ("sm", UserRole.SAFETY_MANAGER),
+            ("mfr", UserRole.MANUFACTURER),
+            ("driver", UserRole.DRIVER),
+        ):
+            db.add(
+                User(
+                    id=ids[key],
+                    email=f"{key}@example.com",
+                    name=key,
+                    hashed_password="x",
+                    role=role,
+                )
+            )
+        db.add(Org(id=ids["owner_org"], name="Owner", type=OrgType.OWNER))
+        db.add(CraneModel(id="m1", model_name="SS1926", max_lifting_capacity_ton_m=18))
+        db.add(
+            Crane(id="c1", owner_org_id=ids["owner_org"], model_id="m1", serial_no="S1")
+        )
+        db.commit()
+
+    client = TestClient(app)
+    rtt = args.rtt_ms / 1000
+
+    def round_trip(method: str, path: str, **kwargs):
+        time.sleep(rtt)  # network latency of one request/response exchange
+        response = client.request(method, "/api/v1" + path, **kwargs)
+        assert response.status_code < 400, (path, response.status_code, response.text)
+        return response
+
+    def sequential(run: int) -> None:
+        results: dict = {}
+        for sub in workflow_requests(run, ids):
+            resolved = resolve_references(sub, results)
+            response = round_trip(
+                resolved["method"], resolved["path"], json=resolved.get("body")
+            )
+            results[sub["id"]] = {
+                "status": response.status_code,
+                "headers": {},
+                "body": response.json(),
+            }
+
+    def batched(run: int, transaction: bool) -> None:
+        body = round_trip(
+            "POST",
+            "/batch",
+            json={"requests": workflow_requests(run, ids), "transaction": transaction},
+        ).json()
+        statuses = [item["status"] for item in body["responses"]]
+        assert all(code < 400 for code in statuses), statuses
+
+    print(
+        f"batch: workflow B1..E3 (9 calls), simulated RTT {args.rtt_ms:.0f} ms, "
+        f"{args.repeat} runs each"
+    )
+    modes = {
+        "sequential": sequential,
+        "batch": lambda run: batched(run, False),
+        "batch (transaction)": lambda run: batched(run, True),
+    }
+    round_trips = {"sequential": 9, "batch": 1, "batch (transaction)": 1}
+    run = 0
+    for label, workflow in modes.items():
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            workflow(run)
+            timings.append(time.perf_counter() - start)
+            run += 1
+        best = min(timings)
+        print(
+            f"  {label:<22} {best * 1000:>8.1f} ms end-to-end "
+            f"(server {(best - rtt * round_trips[label]) * 1000:>6.1f} ms)"
+        )
+
+
+def bench_logging(args: argparse.Namespace) -> None:
+    """Logging cost on the request threads: sync handler vs queue pipeline."""
+    import logging
+    import tempfile
+    from concurrent.futures import ThreadPoolExecutor
+
+    from server.config import settings
+    from server.core.logging import setup_logging, shutdown_logging
+
+    root_logger = logging.getLogger()
+    middleware_log = logging.getLogger("server.main")
+    db_log = logging.getLogger("server.database")
+    service_log = logging.getLogger("server.domain.services.site_service")
+    headers = {
+        "host": "api.example.com",
+        "authorization": "Bearer " + "x" * 180,
+        "user-agent": "dycrane-mobile/2.3",
+        "accept": "application/json",
+    }
+
+    def previous_request(i: int) -> None:
+        # Log calls of one request before this change (f-strings, header dump).
+        middleware_log.info(f"--> Request: GET /api/v1/org/sites?page={i}")
+        middleware_log.info(f"    Headers: {headers}")
+        db_log.debug("Database session requested.")
+        db_log.debug(f"Database session {i} created and yielded.")
+        service_log.info(f"Listing sites with mine=True for user_id=user-{i}")
+        db_log.debug(f"Closing database session {i}.")
+        middleware_log.info(f"<-- Response: {200}")
+
+    def current_request(i: int) -> None:
+        middleware_log.info("--> Request: %s %s", "GET", f"/api/v1/org/sites?page={i}")
+        db_log.debug("Database session requested.")
+        db_log.debug("Database session %s created and yielded.", i)
+        service_log.info(f"Listing sites with mine=True for user_id=user-{i}")
+        db_log.debug("Closing database session %s.", i)
+        middleware_log.info("<-- Response: %s", 200)
+
+    def run(request: Callable[[int], None]) -> float:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.threads) as pool:
+            list(pool.map(request, range(args.rows)))
+        return args.rows / (time.perf_counter() - start)
+
+    class SlowSink:
+        """A file whose writes block for `--sink-latency-us`, like a full pipe."""
+
+        def __init__(self, file):
+            self.file = file
+
+        def write(self, text: str) -> int:
+            time.sleep(args.sink_latency_us / 1e6)
+            return self.file.write(text)
+
+        def flush(self) -> None:
+            self.file.flush()
+
+    print(
+        f"logging: {args.rows} simulated requests on {args.threads} threads, "
+        "output to a "
+        f"file with {args.sink_latency_us:.0f} us write latency"
+    )
+    results = {}
+    settings.LOG_QUEUE_SIZE = args.rows * 8  # measure the hot path, not load shedding
+    with tempfile.TemporaryFile("w") as file:
+        sink = SlowSink(file) if args.sink_latency_us else file
+        for level_name, level in (
+            ("off", logging.WARNING),
+            ("INFO", logging.INFO),
+            ("DEBUG", logging.DEBUG),
+        ):
+            for handler in root_logger.handlers[:]:
+                root_logger.removeHandler(handler)
+            sync = logging.StreamHandler(sink)
+            sync.setFormatter(logging.Formatter(settings.LOG_FORMAT))
+            root_logger.addHandler(sync)
+            root_logger.setLevel(level)
+            results[f"before, {level_name}"] = run(previous_request)
+
+            pipeline = setup_logging(stream=sink, json_output=True)
+            root_logger.setLevel(level)
+            pipeline.output.setLevel(level)
+            results[f"queue + JSON, {level_name}"] = run(current_request)
+            drain_start = time.perf_counter()
+            shutdown_logging()
+            drain = time.perf_counter() - drain_start
+            if level_name != "off":
+                print(
+                    f"  queue drained {drain * 1000:.0f} ms after the last request "
+                    f"({level_name})"
+                )
+        for handler in root_logger.handlers[:]:
+            root_logger.removeHandler(handler)
+    for label, rps in results.items():
+        print(f"  {label:<22} {rps:>10.0f} req/s   {1e6 / rps:>6.1f} us/req of logging")
+
+
+def bench_middleware(args: argparse.Namespace) -> None:
+    """Request-context middleware overhead vs the old BaseHTTPMiddleware pair."""
+    import asyncio
+    import logging
+    from contextlib import contextmanager
+
+    import httpx
+    from fastapi.responses import JSONResponse
+
+    from server.database import db_manager
+    from server.domain.models import DriverAttendance
+    from server.domain.services import export_service
+    from server.main import create_app
+    from server.middleware.request_context import RequestContextMiddleware
+
+    SessionLocal = sqlite_sessionmaker()
+    with SessionLocal() as db:
+        db.add_all(
+            DriverAttendance(
+                driver_assignment_id=f"da-{i}",
+                work_date=dt.date(2025, 1, 1),
+                check_in_at=dt.datetime(2025, 1, 1, 8),
+            )
+            for i in range(1000)
+        )
+        db.commit()
+
+    @contextmanager
+    def session_scope():
+        with SessionLocal() as session:
+            yield session
+
+    db_manager.SessionLocal = SessionLocal
+    export_service.session_factory = session_scope
+    export_service.batch_size = 100
+    logging.getLogger().setLevel(logging.WARNING)  # measure the middleware, not log I/O
+
+    def without_request_context():
+        app = create_app()
+        app.user_middleware = [
+            m for m in app.user_middleware if m.cls is not RequestContextMiddleware
+        ]
+        return app
+
+    def previous_app():
+        # The two @app.middleware("http") layers this middleware replaced.
+        app = without_request_context()
+
+        @app.middleware("http")
+        async def log_requests(request, call_next):
+            logger = logging.getLogger("server.main")
+            logger.info(f"--> Request: {request.method} {request.url.path}")
+            logger.info(f"    Headers: {request.headers}")
+            response = await call_next(request)
+            logger.info(f"<-- Response: {response.status_code}")
+            return response
+
+        @app.middleware("http")
+        async def log_server_errors(request, call_next):
+            try:
+                return await call_next(request)
+            except Exception:
+                return JSONResponse(
+                    status_code=500,
+                    content={"detail": "An internal server error occurred."},
+                )
+
+        return app
+
+    apps = {
+        "none": without_request_context(),
+        "before (2x BaseHTTP)": previous_app(),
+        "pure ASGI": create_app(),
+    }
+    targets = {
+        "GET /api/v1/system/": "/api/v1/system/",
+        "stream 1000-row export (10 chunks)": (
+            "/api/v1/exports/driver-attendance-logs?format=csv"
+        ),
+    }
+
+    async def compare(url: str) -> dict:
+        clients = {
+            label: httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=app), base_url="http://test"
+            )
+            for label, app in apps.items()
+        }
+        for client in clients.values():
+            for _ in range(20):
+                (await client.get(url)).raise_for_status()
+        best = dict.fromkeys(clients, float("inf"))
+        for _ in range(args.repeat):  # interleave the variants to share any drift
+            for label, client in clients.items():
+                start = time.perf_counter()
+                for _ in range(args.rows):
+                    await client.get(url)
+                best[label] = min(
+                    best[label], (time.perf_counter() - start) / args.rows
+                )
+        for client in clients.values():
+            await client.aclose()
+        return best
+
+    print(
+        f"middleware: best of {args.repeat} rounds x {args.rows} requests, "
+        "logging at WARNING"
+    )
+    for target, url in targets.items():
+        best = asyncio.run(compare(url))
+        print(f"  {target}")
+        for label, latency in best.items():
+            print(
+                f"    {label:<22} {latency * 1e6:>8.0f} us/req   "
+                f"overhead {(latency - best['none']) * 1e6:>6.0f} us"
+            )
+
+
+def bench_auth(args: argparse.Namespace) -> None:
+    """
+    get_current_user cost per request: dev token vs strict JWT vs strict JWT
+    with the verified-token cache.
+    """
+    import json
+    import tempfile
+
+    from starlette.requests import Request
+
+    from server.auth import context
+    from server.config import settings
+    from server.core import tokens
+
+    with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as f:
+        key = tokens._b64url_encode(os.urandom(32))
+        json.dump({"keys": [{"kty": "oct", "kid": "bench", "k": key}]}, f)
+    tokens.key_store.keys_file = f.name
+    jwt = tokens.create_access_token(
+        "bench-user", ["DRIVER"], email="bench@example.com", name="Bench"
+    )
+
+    def request_with(authorization: str) -> Request:
+        return Request(
+            {
+                "type": "http",
+                "method": "GET",
+                "path": "/",
+                "query_string": b"",
+                "headers": [(b"authorization", authorization.encode())],
+            }
+        )
+
+    SessionLocal = sqlite_sessionmaker()
+    db = SessionLocal()
+    db.add(
+        User(
+            id="bench-user",
+            email="bench@example.com",
+            name="Bench",
+            hashed_password="",
+            role=UserRole.DRIVER,
+        )
+    )
+    db.commit()
+
+    uncached = tokens.TokenVerifier(
+        tokens.key_store,
+        settings.JWT_ISSUER,
+        settings.JWT_AUDIENCE,
+        settings.JWT_LEEWAY_SECONDS,
+        cache_size=0,
+    )
+    cached = context.token_verifier
+    variants = [
+        ("dev", "dev", cached, "Bearer dev:bench-user:DRIVER"),
+        ("strict, no cache", "strict", uncached, f"Bearer {jwt}"),
+        ("strict, verified-token LRU", "strict", cached, f"Bearer {jwt}"),
+    ]
+    print(f"auth: get_current_user, best of {args.repeat} x {args.rows} calls")
+    for label, mode, verifier, header in variants:
+        settings.AUTH_MODE = mode
+        context.token_verifier = verifier
+        request = request_with(header)
+        context.get_current_user(request, db)
+        best = float("inf")
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            for _ in range(args.rows):
+                context.get_current_user(request, db)
+            best = min(best, (time.perf_counter() - start) / args.rows)
+        print(f"  {label:<28} {best * 1e6:>8.1f} us/request")
+    db.close()
+    os.unlink(f.name)
+
+
+def bench_policy(args: argparse.Namespace) -> None:
+    """
+    Authorization checks per second: per-request dicts and role-name sets vs
+    the compiled policy.
+    """
+    from server.auth.context import UserContext
+    from server.auth.policy import Resource, policy
+
+    def legacy_scopes(user: UserContext) -> set:
+        # What /me/permissions did per call before the policy engine.
+        scope_map = {
+            "DRIVER": ["site:read", "assignment:read"],
+            "OWNER": ["crane:read", "assignment:read", "maintenance:read"],
+            "SAFETY_MANAGER": [
+                "site:read",
+                "crane:assign",
+                "driver:assign",
+                "request:review",
+            ],
+        }
+        scopes = set()
+        for role in user.roles:
+            scopes.update(scope_map.get(role, []))
+        return scopes
+
+    users = [
+        UserContext(
+            id=f"user-{i}", roles=[role], org_ids=[f"org-{i % 7}", f"org-{i % 11}"]
+        )
+        for i, role in enumerate(["DRIVER", "OWNER", "SAFETY_MANAGER"] * 100)
+    ]
+    resources = [
+        Resource(org_id=f"org-{i % 13}", user_id=f"user-{i % 5}")
+        for i in range(len(users))
+    ]
+    required_roles = {"OWNER", "SAFETY_MANAGER"}
+    role_mask = policy.role_mask(required_roles)
+    crane_read = policy.scope_mask(["crane:read"])
+
+    variants = [
+        ("loop overhead only", lambda u, r: None),
+        ("scope set per check", lambda u, r: "crane:read" in legacy_scopes(u)),
+        (
+            "role-name set intersection",
+            lambda u, r: bool(required_roles.intersection(set(u.roles))),
+        ),
+        (
+            "compiled role mask",
+            lambda u, r: bool(policy.effective(u).roles & role_mask),
+        ),
+        ("compiled scope, no resource", lambda u, r: policy.check_mask(u, crane_read)),
+        ("compiled scope + resource", lambda u, r: policy.check_mask(u, crane_read, r)),
+    ]
+    pairs = list(zip(users, resources))
+    print(f"policy: {len(users)} users, best of {args.repeat} x {args.rows} checks")
+    for label, check in variants:
+        best = float("inf")
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            for i in range(args.rows):
+                user, resource = pairs[i % len(pairs)]
+                check(user, resource)
+            best = min(best, (time.perf_counter() - start) / args.rows)
+        print(
+            f"  {label:<30} {best * 1e9:>8.0f} ns/check   {1 / best:>12,.0f} checks/s"
+        )
+
+
+def bench_login(args: argparse.Namespace) -> None:
+    """Shift-start login burst: login throughput and other requests' latency."""
+    import asyncio
+    import logging
+    import statistics
+
+    import httpx
+
+    from server.core.security import password_hasher
+    from server.database import get_db
+    from server.main import create_app
+
+    SessionLocal = sqlite_sessionmaker()
+    stored = password_hasher.hash("password1")
+    with SessionLocal() as db:
+        db.add_all(
+            User(
+                id=f"driver-{i}",
+                email=f"driver{i}@example.com",
+                name=f"Driver {i}",
+                hashed_password=stored,
+                role=UserRole.DRIVER,
+            )
+            for i in range(args.rows)
+        )
+        db.commit()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    def session():
+        with SessionLocal() as db:
+            yield db
+
+    app = create_app()
+    app.dependency_overrides[get_db] = session
+    pooled_verify = password_hasher.verify_async
+
+    async def inline_verify(password, stored_hash):
+        return password_hasher.verify(password, stored_hash)
+
+    def percentile(values, q):
+        return (
+            statistics.quantiles(values, n=100)[q - 1] * 1000
+            if len(values) > 1
+            else float("nan")
+        )
+
+    async def probe(client, stop, latencies):
+        while not stop.is_set():
+            start = time.perf_counter()
+            await client.get("/api/v1/system/")
+            latencies.append(time.perf_counter() - start)
+            await asyncio.sleep(0.005)
+
+    async def run():
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://test"
+        ) as client:
+            idle = []
+            for _ in range(200):
+                start = time.perf_counter()
+                await client.get("/api/v1/system/")
+                idle.append(time.perf_counter() - start)
+            print(
+                f"  GET /api/v1/system/ idle    p50 {percentile(idle, 50):>7.1f} ms   "
+                f"p95 {percentile(idle, 95):>7.1f} ms"
+            )
+
+            for label, verify in (
+                ("inline on the loop", inline_verify),
+                ("hashing pool", pooled_verify),
+            ):
+                password_hasher.verify_async = verify
+                stop, probed = asyncio.Event(), []
+                prober = asyncio.create_task(probe(client, stop, probed))
+
+                async def login(i):
+                    return await client.post(
+                        "/api/v1/auth/login",
+                        json={
+                            "email": f"driver{i}@example.com",
+                            "password": "password1",
+                        },
+                    )
+
+                start = time.perf_counter()
+                responses = await asyncio.gather(*(login(i) for i in range(args.rows)))
+                elapsed = time.perf_counter() - start
+                stop.set()
+                await prober
+                codes = [r.status_code for r in responses]
+                print(
+                    f"  {label}: {codes.count(200)} ok, {codes.count(503)} shed (503) "
+                    f"in {elapsed:.2f} s = {codes.count(200) / elapsed:.0f} logins/s"
+                )
+                print(
+                    f"    GET /api/v1/system/ meanwhile: {len(probed)} requests, "
+                    f"p50 {percentile(probed, 50):>7.1f} ms   "
+                    f"p95 {percentile(probed, 95):>7.1f} ms"
+                )
+        password_hasher.verify_async = pooled_verify
+
+    print(
+        f"login: {args.rows} concurrent logins, "
+        f"scrypt n={password_hasher.n} r={password_hasher.r}, "
+        f"{password_hasher._executor._max_workers} hashing threads, "
+        f"max {password_hasher.max_pending} pending"
+    )
+    asyncio.run(run())
+
+
+def bench_overload(args: argparse.Namespace) -> None:
+    """
+    Goodput and p99 under a database slowdown, with and without the adaptive
+    concurrency limit.
+    """
+    import asyncio
+    import logging
+    import threading
+
+    import httpx
+    from fastapi import FastAPI, HTTPException
+
+    from server.config import settings
+    from server.middleware.concurrency import (
+        AIMDLimit,
+        ConcurrencyLimiter,
+        ConcurrencyLimitMiddleware,
+    )
+
+    settings.AUTH_MODE = "dev"  # tenants come from X-Dev-User
+    logging.getLogger().setLevel(logging.WARNING)
+    pool = threading.BoundedSemaphore(5)  # stands in for the DB connection pool
+    service = {"seconds": 0.01}
+    deadline = 1.0  # clients give up after this; later answers are wasted work
+
+    def make_app(limiter):
+        app = FastAPI()
+
+        @app.get("/work")
+        def work():
+            if not pool.acquire(timeout=5):
+                raise HTTPException(status_code=500, detail="pool timeout")
+            try:
+                time.sleep(service["seconds"])
+            finally:
+                pool.release()
+            return {"ok": True}
+
+        if limiter is not None:
+            app.add_middleware(ConcurrencyLimitMiddleware, limiter=limiter)
+        return app
+
+    def tenant(i):
+        return "heavy" if i % 10 < 8 else f"light-{i % 2}"
+
+    async def run(app):
+        results = []
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://test"
+        ) as client:
+
+            async def one(i):
+                start = time.perf_counter()
+                try:
+                    response = await asyncio.wait_for(
+                        client.get("/work", headers={"X-Dev-User": tenant(i)}), deadline
+                    )
+                    outcome = response.status_code
+                except asyncio.TimeoutError:
+                    outcome = "timeout"
+                results.append((tenant(i), outcome, time.perf_counter() - start))
+
+            total = int(args.rps * args.duration)
+            service["seconds"] = 0.01
+            begin = time.perf_counter()
+            tasks = []
+            for i in range(total):
+                if i == total // 3:
+                    service["seconds"] = 0.1  # the database slows down 10x
+                delay = begin + i / args.rps - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                tasks.append(asyncio.create_task(one(i)))
+            await asyncio.gather(*tasks)
+        # Let abandoned requests finish before the next run.
+        for _ in range(5):
+            pool.acquire()
+        for _ in range(5):
+            pool.release()
+        return results
+
+    print(
+        f"overload: {args.rps:.0f} req/s for {args.duration:.0f} s (80% one tenant), "
+        "5 pool connections, service time 10 ms -> 100 ms "
+        f"after {args.duration / 3:.1f} s, client deadline {deadline:.0f} s"
+    )
+    for label, limiter in (
+        ("no limiter", None),
+        ("AIMD limiter", ConcurrencyLimiter(AIMDLimit(20, 2, 200, 0.25), 0.75)),
+    ):
+        results = asyncio.run(run(make_app(limiter)))
+        ok = sorted(latency for _, outcome, latency in results if outcome == 200)
+        shed = sum(1 for _, outcome, _ in results if outcome == 503)
+        timeouts = sum(1 for _, outcome, _ in results if outcome == "timeout")
+        p99 = ok[int(len(ok) * 0.99) - 1] * 1000 if ok else float("nan")
+        print(
+            f"  {label:<13} goodput {len(ok) / args.duration:>6.1f} req/s   "
+            f"p99 {p99:>7.1f} ms   "
+            f"shed {shed:>4}   timed out {timeouts:>4}"
+        )
+        for name in ("heavy", "light-0", "light-1"):
+            mine = [outcome for who, outcome, _ in results if who == name]
+            print(f"    {name:<8} {mine.count(200):>4} / {len(mine):<4} ok")
+
+
+BENCHMARKS = {
+    "auth": bench_auth,
+    "batch": bench_batch,
+    "compression": bench_compression,
+    "export": bench_export,
+    "logging": bench_logging,
+    "login": bench_login,
+    "middleware": bench_middleware,
+    "overload": bench_overload,
+    "policy": bench_policy,
+    "conditional-get": bench_conditional_get,
+    "site-list": bench_site_list,
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("benchmark", choices=sorted(BENCHMARKS))
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--polls", type=int, default=200)
+    parser.add_argument("--change-every", type=int, default=20)
+    parser.add_argument("--rtt-ms", type=float, default=80.0)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--sink-latency-us", type=float, default=0.0)
+    parser.add_argument("--rps", type=float, default=120.0)
+    parser.add_argument("--duration", type=float, default=6.0)
+    cli_args = parser.parse_args()
+    BENCHMARKS[cli_args.benchmark](cli_args)
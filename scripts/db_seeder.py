@@ -19,7 +19,7 @@ import random
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Hashed password for 'password'
+# Hashed password for 'password' (legacy sha256; upgraded to scrypt on first login)
 HASHED_PASSWORD = "5e884898da28047151d0e56f8dc6292773603d0d6aabbdd62a11ef721d1542d8"
 
 ORGS = [
@@ -0,0 +1,285 @@
+"""
+In-process execution of batched sub-requests (``POST /api/v1/batch``).
+
+Each sub-request is matched against the application's routes and handed
+straight to the route's ASGI handler, so it goes through the normal
+dependency resolution, validation and exception handlers, but skips the
+HTTP server, the middleware stack and a second network round trip. The
+concurrency limit is the exception: each sub-request is admitted (or shed
+with 503) on its own, as if it had been sent separately. Sub-requests run
+in the batch request's context, so its deadline and request id apply.
+
+Sub-responses are buffered: a body over BATCH_MAX_RESPONSE_BYTES (e.g. a
+streamed export) is cut off and answered with 413. Headers are returned
+as a list of ``[name, value]`` pairs, so repeated headers are kept.
+
+String values in a sub-request's path, query and body may reference earlier
+results with ``${<key>.<path>}``, where ``<key>`` is the earlier
+sub-request's ``id`` or its index, and ``<path>`` walks its ``status``,
+``headers`` or ``body``, e.g. ``${site.body.id}`` or ``${0.headers.etag}``
+(the first header of that name). A value that consists of a single
+reference keeps the referenced type.
+
+In transaction mode all sub-requests share one DB session through
+`server.database.shared_session`; the batch stops at the first failure and
+the shared transaction is rolled back.
+"""
+
+import json
+import logging
+import re
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlencode
+
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+from starlette.routing import Match
+from starlette.types import Message, Scope
+
+from server.config import settings
+from server.database import db_manager, shared_session
+from server.domain.schemas import BatchIn, BatchOut, BatchSubRequest, BatchSubResponse
+
+logger = logging.getLogger(__name__)
+
+REFERENCE = re.compile(r"\$\{([^}]+)\}")
+# Request headers that describe the batch itself, not the sub-request.
+_OWN_HEADERS = {b"content-length", b"content-type", b"accept-encoding"}
+
+
+_MISSING = object()
+
+
+class UnresolvedReference(Exception):
+    """A `${...}` reference points at a missing or failed result."""
+
+
+class _BatchAborted(Exception):
+    """Raised inside the shared transaction to roll it back."""
+
+
+class _ResponseTooLarge(Exception):
+    """Stops a sub-request whose body outgrows BATCH_MAX_RESPONSE_BYTES."""
+
+
+def _lookup(reference: str, results: Dict[str, Dict[str, Any]]) -> Any:
+    key, *path = reference.strip().split(".")
+    if key not in results:
+        raise UnresolvedReference(f"Unknown result '{key}' in ${{{reference}}}")
+    result = results[key]
+    if result["status"] >= 400:
+        raise UnresolvedReference(
+            f"Result '{key}' failed with status {result['status']}"
+        )
+    value: Any = result
+    for part in path:
+        if isinstance(value, dict) and part in value:
+            value = value[part]
+        elif isinstance(value, list) and part.isdigit() and int(part) < len(value):
+            value = value[int(part)]
+        elif path[0] == "headers" and value is result["headers"]:
+            value = next((v for name, v in value if name == part.lower()), _MISSING)
+            if value is _MISSING:
+                raise UnresolvedReference(f"Cannot resolve ${{{reference}}}")
+        else:
+            raise UnresolvedReference(f"Cannot resolve ${{{reference}}}")
+    return value
+
+
+def resolve_references(value: Any, results: Dict[str, Dict[str, Any]]) -> Any:
+    """Replaces `${...}` references in strings, lists and dicts."""
+    if isinstance(value, str):
+        whole = REFERENCE.fullmatch(value)
+        if whole:
+            return _lookup(whole.group(1), results)
+        return REFERENCE.sub(lambda m: str(_lookup(m.group(1), results)), value)
+    if isinstance(value, list):
+        return [resolve_references(item, results) for item in value]
+    if isinstance(value, dict):
+        return {key: resolve_references(item, results) for key, item in value.items()}
+    return value
+
+
+def _error(
+    status_code: int, detail: str, sub_id: Optional[str] = None
+) -> BatchSubResponse:
+    return BatchSubResponse(id=sub_id, status=status_code, body={"detail": detail})
+
+
+class BatchRunner:
+    """Runs the sub-requests of one batch against the parent request's app."""
+
+    def __init__(self, request: Request, prefix: str):
+        self.parent_scope = request.scope
+        self.prefix = prefix
+        self.results: Dict[str, Dict[str, Any]] = {}
+
+    async def run(self, batch: BatchIn) -> BatchOut:
+        if not batch.transaction:
+            responses, _ = await self._run_all(batch.requests, stop_on_error=False)
+            return BatchOut(responses=responses)
+
+        context = db_manager.shared_transaction()
+        session = await run_in_threadpool(context.__enter__)
+        token = shared_session.set(session)
+        error: Optional[BaseException] = None
+        try:
+            responses, ok = await self._run_all(batch.requests, stop_on_error=True)
+            if not ok:
+                error = _BatchAborted()
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            shared_session.reset(token)
+            await run_in_threadpool(
+                context.__exit__,
+                type(error) if error else None,
+                error,
+                error.__traceback__ if error else None,
+            )
+        return BatchOut(responses=responses, committed=error is None)
+
+    async def _run_all(
+        self, requests: List[BatchSubRequest], stop_on_error: bool
+    ) -> Tuple[List[BatchSubResponse], bool]:
+        responses: List[BatchSubResponse] = []
+        for index, sub in enumerate(requests):
+            try:
+                response = await self.dispatch(sub)
+            except UnresolvedReference as e:
+                response = _error(424, str(e), sub.id)
+            responses.append(response)
+            result = response.model_dump(include={"status", "headers", "body"})
+            self.results[str(index)] = result
+            if sub.id:
+                self.results[sub.id] = result
+            if stop_on_error and response.status >= 400:
+                logger.info(f"Batch aborted at sub-request {index}: {response.status}")
+                responses.extend(
+                    _error(
+                        424, f"Not executed: batch aborted at request {index}", rest.id
+                    )
+                    for rest in requests[index + 1 :]
+                )
+                return responses, False
+        return responses, True
+
+    def _scope_for(self, sub: BatchSubRequest) -> Tuple[Scope, bytes]:
+        path, _, query_string = resolve_references(sub.path, self.results).partition(
+            "?"
+        )
+        if sub.query:
+            query = resolve_references(sub.query, self.results)
+            extra = urlencode(query, doseq=True)
+            query_string = f"{query_string}&{extra}" if query_string else extra
+        body = b""
+        headers = [
+            (name, value)
+            for name, value in self.parent_scope["headers"]
+            if name not in _OWN_HEADERS
+        ]
+        for name, value in (sub.headers or {}).items():
+            key = name.lower().encode("latin-1")
+            headers = [header for header in headers if header[0] != key]
+            headers.append((key, value.encode("latin-1")))
+        if sub.body is not None:
+            body = json.dumps(resolve_references(sub.body, self.results)).encode()
+            headers.append((b"content-type", b"application/json"))
+        headers.append((b"content-length", str(len(body)).encode()))
+
+        full_path = self.prefix + "/" + path.lstrip("/")
+        scope = {
+            key: value
+            for key, value in self.parent_scope.items()
+            if key not in ("route", "endpoint", "path_params")
+            and not key.startswith(("fastapi_inner", "fastapi_function"))
+        }
+        scope.update(
+            method=sub.method,
+            path=full_path,
+            raw_path=full_path.encode(),
+            query_string=query_string.encode(),
+            headers=headers,
+        )
+        return scope, body
+
+    async def dispatch(self, sub: BatchSubRequest) -> BatchSubResponse:
+        """Routes one sub-request in-process and collects its response."""
+        scope, body = self._scope_for(sub)
+        if scope["path"].rstrip("/") == self.parent_scope["path"].rstrip("/"):
+            return _error(400, "Nested batches are not supported", sub.id)
+
+        route, partial = None, None
+        for candidate in scope["router"].routes:
+            match, child_scope = candidate.matches(scope)
+            if match == Match.FULL:
+                route = candidate
+                scope.update(child_scope)
+                break
+            if match == Match.PARTIAL and partial is None:
+                partial = candidate
+        if route is None:
+            if partial is not None:
+                return _error(405, "Method Not Allowed", sub.id)
+            return _error(404, "Not Found", sub.id)
+
+        messages: List[Message] = []
+        body_sent = False
+        body_size = 0
+        too_large = False
+
+        async def receive() -> Message:
+            nonlocal body_sent
+            if body_sent:
+                return {"type": "http.disconnect"}
+            body_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        async def send(message: Message) -> None:
+            nonlocal body_size, too_large
+            body_size += len(message.get("body", b""))
+            if body_size > settings.BATCH_MAX_RESPONSE_BYTES:
+                too_large = True
+                raise _ResponseTooLarge()
+            messages.append(message)
+
+        limit = scope.get("concurrency_limit")
+        try:
+            if limit is not None:
+                await limit.admit(scope, receive, send, route.handle)
+            else:
+                await route.handle(scope, receive, send)
+        except Exception as e:
+            # Checked by flag: streamed responses may wrap it in a group
+            if too_large:
+                return _error(
+                    413,
+                    "Response too large for a batch; request it on its own",
+                    sub.id,
+                )
+            logger.error(
+                f"Unhandled error in batch sub-request {sub.method} {sub.path}: {e}",
+                exc_info=True,
+            )
+            return _error(500, "An internal server error occurred.", sub.id)
+
+        start = next(m for m in messages if m["type"] == "http.response.start")
+        content = b"".join(
+            m.get("body", b"") for m in messages if m["type"] == "http.response.body"
+        )
+        headers = [
+            (name.decode("latin-1"), value.decode("latin-1"))
+            for name, value in start.get("headers", [])
+            if name != b"content-length"
+        ]
+        content_type = next((v for name, v in headers if name == "content-type"), "")
+        payload: Any = None
+        if content:
+            if "json" in content_type:
+                payload = json.loads(content)
+            else:
+                payload = content.decode("utf-8", errors="replace")
+        return BatchSubResponse(
+            id=sub.id, status=start["status"], headers=headers, body=payload
+        )
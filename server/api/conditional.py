@@ -0,0 +1,186 @@
+"""
+Conditional GET support (ETag / Last-Modified) for polled read endpoints.
+
+Validators are derived from a cheap aggregate per source table within
+the endpoint's scope, plus the request path and query string: the ETag
+from ``count(*)`` and the sum of the rows' ``xmin`` (the id of the
+transaction that wrote each row version), ``Last-Modified`` from
+``max(updated_at)``.
+
+``updated_at`` alone is not enough for the ETag: it is ``now()``, the
+transaction *start* time, so an update that commits after a newer one
+carries an older timestamp and would leave ``max(updated_at)`` unchanged.
+Every write gives the row a new, larger ``xmin`` instead, so the sum moves
+whatever the commit order. (On SQLite, used by the tests, ``updated_at``
+stands in for ``xmin``; no such guarantee there.)
+
+A matching ``If-None-Match`` (or, without one, a satisfied
+``If-Modified-Since``) is answered with ``304 Not Modified`` from the
+dependency itself, before the endpoint runs its main query or serializes
+anything.
+
+Usage::
+
+    owner_cranes_cache = ConditionalGet(
+        lambda request: scope_version(
+            Crane, Crane.owner_org_id == request.path_params["ownerId"]
+        ),
+    )
+
+    @router.get("/{ownerId}/cranes")
+    def endpoint(cache: CacheValidators = Depends(owner_cranes_cache), ...):
+        ...
+"""
+
+import datetime as dt
+import hashlib
+import logging
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from fastapi import Depends, HTTPException, Request, Response, status
+from sqlalchemy import BigInteger, Select, func, select
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.functions import FunctionElement
+
+from server.config import settings
+from server.core.metrics import cache_requests
+from server.database import get_analytics_db, get_db
+
+logger = logging.getLogger(__name__)
+
+VersionSource = Callable[[Request], Select]
+
+
+class row_version(FunctionElement):
+    """Commit-order-independent row version: ``xmin`` on PostgreSQL."""
+
+    type = BigInteger()
+    inherit_cache = True
+
+
+@compiles(row_version, "postgresql")
+def _row_version_postgresql(element, compiler, **kw):
+    return "xmin::text::bigint"
+
+
+@compiles(row_version)
+def _row_version_default(element, compiler, **kw):
+    return f"julianday({compiler.process(element.clauses, **kw)})"
+
+
+def scope_version(model: Any, *criteria: Any) -> Select:
+    """
+    Builds the version query for one table: row count, sum of row versions
+    and newest `updated_at` within the given scope.
+    """
+    stmt = select(
+        func.count(),
+        func.sum(row_version(model.updated_at)),
+        func.max(model.updated_at),
+    ).select_from(model)
+    if criteria:
+        stmt = stmt.where(*criteria)
+    return stmt
+
+
+class CacheValidators:
+    """Validators computed for the current request."""
+
+    def __init__(
+        self, etag: str, last_modified: Optional[dt.datetime], cache_control: str
+    ):
+        self.etag = etag
+        self.last_modified = last_modified
+        self.cache_control = cache_control
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        headers = {"ETag": self.etag, "Cache-Control": self.cache_control}
+        if self.last_modified is not None:
+            headers["Last-Modified"] = format_datetime(self.last_modified, usegmt=True)
+        return headers
+
+    def matches(self, request: Request) -> bool:
+        """Evaluates If-None-Match / If-Modified-Since against the validators."""
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None:
+            tags = [tag.strip() for tag in if_none_match.split(",")]
+            return "*" in tags or any(
+                tag.removeprefix("W/") == self.etag for tag in tags
+            )
+        if_modified_since = request.headers.get("if-modified-since")
+        if if_modified_since and self.last_modified is not None:
+            try:
+                since = parsedate_to_datetime(if_modified_since)
+            except (TypeError, ValueError):
+                return False
+            return self.last_modified.replace(microsecond=0) <= since
+        return False
+
+
+def _as_utc(value: Optional[dt.datetime]) -> Optional[dt.datetime]:
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        return value.replace(tzinfo=dt.timezone.utc)
+    return value.astimezone(dt.timezone.utc)
+
+
+class ConditionalGet:
+    """
+    Dependency that computes validators for an endpoint and short-circuits
+    with 304 when the client's cached copy is still current.
+    """
+
+    def __init__(
+        self,
+        *sources: VersionSource,
+        cache_control: str = "private, no-cache",
+    ):
+        self.sources: Sequence[VersionSource] = sources
+        self.cache_control = cache_control
+
+    def compute(self, request: Request, db: Session) -> CacheValidators:
+        parts: List[str] = [settings.APP_VERSION, request.url.path, request.url.query]
+        last_modified: Optional[dt.datetime] = None
+        for source in self.sources:
+            count, version, newest = db.execute(source(request)).one()
+            newest = _as_utc(newest)
+            parts.append(f"{count}:{version}")
+            if newest is not None and (last_modified is None or newest > last_modified):
+                last_modified = newest
+        digest = hashlib.sha256("|".join(parts).encode()).hexdigest()[:32]
+        return CacheValidators(f'"{digest}"', last_modified, self.cache_control)
+
+    def __call__(
+        self, request: Request, response: Response, db: Session = Depends(get_db)
+    ) -> CacheValidators:
+        return self.check(request, response, db)
+
+    def check(
+        self, request: Request, response: Response, db: Session
+    ) -> CacheValidators:
+        validators = self.compute(request, db)
+        if validators.matches(request):
+            cache_requests.inc("conditional_get", "hit")
+            logger.debug("304 Not Modified for %s", request.url.path)
+            raise HTTPException(
+                status_code=status.HTTP_304_NOT_MODIFIED, headers=validators.headers
+            )
+        cache_requests.inc("conditional_get", "miss")
+        response.headers.update(validators.headers)
+        return validators
+
+
+class AnalyticsConditionalGet(ConditionalGet):
+    """`ConditionalGet` for analytics routes: reads on the analytics engine."""
+
+    def __call__(
+        self,
+        request: Request,
+        response: Response,
+        db: Session = Depends(get_analytics_db),
+    ) -> CacheValidators:
+        return self.check(request, response, db)
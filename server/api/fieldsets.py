@@ -0,0 +1,103 @@
+"""
+Sparse fieldsets (``?fields=``) for list endpoints.
+
+A list endpoint declares ``fields: Optional[FrozenSet[str]] = Depends(
+sparse_fields(SchemaOut))``. When the client sends ``?fields=id,status`` the
+dependency validates the names against the response schema, the service
+selects only the matching columns, and `sparse_response` serializes just
+those fields. Without the parameter the endpoint behaves as before.
+"""
+
+from functools import lru_cache
+from typing import (
+    Any,
+    Callable,
+    FrozenSet,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Type,
+)
+
+from fastapi import HTTPException, Query, Response, status
+from pydantic import BaseModel, ConfigDict, TypeAdapter, create_model
+
+from server.core.metrics import watch_lru_cache
+
+
+def parse_fields(
+    schema: Type[BaseModel], raw: Optional[str]
+) -> Optional[FrozenSet[str]]:
+    """
+    Parses a comma-separated field list and validates it against a schema.
+
+    Returns None when no fields were requested (i.e. the full representation).
+    """
+    if raw is None:
+        return None
+    fields = frozenset(name.strip() for name in raw.split(",") if name.strip())
+    if not fields:
+        return None
+    unknown = fields - schema.model_fields.keys()
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=(
+                f"Unknown fields requested: {sorted(unknown)}. "
+                f"Allowed: {list(schema.model_fields)}"
+            ),
+        )
+    return fields
+
+
+def sparse_fields(
+    schema: Type[BaseModel],
+) -> Callable[[Optional[str]], Optional[FrozenSet[str]]]:
+    """Creates a dependency that reads and validates the `fields` query parameter."""
+
+    def dependency(
+        fields: Optional[str] = Query(
+            None,
+            description=(
+                "Comma-separated list of fields to return, e.g. "
+                f"`{','.join(list(schema.model_fields)[:3])}`. "
+                "Defaults to all fields."
+            ),
+        ),
+    ) -> Optional[FrozenSet[str]]:
+        return parse_fields(schema, fields)
+
+    return dependency
+
+
+@lru_cache(maxsize=256)
+def _partial_list_adapter(
+    schema: Type[BaseModel], fields: FrozenSet[str]
+) -> TypeAdapter:
+    definitions: Any = {
+        name: (info.annotation, info)
+        for name, info in schema.model_fields.items()
+        if name in fields
+    }
+    partial = create_model(
+        f"{schema.__name__}Partial",
+        __config__=ConfigDict(from_attributes=True),
+        **definitions,
+    )
+    return TypeAdapter(List[partial])  # type: ignore[valid-type]
+
+
+watch_lru_cache("fieldset_adapters", _partial_list_adapter)
+
+
+def sparse_response(
+    schema: Type[BaseModel],
+    items: Iterable[Any],
+    fields: FrozenSet[str],
+    headers: Optional[Mapping[str, str]] = None,
+) -> Response:
+    """Serializes `items` with only the requested `fields` of `schema`."""
+    adapter = _partial_list_adapter(schema, fields)
+    body = adapter.dump_json(adapter.validate_python(list(items), from_attributes=True))
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,297 @@
+"""
+Rate limits for login and expensive endpoints.
+
+Limits are token buckets: ``"10/minute"`` allows a burst of 10 requests
+and refills 10 tokens per minute. Buckets are keyed per client IP, per
+user or per organization, and configured per route with a dependency::
+
+    login_limit = RateLimit("login", settings.RATE_LIMIT_LOGIN)  # per IP
+
+    @router.post("/login", dependencies=[Depends(login_limit)])
+    def endpoint(...):
+        ...
+
+    UserRateLimit("owner-stats", "30/minute", key="org")  # per org of the current user
+
+Requests over the limit get ``429 Too Many Requests`` with ``Retry-After``.
+
+Every worker keeps its buckets in memory. With RATE_LIMIT_STORE=database
+the limit is shared by all workers through ``ops.rate_limit_buckets``:
+one upsert per allowed request. The in-memory bucket stays in front of it
+and sees only this worker's requests, so it holds at least as many
+tokens as the shared one. A request it rejects is rejected without I/O.
+About once an hour each worker deletes the rows that have been idle long
+enough to refill completely; a missing row is the same as a full bucket.
+"""
+
+import asyncio
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import List, NamedTuple, Optional
+
+from fastapi import Depends, HTTPException, Request, status
+from sqlalchemy import case, delete, literal
+from sqlalchemy.engine import Engine
+from starlette.concurrency import run_in_threadpool
+
+from server.auth.context import UserContext, get_current_user
+from server.config import settings
+from server.core.metrics import Counter
+from server.database import db_manager
+from server.domain.models import RateLimitBucket
+
+logger = logging.getLogger(__name__)
+
+rate_limited_requests = Counter(
+    "rate_limited_requests_total",
+    "Requests rejected with 429 by a rate limit",
+    ["limit"],
+)
+
+_UNITS = {"second": 1.0, "minute": 60.0, "hour": 3600.0, "day": 86400.0}
+_PURGE_INTERVAL_SECONDS = 3600.0
+
+
+class Rate(NamedTuple):
+    burst: float
+    per_second: float
+
+    @property
+    def refill_seconds(self) -> float:
+        """Seconds an empty bucket takes to fill up again."""
+        return self.burst / self.per_second
+
+    @classmethod
+    def parse(cls, text: str) -> "Rate":
+        """Parses ``"<count>/<second|minute|hour|day>"``."""
+        count, _, unit = text.partition("/")
+        try:
+            burst = float(count)
+            period = _UNITS[unit.strip().rstrip("s")]
+        except (ValueError, KeyError):
+            raise ValueError(f"Invalid rate limit {text!r}; expected e.g. '10/minute'")
+        return cls(burst, burst / period)
+
+
+class MemoryBuckets:
+    """Token buckets held by this process; the least recently used are evicted."""
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, list]" = (
+            OrderedDict()
+        )  # key -> [tokens, updated_at]
+        self._lock = threading.Lock()
+
+    def take(self, key: str, rate: Rate, now: float, cost: float = 1.0) -> float:
+        """Takes ``cost`` tokens; returns 0, or the seconds until they are available."""
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [rate.burst, now]
+                if len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+                bucket[0] = min(
+                    rate.burst, bucket[0] + (now - bucket[1]) * rate.per_second
+                )
+                bucket[1] = now
+            if bucket[0] >= cost:
+                bucket[0] -= cost
+                return 0.0
+            return (cost - bucket[0]) / rate.per_second
+
+    def refund(self, key: str, rate: Rate, cost: float = 1.0) -> None:
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket[0] = min(rate.burst, bucket[0] + cost)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+
+class DatabaseBuckets:
+    """
+    Token buckets shared by all workers in ``ops.rate_limit_buckets``
+    (an UNLOGGED table on PostgreSQL). Each take is one atomic upsert.
+    """
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        if engine.dialect.name == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        self._insert = insert
+        self._idle_seconds = 0.0  # longest refill time of the limits using it
+        self._task: Optional[asyncio.Task] = None
+
+    def register(self, rate: Rate) -> None:
+        """Makes sure `purge_idle` keeps buckets that ``rate`` has not refilled."""
+        self._idle_seconds = max(self._idle_seconds, rate.refill_seconds)
+
+    def take(self, key: str, rate: Rate, now: float, cost: float = 1.0) -> float:
+        table = RateLimitBucket.__table__
+        stmt = self._insert(table).values(
+            key=key, tokens=rate.burst - cost, updated_at=now, allowed=True
+        )
+        refilled = (
+            table.c.tokens + (literal(now) - table.c.updated_at) * rate.per_second
+        )
+        refilled = case((refilled < rate.burst, refilled), else_=literal(rate.burst))
+        allowed = refilled >= cost
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.key],
+            set_={
+                "tokens": case((allowed, refilled - cost), else_=refilled),
+                "updated_at": now,
+                "allowed": allowed,
+            },
+        ).returning(table.c.tokens, table.c.allowed)
+        with self.engine.begin() as connection:
+            tokens, was_allowed = connection.execute(stmt).one()
+        if was_allowed:
+            return 0.0
+        return (cost - tokens) / rate.per_second
+
+    def purge_idle(self, now: float) -> int:
+        """Deletes buckets that are full again by now; returns the number deleted."""
+        table = RateLimitBucket.__table__
+        with self.engine.begin() as connection:
+            result = connection.execute(
+                delete(table).where(table.c.updated_at < now - self._idle_seconds)
+            )
+        return result.rowcount
+
+    # --- Background purge ------------------------------------------------------
+
+    def _purge_once(self) -> None:
+        try:
+            deleted = self.purge_idle(time.time())
+        except Exception as e:
+            logger.error("Could not purge rate limit buckets: %s", e)
+            return
+        if deleted:
+            logger.info("Purged %d idle rate limit bucket(s)", deleted)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(_PURGE_INTERVAL_SECONDS)
+            await run_in_threadpool(self._purge_once)
+
+    def start(self) -> None:
+        """Purges idle buckets in the background until `stop`."""
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+_limiters: List["RateLimiter"] = []
+
+
+def reset_rate_limits() -> None:
+    """Refills every limiter's in-process buckets (tests)."""
+    for limiter in _limiters:
+        limiter.local.clear()
+
+
+class RateLimiter:
+    """One named limit: the local buckets, plus the shared ones if configured."""
+
+    def __init__(self, name: str, rate: Rate, shared: Optional[DatabaseBuckets] = None):
+        self.name = name
+        self.rate = rate
+        self.shared = shared
+        if shared is not None:
+            shared.register(rate)
+        self.local = MemoryBuckets(settings.RATE_LIMIT_MAX_KEYS)
+        _limiters.append(self)
+
+    def hit(self, key: str) -> None:
+        """Counts one request for ``key``; raises a 429 `HTTPException` if over."""
+        now = time.time()
+        wait = self.local.take(key, self.rate, now)
+        if not wait and self.shared is not None:
+            try:
+                wait = self.shared.take(f"{self.name}:{key}", self.rate, now)
+            except Exception as e:
+                # Fall back to the per-worker limit rather than failing the request.
+                logger.error("Shared rate limit %s unavailable: %s", self.name, e)
+            if wait:
+                self.local.refund(key, self.rate)
+        if wait:
+            rate_limited_requests.inc(self.name)
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many requests, please retry later",
+                headers={"Retry-After": str(max(1, math.ceil(wait)))},
+            )
+
+    async def hit_async(self, key: str) -> None:
+        """`hit` for async code; the shared store is queried off the event loop."""
+        if self.shared is None:
+            self.hit(key)
+        else:
+            await run_in_threadpool(self.hit, key)
+
+
+_shared: Optional[DatabaseBuckets] = None
+
+
+def shared_buckets() -> Optional[DatabaseBuckets]:
+    """The cross-worker store selected by RATE_LIMIT_STORE, or None for memory only."""
+    global _shared
+    if settings.RATE_LIMIT_STORE != "database":
+        return None
+    if _shared is None:
+        _shared = DatabaseBuckets(db_manager.engine)
+    return _shared
+
+
+def client_ip(request: Request) -> str:
+    if settings.RATE_LIMIT_TRUST_FORWARDED:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+
+class RateLimit:
+    """Dependency limiting requests per client IP."""
+
+    def __init__(self, name: str, limit: str):
+        self.limiter = RateLimiter(name, Rate.parse(limit), shared_buckets())
+
+    def enabled(self) -> bool:
+        return settings.RATE_LIMIT_ENABLED
+
+    def __call__(self, request: Request) -> None:
+        if self.enabled():
+            self.limiter.hit(f"ip:{client_ip(request)}")
+
+
+class UserRateLimit(RateLimit):
+    """Dependency limiting requests per user (``key="user"``) or org (``key="org"``)."""
+
+    def __init__(self, name: str, limit: str, key: str = "user"):
+        if key not in ("user", "org"):
+            raise ValueError(f"Unknown rate limit key {key!r}")
+        super().__init__(name, limit)
+        self.key = key
+
+    def __call__(self, user: UserContext = Depends(get_current_user)) -> None:
+        if not self.enabled():
+            return
+        if self.key == "org" and user.org_ids:
+            self.limiter.hit(f"org:{user.org_ids[0]}")
+        else:
+            self.limiter.hit(f"user:{user.id}")
@@ -0,0 +1,35 @@
+import logging
+
+from fastapi import APIRouter, HTTPException, Request, status
+
+from server.api.batch import BatchRunner
+from server.config import settings
+from server.core.timing import TimedRoute
+from server.domain.schemas import BatchIn, BatchOut
+
+router = APIRouter(route_class=TimedRoute)
+logger = logging.getLogger(__name__)
+
+API_PREFIX = "/api/v1"
+
+
+@router.post("", response_model=BatchOut)
+async def batch_endpoint(payload: BatchIn, request: Request):
+    """
+    Execute an ordered list of sub-requests in one round trip.
+    Later sub-requests can reference earlier results, e.g.
+    `"site_id": "${site.body.id}"`. With `transaction: true` all of them run
+    in one DB transaction that is rolled back if any sub-request fails.
+    """
+    if len(payload.requests) > settings.BATCH_MAX_REQUESTS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=(
+                f"A batch may contain at most {settings.BATCH_MAX_REQUESTS} requests"
+            ),
+        )
+    logger.info(
+        f"Running batch of {len(payload.requests)} requests "
+        f"(transaction={payload.transaction})"
+    )
+    return await BatchRunner(request, prefix=API_PREFIX).run(payload)
@@ -1,19 +1,37 @@
 import logging
-from typing import List
+from typing import FrozenSet, List, Optional
 from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
 
+from server.api.conditional import CacheValidators, ConditionalGet, scope_version
+from server.api.fieldsets import sparse_fields, sparse_response
+from server.core.timing import TimedRoute
 from server.database import get_db
+from server.domain.models import CraneModel
 from server.domain.schemas import CraneModelOut
 from server.domain.services import crane_model_service
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 logger = logging.getLogger(__name__)
 
+crane_models_cache = ConditionalGet(
+    lambda request: scope_version(CraneModel),
+    cache_control="public, no-cache",
+)
+
 
 @router.get("", response_model=List[CraneModelOut])
-def list_crane_models_endpoint(db: Session = Depends(get_db)):
+def list_crane_models_endpoint(
+    fields: Optional[FrozenSet[str]] = Depends(sparse_fields(CraneModelOut)),
+    cache: CacheValidators = Depends(crane_models_cache),
+    db: Session = Depends(get_db),
+):
     """
     List all crane models.
+    Use `fields` to return only a subset of fields, e.g. `fields=id,model_name`.
+    Supports conditional requests (`If-None-Match` / `If-Modified-Since`).
     """
-    return crane_model_service.get_models(db=db)
+    models = crane_model_service.get_models(db=db, fields=fields)
+    if fields is not None:
+        return sparse_response(CraneModelOut, models, fields, headers=cache.headers)
+    return models
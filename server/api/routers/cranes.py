@@ -1,9 +1,11 @@
 import logging
-from typing import List, Optional
+from typing import FrozenSet, List, Optional
 
 from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
 
+from server.api.fieldsets import sparse_fields, sparse_response
+from server.core.timing import TimedRoute
 from server.database import get_db
 from server.domain.schemas import (
     CraneOut,
@@ -11,7 +13,7 @@ from server.domain.schemas import (
 )
 from server.domain.services import crane_service
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 logger = logging.getLogger(__name__)
 
 
@@ -22,14 +24,20 @@ def list_cranes_endpoint(
     status: Optional[CraneStatus] = None,
     model_name: Optional[str] = None,
     min_capacity: Optional[int] = None,
+    fields: Optional[FrozenSet[str]] = Depends(sparse_fields(CraneOut)),
 ):
     """
     List all cranes with optional filtering.
+    Use `fields` to return only a subset of fields, e.g. `fields=id,serial_no,status`.
     """
-    return crane_service.list_owner_cranes(
+    cranes = crane_service.list_owner_cranes(
         db=db,
         owner_org_id=owner_org_id,
         status=status,
         model_name=model_name,
         min_capacity=min_capacity,
+        fields=fields,
     )
+    if fields is not None:
+        return sparse_response(CraneOut, cranes, fields)
+    return cranes
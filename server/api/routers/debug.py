@@ -0,0 +1,236 @@
+import logging
+import tracemalloc
+from enum import Enum
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import HTMLResponse, PlainTextResponse
+
+from server.config import settings
+from server.core import memory
+from server.core.loop_watchdog import loop_watchdog
+from server.core.profiler import (
+    PROFILE_PATH,
+    collapsed_stacks,
+    profile_store,
+    profile_summary,
+    render_flamegraph,
+    start_process_profile,
+)
+from server.core.security import is_debug_request
+from server.core.slow_queries import slow_query_log
+from server.core.sql_trace import trace_store
+from server.core.timing import TimedRoute
+
+logger = logging.getLogger(__name__)
+
+
+class AllocationKey(str, Enum):
+    LINENO = "lineno"
+    FILENAME = "filename"
+    TRACEBACK = "traceback"
+
+
+class ProfileFormat(str, Enum):
+    HTML = "html"
+    COLLAPSED = "collapsed"
+    JSON = "json"
+
+
+def require_debug_access(request: Request) -> None:
+    """Debug endpoints answer 404 to requests without debug access."""
+    if not is_debug_request(request.headers):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+
+
+router = APIRouter(route_class=TimedRoute, dependencies=[Depends(require_debug_access)])
+
+
+@router.get("/traces/{request_id}")
+def get_sql_trace_endpoint(request_id: str):
+    """
+    SQL trace captured for a request sent with `X-Debug-Trace: 1` (or
+    `explain`): statements, parameters, timings, row counts and the plan of
+    the slowest SELECT.
+    """
+    trace = trace_store.get(request_id)
+    if trace is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No trace stored for request {request_id}",
+        )
+    return trace
+
+
+@router.get("/slow-queries")
+def list_slow_queries_endpoint(limit: int = Query(50, ge=1, le=500)):
+    """
+    Statements over SLOW_QUERY_THRESHOLD_MS in this worker, aggregated by
+    fingerprint and ordered by total time, with the captured plan.
+    """
+    return {
+        "threshold_ms": slow_query_log.threshold * 1000,
+        "dropped": slow_query_log.dropped,
+        "entries": slow_query_log.entries(limit),
+    }
+
+
+@router.delete("/slow-queries", status_code=204)
+def reset_slow_queries_endpoint():
+    """Clears the slow-query aggregate of this worker."""
+    logger.info("Slow query log reset")
+    slow_query_log.reset()
+
+
+@router.get("/loop-stalls")
+def list_loop_stalls_endpoint():
+    """
+    Recent event-loop stalls of this worker, newest first: how long the
+    loop was held and the stack of the code holding it.
+    """
+    return {
+        "threshold_ms": loop_watchdog.threshold * 1000,
+        "stalls": loop_watchdog.recent_stalls(),
+    }
+
+
+@router.post("/profiler/start", status_code=status.HTTP_202_ACCEPTED)
+def start_profiler_endpoint(
+    request: Request,
+    seconds: float = Query(10, gt=0, le=settings.PROFILER_MAX_SECONDS),
+):
+    """
+    Samples every thread of this worker for `seconds`. The profile is stored
+    under this request's id once done.
+    """
+    if not settings.PROFILER_ENABLED:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    profile_id = request.state.request_id
+    if not start_process_profile(profile_id, seconds):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A process-wide profile is already running on this worker",
+        )
+    logger.info("Started process profile %s for %.1f s", profile_id, seconds)
+    return {
+        "profile_id": profile_id,
+        "seconds": seconds,
+        "url": PROFILE_PATH.format(profile_id=profile_id),
+    }
+
+
+@router.get("/profiles/{profile_id}")
+def get_profile_endpoint(
+    profile_id: str,
+    format: ProfileFormat = ProfileFormat.HTML,
+):
+    """
+    A stored CPU profile as a flamegraph page (`html`), collapsed stacks for
+    external tools (`collapsed`) or the raw document with the hottest
+    functions (`json`).
+    """
+    document = profile_store.get(profile_id)
+    if document is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No profile stored under {profile_id}",
+        )
+    if format == ProfileFormat.HTML:
+        return HTMLResponse(render_flamegraph(document))
+    if format == ProfileFormat.COLLAPSED:
+        return PlainTextResponse(collapsed_stacks(document))
+    return {**document, "top": profile_summary(document)}
+
+
+def require_memory_profiling() -> None:
+    if not settings.MEMORY_PROFILING_ENABLED:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+
+
+def get_memory_snapshot(name: str):
+    snapshot = memory.snapshot_store.get(name)
+    if snapshot is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No memory snapshot named {name}",
+        )
+    return snapshot
+
+
+@router.get("/memory", dependencies=[Depends(require_memory_profiling)])
+def get_memory_status_endpoint():
+    """Tracing state, traced and resident memory and the stored snapshots."""
+    return memory.status()
+
+
+@router.post("/memory/start", dependencies=[Depends(require_memory_profiling)])
+def start_memory_tracing_endpoint(
+    frames: int = Query(settings.MEMORY_TRACE_FRAMES, ge=1, le=100),
+):
+    """
+    Starts tracemalloc in this worker, keeping `frames` frames per
+    allocation. Allocations are noticeably slower until it is stopped.
+    """
+    memory.start_tracing(frames)
+    logger.info("Memory tracing started (%d frames)", frames)
+    return memory.status()
+
+
+@router.post("/memory/stop", dependencies=[Depends(require_memory_profiling)])
+def stop_memory_tracing_endpoint():
+    """Stops tracemalloc; snapshots already taken stay available."""
+    memory.stop_tracing()
+    logger.info("Memory tracing stopped")
+    return memory.status()
+
+
+@router.post(
+    "/memory/snapshots",
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(require_memory_profiling)],
+)
+def take_memory_snapshot_endpoint(
+    name: Optional[str] = Query(None, pattern=r"^[A-Za-z0-9_.-]{1,64}$"),
+):
+    """Snapshots the traced allocations of this worker (tracing must be on)."""
+    if not tracemalloc.is_tracing():
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Memory tracing is not running; POST /memory/start first",
+        )
+    name = memory.snapshot_store.take(name)
+    logger.info("Memory snapshot %s taken", name)
+    return {"name": name, "snapshots": memory.snapshot_store.names()}
+
+
+@router.get(
+    "/memory/snapshots/{name}", dependencies=[Depends(require_memory_profiling)]
+)
+def get_memory_snapshot_endpoint(
+    name: str,
+    key: AllocationKey = AllocationKey.LINENO,
+    limit: int = Query(20, ge=1, le=500),
+):
+    """The allocation sites holding the most memory in a snapshot."""
+    snapshot = get_memory_snapshot(name)
+    return {
+        "name": name,
+        "traced_bytes": sum(stat.size for stat in snapshot.statistics("filename")),
+        "top": memory.top_allocations(snapshot, key.value, limit),
+    }
+
+
+@router.get("/memory/diff", dependencies=[Depends(require_memory_profiling)])
+def diff_memory_snapshots_endpoint(
+    base: str,
+    target: str,
+    key: AllocationKey = AllocationKey.LINENO,
+    limit: int = Query(20, ge=1, le=500),
+):
+    """Allocation sites ordered by how much they grew from `base` to `target`."""
+    old, new = get_memory_snapshot(base), get_memory_snapshot(target)
+    return {
+        "base": base,
+        "target": target,
+        "top": memory.allocation_diff(old, new, key.value, limit),
+    }
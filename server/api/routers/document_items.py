@@ -3,6 +3,7 @@ import logging
 from fastapi import APIRouter, Depends, status, HTTPException
 from sqlalchemy.orm import Session
 
+from server.core.timing import TimedRoute
 from server.database import get_db
 from server.domain.schemas import (
     DocItemResponse,
@@ -12,7 +13,7 @@ from server.domain.schemas import (
 )
 from server.domain.services import document_service
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 logger = logging.getLogger(__name__)
 
 
@@ -3,11 +3,12 @@ import logging
 from fastapi import APIRouter, Depends, status
 from sqlalchemy.orm import Session
 
+from server.core.timing import TimedRoute
 from server.database import get_db
 from server.domain.schemas import DocRequestIn, DocRequestResponse
 from server.domain.services import document_service
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 logger = logging.getLogger(__name__)
 
 
@@ -0,0 +1,137 @@
+import datetime as dt
+import logging
+from typing import Iterator, Optional
+
+from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
+
+from server.api.rate_limits import UserRateLimit
+from server.config import settings
+from server.core.bulkheads import analytics_bulkhead
+from server.core.timing import AnalyticsRoute
+from server.domain.schemas import (
+    AssignmentStatus,
+    CraneStatus,
+    DocItemStatus,
+    ExportFormat,
+)
+from server.domain.services import export_service
+
+# Every export is a full-table scan; rate limited per organization and run
+# on the analytics bulkhead (threads and database engine).
+exports_limit = UserRateLimit("exports", settings.RATE_LIMIT_EXPORTS, key="org")
+router = APIRouter(route_class=AnalyticsRoute, dependencies=[Depends(exports_limit)])
+logger = logging.getLogger(__name__)
+
+MEDIA_TYPES = {
+    ExportFormat.NDJSON: "application/x-ndjson",
+    ExportFormat.CSV: "text/csv; charset=utf-8",
+}
+
+
+def _export_response(
+    name: str, chunks: Iterator[bytes], export_format: ExportFormat
+) -> StreamingResponse:
+    """Wraps an export generator in a downloadable streaming response."""
+    filename = f"{name}-{dt.date.today().isoformat()}.{export_format.value}"
+    logger.info(f"Starting {export_format.value} export: {name}")
+    return StreamingResponse(
+        analytics_bulkhead.iterate(chunks),
+        media_type=MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.get("/cranes")
+def export_cranes_endpoint(
+    format: ExportFormat = ExportFormat.NDJSON,
+    owner_org_id: Optional[str] = None,
+    status: Optional[CraneStatus] = None,
+    model_name: Optional[str] = None,
+    min_capacity: Optional[int] = None,
+):
+    """
+    Export cranes (with model specs) as NDJSON or CSV.
+    Filters mirror `GET /org/cranes`.
+    """
+    stmt, columns = export_service.cranes_stmt(
+        owner_org_id=owner_org_id,
+        crane_status=status,
+        model_name=model_name,
+        min_capacity=min_capacity,
+    )
+    return _export_response(
+        "cranes", export_service.stream(stmt, columns, format), format
+    )
+
+
+@router.get("/sites")
+def export_sites_endpoint(
+    format: ExportFormat = ExportFormat.NDJSON,
+    mine: Optional[bool] = None,
+    user_id: Optional[str] = None,
+):
+    """
+    Export construction sites as NDJSON or CSV.
+    Filters mirror `GET /org/sites`.
+    """
+    stmt, columns = export_service.sites_stmt(mine=mine, user_id=user_id)
+    return _export_response(
+        "sites", export_service.stream(stmt, columns, format), format
+    )
+
+
+@router.get("/crane-deployments")
+def export_crane_assignments_endpoint(
+    format: ExportFormat = ExportFormat.NDJSON,
+    site_id: Optional[str] = None,
+    crane_id: Optional[str] = None,
+    status: Optional[AssignmentStatus] = None,
+):
+    """
+    Export crane-to-site assignments as NDJSON or CSV.
+    """
+    stmt, columns = export_service.crane_assignments_stmt(
+        site_id=site_id, crane_id=crane_id, assignment_status=status
+    )
+    return _export_response(
+        "crane-deployments", export_service.stream(stmt, columns, format), format
+    )
+
+
+@router.get("/driver-attendance-logs")
+def export_attendance_endpoint(
+    format: ExportFormat = ExportFormat.NDJSON,
+    driver_assignment_id: Optional[str] = None,
+    work_date_from: Optional[dt.date] = None,
+    work_date_to: Optional[dt.date] = None,
+):
+    """
+    Export driver attendance logs as NDJSON or CSV.
+    `work_date_from` / `work_date_to` are inclusive.
+    """
+    stmt, columns = export_service.attendance_stmt(
+        driver_assignment_id=driver_assignment_id,
+        work_date_from=work_date_from,
+        work_date_to=work_date_to,
+    )
+    return _export_response(
+        "driver-attendance-logs", export_service.stream(stmt, columns, format), format
+    )
+
+
+@router.get("/document-items")
+def export_document_items_endpoint(
+    format: ExportFormat = ExportFormat.NDJSON,
+    request_id: Optional[str] = None,
+    status: Optional[DocItemStatus] = None,
+):
+    """
+    Export driver document items as NDJSON or CSV.
+    """
+    stmt, columns = export_service.document_items_stmt(
+        request_id=request_id, item_status=status
+    )
+    return _export_response(
+        "document-items", export_service.stream(stmt, columns, format), format
+    )
@@ -4,10 +4,11 @@ import logging
 from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
 
+from server.core.timing import TimedRoute
 from server.database import db_manager, get_db
 from server.domain.schemas import HealthCheckResponse
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 logger = logging.getLogger(__name__)
 
 
@@ -0,0 +1,23 @@
+import logging
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from server.config import settings
+from server.core.metrics import exposition
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def metrics_endpoint():
+    """
+    Prometheus scrape endpoint. With METRICS_MULTIPROC_DIR set, the totals of
+    all worker processes are returned, whichever worker serves the scrape.
+    """
+    return PlainTextResponse(
+        exposition(settings.METRICS_MULTIPROC_DIR), media_type=CONTENT_TYPE
+    )
@@ -1,13 +1,26 @@
 import logging
-from typing import List, Optional
+from typing import FrozenSet, List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 
-from server.database import get_db
+from server.api.conditional import (
+    AnalyticsConditionalGet,
+    CacheValidators,
+    ConditionalGet,
+    scope_version,
+)
+from server.api.fieldsets import sparse_fields, sparse_response
+from server.api.rate_limits import UserRateLimit
+from server.config import settings
+from server.core.deadlines import DeadlineExceeded
+from server.core.timing import AnalyticsRoute, TimedRoute
+from server.database import get_analytics_db, get_db
+from server.domain.models import Crane, CraneModel, Org
 from server.domain.schemas import (
     CraneOut,
     CraneStatus,
+    OrgType,
     OwnerStatsOut,
     RequestOut,
     RequestStatus,
@@ -15,23 +28,55 @@ from server.domain.schemas import (
 )
 from server.domain.services import owner_service, crane_service
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
+# Fleet statistics aggregate every crane: analytics bulkhead.
+stats_router = APIRouter(route_class=AnalyticsRoute)
 logger = logging.getLogger(__name__)
 
+owners_cache = AnalyticsConditionalGet(
+    lambda request: scope_version(Org, Org.type == OrgType.OWNER),
+    lambda request: scope_version(Crane),
+)
+owner_cranes_cache = ConditionalGet(
+    lambda request: scope_version(
+        Crane, Crane.owner_org_id == request.path_params["ownerId"]
+    ),
+    lambda request: scope_version(CraneModel),
+)
+owner_stats_limit = UserRateLimit(
+    "owner-stats", settings.RATE_LIMIT_OWNER_STATS, key="org"
+)
 
-@router.get("/", response_model=List[OwnerStatsOut])
-def list_owners_endpoint(include: Optional[str] = None, db: Session = Depends(get_db)):
+
+@stats_router.get(
+    "/", response_model=List[OwnerStatsOut], dependencies=[Depends(owner_stats_limit)]
+)
+def list_owners_endpoint(
+    include: Optional[str] = None,
+    fields: Optional[FrozenSet[str]] = Depends(sparse_fields(OwnerStatsOut)),
+    cache: CacheValidators = Depends(owners_cache),
+    db: Session = Depends(get_analytics_db),
+):
     """
     List all owners. If 'include=stats' is provided, includes statistics about their crane fleet.
+    Use `fields` to return only a subset of fields, e.g. `fields=id,name`.
+    Supports conditional requests (`If-None-Match` / `If-Modified-Since`).
+    Rate limited per organization (RATE_LIMIT_OWNER_STATS).
+    Runs on the analytics bulkhead.
     """
     try:
-        return owner_service.get_owners_with_stats(db=db)
+        owners = owner_service.get_owners_with_stats(db=db)
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         logger.error(f"Failed to get owners with stats: {e}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Internal server error",
         )
+    if fields is not None:
+        return sparse_response(OwnerStatsOut, owners, fields, headers=cache.headers)
+    return owners
 
 
 @router.get("/{ownerId}/cranes", response_model=List[CraneOut])
@@ -40,17 +85,26 @@ def list_owner_cranes_endpoint(
     status: Optional[CraneStatus] = None,
     model_name: Optional[str] = None,
     min_capacity: Optional[int] = None,
+    fields: Optional[FrozenSet[str]] = Depends(sparse_fields(CraneOut)),
+    cache: CacheValidators = Depends(owner_cranes_cache),
     db: Session = Depends(get_db),
 ):
     """
     List all cranes owned by a specific organization, with optional filters.
+    Use `fields` to return only a subset of fields, e.g. `fields=id,serial_no,status`.
+    Supports conditional requests (`If-None-Match` / `If-Modified-Since`).
     """
-    return crane_service.list_owner_cranes(
+    cranes = crane_service.list_owner_cranes(
         db=db,
         owner_org_id=ownerId,
         status=status,
         model_name=model_name,
         min_capacity=min_capacity,
+        fields=fields,
     )
+    if fields is not None:
+        return sparse_response(CraneOut, cranes, fields, headers=cache.headers)
+    return cranes
 
 
+router.include_router(stats_router)
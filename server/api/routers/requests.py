@@ -3,11 +3,13 @@ import logging
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 
+from server.core.deadlines import DeadlineExceeded
+from server.core.timing import TimedRoute
 from server.database import get_db
 from server.domain.schemas import RequestCreate, RequestOut, RequestUpdate, RequestType
 from server.domain.services import request_service
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 logger = logging.getLogger(__name__)
 
 
@@ -21,6 +23,8 @@ def create_request_endpoint(payload: RequestCreate, db: Session = Depends(get_db
         return new_request
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         logger.error(f"Failed to create request: {e}")
         raise HTTPException(
@@ -44,6 +48,8 @@ def respond_to_request_endpoint(
         return updated_request
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         logger.error(f"Failed to respond to request {requestId}: {e}")
         raise HTTPException(
@@ -1,22 +1,24 @@
 from fastapi import APIRouter, Depends, Path, Query
 
+from server.auth.policy import require_scopes
 from server.auth.rbac import require_roles
 
-# This router is for demonstrating the RBAC decorator.
+# This router is for demonstrating the RBAC and scope dependencies.
 # The business logic is entirely placeholder.
 router = APIRouter(tags=["_samples"])
 
 
 @router.get(
     "/drivers/{driver_id}/active-assignments-sample",
-    dependencies=[Depends(require_roles("DRIVER"))],
+    dependencies=[Depends(require_scopes("assignment:read", user_param="driver_id"))],
 )
 async def list_driver_active_assignments_sample(
     driver_id: str = Path(..., description="The ID of the driver"),
     date: str = Query("today", description="The target date for assignments"),
 ):
     """
-    (Sample) Get active assignments for a specific driver. Requires DRIVER role.
+    (Sample) Get active assignments for a specific driver. Requires the
+    assignment:read scope on that driver (drivers hold it for themselves).
     TODO(strict): DB 조회/페이징/정렬/필터, RBAC 재검증, 에러 규격 적용
     """
     return {"items": [], "total": 0}
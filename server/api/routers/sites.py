@@ -1,14 +1,16 @@
 import logging
-from typing import List, Optional
+from typing import FrozenSet, List, Optional
 
 from fastapi import APIRouter, Depends, status
 from sqlalchemy.orm import Session
 
+from server.api.fieldsets import sparse_fields, sparse_response
+from server.core.timing import TimedRoute
 from server.database import get_db
 from server.domain.schemas import SiteCreate, SiteOut, SiteUpdate
 from server.domain.services import site_service
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 logger = logging.getLogger(__name__)
 
 
@@ -25,13 +27,18 @@ def list_sites_endpoint(
     db: Session = Depends(get_db),
     mine: Optional[bool] = None,
     user_id: Optional[str] = None,
+    fields: Optional[FrozenSet[str]] = Depends(sparse_fields(SiteOut)),
 ):
     """
     List all construction sites.
     If 'mine' is true, returns only sites relevant to the user_id.
+    Use `fields` to return only a subset of fields, e.g. `fields=id,name,status`.
     NOTE: In a real app, user_id would come from an auth dependency.
     """
-    return site_service.list_sites(db=db, mine=mine, user_id=user_id)
+    sites = site_service.list_sites(db=db, mine=mine, user_id=user_id, fields=fields)
+    if fields is not None:
+        return sparse_response(SiteOut, sites, fields)
+    return sites
 
 
 @router.patch("/{site_id}", response_model=SiteOut)
@@ -1,13 +1,16 @@
 from fastapi import APIRouter
 
 from server.api.routers import (
+    batch,
     crane_assignments,
     driver_assignments,
     attendances,
     crane_models,
     cranes,
+    debug,
     document_requests,
     document_items,
+    exports,
     health,
     owners,
     requests,
@@ -25,6 +28,7 @@ api_router.include_router(routes_me.router, prefix="/me", tags=["users"])
 
 # System and catalog routes
 api_router.include_router(health.router, prefix="/system", tags=["system"])
+api_router.include_router(debug.router, prefix="/system", tags=["system"])
 api_router.include_router(
     crane_models.router, prefix="/catalog/crane-models", tags=["catalog"]
 )
@@ -58,5 +62,11 @@ api_router.include_router(
     requests.router, prefix="/deploy/requests", tags=["deployment"]
 )
 
+# Bulk export routes
+api_router.include_router(exports.router, prefix="/exports", tags=["exports"])
+
+# Batch route (sub-requests are dispatched in-process)
+api_router.include_router(batch.router, prefix="/batch", tags=["batch"])
+
 # Sample routes for demonstrating RBAC
 api_router.include_router(role_samples.router)
@@ -3,8 +3,14 @@ from typing import List, Optional
 
 from fastapi import Depends, HTTPException, Request, status
 from pydantic import BaseModel, Field
+from sqlalchemy.orm import Session
 
 from server.config import settings
+from server.core.timing import timed_function
+from server.core.tokens import InvalidToken, token_verifier
+from server.database import get_db
+from server.domain.revocations import revoked_tokens
+from server.domain.user_cache import user_contexts
 
 logger = logging.getLogger(__name__)
 
@@ -13,7 +19,7 @@ class UserContext(BaseModel):
     """
     Schema for the current user's context, extracted from a request.
     In DEV mode, this is derived from headers.
-    In strict mode, this would be derived from a validated JWT.
+    In strict mode, this is derived from a validated JWT.
     """
 
     id: str
@@ -23,20 +29,21 @@ class UserContext(BaseModel):
     org_ids: List[str] = Field(default_factory=list)
 
 
-def get_current_user(request: Request) -> UserContext:
+@timed_function("auth")
+def get_current_user(request: Request, db: Session = Depends(get_db)) -> UserContext:
     """
     FastAPI dependency to extract the current user context.
 
     In 'dev' mode, it constructs a user context from special headers.
-    In 'strict' mode, it will be replaced with JWT validation.
+    In 'strict' mode, it validates the bearer JWT (see server.core.tokens).
+    Either way the role, active flag and org memberships are then taken
+    from the user cache (server.domain.user_cache), which only queries the
+    database on a miss.
     """
     logger.debug("Attempting to get current user context...")
     if settings.AUTH_MODE != "dev":
-        # TODO(strict): Implement JWT decoding and validation here.
-        # This includes fetching the public key, verifying the signature,
-        # checking expiration, and extracting user claims.
-        logger.error("Strict mode authentication not implemented yet.")
-        raise NotImplementedError("Strict mode authentication must be implemented.")
+        user_context = _user_from_jwt(request.headers.get("Authorization"))
+        return _enrich(db, user_context, strict=True)
 
     # --- DEV Mode Implementation ---
     auth_header = request.headers.get("Authorization")
@@ -73,18 +80,81 @@ def get_current_user(request: Request) -> UserContext:
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    # TODO(strict): In strict mode, user details (email, name) should be fetched
-    # from the database (ops.users) based on the user_id from the JWT.
-    # For now, we use dummy data.
-    user_context = UserContext(
-        id=user_id,
-        roles=roles,
-        email=f"{user_id.split('-')[0]}@example.dev",
-        name=f"Dev User {user_id}",
+    user_context = _enrich(db, UserContext(id=user_id, roles=roles), strict=False)
+    # Dev users without a row in ops.users get dummy details.
+    if user_context.email is None:
+        user_context.email = f"{user_id.split('-')[0]}@example.dev"
+    if user_context.name is None:
+        user_context.name = f"Dev User {user_id}"
+    logger.debug(
+        "Successfully created user context: %s, roles=%s",
+        user_context.id,
+        user_context.roles,
     )
-    logger.debug(f"Successfully created user context: {user_context.id}, roles={user_context.roles}")
     return user_context
 
 
+def _enrich(db: Session, user_context: UserContext, strict: bool) -> UserContext:
+    """
+    Fills in the stored role, details and org memberships where the token
+    (or dev header) did not supply them. Unknown users are rejected in
+    strict mode; inactive users always.
+    """
+    cached = user_contexts.get(db, user_context.id)
+    if cached is None:
+        if strict:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Unknown user",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        return user_context
+    if not cached.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User is inactive",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return UserContext(
+        id=cached.id,
+        roles=user_context.roles or [cached.role],
+        email=user_context.email or cached.email,
+        name=user_context.name or cached.name,
+        org_ids=user_context.org_ids or list(cached.org_ids),
+    )
+
+
+def _user_from_jwt(auth_header: Optional[str]) -> UserContext:
+    if not auth_header or not auth_header.lower().startswith("bearer "):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=(
+                "Not authenticated. "
+                "Provide an 'Authorization: Bearer <token>' header."
+            ),
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    try:
+        claims = token_verifier.verify(auth_header[7:].strip())
+    except InvalidToken as e:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=str(e),
+            headers={"WWW-Authenticate": 'Bearer error="invalid_token"'},
+        )
+    if revoked_tokens.is_revoked(claims.get("jti")):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token has been revoked",
+            headers={"WWW-Authenticate": 'Bearer error="invalid_token"'},
+        )
+    return UserContext(
+        id=claims["sub"],
+        roles=list(claims.get("roles") or []),
+        email=claims.get("email"),
+        name=claims.get("name"),
+    )
+
+
 # For convenience, create a dependency instance
 current_user = Depends(get_current_user)
@@ -0,0 +1,277 @@
+"""
+Compiled permission policy.
+
+Rules grant scopes to roles at one of three levels:
+
+- ``any``: on every resource;
+- ``org``: on resources of an organization the user belongs to;
+- ``self``: on resources that belong to the user.
+
+`PolicyEngine` compiles the rules into integer bitmasks. Every scope and
+role name is interned to a fixed bit the first time it is seen, so masks
+built from earlier policies stay valid. Per user, the masks of their
+roles are OR-ed into `EffectivePermissions` once and cached by user id;
+an entry is reused only while the user's roles and org ids are the ones
+it was built from, and loading a new policy or interning a new role
+(a `RoleChecker` created after users were cached) drops them all. A check
+is then a dict lookup, a few bit operations and at most one set lookup.
+
+`require_scopes` (a FastAPI dependency) checks the scopes for the
+resource named by the route's path parameters.
+"""
+
+import threading
+from typing import Dict, Iterable, List, Mapping, NamedTuple, Optional, Tuple
+
+from fastapi import Depends, HTTPException, Request, status
+
+from server.auth.context import UserContext, get_current_user
+
+LEVELS = ("any", "org", "self")
+
+# role -> scope -> level
+DEFAULT_RULES: Dict[str, Dict[str, str]] = {
+    "DRIVER": {
+        "site:read": "any",
+        "assignment:read": "self",
+    },
+    "OWNER": {
+        "crane:read": "org",
+        "assignment:read": "org",
+        "maintenance:read": "org",
+    },
+    "SAFETY_MANAGER": {
+        "site:read": "any",
+        "crane:assign": "any",
+        "driver:assign": "any",
+        "request:review": "any",
+    },
+}
+
+
+class Resource(NamedTuple):
+    """What a permission is checked against; None fields are unknown."""
+
+    org_id: Optional[str] = None
+    user_id: Optional[str] = None
+
+
+class _Interned:
+    """Assigns each name a bit that never changes for the life of the process."""
+
+    def __init__(self) -> None:
+        self.bits: Dict[str, int] = {}
+        self.names: List[str] = []
+        self._lock = threading.Lock()
+
+    def bit(self, name: str) -> int:
+        bit = self.bits.get(name)
+        if bit is None:
+            with self._lock:
+                bit = self.bits.get(name)
+                if bit is None:
+                    bit = self.bits[name] = 1 << len(self.names)
+                    self.names.append(name)
+        return bit
+
+    def names_in(self, mask: int) -> List[str]:
+        return [name for name in self.names if mask & self.bits[name]]
+
+
+class EffectivePermissions:
+    """One user's compiled permissions."""
+
+    __slots__ = (
+        "user_id",
+        "role_names",
+        "org_list",
+        "roles",
+        "any",
+        "org",
+        "self",
+        "org_ids",
+        "scopes",
+    )
+
+    def __init__(
+        self,
+        user_id: str,
+        role_names: List[str],
+        org_list: List[str],
+        roles: int,
+        masks: Tuple[int, int, int],
+        scopes: Tuple[str, ...],
+    ):
+        self.user_id = user_id
+        # The inputs these were compiled from
+        self.role_names = role_names
+        self.org_list = org_list
+        self.roles = roles
+        self.any, self.org, self.self = masks
+        self.org_ids = frozenset(org_list)
+        # Names of the scopes granted at any level, for /me/permissions
+        self.scopes = scopes
+
+
+class PolicyEngine:
+    """Compiles role rules into bitmasks and answers scope checks."""
+
+    def __init__(self, rules: Mapping[str, Mapping[str, str]], cache_size: int = 10000):
+        self.scopes = _Interned()
+        self.roles = _Interned()
+        self.cache_size = cache_size
+        self.version = 0
+        self._role_masks: Dict[str, Tuple[int, int, int]] = {}
+        # user id -> permissions, oldest first (evicted FIFO)
+        self._effective: Dict[str, EffectivePermissions] = {}
+        self._lock = threading.Lock()
+        self.load(rules)
+
+    def load(self, rules: Mapping[str, Mapping[str, str]]) -> None:
+        """Compiles a new policy; cached per-user permissions are dropped."""
+        role_masks = {}
+        for role, grants in rules.items():
+            masks = [0, 0, 0]
+            for scope, level in grants.items():
+                if level not in LEVELS:
+                    raise ValueError(f"Unknown level {level!r} for {role}/{scope}")
+                masks[LEVELS.index(level)] |= self.scopes.bit(scope)
+            self.roles.bit(role)
+            role_masks[role] = (masks[0], masks[1], masks[2])
+        with self._lock:
+            self._role_masks = role_masks
+            self._invalidate()
+
+    def _invalidate(self) -> None:
+        # Caller holds self._lock. Computations that started before this
+        # see a newer version and are not stored.
+        self.version += 1
+        self._effective.clear()
+
+    def scope_mask(self, scopes: Iterable[str]) -> int:
+        """Mask of known scopes; unknown names are a programming error."""
+        mask = 0
+        for scope in scopes:
+            if scope not in self.scopes.bits:
+                raise ValueError(f"Unknown scope {scope!r}")
+            mask |= self.scopes.bits[scope]
+        return mask
+
+    def role_mask(self, roles: Iterable[str]) -> int:
+        """Mask of ``roles``, interning names not seen before (e.g. `RoleChecker`)."""
+        mask = 0
+        interned = False
+        for role in roles:
+            interned = interned or role not in self.roles.bits
+            mask |= self.roles.bit(role)
+        if interned:
+            # Users cached earlier hold no bit for the new role.
+            with self._lock:
+                self._invalidate()
+        return mask
+
+    def effective(self, user: UserContext) -> EffectivePermissions:
+        # Hits take no lock and build no key tuple: the entry is found by user
+        # id and is only used if the roles and org ids it was built from match.
+        permissions = self._effective.get(user.id)
+        if (
+            permissions is not None
+            and permissions.role_names == user.roles
+            and permissions.org_list == user.org_ids
+        ):
+            return permissions
+        with self._lock:
+            role_masks = self._role_masks
+            version = self.version
+        masks = [0, 0, 0]
+        role_bits = 0
+        for role in user.roles:
+            # Roles nobody checks for get no bit (dev headers may name anything).
+            role_bits |= self.roles.bits.get(role, 0)
+            for level, mask in enumerate(role_masks.get(role, (0, 0, 0))):
+                masks[level] |= mask
+        permissions = EffectivePermissions(
+            user.id,
+            list(user.roles),
+            list(user.org_ids),
+            role_bits,
+            (masks[0], masks[1], masks[2]),
+            tuple(self.scopes.names_in(masks[0] | masks[1] | masks[2])),
+        )
+        with self._lock:
+            if version == self.version:  # not compiled against a replaced policy
+                self._effective.pop(user.id, None)
+                self._effective[user.id] = permissions
+                while len(self._effective) > self.cache_size:
+                    del self._effective[next(iter(self._effective))]
+        return permissions
+
+    def check_mask(
+        self, user: UserContext, mask: int, resource: Optional[Resource] = None
+    ) -> bool:
+        """
+        Whether every scope in ``mask`` is granted on ``resource``. Without a
+        resource (list endpoints that scope their own query), a grant at any
+        level is enough.
+        """
+        permissions = self.effective(user)
+        missing = mask & ~permissions.any
+        if not missing:
+            return True
+        if resource is None:
+            return not (missing & ~(permissions.org | permissions.self))
+        if resource.org_id is not None and resource.org_id in permissions.org_ids:
+            missing &= ~permissions.org
+        if resource.user_id is not None and resource.user_id == user.id:
+            missing &= ~permissions.self
+        return not missing
+
+    def check(
+        self, user: UserContext, scope: str, resource: Optional[Resource] = None
+    ) -> bool:
+        bit = self.scopes.bits.get(scope)
+        return bit is not None and self.check_mask(user, bit, resource)
+
+    def scopes_for(self, user: UserContext) -> List[str]:
+        return list(self.effective(user).scopes)
+
+
+policy = PolicyEngine(DEFAULT_RULES)
+
+
+class ScopeChecker:
+    """
+    Dependency requiring all of ``scopes``. The resource is taken from the
+    route's ``org_param``/``user_param`` path parameters, if given.
+    """
+
+    def __init__(
+        self,
+        *scopes: str,
+        org_param: Optional[str] = None,
+        user_param: Optional[str] = None,
+    ):
+        self.scopes = scopes
+        self.mask = policy.scope_mask(scopes)
+        self.org_param = org_param
+        self.user_param = user_param
+
+    def __call__(
+        self, request: Request, user: UserContext = Depends(get_current_user)
+    ) -> UserContext:
+        resource = None
+        if self.org_param or self.user_param:
+            params = request.path_params
+            resource = Resource(
+                org_id=params.get(self.org_param) if self.org_param else None,
+                user_id=params.get(self.user_param) if self.user_param else None,
+            )
+        if not policy.check_mask(user, self.mask, resource):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail=f"Missing required scopes: {', '.join(self.scopes)}",
+            )
+        return user
+
+
+require_scopes = ScopeChecker
@@ -1,36 +1,36 @@
-from typing import List, Set
+from typing import List, Union
 
 from fastapi import Depends, HTTPException, status
 
 from server.auth.context import UserContext, get_current_user
+from server.auth.policy import policy
 
 
 class RoleChecker:
     """
     Dependency class to check for user roles.
     This allows the dependency to be created with parameters (*roles).
+    For permission checks prefer `server.auth.policy.require_scopes`.
     """
 
-    def __init__(self, required_roles: List[str]):
-        self.required_roles: Set[str] = set(required_roles)
+    def __init__(self, *required_roles: Union[str, List[str]]):
+        # Accepts require_roles("A", "B") as well as the older
+        # require_roles(["A", "B"]).
+        names: List[str] = []
+        for role in required_roles:
+            names.extend([role] if isinstance(role, str) else role)
+        self.required_roles = names
+        self.mask = policy.role_mask(names)
 
     def __call__(self, user: UserContext = Depends(get_current_user)) -> UserContext:
-        """
-        Checks if the current user has any of the required roles.
-
-        In DEV mode, this is a simple role name check.
-        TODO(strict): In strict mode, this should be replaced with a proper
-        RBAC system that checks permissions/scopes against a policy service
-        or database table, not just simple role names.
-        """
-        user_roles = set(user.roles)
-        if not self.required_roles.intersection(user_roles):
+        """Checks if the current user has any of the required roles (one AND)."""
+        if not policy.effective(user).roles & self.mask:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail=(
                     f"User does not have required roles. "
-                    f"Required: {list(self.required_roles)}, "
-                    f"User has: {list(user_roles)}"
+                    f"Required: {self.required_roles}, "
+                    f"User has: {user.roles}"
                 ),
             )
         return user
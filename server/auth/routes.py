@@ -1,12 +1,24 @@
+import logging
 import uuid
 from datetime import datetime, timezone
+from typing import List, Optional
 
-from fastapi import APIRouter, Response, status, Depends, HTTPException
+from fastapi import APIRouter, Request, Response, status, Depends, HTTPException
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
+from server.api.rate_limits import Rate, RateLimit, RateLimiter, shared_buckets
 from server.auth.context import UserContext, get_current_user
-from server.core.security import create_dev_access_token
+from server.config import settings
+from server.core.security import (
+    PasswordHashingBusy,
+    create_dev_access_token,
+    password_hasher,
+)
+from server.core.timing import TimedRoute
+from server.core.tokens import InvalidToken, create_access_token, token_verifier
 from server.database import get_db
+from server.domain.revocations import revoked_tokens
 from server.domain.repositories import user_repo
 from server.domain.schemas.auth import (
     LoginRequest,
@@ -14,24 +26,56 @@ from server.domain.schemas.auth import (
     UserIdentity,
 )
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
+logger = logging.getLogger(__name__)
+
+login_limit = RateLimit("login", settings.RATE_LIMIT_LOGIN)
+# Keyed by the email in the body, so checked in the endpoint, not a dependency.
+login_account_limit = RateLimiter(
+    "login-account", Rate.parse(settings.RATE_LIMIT_LOGIN_ACCOUNT), shared_buckets()
+)
+
+
+def issue_access_token(
+    user_id: str, roles: List[str], email: Optional[str], name: Optional[str]
+) -> str:
+    """A DEV token in dev auth mode, otherwise a signed JWT."""
+    if settings.AUTH_MODE == "dev":
+        return create_dev_access_token(user_id=user_id, roles=roles)
+    return create_access_token(user_id, roles, email=email, name=name)
 
 
-# TODO(strict): Add rate limiting to login endpoints.
-# TODO(strict): Add password hash verification (e.g., argon2).
-@router.post("/login", response_model=LoginResponse)
+@router.post(
+    "/login", response_model=LoginResponse, dependencies=[Depends(login_limit)]
+)
 async def login_for_access_token(
     request: LoginRequest, db: Session = Depends(get_db)
 ):
     """
     Authenticates a user and returns an access token.
+    - Rate limited per client IP and per email address (429 with Retry-After).
     - Looks up the user by email.
-    - In this version, password is not checked.
-    - If user is found and active, generates a DEV access token.
+    - Verifies the password on the password-hashing pool (503 when it is
+      saturated) and upgrades legacy hashes.
+    - If the password matches and the user is active, issues an access token
+      (a DEV token in dev auth mode, a signed JWT otherwise).
     """
-    user = user_repo.get_by_email(db, email=request.email)
+    if settings.RATE_LIMIT_ENABLED:
+        await login_account_limit.hit_async(f"email:{request.email.lower()}")
 
-    if not user or not user.is_active:
+    # The sync Session must not run on the event loop.
+    user = await run_in_threadpool(user_repo.get_by_email, db, email=request.email)
+    stored_hash = user.hashed_password if user else None
+    try:
+        password_ok = await password_hasher.verify_async(request.password, stored_hash)
+    except PasswordHashingBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many logins in progress, please retry",
+            headers={"Retry-After": "1"},
+        )
+
+    if not user or not password_ok or not user.is_active:
         # Note: It's good practice to use a generic error message
         # to avoid leaking information about which accounts exist.
         raise HTTPException(
@@ -40,6 +84,17 @@ async def login_for_access_token(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+    if password_hasher.needs_rehash(stored_hash):
+        try:
+            new_hash = await password_hasher.hash_async(request.password)
+        except PasswordHashingBusy:
+            new_hash = None  # upgraded on a later login
+        if new_hash is not None:
+            await run_in_threadpool(
+                user_repo.set_password_hash, db, user=user, hashed_password=new_hash
+            )
+            logger.info("Upgraded password hash of user %s", user.id)
+
     # The user's role from the DB is an enum, so we get its value.
     # The token expects a list of roles, so we wrap it in a list.
     roles = [user.role.value]
@@ -48,10 +103,14 @@ async def login_for_access_token(
         id=user.id, email=user.email, name=user.name, roles=roles
     )
 
-    access_token = create_dev_access_token(user_id=user.id, roles=roles)
+    # Signing may re-read the key file.
+    access_token = await run_in_threadpool(
+        issue_access_token, user.id, roles, user.email, user.name
+    )
 
     return LoginResponse(
         access_token=access_token,
+        expires_in=settings.JWT_ACCESS_TOKEN_TTL,
         user=user_identity,
         server_time=datetime.now(timezone.utc),
     )
@@ -60,11 +119,15 @@ async def login_for_access_token(
 @router.post("/refresh", response_model=LoginResponse)
 async def refresh_access_token(current_user: UserContext = Depends(get_current_user)):
     """
-    DEV mode token refresh. Issues a new dummy access token.
+    Issues a new access token for the bearer of a valid one.
     TODO(strict): Implement actual refresh token validation and rotation.
     """
-    access_token = create_dev_access_token(
-        user_id=current_user.id, roles=current_user.roles
+    access_token = await run_in_threadpool(
+        issue_access_token,
+        current_user.id,
+        current_user.roles,
+        current_user.email,
+        current_user.name,
     )
     user_identity = UserIdentity(
         id=current_user.id,
@@ -74,15 +137,31 @@ async def refresh_access_token(current_user: UserContext = Depends(get_current_u
     )
     return LoginResponse(
         access_token=access_token,
+        expires_in=settings.JWT_ACCESS_TOKEN_TTL,
         user=user_identity,
         server_time=datetime.now(timezone.utc),
     )
 
 
 @router.post("/logout")
-async def logout():
+async def logout(request: Request, db: Session = Depends(get_db)):
     """
-    DEV mode logout. Returns 204 No Content.
-    TODO(strict): Implement server-side session/token invalidation (e.g., jti blocklist).
+    Revokes the bearer token (strict mode): this worker rejects it at once,
+    the others within REVOCATION_POLL_SECONDS. Returns 204 No Content, also
+    when there is no valid token to revoke.
     """
+    auth_header = request.headers.get("Authorization")
+    if (
+        settings.AUTH_MODE != "dev"
+        and auth_header
+        and auth_header.lower().startswith("bearer ")
+    ):
+        try:
+            claims = token_verifier.verify(auth_header[7:].strip())
+        except InvalidToken:
+            claims = None
+        if claims and claims.get("jti"):
+            await run_in_threadpool(
+                revoked_tokens.revoke, db, claims["jti"], claims["exp"], claims["sub"]
+            )
     return Response(status_code=status.HTTP_204_NO_CONTENT)
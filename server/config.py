@@ -1,6 +1,6 @@
 import logging
 from functools import lru_cache
-from typing import Set, cast
+from typing import Dict, Optional, Set, cast
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -23,6 +23,49 @@ class Settings(BaseSettings):
     # Auth Settings
     AUTH_MODE: str = "strict"  # "dev" or "strict"
     DEV_AUTH_BYPASS: bool = False
+    # scrypt cost (memory is 128 * N * R bytes per hash) and the dedicated
+    # hashing pool; logins beyond MAX_PENDING queued hashes get a 503.
+    PASSWORD_SCRYPT_N: int = 16384
+    PASSWORD_SCRYPT_R: int = 8
+    PASSWORD_SCRYPT_P: int = 1
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_PENDING: int = 256
+    # Strict mode access tokens (HS256 JWT), see server.core.tokens
+    JWT_KEYS_FILE: Optional[str] = None  # local JWKS with "oct" keys
+    JWT_SECRET_FILE: Optional[str] = None  # or a single raw secret
+    JWT_SIGNING_KID: Optional[str] = None  # defaults to the first key
+    JWT_ISSUER: str = "dy-crane-api"
+    JWT_AUDIENCE: str = "dy-crane"
+    JWT_ACCESS_TOKEN_TTL: int = 3600  # seconds
+    JWT_LEEWAY_SECONDS: int = 30
+    JWT_KEYS_REFRESH_SECONDS: int = 300
+    JWT_CACHE_SIZE: int = 4096  # verified tokens remembered; 0 disables
+    # Role, active flag and org memberships per user, see server.domain.user_cache
+    USER_CACHE_TTL_SECONDS: float = 30.0
+    USER_CACHE_MAX_ENTRIES: int = 10000
+    # Revoked access tokens, mirrored into each worker, see server.domain.revocations
+    REVOCATION_POLL_SECONDS: float = 5.0
+    # Re-read window for inserts that commit late
+    REVOCATION_LOOKBACK_SECONDS: float = 60.0
+    # Rate limits ("<count>/<second|minute|hour|day>"), see server.api.rate_limits
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_STORE: str = "memory"  # or "database": shared by all workers
+    RATE_LIMIT_TRUST_FORWARDED: bool = False  # key on X-Forwarded-For (behind a proxy)
+    RATE_LIMIT_MAX_KEYS: int = 100000  # buckets kept per limit and worker
+    RATE_LIMIT_LOGIN: str = "20/minute"  # per client IP
+    RATE_LIMIT_LOGIN_ACCOUNT: str = "5/minute"  # per email address
+    RATE_LIMIT_OWNER_STATS: str = "60/minute"  # per organization
+    RATE_LIMIT_EXPORTS: str = "10/minute"  # per organization
+    # Adaptive concurrency limit and load shedding, see server.middleware.concurrency
+    CONCURRENCY_LIMIT_ENABLED: bool = True
+    CONCURRENCY_LIMIT_INITIAL: int = 20
+    CONCURRENCY_LIMIT_MIN: int = 4
+    CONCURRENCY_LIMIT_MAX: int = 200
+    CONCURRENCY_LATENCY_THRESHOLD_MS: float = 500.0  # slower responses shrink the limit
+    # Share of the limit in use before per-tenant caps apply
+    CONCURRENCY_FAIR_SHARE_AT: float = 0.75
+    # Comma-separated path prefixes
+    CONCURRENCY_EXEMPT_PATHS: str = "/metrics,/api/v1/system"
 
     # API Configuration
     API_HOST: str = "127.0.0.1"
@@ -41,12 +84,86 @@ class Settings(BaseSettings):
     DB_ECHO: bool = False
     DB_POOL_PRE_PING: bool = True
     DB_POOL_RECYCLE: int = 3600
+    # Bulkheads, see server.core.bulkheads. The default (OLTP) engine serves
+    # writes and interactive reads with tight limits; reports and exports
+    # get their own engine, pool and worker threads.
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 5.0  # seconds to wait for a connection
+    DB_STATEMENT_TIMEOUT_MS: int = 5000  # 0 disables
+    ANALYTICS_DB_POOL_SIZE: int = 3
+    ANALYTICS_DB_MAX_OVERFLOW: int = 2
+    ANALYTICS_DB_POOL_TIMEOUT: float = 30.0
+    ANALYTICS_DB_STATEMENT_TIMEOUT_MS: int = 120000
+    ANALYTICS_DB_WORK_MEM: str = "64MB"
+    ANALYTICS_THREADS: int = 6
+    # Request deadlines, see server.core.deadlines. Per route class; the
+    # X-Request-Timeout-Ms header can only shorten them.
+    REQUEST_DEADLINE_SECONDS: float = 10.0
+    ANALYTICS_REQUEST_DEADLINE_SECONDS: float = 120.0
 
     @property
     def DATABASE_URL(self) -> str:
         """Construct SQLAlchemy database URL."""
         return f"postgresql+psycopg2://{self.PGUSER}:{self.PGPASSWORD}@{self.PGHOST}:{self.PGPORT}/{self.PGDATABASE}"
 
+    # Response Compression
+    # brotli and zstd are used when the optional `brotli` / `zstandard`
+    # packages are installed; gzip is always available.
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MINIMUM_SIZE: int = 1024  # bytes
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4
+    COMPRESSION_ZSTD_LEVEL: int = 3
+
+    # Batch API
+    BATCH_MAX_REQUESTS: int = 50
+    BATCH_MAX_RESPONSE_BYTES: int = 5242880  # per buffered sub-response body
+
+    # Metrics (Prometheus text format at /metrics)
+    METRICS_ENABLED: bool = True
+    # Directory shared by all worker processes; unset means per-process metrics.
+    METRICS_MULTIPROC_DIR: Optional[str] = None
+    METRICS_FLUSH_INTERVAL: float = 5.0  # seconds between snapshot writes
+
+    # Debugging
+    # Outside development, debug output is only returned to requests that
+    # send X-Debug-Token matching this value.
+    DEBUG_TOKEN: Optional[str] = None
+    # Server-Timing header: "always", "debug" (see DEBUG_TOKEN) or "off"
+    SERVER_TIMING: str = "debug"
+    # Fraction of requests checked for query budget / N+1 violations (logged)
+    QUERY_AUDIT_SAMPLE_RATE: float = 0.0
+    QUERY_AUDIT_MAX_QUERIES: int = 30
+    QUERY_AUDIT_REPEAT_THRESHOLD: int = 5  # same SQL, different params
+    # Per-request SQL traces (X-Debug-Trace: 1 | explain), debug requests only
+    SQL_TRACE_ENABLED: bool = True
+    # Allow EXPLAIN (ANALYZE, BUFFERS) of the slowest SELECT
+    SQL_TRACE_EXPLAIN: bool = True
+    SQL_TRACE_MAX_STATEMENTS: int = 1000  # per trace
+    SQL_TRACE_MAX_STORED: int = 100
+    SQL_TRACE_DIR: Optional[str] = None  # share traces between worker processes
+    # Slow-query log (GET /api/v1/system/slow-queries), aggregated by fingerprint
+    SLOW_QUERY_ENABLED: bool = True
+    SLOW_QUERY_THRESHOLD_MS: float = 200.0
+    SLOW_QUERY_MAX_FINGERPRINTS: int = 500
+    SLOW_QUERY_EXPLAIN: bool = True  # capture a plan once per fingerprint
+    # JSON written on shutdown; "{pid}" is replaced
+    SLOW_QUERY_DUMP_PATH: Optional[str] = None
+    # Sampling CPU profiler (X-Debug-Profile: 1, or /api/v1/system/profiler/start)
+    PROFILER_ENABLED: bool = True
+    PROFILER_INTERVAL_MS: float = 5.0
+    PROFILER_MAX_SECONDS: int = 120  # longest process-wide profile
+    PROFILER_MAX_STORED: int = 20
+    PROFILER_DIR: Optional[str] = None  # share profiles between worker processes
+    MEMORY_PROFILING_ENABLED: bool = True
+    MEMORY_TRACE_FRAMES: int = 25  # frames kept per allocation while tracing
+    MEMORY_MAX_SNAPSHOTS: int = 5
+    LOOP_WATCHDOG_ENABLED: bool = True
+    LOOP_WATCHDOG_INTERVAL_MS: float = 50.0
+    # Stalls longer than this are logged with a stack
+    LOOP_WATCHDOG_THRESHOLD_MS: float = 100.0
+
     # File Upload Constraints
     ALLOWED_FILE_EXTENSIONS: Set[str] = {".pdf", ".jpg", ".jpeg", ".png"}
     REQUIRED_URL_SCHEME: str = "https"
@@ -54,6 +171,11 @@ class Settings(BaseSettings):
     # Logging Configuration
     LOG_LEVEL: str = "INFO"
     LOG_FORMAT: str = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    LOG_JSON: bool = True  # one JSON object per line; False uses LOG_FORMAT
+    LOG_QUEUE_SIZE: int = 10000  # records beyond this are dropped, not blocked on
+    # Fraction of sub-WARNING records kept per logger prefix,
+    # e.g. {"server.database": 0.01}
+    LOG_SAMPLING: Dict[str, float] = {}
 
     def get_log_level(self) -> int:
         """Convert string log level to logging constant."""
@@ -0,0 +1,105 @@
+"""
+Bulkheads: dedicated worker threads per route class.
+
+Sync endpoints normally run on anyio's default thread limiter, which is
+shared by every route. A `Bulkhead` has its own `anyio.CapacityLimiter`.
+Routes assigned to it (see `server.core.timing.AnalyticsRoute`) run their
+endpoint, and streamed bodies via `Bulkhead.iterate`, on those threads
+only. So a burst of slow reports queues behind its own limit instead of
+taking the threads that check-ins and assignments need.
+
+The database side is split the same way: analytics routes use the
+analytics engine (`server.database.get_analytics_db`), with its own pool
+and session settings.
+
+Saturation is reported per bulkhead as ``bulkhead_threads_busy``,
+``bulkhead_threads_max`` and ``bulkhead_tasks_waiting``. The default
+limiter is reported as bulkhead ``oltp``.
+"""
+
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Iterator
+
+import anyio
+import anyio.to_thread
+
+from server.config import settings
+from server.core.metrics import CollectedSample, registry
+
+_DONE = object()
+
+
+class Bulkhead:
+    """A named, bounded set of worker threads."""
+
+    def __init__(self, name: str, threads: int):
+        self.name = name
+        self.limiter = anyio.CapacityLimiter(threads)
+
+    async def run_sync(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        if kwargs:
+            return await anyio.to_thread.run_sync(
+                lambda: fn(*args, **kwargs), limiter=self.limiter
+            )
+        return await anyio.to_thread.run_sync(fn, *args, limiter=self.limiter)
+
+    async def iterate(self, iterable: Iterable[Any]) -> AsyncIterator[Any]:
+        """Iterates a sync iterable (e.g. a streaming export) on this bulkhead."""
+        iterator: Iterator[Any] = iter(iterable)
+        try:
+            while True:
+                item = await self.run_sync(next, iterator, _DONE)
+                if item is _DONE:
+                    return
+                yield item
+        finally:
+            # A client that disconnects mid-stream leaves the generator
+            # suspended; close it on this bulkhead so its cleanup (closing
+            # the session) runs on a thread, even while being cancelled.
+            with anyio.CancelScope(shield=True):
+                await self.run_sync(getattr(iterator, "close", lambda: None))
+
+
+analytics_bulkhead = Bulkhead("analytics", settings.ANALYTICS_THREADS)
+
+
+# Limiters reported by `saturation`, by bulkhead name.
+_watched: Dict[str, Any] = {}
+
+
+def watch_bulkheads(default_limiter: Any, *bulkheads: Bulkhead) -> None:
+    """
+    Reports thread saturation of each bulkhead and of the default (OLTP)
+    limiter. Calling it again (a new event loop) replaces the limiters.
+    """
+    if not _watched:
+        registry.add_collector(saturation)
+    _watched["oltp"] = default_limiter
+    _watched.update((b.name, b.limiter) for b in bulkheads)
+
+
+def saturation() -> Iterator[CollectedSample]:
+    """Metrics collector: busy, maximum and queued threads per bulkhead."""
+    for name, limiter in list(_watched.items()):
+        statistics = limiter.statistics()
+        labels = {"bulkhead": name}
+        yield (
+            "bulkhead_threads_busy",
+            "gauge",
+            "Worker threads in use per bulkhead.",
+            labels,
+            statistics.borrowed_tokens,
+        )
+        yield (
+            "bulkhead_threads_max",
+            "gauge",
+            "Worker threads per bulkhead.",
+            labels,
+            statistics.total_tokens,
+        )
+        yield (
+            "bulkhead_tasks_waiting",
+            "gauge",
+            "Calls queued for a bulkhead thread.",
+            labels,
+            statistics.tasks_waiting,
+        )
@@ -0,0 +1,112 @@
+"""
+Shared SQLAlchemy statement hooks.
+
+One pair of ``before_cursor_execute`` / ``after_cursor_execute`` listeners
+is installed on the `Engine` class (so it covers every engine, including
+test and benchmark engines) and fans out to registered observers. Metrics,
+timing headers and query diagnostics subscribe here instead of each adding
+their own listeners.
+"""
+
+import logging
+import time
+from typing import Any, Callable, List
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+
+class ExecutedStatement:
+    """A statement that just finished executing on a DBAPI cursor."""
+
+    __slots__ = (
+        "statement",
+        "parameters",
+        "executemany",
+        "started_at",
+        "duration",
+        "connection",
+        "rowcount",
+    )
+
+    def __init__(
+        self,
+        statement: str,
+        parameters: Any,
+        executemany: bool,
+        started_at: float,
+        duration: float,
+        connection: Any,
+        rowcount: int = -1,
+    ):
+        self.statement = statement
+        self.parameters = parameters
+        self.executemany = executemany
+        self.started_at = started_at
+        self.duration = duration
+        self.connection = connection
+        # DBAPI cursor.rowcount; -1 where the driver does not report it
+        self.rowcount = rowcount
+
+
+StatementObserver = Callable[[ExecutedStatement], None]
+
+_observers: List[StatementObserver] = []
+_installed = False
+
+
+def add_statement_observer(observer: StatementObserver) -> None:
+    if observer not in _observers:
+        _observers.append(observer)
+
+
+def remove_statement_observer(observer: StatementObserver) -> None:
+    if observer in _observers:
+        _observers.remove(observer)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("query_start")
+    if not starts:
+        return
+    started_at = starts.pop()
+    if not _observers:
+        return
+    executed = ExecutedStatement(
+        statement,
+        parameters,
+        executemany,
+        started_at,
+        time.perf_counter() - started_at,
+        conn,
+        cursor.rowcount,
+    )
+    for observer in tuple(_observers):
+        try:
+            observer(executed)
+        except Exception:
+            logger.exception("Statement observer %r failed", observer)
+
+
+def _handle_error(exception_context):
+    # The statement failed, so after_cursor_execute will not run for it.
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_start"):
+        conn.info["query_start"].pop()
+
+
+def install_statement_hooks() -> None:
+    """Installs the class-level listeners (idempotent)."""
+    global _installed
+    if _installed:
+        return
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(Engine, "handle_error", _handle_error)
+    _installed = True
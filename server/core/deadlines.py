@@ -0,0 +1,263 @@
+"""
+Request deadlines, propagated to PostgreSQL.
+
+Every request gets a deadline: the route's default (``TimedRoute.deadline``,
+``REQUEST_DEADLINE_SECONDS``; longer for analytics routes), shortened by the
+client's ``X-Request-Timeout-Ms`` header if that is sooner. It is enforced
+where the time is actually spent:
+
+- each transaction a session opens during the request starts with
+  ``SET LOCAL statement_timeout`` set to the time left, so a query that
+  would outlive the deadline is stopped by the server. The engine's own
+  statement timeout (``DB_STATEMENT_TIMEOUT_MS``) stays the ceiling: a
+  deadline can only tighten it;
+- when the client disconnects before the response is complete, the
+  statements running for the request are cancelled through the driver
+  (psycopg2 ``connection.cancel()``, sent on its own socket, not a pooled
+  connection), instead of finishing work nobody will read;
+- a cancelled statement (SQLSTATE 57014) is raised as `DeadlineExceeded`,
+  which the app answers with ``504 Gateway Timeout``.
+
+`DeadlineMiddleware` creates the deadline and watches for the disconnect;
+`install_deadline_hooks` registers the SQLAlchemy listeners. Outside a
+request (scripts, background tasks) there is no deadline and sessions are
+left alone.
+"""
+
+import logging
+import math
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+import anyio
+import anyio.to_thread
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import Pool
+from starlette.datastructures import Headers
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from server.core.metrics import Counter
+
+logger = logging.getLogger(__name__)
+
+DEADLINE_HEADER = "x-request-timeout-ms"
+QUERY_CANCELED = "57014"
+
+queries_cancelled = Counter(
+    "db_queries_cancelled_total",
+    "Statements stopped by a request deadline or a client disconnect.",
+    ("reason",),
+)
+
+# Cancels run off the event loop, and not on the (possibly saturated)
+# default threadpool.
+_cancel_limiter = anyio.CapacityLimiter(2)
+
+
+class DeadlineExceeded(Exception):
+    """The request ran out of time (or its client went away)."""
+
+
+class Deadline:
+    """Absolute deadline of one request, plus the connections working for it."""
+
+    def __init__(self, timeout: Optional[float] = None):
+        self.started = time.monotonic()
+        self.expires = self.started + timeout if timeout is not None else math.inf
+        self.client_gone = False
+        # id(connection.info) -> DBAPI connection in a transaction
+        self._connections: Dict[int, Any] = {}
+        # Set once a cancel has been sent (or there was nothing to cancel)
+        self._cancelled = threading.Event()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_headers(cls, headers: Headers) -> "Deadline":
+        """A deadline from ``X-Request-Timeout-Ms``; malformed values are ignored."""
+        try:
+            timeout_ms = float(headers.get(DEADLINE_HEADER, ""))
+        except ValueError:
+            return cls()
+        if not math.isfinite(timeout_ms) or timeout_ms <= 0:
+            return cls()
+        return cls(timeout_ms / 1000)
+
+    def limit(self, seconds: Optional[float]) -> None:
+        """Applies a route default; the client can only shorten it."""
+        if seconds is not None:
+            self.expires = min(self.expires, self.started + seconds)
+
+    def remaining(self) -> float:
+        return self.expires - time.monotonic()
+
+    def attach(self, connection: Any) -> None:
+        with self._lock:
+            if self.client_gone:
+                raise DeadlineExceeded("Client disconnected")
+            self._connections[id(connection.info)] = (
+                connection.connection.dbapi_connection
+            )
+            connection.info["deadline"] = self
+
+    def detach(self, info: Dict[Any, Any]) -> None:
+        with self._lock:
+            self._connections.pop(id(info), None)
+            cancelling = self.client_gone
+        if cancelling:
+            # A cancel may still be on its way to this connection; let it
+            # land before the connection moves on to another request.
+            self._cancelled.wait()
+
+    def cancel(self) -> None:
+        """Client went away: stops the statements still running for it."""
+        with self._lock:
+            self.client_gone = True
+            connections = list(self._connections.values())
+            self._connections.clear()
+        # No lock held and no pooled connection needed: the driver sends
+        # the cancel request on a connection of its own.
+        try:
+            for dbapi_connection in connections:
+                try:
+                    dbapi_connection.cancel()
+                    queries_cancelled.inc("disconnect")
+                except Exception:
+                    logger.warning("Failed to cancel a statement", exc_info=True)
+        finally:
+            self._cancelled.set()
+
+
+current_deadline: ContextVar[Optional[Deadline]] = ContextVar(
+    "current_deadline", default=None
+)
+
+
+def _start_transaction(session, transaction, connection) -> None:
+    deadline = current_deadline.get()
+    if deadline is None or connection.dialect.name != "postgresql":
+        return
+    remaining_ms = int(deadline.remaining() * 1000)
+    if remaining_ms <= 0:
+        raise DeadlineExceeded("Request deadline exceeded")
+    ceiling_ms = connection.get_execution_options().get("statement_timeout_ms")
+    if ceiling_ms:
+        remaining_ms = min(remaining_ms, ceiling_ms)
+    # set_config(..., true) is SET LOCAL
+    connection.execute(
+        text("SELECT set_config('statement_timeout', :ms, true)"),
+        {"ms": str(remaining_ms)},
+    )
+    deadline.attach(connection)
+
+
+def _end_transaction(conn) -> None:
+    _release(conn.info)
+
+
+def _checkin(dbapi_connection, connection_record) -> None:
+    _release(connection_record.info)
+
+
+def _release(info: Dict[Any, Any]) -> None:
+    deadline = info.pop("deadline", None)
+    if deadline is not None:
+        deadline.detach(info)
+
+
+def _translate_cancel(exception_context) -> Optional[Exception]:
+    original = exception_context.original_exception
+    sqlstate = getattr(original, "pgcode", None) or getattr(original, "sqlstate", None)
+    if sqlstate != QUERY_CANCELED:
+        return None
+    deadline = current_deadline.get()
+    if deadline is None or not deadline.client_gone:
+        queries_cancelled.inc("timeout")
+    error = DeadlineExceeded("Request deadline exceeded")
+    error.__cause__ = exception_context.sqlalchemy_exception
+    return error
+
+
+_installed = False
+
+
+def install_deadline_hooks() -> None:
+    """Registers the session, connection and pool listeners (once)."""
+    global _installed
+    if _installed:
+        return
+    event.listen(Session, "after_begin", _start_transaction)
+    event.listen(Engine, "commit", _end_transaction)
+    event.listen(Engine, "rollback", _end_transaction)
+    event.listen(Engine, "handle_error", _translate_cancel, retval=True)
+    event.listen(Pool, "checkin", _checkin)
+    _installed = True
+
+
+async def deadline_exceeded_handler(
+    request: Request, exc: DeadlineExceeded
+) -> JSONResponse:
+    """Exception handler: an expired request is a 504, not an internal error."""
+    logger.warning("Request deadline exceeded: %s %s", request.method, request.url.path)
+    return JSONResponse(
+        status_code=504, content={"detail": "Request deadline exceeded"}
+    )
+
+
+class DeadlineMiddleware:
+    """Starts each request's deadline and cancels its queries on disconnect."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        deadline = Deadline.from_headers(Headers(scope=scope))
+        token = current_deadline.set(deadline)
+        # The real receive is read by one task, so a disconnect is noticed
+        # while the endpoint is still busy; the app reads from the stream.
+        forward, messages = anyio.create_memory_object_stream[Message](math.inf)
+        completed = False
+
+        async def watch_disconnect() -> None:
+            async with forward:
+                while True:
+                    message = await receive()
+                    await forward.send(message)
+                    if message["type"] == "http.disconnect":
+                        break
+            if not completed:
+                await anyio.to_thread.run_sync(deadline.cancel, limiter=_cancel_limiter)
+
+        async def receive_message() -> Message:
+            try:
+                return await messages.receive()
+            except anyio.EndOfStream:
+                return {"type": "http.disconnect"}
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal completed
+            if message["type"] == "http.response.body" and not message.get("more_body"):
+                # Servers report a disconnect once the response is done.
+                completed = True
+            await send(message)
+
+        try:
+            async with anyio.create_task_group() as task_group:
+                task_group.start_soon(watch_disconnect)
+                try:
+                    await self.app(scope, receive_message, send_wrapper)
+                finally:
+                    completed = True
+                    task_group.cancel_scope.cancel()
+        finally:
+            messages.close()
+            current_deadline.reset(token)
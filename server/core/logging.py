@@ -0,0 +1,267 @@
+"""
+Non-blocking, structured logging pipeline.
+
+Application threads only run the cheap part of logging: level check,
+sampling, attaching the request id, and putting the record on a bounded
+queue. A `QueueListener` thread does the formatting (message interpolation,
+JSON encoding, secret redaction) and the actual I/O.
+
+- Use %-style arguments (``logger.debug("Session %s opened", sid)``) so
+  disabled levels never build the message.
+- High-volume loggers can be sampled per logger prefix via ``LOG_SAMPLING``;
+  only records below WARNING are ever sampled out.
+- When the queue is full, records are dropped and counted rather than
+  blocking the request.
+"""
+
+import atexit
+import datetime as dt
+import enum
+import json
+import logging
+import queue
+import random
+import re
+import sys
+import threading
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Mapping, Optional
+
+from server.config import settings
+
+# Request id of the request being handled in the current context.
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+REDACTED = "[REDACTED]"
+SECRET_KEYS = re.compile(
+    r"authorization|password|passwd|secret|token|api[_-]?key|cookie", re.IGNORECASE
+)
+SECRET_PATTERNS = (
+    # key=value / "key": "value" pairs
+    re.compile(
+        r"(?i)(['\"]?(?:authorization|password|passwd|secret|token|api[_-]?key|cookie)"
+        r"['\"]?\s*[:=]\s*)(['\"]?)(?:(?:bearer|basic)\s+)?[^'\",\s&;)}]+"
+    ),
+    # bare credentials, e.g. "Bearer eyJ..."
+    re.compile(r"(?i)\b(bearer|basic)\s+[A-Za-z0-9._~+/=-]+"),
+)
+# Arguments of these types are immutable and cheap to format later.
+_DEFERRABLE_ARGS = (str, int, float, bool, type(None), enum.Enum, dt.date, dt.datetime)
+# Attributes of a bare LogRecord; anything else was passed via `extra`.
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {
+    "message",
+    "asctime",
+    "request_id",
+}
+
+
+def redact(text: str) -> str:
+    """Masks credentials that appear in free text."""
+    text = SECRET_PATTERNS[0].sub(lambda m: f"{m.group(1)}{m.group(2)}{REDACTED}", text)
+    return SECRET_PATTERNS[1].sub(lambda m: f"{m.group(1)} {REDACTED}", text)
+
+
+def redact_mapping(values: Mapping[str, Any]) -> Dict[str, Any]:
+    """Masks values whose keys look like credentials."""
+    return {
+        key: REDACTED if SECRET_KEYS.search(str(key)) else value
+        for key, value in values.items()
+    }
+
+
+class RequestContextFilter(logging.Filter):
+    """Stamps records with the current request id (must run on the calling thread)."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps only a fraction of the records below WARNING for configured loggers.
+    Rates are matched by the longest logger-name prefix.
+    """
+
+    def __init__(self, rates: Mapping[str, float]):
+        super().__init__()
+        self.rates = dict(rates)
+        self._resolved: Dict[str, float] = {}
+
+    def rate_for(self, name: str) -> float:
+        rate = self._resolved.get(name)
+        if rate is None:
+            rate = 1.0
+            best = -1
+            for prefix, value in self.rates.items():
+                if (name == prefix or name.startswith(prefix + ".")) and len(
+                    prefix
+                ) > best:
+                    rate, best = value, len(prefix)
+            self._resolved[name] = rate
+        return rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self.rate_for(record.name)
+        return rate >= 1.0 or random.random() < rate
+
+
+class AsyncQueueHandler(QueueHandler):
+    """
+    QueueHandler that defers formatting to the listener thread and never blocks.
+
+    Messages are interpolated on the calling thread only when an argument is
+    not a plain immutable value (e.g. an ORM instance whose ``repr`` may touch
+    its session); otherwise the record is queued as-is.
+    """
+
+    def __init__(self, log_queue: "queue.Queue[logging.LogRecord]"):
+        super().__init__(log_queue)
+        self.dropped = 0
+        self._dropped_lock = threading.Lock()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        args = record.args
+        if args and not (
+            isinstance(args, tuple)
+            and all(isinstance(a, _DEFERRABLE_ARGS) for a in args)
+        ):
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._dropped_lock:
+                self.dropped += 1
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats records as one JSON object per line, with secrets redacted."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload: Dict[str, Any] = {
+            "ts": dt.datetime.fromtimestamp(record.created, dt.timezone.utc).isoformat(
+                timespec="milliseconds"
+            ),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": redact(record.getMessage()),
+        }
+        request_id = getattr(record, "request_id", None)
+        if request_id:
+            payload["request_id"] = request_id
+        extra = {
+            key: value
+            for key, value in vars(record).items()
+            if key not in _RECORD_ATTRS
+        }
+        if extra:
+            payload.update(redact_mapping(extra))
+        if record.exc_info:
+            payload["exc"] = redact(self.formatException(record.exc_info))
+        elif record.exc_text:
+            payload["exc"] = redact(record.exc_text)
+        return json.dumps(payload, default=str, ensure_ascii=False)
+
+
+class RedactingFormatter(logging.Formatter):
+    """Plain-text formatter (``LOG_FORMAT``) with secrets redacted."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        if not hasattr(record, "request_id"):
+            record.request_id = None
+        return redact(super().format(record))
+
+
+class LogPipeline:
+    """Owns the queue, the queue handler and the listener thread."""
+
+    def __init__(
+        self, output: logging.Handler, queue_size: int, sampling: Mapping[str, float]
+    ):
+        self.output = output
+        self.queue: "queue.Queue[logging.LogRecord]" = queue.Queue(maxsize=queue_size)
+        self.queue_handler = AsyncQueueHandler(self.queue)
+        self.queue_handler.addFilter(SamplingFilter(sampling))
+        self.queue_handler.addFilter(RequestContextFilter())
+        self.listener = QueueListener(self.queue, output, respect_handler_level=True)
+        self._started = False
+
+    @property
+    def dropped(self) -> int:
+        return self.queue_handler.dropped
+
+    def start(self) -> None:
+        self.listener.start()
+        self._started = True
+
+    def stop(self) -> None:
+        """
+        Flushes queued records and stops the listener thread. If the pipeline
+        is still installed, later records are written synchronously instead.
+        """
+        root_logger = logging.getLogger()
+        if self.queue_handler in root_logger.handlers:
+            root_logger.removeHandler(self.queue_handler)
+            root_logger.addHandler(self.output)
+        if self._started:
+            self._started = False
+            self.listener.stop()
+
+
+_pipeline: Optional[LogPipeline] = None
+
+
+def build_formatter(json_output: bool) -> logging.Formatter:
+    return JsonFormatter() if json_output else RedactingFormatter(settings.LOG_FORMAT)
+
+
+def setup_logging(
+    stream: Any = None, json_output: Optional[bool] = None
+) -> LogPipeline:
+    """
+    Routes all logging through the queue pipeline. Safe to call again: the
+    previous pipeline is flushed and replaced.
+    """
+    global _pipeline
+    previous = _pipeline
+
+    level = settings.get_log_level()
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setLevel(level)
+    output.setFormatter(
+        build_formatter(settings.LOG_JSON if json_output is None else json_output)
+    )
+
+    pipeline = LogPipeline(output, settings.LOG_QUEUE_SIZE, settings.LOG_SAMPLING)
+    root_logger = logging.getLogger()
+    root_logger.setLevel(level)
+    for handler in root_logger.handlers[:]:
+        root_logger.removeHandler(handler)
+    pipeline.start()
+    root_logger.addHandler(pipeline.queue_handler)
+    _pipeline = pipeline
+    if previous is not None:
+        previous.stop()
+    return pipeline
+
+
+def shutdown_logging() -> None:
+    """Drains the queue; called on application shutdown and at exit."""
+    global _pipeline
+    if _pipeline is not None:
+        if _pipeline.dropped:
+            sys.stderr.write(
+                f"logging: {_pipeline.dropped} records dropped (queue full)\n"
+            )
+        _pipeline.stop()
+        _pipeline = None
+
+
+atexit.register(shutdown_logging)
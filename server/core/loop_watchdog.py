@@ -0,0 +1,354 @@
+"""
+Event-loop blocking detection.
+
+An ``async def`` endpoint that calls synchronous code (a sync `Session`
+query, a password hash, a file read) holds the event loop, and every other
+in-flight request on the worker waits until it lets go.
+
+- `LoopWatchdog` (started in the lifespan) ticks on the loop every
+  LOOP_WATCHDOG_INTERVAL_MS and records how late each tick is
+  (``event_loop_lag_seconds``). A monitor thread notices when the loop has
+  not ticked for LOOP_WATCHDOG_THRESHOLD_MS and captures the loop thread's
+  stack while it is still blocked. Once the loop resumes, the stall is
+  logged with that stack, counted by the coroutine that held the loop
+  (``event_loop_stalls_total{site}``) and kept for
+  ``GET /api/v1/system/loop-stalls``.
+- `record_loop_statement` is a statement observer that flags SQL executed
+  on a thread running an event loop, i.e. straight from async code
+  (``db_statements_on_event_loop_total{site}``). In production only SQL is
+  counted.
+- `BlockingCallRecorder` turns the check into a test failure (the
+  ``strict_event_loop`` fixture). Besides SQL it records ``time.sleep``,
+  blocking socket connects and DNS lookups, and file opens made on the
+  loop, through an audit hook (PEP 578) installed on first use. Files read
+  by imports and source lookups are not reported.
+"""
+
+import asyncio
+import datetime as dt
+import inspect
+import linecache
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from server.config import settings
+from server.core.db_instrumentation import (
+    ExecutedStatement,
+    add_statement_observer,
+    install_statement_hooks,
+    remove_statement_observer,
+)
+from server.core.metrics import WAIT_BUCKETS, Counter, Histogram
+
+logger = logging.getLogger(__name__)
+
+loop_lag = Histogram(
+    "event_loop_lag_seconds",
+    "How late the event loop ran the watchdog tick.",
+    buckets=WAIT_BUCKETS,
+)
+loop_stalls = Counter(
+    "event_loop_stalls_total",
+    "Event-loop stalls over the threshold, by blocking site.",
+    ("site",),
+)
+statements_on_loop = Counter(
+    "db_statements_on_event_loop_total",
+    "SQL statements executed on the event-loop thread, by calling site.",
+    ("site",),
+)
+
+_PROJECT_ROOT = os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+)
+_WRAPPER_FILES = {__file__, os.path.join(_PROJECT_ROOT, "server", "core", "timing.py")}
+_STACK_LIMIT = 30
+
+
+def _short_path(filename: str) -> str:
+    if filename.startswith(_PROJECT_ROOT + os.sep):
+        return os.path.relpath(filename, _PROJECT_ROOT).replace(os.sep, "/")
+    return os.path.basename(filename)
+
+
+def blocking_site(frame: Any) -> str:
+    """
+    Where a stack is blocking the loop, as ``path:function``: the innermost
+    coroutine (the async function that made the synchronous call), skipping
+    instrumentation wrappers; the innermost frame if there is none.
+    """
+    innermost = frame
+    while frame is not None:
+        code = frame.f_code
+        if (
+            code.co_flags & inspect.CO_COROUTINE
+            and code.co_filename not in _WRAPPER_FILES
+        ):
+            return f"{_short_path(code.co_filename)}:{code.co_name}"
+        frame = frame.f_back
+    return f"{_short_path(innermost.f_code.co_filename)}:{innermost.f_code.co_name}"
+
+
+def format_stack(frame: Any) -> str:
+    return "".join(
+        traceback.format_list(traceback.extract_stack(frame, limit=_STACK_LIMIT))
+    )
+
+
+class LoopWatchdog:
+    """Measures event-loop lag and captures the stack of long stalls."""
+
+    def __init__(self, interval_ms: float, threshold_ms: float, max_recent: int = 50):
+        self.interval = interval_ms / 1000
+        self.threshold = threshold_ms / 1000
+        self._stalls: Deque[Dict[str, Any]] = deque(maxlen=max_recent)
+        self._last_tick = 0.0
+        self._loop_thread: Optional[int] = None
+        self._task: Optional["asyncio.Task[None]"] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def start(self) -> None:
+        """Starts watching the running loop (call from a coroutine)."""
+        loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._last_tick = time.perf_counter()
+        self._stop.clear()
+        self._task = loop.create_task(self._tick())
+        self._thread = threading.Thread(
+            target=self._monitor, name="loop-watchdog", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    async def _tick(self) -> None:
+        while True:
+            due = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.perf_counter()
+            self._last_tick = now
+            loop_lag.observe(max(0.0, now - due))
+
+    def _monitor(self) -> None:
+        poll = min(self.interval, self.threshold) / 2
+        pending: Optional[Dict[str, Any]] = None
+        while not self._stop.wait(poll):
+            last_tick = self._last_tick
+            if pending is not None and last_tick != pending["last_tick"]:
+                self._record(pending, last_tick)
+                pending = None
+            overdue = time.perf_counter() - last_tick - self.interval
+            if pending is None and overdue > self.threshold:
+                frame = sys._current_frames().get(self._loop_thread)
+                if frame is None:
+                    continue
+                pending = {
+                    "last_tick": last_tick,
+                    "site": blocking_site(frame),
+                    "stack": format_stack(frame),
+                    "at": dt.datetime.now(dt.timezone.utc),
+                }
+                del frame
+
+    def _record(self, pending: Dict[str, Any], resumed_tick: float) -> None:
+        blocked = resumed_tick - pending["last_tick"] - self.interval
+        loop_stalls.inc(pending["site"])
+        self._stalls.append(
+            {
+                "at": pending["at"].isoformat(),
+                "blocked_ms": round(blocked * 1000, 1),
+                "site": pending["site"],
+                "stack": pending["stack"],
+            }
+        )
+        logger.warning(
+            "Event loop blocked for %.0f ms in %s\n%s",
+            blocked * 1000,
+            pending["site"],
+            pending["stack"],
+            extra={"site": pending["site"], "blocked_ms": round(blocked * 1000, 1)},
+        )
+
+    def recent_stalls(self) -> List[Dict[str, Any]]:
+        """Recent stalls, newest first."""
+        return list(reversed(self._stalls))
+
+
+loop_watchdog = LoopWatchdog(
+    settings.LOOP_WATCHDOG_INTERVAL_MS, settings.LOOP_WATCHDOG_THRESHOLD_MS
+)
+
+
+# Sites already logged by `record_loop_statement`, oldest first.
+_reported_sites: "OrderedDict[str, None]" = OrderedDict()
+_reported_sites_lock = threading.Lock()
+_MAX_REPORTED_SITES = 1000
+
+
+def _first_report(site: str) -> bool:
+    with _reported_sites_lock:
+        if site in _reported_sites:
+            return False
+        _reported_sites[site] = None
+        if len(_reported_sites) > _MAX_REPORTED_SITES:
+            _reported_sites.popitem(last=False)
+        return True
+
+
+def record_loop_statement(executed: ExecutedStatement) -> None:
+    """
+    Statement observer: counts SQL run directly on the event loop, logging
+    each site once.
+    """
+    if asyncio._get_running_loop() is None:
+        return
+    frame = sys._getframe(1)
+    site = blocking_site(frame)
+    statements_on_loop.inc(site)
+    if _first_report(site):
+        logger.warning(
+            "Blocking SQL on the event loop in %s; run it in a worker thread "
+            "(sync endpoint or run_in_threadpool)\n%s",
+            site,
+            format_stack(frame),
+            extra={"site": site},
+        )
+
+
+class BlockingCallOnEventLoop(AssertionError):
+    """Raised by `BlockingCallRecorder.assert_clean`."""
+
+
+# Audit events of blocking calls recorded besides SQL, by kind.
+_BLOCKING_EVENTS = {
+    "time.sleep": "sleep",
+    "socket.connect": "socket",
+    "socket.getaddrinfo": "socket",
+    "socket.gethostbyname": "socket",
+    "open": "file",
+}
+_active_recorders: List["BlockingCallRecorder"] = []
+_audit_hook_installed = False
+# Set while a recorder formats a stack (linecache opens source files).
+_recording = threading.local()
+
+
+def _loading_code(frame: Any) -> bool:
+    """Imports and source lookups (linecache) read files once, then cache."""
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith("<frozen importlib") or filename == linecache.__file__:
+            return True
+        frame = frame.f_back
+    return False
+
+
+def _report_blocking_call(event: str, args: Tuple[Any, ...], frame: Any) -> None:
+    kind = _BLOCKING_EVENTS.get(event)
+    if (
+        kind is None
+        or not _active_recorders
+        or getattr(_recording, "active", False)
+        or asyncio._get_running_loop() is None
+    ):
+        return
+    if event == "socket.connect" and not args[0].getblocking():
+        return  # the loop's own non-blocking sockets
+    if kind == "file" and _loading_code(frame):
+        return
+    call = f"{event}{args[1:] if event == 'socket.connect' else args!r}"
+    for recorder in list(_active_recorders):
+        recorder.record(kind, call, frame)
+
+
+def _audit_blocking_call(event: str, args: Tuple[Any, ...]) -> None:
+    if event in _BLOCKING_EVENTS:
+        _report_blocking_call(event, args, sys._getframe(1))
+
+
+_original_sleep = time.sleep
+
+
+def _recorded_sleep(seconds: float) -> None:
+    # Python < 3.12 raises no audit event for time.sleep.
+    _report_blocking_call("time.sleep", (seconds,), sys._getframe(1))
+    _original_sleep(seconds)
+
+
+class BlockingCallRecorder:
+    """
+    Records blocking calls made on an event-loop thread while active
+    (tests): SQL, ``time.sleep``, blocking socket connects and DNS lookups,
+    and file opens.
+
+    Usage::
+
+        with BlockingCallRecorder() as blocking:
+            client.post("/api/v1/auth/login", json=...)
+        blocking.assert_clean()
+    """
+
+    def __init__(self) -> None:
+        self.calls: List[Dict[str, str]] = []
+
+    def __call__(self, executed: ExecutedStatement) -> None:
+        if asyncio._get_running_loop() is None:
+            return
+        self.record("sql", executed.statement, sys._getframe(1))
+
+    def record(self, kind: str, call: str, frame: Any) -> None:
+        _recording.active = True
+        try:
+            self.calls.append(
+                {
+                    "kind": kind,
+                    "site": blocking_site(frame),
+                    "call": " ".join(call.split())[:200],
+                    "stack": format_stack(frame),
+                }
+            )
+        finally:
+            _recording.active = False
+
+    def __enter__(self) -> "BlockingCallRecorder":
+        global _audit_hook_installed
+        install_statement_hooks()
+        add_statement_observer(self)
+        if not _audit_hook_installed:
+            # Audit hooks cannot be removed; it does nothing without recorders.
+            sys.addaudithook(_audit_blocking_call)
+            _audit_hook_installed = True
+        if not _active_recorders and sys.version_info < (3, 12):
+            time.sleep = _recorded_sleep
+        _active_recorders.append(self)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        _active_recorders.remove(self)
+        if not _active_recorders and sys.version_info < (3, 12):
+            time.sleep = _original_sleep
+        remove_statement_observer(self)
+
+    def assert_clean(self) -> None:
+        if self.calls:
+            details = "\n\n".join(
+                f"{call['site']} ({call['kind']}): {call['call']}\n{call['stack']}"
+                for call in self.calls
+            )
+            raise BlockingCallOnEventLoop(
+                f"{len(self.calls)} blocking call(s) on the event loop:\n\n{details}"
+            )
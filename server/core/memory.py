@@ -0,0 +1,235 @@
+"""
+Memory profiling with tracemalloc.
+
+Production workers: the ``/api/v1/system/memory`` endpoints (debug access)
+start and stop tracing, take named snapshots and return the top
+allocation sites of a snapshot or the growth between two snapshots. This
+tells apart, for example, identity maps of long-lived sessions
+(sqlalchemy/orm), Pydantic models (pydantic_core) and log buffers
+(server/core/logging.py). Tracing slows allocations noticeably, so it is
+off until started and should be stopped afterwards.
+
+Tests: `record_route_allocations` makes `RequestContextMiddleware` measure
+each request's net and peak traced memory per route template, which the
+``route_allocations`` pytest fixture exposes for per-endpoint budgets. The
+numbers are only meaningful while requests do not overlap.
+"""
+
+import datetime as dt
+import linecache
+import threading
+import tracemalloc
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from server.config import settings
+
+KEY_TYPES = ("lineno", "filename", "traceback")
+
+_SNAPSHOT_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, linecache.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+]
+
+
+def rss_bytes() -> Optional[int]:
+    """Resident set size of this process (Linux), None elsewhere."""
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    import resource
+
+    return resident_pages * resource.getpagesize()
+
+
+def status() -> Dict[str, Any]:
+    current, peak = tracemalloc.get_traced_memory()
+    return {
+        "tracing": tracemalloc.is_tracing(),
+        "traceback_limit": tracemalloc.get_traceback_limit(),
+        "traced_bytes": current,
+        "traced_peak_bytes": peak,
+        "tracemalloc_overhead_bytes": tracemalloc.get_tracemalloc_memory(),
+        "rss_bytes": rss_bytes(),
+        "snapshots": snapshot_store.names(),
+    }
+
+
+def start_tracing(frames: int) -> None:
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+
+
+def stop_tracing() -> None:
+    """Stops tracing; existing snapshots stay available."""
+    tracemalloc.stop()
+
+
+def _location(trace_key: Any, key_type: str) -> Any:
+    if key_type == "traceback":
+        return [f"{frame.filename}:{frame.lineno}" for frame in trace_key]
+    frame = trace_key[0]
+    return (
+        frame.filename if key_type == "filename" else f"{frame.filename}:{frame.lineno}"
+    )
+
+
+def top_allocations(
+    snapshot: tracemalloc.Snapshot, key_type: str, limit: int
+) -> List[Dict[str, Any]]:
+    """The allocation sites holding the most memory in ``snapshot``."""
+    return [
+        {
+            "location": _location(stat.traceback, key_type),
+            "size_bytes": stat.size,
+            "count": stat.count,
+        }
+        for stat in snapshot.statistics(key_type)[:limit]
+    ]
+
+
+def allocation_diff(
+    old: tracemalloc.Snapshot, new: tracemalloc.Snapshot, key_type: str, limit: int
+) -> List[Dict[str, Any]]:
+    """Sites ordered by how much their memory changed from ``old`` to ``new``."""
+    return [
+        {
+            "location": _location(stat.traceback, key_type),
+            "size_bytes": stat.size,
+            "size_diff_bytes": stat.size_diff,
+            "count": stat.count,
+            "count_diff": stat.count_diff,
+        }
+        for stat in new.compare_to(old, key_type)[:limit]
+    ]
+
+
+class SnapshotStore:
+    """Named snapshots, oldest dropped first."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._snapshots: "OrderedDict[str, tracemalloc.Snapshot]" = OrderedDict()
+        self._taken_at: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._counter = 0
+
+    def take(self, name: Optional[str] = None) -> str:
+        """Snapshots the traced allocations; requires tracing to be on."""
+        snapshot = tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+        with self._lock:
+            self._counter += 1
+            name = name or f"s{self._counter}"
+            self._snapshots[name] = snapshot
+            self._snapshots.move_to_end(name)
+            self._taken_at[name] = dt.datetime.now(dt.timezone.utc).isoformat()
+            while len(self._snapshots) > self.max_entries:
+                dropped, _ = self._snapshots.popitem(last=False)
+                self._taken_at.pop(dropped, None)
+        return name
+
+    def get(self, name: str) -> Optional[tracemalloc.Snapshot]:
+        with self._lock:
+            return self._snapshots.get(name)
+
+    def names(self) -> List[Dict[str, str]]:
+        with self._lock:
+            return [
+                {"name": name, "taken_at": self._taken_at[name]}
+                for name in self._snapshots
+            ]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._snapshots.clear()
+            self._taken_at.clear()
+
+
+snapshot_store = SnapshotStore(settings.MEMORY_MAX_SNAPSHOTS)
+
+
+# --- Per-route allocations (test harness) -----------------------------------
+
+
+class RouteAllocationStats:
+    __slots__ = ("requests", "net_bytes_total", "peak_bytes_max")
+
+    def __init__(self) -> None:
+        self.requests = 0
+        self.net_bytes_total = 0
+        self.peak_bytes_max = 0
+
+    @property
+    def net_bytes_mean(self) -> float:
+        return self.net_bytes_total / self.requests if self.requests else 0.0
+
+
+class RouteAllocations:
+    """Net (retained) and peak traced memory of each request, by route."""
+
+    def __init__(self) -> None:
+        self.routes: Dict[str, RouteAllocationStats] = {}
+        self._lock = threading.Lock()
+
+    def start(self) -> int:
+        tracemalloc.reset_peak()
+        return tracemalloc.get_traced_memory()[0]
+
+    def finish(self, route: str, started_bytes: int) -> None:
+        current, peak = tracemalloc.get_traced_memory()
+        with self._lock:
+            stats = self.routes.get(route)
+            if stats is None:
+                stats = self.routes[route] = RouteAllocationStats()
+            stats.requests += 1
+            stats.net_bytes_total += current - started_bytes
+            stats.peak_bytes_max = max(stats.peak_bytes_max, peak - started_bytes)
+
+    def assert_budget(self, route: str, max_peak_bytes: int) -> None:
+        stats = self.routes.get(route)
+        if stats is None:
+            raise AssertionError(
+                f"No requests recorded for {route}; seen: {sorted(self.routes)}"
+            )
+        if stats.peak_bytes_max > max_peak_bytes:
+            raise AssertionError(
+                f"{route} peaked at {stats.peak_bytes_max} bytes over "
+                f"{stats.requests} requests, budget is {max_peak_bytes}"
+            )
+
+    def report(self) -> Dict[str, Dict[str, float]]:
+        return {
+            route: {
+                "requests": stats.requests,
+                "net_bytes_mean": stats.net_bytes_mean,
+                "peak_bytes_max": stats.peak_bytes_max,
+            }
+            for route, stats in sorted(self.routes.items())
+        }
+
+
+# Checked by RequestContextMiddleware for every request; None outside the harness.
+route_recorder: Optional[RouteAllocations] = None
+
+
+@contextmanager
+def record_route_allocations(frames: int = 1) -> Iterator[RouteAllocations]:
+    """Measures allocations per request and route while active (tests only)."""
+    global route_recorder
+    started_here = not tracemalloc.is_tracing()
+    if started_here:
+        tracemalloc.start(frames)
+    recorder = RouteAllocations()
+    route_recorder = recorder
+    try:
+        yield recorder
+    finally:
+        route_recorder = None
+        if started_here:
+            tracemalloc.stop()
@@ -0,0 +1,578 @@
+"""
+In-process metrics with Prometheus text exposition.
+
+Collectors are plain dictionaries behind one lock, updated from the request
+path (`RequestContextMiddleware`), the shared statement hooks
+(`server.core.db_instrumentation`) and the instrumented connection pool.
+Point-in-time values (pool state, threadpool queue, cache hit counts) are
+read by collector callbacks when a snapshot is taken.
+
+With several worker processes, set ``METRICS_MULTIPROC_DIR`` to a directory
+shared by the workers. Each process writes its snapshot there periodically
+and on every scrape; ``/metrics`` merges all snapshots. Counters and
+histograms are summed (including those of exited workers, so they never go
+backwards); gauges are reported per live ``pid``. Snapshot files are named
+by pid plus a random suffix, so a reused pid never overwrites an exited
+worker's counters. On each scrape the snapshots of exited workers are
+folded into one ``metrics-exited.json`` and removed.
+"""
+
+import fcntl
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy.pool import QueuePool
+
+from server.core.db_instrumentation import ExecutedStatement
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+WAIT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+
+LabelValues = Tuple[str, ...]
+# (name, type, help, labels, value) as yielded by scrape-time collectors
+CollectedSample = Tuple[str, str, str, Dict[str, str], float]
+
+
+class MetricsRegistry:
+    """Holds all metrics of this process."""
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.metrics: Dict[str, "_Metric"] = {}
+        self.collectors: List[Callable[[], Iterable[CollectedSample]]] = []
+
+    def register(self, metric: "_Metric") -> None:
+        self.metrics[metric.name] = metric
+
+    def add_collector(self, collector: Callable[[], Iterable[CollectedSample]]) -> None:
+        """
+        Adds a callback evaluated at snapshot time. It yields
+        ``(name, type, help, labels, value)`` with type "counter" or "gauge".
+        """
+        self.collectors.append(collector)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Returns a JSON-serializable copy of all values (see `merge_snapshots`)."""
+        families: Dict[str, Any] = {}
+        with self.lock:
+            for metric in self.metrics.values():
+                families[metric.name] = metric.dump()
+        for collector in self.collectors:
+            try:
+                samples = list(collector())
+            except Exception:
+                logger.exception("Metrics collector %r failed", collector)
+                continue
+            for name, kind, documentation, labels, value in samples:
+                family = families.setdefault(
+                    name, {"type": kind, "help": documentation, "samples": []}
+                )
+                family["samples"].append([labels, value])
+        return {"pid": os.getpid(), "families": families}
+
+
+registry = MetricsRegistry()
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        registry.register(self)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self.values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labelvalues: str, amount: float = 1.0) -> None:
+        with registry.lock:
+            self.values[labelvalues] = self.values.get(labelvalues, 0.0) + amount
+
+    def dump(self) -> Dict[str, Any]:
+        return {
+            "type": self.kind,
+            "help": self.documentation,
+            "samples": [
+                [dict(zip(self.labelnames, key)), value]
+                for key, value in self.values.items()
+            ],
+        }
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+        # per label set: [count per bucket..., +Inf count, sum]
+        self.values: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, *labelvalues: str) -> None:
+        index = len(self.buckets)
+        for position, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = position
+                break
+        with registry.lock:
+            counts = self.values.get(labelvalues)
+            if counts is None:
+                counts = self.values[labelvalues] = [0.0] * (len(self.buckets) + 2)
+            counts[index] += 1
+            counts[-1] += value
+
+    def dump(self) -> Dict[str, Any]:
+        return {
+            "type": self.kind,
+            "help": self.documentation,
+            "buckets": list(self.buckets),
+            "samples": [
+                [dict(zip(self.labelnames, key)), list(counts)]
+                for key, counts in self.values.items()
+            ],
+        }
+
+
+# --- Metrics -----------------------------------------------------------------
+
+http_requests = Counter(
+    "http_requests_total",
+    "HTTP requests by route and status.",
+    ("method", "route", "status"),
+)
+http_duration = Histogram(
+    "http_request_duration_seconds", "HTTP request latency.", ("method", "route")
+)
+db_statements = Counter(
+    "db_statements_total", "SQL statements executed, by route.", ("route",)
+)
+db_time = Counter(
+    "db_statement_seconds_total", "Time spent executing SQL, by route.", ("route",)
+)
+pool_wait = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time to obtain a connection from the pool (including connecting).",
+    buckets=WAIT_BUCKETS,
+)
+cache_requests = Counter(
+    "cache_requests_total", "Cache lookups by cache and result.", ("cache", "result")
+)
+
+
+# --- Per-request accounting --------------------------------------------------
+
+
+class RequestStats:
+    """Mutable per-request accumulator shared with worker threads via a contextvar."""
+
+    __slots__ = (
+        "db_statements",
+        "db_seconds",
+        "timings",
+        "endpoint_span",
+        "queries",
+        "trace",
+        "profile",
+    )
+
+    def __init__(self) -> None:
+        self.db_statements = 0
+        self.db_seconds = 0.0
+        # Server-Timing spans in seconds, see server.core.timing
+        self.timings: Dict[str, float] = {}
+        self.endpoint_span: Optional[Tuple[float, float]] = None
+        # Statements of requests sampled for auditing, see server.core.query_audit
+        self.queries: Optional[List[Any]] = None
+        # On-demand SQL trace, see server.core.sql_trace
+        self.trace: Optional[Any] = None
+        # Per-request CPU profile, see server.core.profiler
+        self.profile: Optional[Any] = None
+
+    def add_timing(self, name: str, seconds: float) -> None:
+        self.timings[name] = self.timings.get(name, 0.0) + seconds
+
+    def mark_endpoint(self, entered: float, start: float, end: float) -> None:
+        """``entered`` precedes ``start`` by the threadpool wait for sync endpoints."""
+        self.endpoint_span = (entered, end)
+        self.add_timing("endpoint", end - start)
+
+
+current_request_stats: ContextVar[Optional[RequestStats]] = ContextVar(
+    "current_request_stats", default=None
+)
+
+
+def record_statement(executed: ExecutedStatement) -> None:
+    """Statement observer: attributes SQL to the current request."""
+    stats = current_request_stats.get()
+    if stats is not None:
+        stats.db_statements += 1
+        stats.db_seconds += executed.duration
+
+
+def route_template(scope: Dict[str, Any]) -> str:
+    """Returns the matched route as a template (e.g. /org/sites/{site_id})."""
+    # The route's own template, not the path with values substituted back:
+    # a value can equal a literal segment, and {param:path} spans segments.
+    route = scope.get("route")
+    if route is None:
+        return "<unmatched>"
+    # Routes of included routers keep their own (relative) path; FastAPI
+    # records the prefixed one for the matched route.
+    effective = scope.get("fastapi", {}).get("effective_route_context")
+    return getattr(effective or route, "path_format", None) or "<unmatched>"
+
+
+def observe_request(
+    scope: Dict[str, Any], status_code: int, duration: float, stats: RequestStats
+) -> None:
+    route = route_template(scope)
+    method = scope["method"]
+    http_requests.inc(method, route, str(status_code))
+    http_duration.observe(duration, method, route)
+    if stats.db_statements:
+        db_statements.inc(route, amount=stats.db_statements)
+        db_time.inc(route, amount=stats.db_seconds)
+
+
+# --- Pool, threadpool and cache collectors -----------------------------------
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            waited = time.perf_counter() - start
+            pool_wait.observe(waited)
+            stats = current_request_stats.get()
+            if stats is not None:
+                stats.add_timing("pool", waited)
+
+
+def watch_pool(name: str, pool: Any) -> None:
+    """Reports connection pool state as gauges."""
+
+    def collect():
+        if not isinstance(pool, QueuePool):
+            return
+        labels = {"pool": name}
+        yield ("db_pool_size", "gauge", "Configured pool size.", labels, pool.size())
+        for state, value in (
+            ("checked_out", pool.checkedout()),
+            ("checked_in", pool.checkedin()),
+            ("overflow", max(pool.overflow(), 0)),
+        ):
+            yield (
+                "db_pool_connections",
+                "gauge",
+                "Pool connections by state.",
+                {**labels, "state": state},
+                value,
+            )
+
+    registry.add_collector(collect)
+
+
+# Limiter reported by `watch_threadpool` (replaced on each startup)
+_threadpool: Dict[str, Any] = {}
+
+
+def watch_threadpool(limiter: Any) -> None:
+    """Reports the anyio worker-thread limiter (sync endpoints, dependencies)."""
+    first = not _threadpool
+    _threadpool["limiter"] = limiter
+    if not first:
+        return
+
+    def collect():
+        statistics = _threadpool["limiter"].statistics()
+        yield (
+            "threadpool_threads_busy",
+            "gauge",
+            "Worker threads in use.",
+            {},
+            statistics.borrowed_tokens,
+        )
+        yield (
+            "threadpool_threads_max",
+            "gauge",
+            "Worker thread limit.",
+            {},
+            statistics.total_tokens,
+        )
+        yield (
+            "threadpool_tasks_waiting",
+            "gauge",
+            "Calls queued for a worker thread.",
+            {},
+            statistics.tasks_waiting,
+        )
+
+    registry.add_collector(collect)
+
+
+def watch_lru_cache(name: str, cached: Any) -> None:
+    """Reports hits/misses of a functools.lru_cache-decorated function."""
+
+    def collect():
+        info = cached.cache_info()
+        for result, value in (("hit", info.hits), ("miss", info.misses)):
+            yield (
+                cache_requests.name,
+                "counter",
+                cache_requests.documentation,
+                {"cache": name, "result": result},
+                value,
+            )
+
+    registry.add_collector(collect)
+
+
+# --- Multi-process aggregation and rendering ---------------------------------
+
+
+_EXITED_FILE = "metrics-exited.json"
+_LOCK_FILE = "metrics.lock"
+
+_instance: Tuple[int, str] = (0, "")
+
+
+def _instance_id() -> str:
+    """``<pid>-<random>``; renewed in a forked child, which gets a new pid."""
+    global _instance
+    pid = os.getpid()
+    if _instance[0] != pid:
+        _instance = (pid, uuid.uuid4().hex[:12])
+    return f"{pid}-{_instance[1]}"
+
+
+def _snapshot_path(directory: str, instance: str) -> str:
+    return os.path.join(directory, f"metrics-{instance}.json")
+
+
+def _write_json(path: str, data: Dict[str, Any]) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def write_snapshot(directory: str) -> None:
+    """Atomically writes this process's snapshot to the shared directory."""
+    _write_json(_snapshot_path(directory, _instance_id()), registry.snapshot())
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _load_snapshots(directory: str) -> List[Tuple[str, Dict[str, Any]]]:
+    snapshots = []
+    for filename in sorted(os.listdir(directory)):
+        if not (filename.startswith("metrics-") and filename.endswith(".json")):
+            continue
+        try:
+            with open(os.path.join(directory, filename)) as f:
+                snapshots.append((filename, json.load(f)))
+        except FileNotFoundError:
+            pass  # folded by another worker meanwhile
+        except (OSError, ValueError):
+            logger.warning("Skipping unreadable metrics snapshot %s", filename)
+    return snapshots
+
+
+def read_snapshots(directory: str) -> List[Dict[str, Any]]:
+    return [snapshot for _, snapshot in _load_snapshots(directory)]
+
+
+def fold_exited_snapshots(directory: str) -> int:
+    """
+    Adds the counters and histograms of exited workers to ``metrics-exited.json``
+    and removes their snapshots; returns how many were folded.
+    """
+    exited_path = os.path.join(directory, _EXITED_FILE)
+    with open(os.path.join(directory, _LOCK_FILE), "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        exited: Dict[str, Any] = {"pid": None, "folded": [], "families": {}}
+        if os.path.exists(exited_path):
+            with open(exited_path) as f:
+                exited = json.load(f)
+        # Left over if a previous fold stopped before removing them.
+        for filename in exited["folded"]:
+            if os.path.exists(os.path.join(directory, filename)):
+                os.remove(os.path.join(directory, filename))
+        folded = [
+            (filename, snapshot)
+            for filename, snapshot in _load_snapshots(directory)
+            if filename != _EXITED_FILE
+            and snapshot["pid"] != os.getpid()
+            and not _pid_alive(snapshot["pid"])
+        ]
+        if not folded:
+            return 0
+        merged = merge_snapshots(
+            [exited] + [snapshot for _, snapshot in folded], multiprocess=False
+        )
+        families = {
+            name: {key: value for key, value in family.items() if key != "samples"}
+            | {"samples": [list(sample) for sample in family["samples"].values()]}
+            for name, family in merged.items()
+            if family["type"] != "gauge"
+        }
+        filenames = [filename for filename, _ in folded]
+        _write_json(
+            exited_path, {"pid": None, "folded": filenames, "families": families}
+        )
+        for filename in filenames:
+            os.remove(os.path.join(directory, filename))
+    return len(folded)
+
+
+def merge_snapshots(
+    snapshots: List[Dict[str, Any]], multiprocess: bool
+) -> Dict[str, Any]:
+    """
+    Sums counters/histograms across processes; keeps gauges of live
+    processes per pid. Folded exited workers have no pid.
+    """
+    merged: Dict[str, Any] = {}
+    for snapshot in snapshots:
+        pid = snapshot["pid"]
+        alive = pid is not None and (pid == os.getpid() or _pid_alive(pid))
+        for name, family in snapshot["families"].items():
+            target = merged.setdefault(
+                name,
+                {key: value for key, value in family.items() if key != "samples"}
+                | {"samples": {}},
+            )
+            for labels, value in family["samples"]:
+                if family["type"] == "gauge":
+                    if not alive:
+                        continue
+                    if multiprocess:
+                        labels = {**labels, "pid": str(pid)}
+                key = tuple(sorted(labels.items()))
+                if family["type"] == "histogram":
+                    current = target["samples"].get(key, (labels, [0.0] * len(value)))[
+                        1
+                    ]
+                    value = [a + b for a, b in zip(current, value)]
+                elif family["type"] == "counter":
+                    value += target["samples"].get(key, (labels, 0.0))[1]
+                target["samples"][key] = (labels, value)
+    return merged
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    pairs = ",".join(
+        f'{name}="{_escape(value)}"' for name, value in sorted(labels.items())
+    )
+    return "{" + pairs + "}"
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def render(families: Dict[str, Any]) -> str:
+    """Formats merged families in the Prometheus text format (0.0.4)."""
+    lines: List[str] = []
+    for name in sorted(families):
+        family = families[name]
+        lines.append(f"# HELP {name} {family['help']}")
+        lines.append(f"# TYPE {name} {family['type']}")
+        for labels, value in family["samples"].values():
+            if family["type"] != "histogram":
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+                continue
+            cumulative = 0.0
+            for bound, count in zip(family["buckets"] + ["+Inf"], value[:-1]):
+                cumulative += count
+                le = bound if bound == "+Inf" else _format_value(bound)
+                bucket_labels = _format_labels({**labels, "le": str(le)})
+                lines.append(
+                    f"{name}_bucket{bucket_labels} {_format_value(cumulative)}"
+                )
+            lines.append(
+                f"{name}_sum{_format_labels(labels)} {_format_value(value[-1])}"
+            )
+            lines.append(
+                f"{name}_count{_format_labels(labels)} {_format_value(cumulative)}"
+            )
+    return "\n".join(lines) + "\n"
+
+
+def exposition(multiproc_dir: Optional[str] = None) -> str:
+    """Renders this process's metrics, or all workers' with a shared directory."""
+    if not multiproc_dir:
+        return render(merge_snapshots([registry.snapshot()], multiprocess=False))
+    write_snapshot(multiproc_dir)
+    fold_exited_snapshots(multiproc_dir)
+    return render(merge_snapshots(read_snapshots(multiproc_dir), multiprocess=True))
+
+
+class SnapshotWriter:
+    """Background thread flushing this process's snapshot to the shared directory."""
+
+    def __init__(self, directory: str, interval: float):
+        self.directory = directory
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        self._thread = threading.Thread(
+            target=self._run, name="metrics-writer", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                write_snapshot(self.directory)
+            except OSError as e:
+                logger.warning("Could not write metrics snapshot: %s", e)
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        write_snapshot(self.directory)
@@ -0,0 +1,348 @@
+"""
+Sampling CPU profiler with collapsed-stack and flamegraph output.
+
+A background thread reads ``sys._current_frames()`` every
+PROFILER_INTERVAL_MS and counts the stacks of the threads each active
+`Profile` is interested in. The thread only exists while a profile is
+active, so there is no cost when profiling is off.
+
+- Per request: a debug request sending ``X-Debug-Profile: 1`` is profiled
+  while it runs. That covers the event-loop thread whenever the request's
+  task is the one running, i.e. its coroutine frame is on the sampled stack
+  (async routes such as ``server/auth/routes.py``), and the worker thread
+  that runs a sync endpoint (`TimedRoute`). The
+  profile is stored under the request id.
+- Process-wide: ``POST /api/v1/system/profiler/start?seconds=N`` samples
+  every thread for N seconds and stores the profile under the id of that
+  request.
+
+Profiles are fetched from ``GET /api/v1/system/profiles/{id}`` as collapsed
+stacks (``format=collapsed``, the input format of flamegraph.pl and
+speedscope) or a self-contained flamegraph page (``format=html``).
+"""
+
+import asyncio
+import datetime as dt
+import html
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter as Tally
+from typing import Any, Dict, List, Optional, Tuple
+
+from server.config import settings
+from server.core.sql_trace import TraceStore
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "x-debug-profile"
+PROFILE_PATH = "/api/v1/system/profiles/{profile_id}"
+
+# Innermost frames of threads that are waiting for work, not using CPU.
+_IDLE_LEAVES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("selectors.py", "select"),
+}
+
+
+def _frame_label(code: Any, cache: Dict[Any, str]) -> str:
+    label = cache.get(code)
+    if label is None:
+        filename = code.co_filename
+        parts = filename.replace("\\", "/").split("/")
+        if "site-packages" in parts:
+            short = "/".join(parts[parts.index("site-packages") + 1 :])
+        elif "server" in parts:
+            short = "/".join(parts[len(parts) - 1 - parts[::-1].index("server") :])
+        else:
+            short = parts[-1]
+        # ';' separates frames in the collapsed format
+        label = f"{code.co_name} ({short}:{code.co_firstlineno})".replace(";", ":")
+        cache[code] = label
+    return label
+
+
+class Profile:
+    """Stack counts for one profiling session."""
+
+    def __init__(
+        self,
+        profile_id: str,
+        kind: str,
+        loop: Optional[asyncio.AbstractEventLoop] = None,
+        task: Optional["asyncio.Task[Any]"] = None,
+    ):
+        self.profile_id = profile_id
+        self.kind = kind
+        self.started_at = dt.datetime.now(dt.timezone.utc)
+        self.started = time.perf_counter()
+        self.stacks: "Tally[str]" = Tally()
+        self.samples = 0
+        # Recorded on the loop: the sampler thread must not ask the loop
+        # which task is running, it looks for this frame on the stack.
+        self._task_frame = task.get_coro().cr_frame if task is not None else None
+        self._loop_thread = threading.get_ident() if loop is not None else None
+        self._threads: "Tally[int]" = Tally()
+
+    @property
+    def all_threads(self) -> bool:
+        return self.kind == "process"
+
+    def enter_thread(self) -> None:
+        """Marks the calling worker thread as doing this request's work."""
+        self._threads[threading.get_ident()] += 1
+
+    def exit_thread(self) -> None:
+        ident = threading.get_ident()
+        self._threads[ident] -= 1
+        if self._threads[ident] <= 0:
+            del self._threads[ident]
+
+    def wants(self, thread_id: int, frame: Any) -> bool:
+        """Whether the sampled stack of ``thread_id`` belongs to this profile."""
+        if self.all_threads or thread_id in self._threads:
+            return True
+        if thread_id == self._loop_thread and self._task_frame is not None:
+            while frame is not None:
+                if frame is self._task_frame:
+                    return True
+                frame = frame.f_back
+        return False
+
+    def document(self, interval: float) -> Dict[str, Any]:
+        return {
+            "request_id": self.profile_id,
+            "kind": self.kind,
+            "started_at": self.started_at.isoformat(),
+            "duration_ms": round((time.perf_counter() - self.started) * 1000, 3),
+            "interval_ms": interval * 1000,
+            "samples": self.samples,
+            "stacks": dict(self.stacks.most_common()),
+        }
+
+
+class StackSampler:
+    """Samples thread stacks for the active profiles on a background thread."""
+
+    def __init__(self, interval: float, include_idle: bool = False):
+        self.interval = interval
+        self.include_idle = include_idle
+        self._profiles: List[Profile] = []
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._labels: Dict[Any, str] = {}
+
+    def add(self, profile: Profile) -> None:
+        with self._lock:
+            self._profiles.append(profile)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="stack-sampler", daemon=True
+                )
+                self._thread.start()
+
+    def remove(self, profile: Profile) -> None:
+        with self._lock:
+            if profile in self._profiles:
+                self._profiles.remove(profile)
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def _run(self) -> None:
+        own_ident = threading.get_ident()
+        names: Dict[int, str] = {}
+        while True:
+            with self._lock:
+                profiles = list(self._profiles)
+                if not profiles:
+                    self._thread = None
+                    return
+            frames = sys._current_frames()
+            if any(p.all_threads for p in profiles):
+                names = {
+                    t.ident: t.name
+                    for t in threading.enumerate()
+                    if t.ident is not None
+                }
+            for thread_id, frame in frames.items():
+                if thread_id == own_ident:
+                    continue
+                interested = [p for p in profiles if p.wants(thread_id, frame)]
+                if not interested:
+                    continue
+                stack = self._collapse(frame)
+                if stack is None:
+                    continue
+                for profile in interested:
+                    key = (
+                        f"{names.get(thread_id, 'thread')};{stack}"
+                        if profile.all_threads
+                        else stack
+                    )
+                    profile.stacks[key] += 1
+            for profile in profiles:
+                profile.samples += 1
+            del frames
+            time.sleep(self.interval)
+
+    def _collapse(self, frame: Any) -> Optional[str]:
+        leaf = frame.f_code
+        if (
+            not self.include_idle
+            and (os.path.basename(leaf.co_filename), leaf.co_name) in _IDLE_LEAVES
+        ):
+            return None
+        labels = []
+        while frame is not None:
+            labels.append(_frame_label(frame.f_code, self._labels))
+            frame = frame.f_back
+        labels.reverse()
+        return ";".join(labels)
+
+
+sampler = StackSampler(settings.PROFILER_INTERVAL_MS / 1000)
+profile_store = TraceStore(
+    settings.PROFILER_MAX_STORED, settings.PROFILER_DIR, prefix="profile"
+)
+
+
+def start_request_profile(request_id: str) -> Profile:
+    """Starts profiling the calling task (must run on the event loop)."""
+    profile = Profile(
+        request_id,
+        "request",
+        loop=asyncio.get_running_loop(),
+        task=asyncio.current_task(),
+    )
+    sampler.add(profile)
+    return profile
+
+
+def finish_profile(profile: Profile) -> None:
+    sampler.remove(profile)
+    profile_store.put(profile.document(sampler.interval))
+
+
+_process_profile: Optional[Profile] = None
+_process_lock = threading.Lock()
+
+
+def start_process_profile(profile_id: str, seconds: float) -> bool:
+    """Samples all threads for ``seconds``; False if one is already running."""
+    global _process_profile
+    with _process_lock:
+        if _process_profile is not None:
+            return False
+        _process_profile = Profile(profile_id, "process")
+        profile = _process_profile
+    sampler.add(profile)
+
+    def stop() -> None:
+        global _process_profile
+        finish_profile(profile)
+        with _process_lock:
+            _process_profile = None
+        logger.info(
+            "Process profile %s finished (%d samples)", profile_id, profile.samples
+        )
+
+    timer = threading.Timer(seconds, stop)
+    timer.daemon = True
+    timer.start()
+    return True
+
+
+def collapsed_stacks(document: Dict[str, Any]) -> str:
+    """The ``stack count`` lines understood by flamegraph.pl, speedscope and others."""
+    return "".join(f"{stack} {count}\n" for stack, count in document["stacks"].items())
+
+
+def _stack_tree(stacks: Dict[str, int]) -> Dict[str, Any]:
+    root: Dict[str, Any] = {"n": "all", "v": 0, "c": {}}
+    for stack, count in stacks.items():
+        root["v"] += count
+        node = root
+        for label in stack.split(";"):
+            child = node["c"].get(label)
+            if child is None:
+                child = node["c"][label] = {"n": label, "v": 0, "c": {}}
+            child["v"] += count
+            node = child
+
+    def finalize(node: Dict[str, Any]) -> Dict[str, Any]:
+        children = sorted(node["c"].values(), key=lambda c: c["n"])
+        return {"n": node["n"], "v": node["v"], "c": [finalize(c) for c in children]}
+
+    return finalize(root)
+
+
+_FLAMEGRAPH_TEMPLATE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>%(title)s</title>
+<style>
+body{font:12px sans-serif;margin:8px}
+#fg{position:relative;width:100%%}
+#fg div{position:absolute;height:17px;overflow:hidden;white-space:nowrap;
+box-sizing:border-box;border:1px solid #fff;padding:1px 3px;cursor:pointer;
+border-radius:2px}
+#info{height:18px;margin:6px 0;font-family:monospace}
+</style></head><body>
+<h3>%(title)s</h3>
+<div>%(subtitle)s &mdash; click a frame to zoom, click the root to reset</div>
+<div id="info"></div><div id="fg"></div>
+<script>
+var data = %(data)s;
+function color(name){var h=0;
+for(var i=0;i<name.length;i++){h=(h*31+name.charCodeAt(i))>>>0;}
+return "hsl("+(10+h%%40)+",85%%,"+(55+h%%15)+"%%)";}
+function render(focus){
+  var fg=document.getElementById("fg"), info=document.getElementById("info"), depth=0;
+  fg.innerHTML="";
+  function draw(node,x,w,d){
+    if(w<0.05)return; depth=Math.max(depth,d);
+    var el=document.createElement("div"), pct=(100*node.v/data.v).toFixed(2);
+    el.style.left=x+"%%";el.style.width=w+"%%";el.style.top=(d*18)+"px";
+    el.style.background=color(node.n);el.textContent=node.n;
+    el.title=node.n+" ("+node.v+" samples, "+pct+"%%)";
+    el.onmouseover=function(){info.textContent=el.title;};
+    el.onclick=function(){render(node===focus?data:node);};
+    fg.appendChild(el);
+    var cx=x;
+    node.c.forEach(function(c){var cw=w*c.v/node.v;draw(c,cx,cw,d+1);cx+=cw;});
+  }
+  draw(focus,0,100,0);
+  fg.style.height=((depth+1)*18)+"px";
+}
+render(data);
+</script></body></html>
+"""
+
+
+def render_flamegraph(document: Dict[str, Any]) -> str:
+    """Renders a stored profile as a standalone HTML flamegraph (root at the top)."""
+    title = f"Profile {document['request_id']}"
+    subtitle = (
+        f"{document['kind']} profile, {document['samples']} samples every "
+        f"{document['interval_ms']:g} ms over {document['duration_ms'] / 1000:.2f} s, "
+        f"started {document['started_at']}"
+    )
+    data = json.dumps(_stack_tree(document["stacks"])).replace("</", "<\\/")
+    return _FLAMEGRAPH_TEMPLATE % {
+        "title": html.escape(title),
+        "subtitle": html.escape(subtitle),
+        "data": data,
+    }
+
+
+def profile_summary(document: Dict[str, Any], top: int = 20) -> List[Tuple[str, int]]:
+    """Functions with the most samples at the top of the stack (self time)."""
+    leaves: "Tally[str]" = Tally()
+    for stack, count in document["stacks"].items():
+        leaves[stack.rsplit(";", 1)[-1]] += count
+    return leaves.most_common(top)
@@ -0,0 +1,172 @@
+"""
+Query budgets and N+1 detection.
+
+Statements come from the shared statement hooks
+(`server.core.db_instrumentation`). An N+1 pattern is the same SQL text
+executed repeatedly with different parameters, which is what a lazy
+relationship load per row (e.g. ``Crane.model`` without ``joinedload``)
+looks like on the wire.
+
+Two ways to use it:
+
+- `QueryRecorder`, a context manager that records every statement run
+  while it is active (any thread). The ``query_budget`` pytest fixture
+  wraps it to assert per-endpoint budgets.
+- `QueryAuditor`, used by `RequestContextMiddleware` to audit a sampled
+  fraction of live requests and log the ones over budget or with N+1
+  patterns (QUERY_AUDIT_* settings).
+"""
+
+import logging
+import random
+from collections import defaultdict
+from typing import Dict, List, NamedTuple, Optional, Set
+
+from server.core.db_instrumentation import (
+    ExecutedStatement,
+    add_statement_observer,
+    install_statement_hooks,
+    remove_statement_observer,
+)
+from server.core.metrics import Counter, RequestStats, current_request_stats
+
+logger = logging.getLogger(__name__)
+
+query_audit_violations = Counter(
+    "db_query_audit_violations_total",
+    "Audited requests over their query budget or with N+1 patterns.",
+    ("route", "kind"),
+)
+
+
+class RecordedQuery(NamedTuple):
+    statement: str
+    parameters: str  # repr, so that parameter sets can be compared cheaply
+
+
+class RepeatedStatement(NamedTuple):
+    statement: str
+    executions: int
+    distinct_parameters: int
+
+
+def _record(executed: ExecutedStatement) -> RecordedQuery:
+    return RecordedQuery(executed.statement, repr(executed.parameters))
+
+
+def find_n_plus_one(
+    queries: List[RecordedQuery], threshold: int
+) -> List[RepeatedStatement]:
+    """Statements run at least ``threshold`` times with more than one parameter set."""
+    parameters: Dict[str, List[str]] = defaultdict(list)
+    for query in queries:
+        parameters[query.statement].append(query.parameters)
+    repeated = []
+    for statement, seen in parameters.items():
+        distinct: Set[str] = set(seen)
+        if len(seen) >= threshold and len(distinct) > 1:
+            repeated.append(RepeatedStatement(statement, len(seen), len(distinct)))
+    return sorted(repeated, key=lambda r: r.executions, reverse=True)
+
+
+def _shorten(statement: str, limit: int = 200) -> str:
+    statement = " ".join(statement.split())
+    return statement if len(statement) <= limit else statement[: limit - 3] + "..."
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised by `QueryRecorder.assert_budget`."""
+
+
+class QueryRecorder:
+    """
+    Records every statement executed while active.
+
+    Usage::
+
+        with QueryRecorder() as queries:
+            client.get("/api/v1/org/cranes")
+        queries.assert_budget(max_queries=2)
+    """
+
+    def __init__(self) -> None:
+        self.queries: List[RecordedQuery] = []
+
+    def __call__(self, executed: ExecutedStatement) -> None:
+        self.queries.append(_record(executed))
+
+    def __enter__(self) -> "QueryRecorder":
+        install_statement_hooks()
+        add_statement_observer(self)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        remove_statement_observer(self)
+
+    @property
+    def count(self) -> int:
+        return len(self.queries)
+
+    def n_plus_one(self, threshold: int = 3) -> List[RepeatedStatement]:
+        return find_n_plus_one(self.queries, threshold)
+
+    def assert_budget(
+        self, max_queries: Optional[int] = None, n_plus_one_threshold: int = 3
+    ) -> None:
+        """Fails if over ``max_queries`` statements ran or an N+1 pattern was seen."""
+        problems = []
+        if max_queries is not None and self.count > max_queries:
+            problems.append(f"{self.count} queries executed, budget is {max_queries}")
+        for repeated in self.n_plus_one(n_plus_one_threshold):
+            problems.append(
+                f"N+1: {repeated.executions}x "
+                f"({repeated.distinct_parameters} parameter sets) "
+                f"{_shorten(repeated.statement)}"
+            )
+        if problems:
+            listing = "\n".join(
+                f"  {i}. {_shorten(q.statement)}" for i, q in enumerate(self.queries, 1)
+            )
+            raise QueryBudgetExceeded("\n".join(problems) + "\nQueries:\n" + listing)
+
+
+def record_request_query(executed: ExecutedStatement) -> None:
+    """Statement observer: keeps statements of requests selected for auditing."""
+    stats = current_request_stats.get()
+    if stats is not None and stats.queries is not None:
+        stats.queries.append(_record(executed))
+
+
+class QueryAuditor:
+    """Audits a sampled fraction of requests against a query budget."""
+
+    def __init__(self, sample_rate: float, max_queries: int, n_plus_one_threshold: int):
+        self.sample_rate = sample_rate
+        self.max_queries = max_queries
+        self.n_plus_one_threshold = n_plus_one_threshold
+
+    def start(self, stats: RequestStats) -> None:
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            stats.queries = []
+
+    def finish(self, route: str, stats: RequestStats) -> None:
+        queries = stats.queries
+        if queries is None:
+            return
+        repeated = find_n_plus_one(queries, self.n_plus_one_threshold)
+        over_budget = len(queries) > self.max_queries
+        if over_budget:
+            query_audit_violations.inc(route, "budget")
+        if repeated:
+            query_audit_violations.inc(route, "n_plus_one")
+        if not (over_budget or repeated):
+            return
+        logger.warning(
+            "Query audit: %s ran %d statements (budget %d), N+1 patterns: %s",
+            route,
+            len(queries),
+            self.max_queries,
+            "; ".join(f"{r.executions}x {_shorten(r.statement, 120)}" for r in repeated)
+            or "none",
+            extra={"route": route, "query_count": len(queries)},
+        )
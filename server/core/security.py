@@ -1,7 +1,17 @@
-# TODO(strict): This file should be expanded with real security helpers
-# (password hashing, JWT creation/decoding) in strict mode.
+import asyncio
+import base64
+import binascii
+import hashlib
+import hmac
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List, Mapping, Optional
 
-from typing import List
+from server.config import settings
+
+DEBUG_TOKEN_HEADER = "x-debug-token"
 
 
 def create_dev_access_token(user_id: str, roles: List[str]) -> str:
@@ -11,3 +21,140 @@ def create_dev_access_token(user_id: str, roles: List[str]) -> str:
     """
     roles_csv = ",".join(roles)
     return f"dev:{user_id}:{roles_csv}"
+
+
+def is_debug_request(headers: Mapping[str, str]) -> bool:
+    """
+    Whether a request may see debug output (timing headers, traces,
+    profiles). Requires an X-Debug-Token header matching DEBUG_TOKEN, in
+    development too: ENVIRONMENT defaults to development, so a deployment
+    that forgets to set it must not expose these surfaces. Without a
+    DEBUG_TOKEN nobody gets debug output.
+    """
+    supplied = headers.get(DEBUG_TOKEN_HEADER)
+    if not settings.DEBUG_TOKEN or not supplied:
+        return False
+    return hmac.compare_digest(supplied.encode(), settings.DEBUG_TOKEN.encode())
+
+
+# --- Passwords ---------------------------------------------------------------
+
+_SCRYPT_PREFIX = "scrypt"
+# Unsalted sha256 hex digests written by earlier versions of UserRepository.create
+_LEGACY_SHA256 = re.compile(r"[0-9a-f]{64}")
+
+
+class PasswordHashingBusy(Exception):
+    """Too many password hashes are already waiting for the hashing pool."""
+
+
+def _b64encode(raw: bytes) -> str:
+    return base64.b64encode(raw).decode().rstrip("=")
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.b64decode(text + "=" * (-len(text) % 4), validate=True)
+
+
+class PasswordHasher:
+    """
+    scrypt password hashes, computed on a small dedicated thread pool.
+
+    ``hashlib.scrypt`` releases the GIL, so up to ``workers`` hashes run in
+    parallel without holding the event loop. The pool is separate from the
+    threadpool that runs sync endpoints, so a burst of logins cannot take
+    all of its threads. At most ``max_pending`` hashes may be queued or
+    running; beyond that `PasswordHashingBusy` is raised at once instead of
+    growing the queue.
+
+    Stored format: ``scrypt$<n>$<r>$<p>$<salt>$<hash>`` with base64 salt and
+    hash. Legacy sha256 digests still verify and report `needs_rehash`.
+    """
+
+    def __init__(self, n: int, r: int, p: int, workers: int, max_pending: int):
+        self.n = n
+        self.r = r
+        self.p = p
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="password-hash"
+        )
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._dummy_hash: Optional[str] = None
+
+    @staticmethod
+    def _scrypt(password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+        return hashlib.scrypt(
+            password.encode(), salt=salt, n=n, r=r, p=p, maxmem=256 * n * r, dklen=32
+        )
+
+    def hash(self, password: str) -> str:
+        salt = os.urandom(16)
+        digest = self._scrypt(password, salt, self.n, self.r, self.p)
+        return "$".join(
+            (
+                _SCRYPT_PREFIX,
+                str(self.n),
+                str(self.r),
+                str(self.p),
+                _b64encode(salt),
+                _b64encode(digest),
+            )
+        )
+
+    def verify(self, password: str, stored: Optional[str]) -> bool:
+        """
+        Checks ``password`` against a stored hash. Without one (unknown user)
+        a dummy hash is checked, so the response time does not reveal whether
+        the account exists.
+        """
+        if stored is None:
+            if self._dummy_hash is None:
+                self._dummy_hash = self.hash(os.urandom(16).hex())
+            self.verify(password, self._dummy_hash)
+            return False
+        if stored.startswith(_SCRYPT_PREFIX + "$"):
+            try:
+                _, n, r, p, salt, expected = stored.split("$")
+                digest = self._scrypt(
+                    password, _b64decode(salt), int(n), int(r), int(p)
+                )
+                return hmac.compare_digest(digest, _b64decode(expected))
+            except (ValueError, binascii.Error):
+                return False
+        if _LEGACY_SHA256.fullmatch(stored):
+            legacy = hashlib.sha256(password.encode()).hexdigest()
+            return hmac.compare_digest(legacy, stored)
+        return False
+
+    def needs_rehash(self, stored: str) -> bool:
+        """True for legacy hashes and scrypt hashes made with other cost parameters."""
+        return not stored.startswith(f"{_SCRYPT_PREFIX}${self.n}${self.r}${self.p}$")
+
+    async def _submit(self, fn: Callable[..., Any], *args: Any) -> Any:
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise PasswordHashingBusy()
+            self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, fn, *args)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    async def hash_async(self, password: str) -> str:
+        return await self._submit(self.hash, password)
+
+    async def verify_async(self, password: str, stored: Optional[str]) -> bool:
+        return await self._submit(self.verify, password, stored)
+
+
+password_hasher = PasswordHasher(
+    settings.PASSWORD_SCRYPT_N,
+    settings.PASSWORD_SCRYPT_R,
+    settings.PASSWORD_SCRYPT_P,
+    settings.PASSWORD_HASH_WORKERS,
+    settings.PASSWORD_HASH_MAX_PENDING,
+)
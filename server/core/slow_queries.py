@@ -0,0 +1,239 @@
+"""
+Slow-query log with fingerprinting and plan capture.
+
+Every statement slower than SLOW_QUERY_THRESHOLD_MS is reduced to a
+fingerprint: literals and bind parameters become ``?`` and IN-lists
+collapse to ``(...)``, so all executions of e.g. the model-name ``ilike``
+filter in `CraneRepository.get_by_owner` aggregate to one entry no matter
+the search term. Entries count executions and total, mean and max time.
+
+The first time a fingerprint is seen, its plan is captured on a separate
+connection by a background thread (plain ``EXPLAIN``, so the statement is
+not run again). Capture never delays the request, and plans are dropped if
+the thread falls behind.
+
+The aggregate is served at ``GET /api/v1/system/slow-queries`` (debug
+access) and written out on shutdown.
+"""
+
+import datetime as dt
+import hashlib
+import json
+import logging
+import queue
+import re
+import threading
+from typing import Any, Dict, List, Optional
+
+from server.config import settings
+from server.core.db_instrumentation import ExecutedStatement
+from server.core.metrics import Counter
+from server.core.sql_trace import explain_statement, jsonable_parameters
+
+logger = logging.getLogger(__name__)
+
+slow_queries_total = Counter(
+    "db_slow_queries_total", "Statements over the slow-query threshold.", ()
+)
+
+_COMMENT = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_POSTCOMPILE = re.compile(r"\(?__\[POSTCOMPILE_\w+\]\)?")
+_PARAM = re.compile(r"%\(\w+\)s|%s|\?|(?<!:):(?!:)\w+|\$\d+")
+_NUMBER = re.compile(r"(?<![\w.$])-?\d+(?:\.\d+)?(?:e-?\d+)?\b", re.I)
+_PLACEHOLDERS = r"\(\s*\?(?:\s*,\s*\?)*\s*\)"
+_IN_LIST = re.compile(rf"\bIN\s*{_PLACEHOLDERS}", re.I)
+_VALUES_LIST = re.compile(
+    rf"\bVALUES\s*{_PLACEHOLDERS}(?:\s*,\s*{_PLACEHOLDERS})*", re.I
+)
+_EXPLAINABLE = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE")
+
+
+def fingerprint(statement: str) -> str:
+    """Normalizes literals and parameters so equivalent statements compare equal."""
+    text = _COMMENT.sub(" ", statement)
+    text = _STRING.sub("?", text)
+    text = _POSTCOMPILE.sub("(?)", text)
+    text = _PARAM.sub("?", text)
+    text = _NUMBER.sub("?", text)
+    text = _IN_LIST.sub("IN (...)", text)
+    text = _VALUES_LIST.sub("VALUES (...)", text)
+    return " ".join(text.split())
+
+
+class SlowQueryStats:
+    """Aggregate for one fingerprint."""
+
+    __slots__ = (
+        "fingerprint",
+        "count",
+        "total_seconds",
+        "max_seconds",
+        "first_seen",
+        "last_seen",
+        "sample_statement",
+        "sample_parameters",
+        "plan",
+    )
+
+    def __init__(self, fingerprint: str, executed: ExecutedStatement):
+        now = dt.datetime.now(dt.timezone.utc)
+        self.fingerprint = fingerprint
+        self.count = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.first_seen = now
+        self.last_seen = now
+        self.sample_statement = executed.statement
+        self.sample_parameters = jsonable_parameters(executed.parameters)
+        self.plan: Optional[str] = None
+
+    def add(self, duration: float) -> None:
+        self.count += 1
+        self.total_seconds += duration
+        self.max_seconds = max(self.max_seconds, duration)
+        self.last_seen = dt.datetime.now(dt.timezone.utc)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "id": hashlib.sha1(self.fingerprint.encode()).hexdigest()[:12],
+            "fingerprint": self.fingerprint,
+            "count": self.count,
+            "total_ms": round(self.total_seconds * 1000, 3),
+            "mean_ms": round(self.total_seconds * 1000 / self.count, 3),
+            "max_ms": round(self.max_seconds * 1000, 3),
+            "first_seen": self.first_seen.isoformat(),
+            "last_seen": self.last_seen.isoformat(),
+            "sample_statement": self.sample_statement,
+            "sample_parameters": self.sample_parameters,
+            "plan": self.plan,
+        }
+
+
+class SlowQueryLog:
+    """Statement observer aggregating slow statements by fingerprint."""
+
+    def __init__(self, threshold_ms: float, max_fingerprints: int, explain: bool):
+        self.threshold = threshold_ms / 1000
+        self.max_fingerprints = max_fingerprints
+        self.explain = explain
+        self.dropped = 0  # slow statements not tracked because the table was full
+        self._entries: Dict[str, SlowQueryStats] = {}
+        self._lock = threading.Lock()
+        self._plans: "queue.Queue[Any]" = queue.Queue(maxsize=100)
+        self._worker: Optional[threading.Thread] = None
+
+    def __call__(self, executed: ExecutedStatement) -> None:
+        if (
+            executed.duration < self.threshold
+            or executed.statement.lstrip()[:7].upper() == "EXPLAIN"
+        ):
+            return
+        slow_queries_total.inc()
+        key = fingerprint(executed.statement)
+        with self._lock:
+            entry = self._entries.get(key)
+            new = entry is None
+            if entry is None:
+                if len(self._entries) >= self.max_fingerprints:
+                    self.dropped += 1
+                    return
+                entry = self._entries[key] = SlowQueryStats(key, executed)
+            entry.add(executed.duration)
+        if new and self.explain and key.split(" ", 1)[0].upper() in _EXPLAINABLE:
+            self._request_plan(entry, executed)
+
+    def _request_plan(self, entry: SlowQueryStats, executed: ExecutedStatement) -> None:
+        try:
+            self._plans.put_nowait(
+                (
+                    entry,
+                    executed.connection.engine,
+                    executed.statement,
+                    executed.parameters,
+                )
+            )
+        except queue.Full:
+            logger.debug(
+                "Plan queue full, skipping EXPLAIN for %s", entry.fingerprint[:80]
+            )
+            return
+        if self._worker is None:
+            with self._lock:
+                if self._worker is None:
+                    self._worker = threading.Thread(
+                        target=self._explain_loop,
+                        name="slow-query-explain",
+                        daemon=True,
+                    )
+                    self._worker.start()
+
+    def _explain_loop(self) -> None:
+        while True:
+            item = self._plans.get()
+            try:
+                if item is None:
+                    return
+                entry, engine, statement, parameters = item
+                try:
+                    entry.plan = explain_statement(
+                        engine, statement, parameters, analyze=False
+                    )
+                except Exception as e:
+                    logger.warning("EXPLAIN of slow query failed: %s", e)
+                    entry.plan = f"EXPLAIN failed: {e}"
+            finally:
+                self._plans.task_done()
+
+    def wait_for_plans(self) -> None:
+        """Blocks until queued plan captures are done."""
+        self._plans.join()
+
+    def entries(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Aggregates ordered by total time, slowest first."""
+        with self._lock:
+            entries = sorted(
+                self._entries.values(), key=lambda e: e.total_seconds, reverse=True
+            )
+            return [entry.as_dict() for entry in entries[:limit]]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.dropped = 0
+
+    def dump(self, path: Optional[str] = None, top: int = 10) -> None:
+        """Logs the top entries and, with ``path``, writes all of them as JSON."""
+        entries = self.entries()
+        if not entries:
+            return
+        for entry in entries[:top]:
+            logger.info(
+                "Slow query: %d x, total %.1f ms, max %.1f ms: %s",
+                entry["count"],
+                entry["total_ms"],
+                entry["max_ms"],
+                entry["fingerprint"][:200],
+            )
+        if path:
+            with open(path, "w") as f:
+                json.dump({"dropped": self.dropped, "entries": entries}, f, indent=2)
+            logger.info(
+                "Slow query log written to %s (%d fingerprints)", path, len(entries)
+            )
+
+    def stop(self) -> None:
+        if self._worker is not None:
+            try:
+                self._plans.put(None, timeout=5)
+            except queue.Full:
+                return
+            self._worker.join(timeout=5)
+            self._worker = None
+
+
+slow_query_log = SlowQueryLog(
+    settings.SLOW_QUERY_THRESHOLD_MS,
+    settings.SLOW_QUERY_MAX_FINGERPRINTS,
+    settings.SLOW_QUERY_EXPLAIN,
+)
@@ -0,0 +1,286 @@
+"""
+On-demand SQL trace for a single request.
+
+A request that is allowed to see debug output (`is_debug_request`) and asks
+for a trace, with ``X-Debug-Trace: 1`` or ``?debug_trace=1``, gets every
+statement it runs recorded with parameters, timing and row count. Passing
+``explain`` instead of ``1`` also captures the plan of the slowest
+read-only statement: ``EXPLAIN (ANALYZE, BUFFERS)`` on PostgreSQL, run on a
+separate connection inside a transaction that is rolled back.
+
+The trace is stored under the request id before the last response chunk is
+sent and can be fetched from ``GET /api/v1/system/traces/{request_id}``.
+The ``X-Debug-Trace`` response header points there. Unlike DB_ECHO this
+touches nothing outside the traced request.
+"""
+
+import datetime as dt
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Mapping, Optional
+
+from sqlalchemy.engine import Engine
+
+from server.config import settings
+from server.core.db_instrumentation import ExecutedStatement
+from server.core.logging import redact_mapping
+from server.core.metrics import current_request_stats
+
+logger = logging.getLogger(__name__)
+
+TRACE_HEADER = "x-debug-trace"
+TRACE_QUERY_PARAM = "debug_trace"
+TRACE_PATH = "/api/v1/system/traces/{request_id}"
+EXPLAIN_TIMEOUT_MS = 10000
+
+_TRACE_VALUES = {"1", "true", "explain"}
+_VALID_TRACE_ID = re.compile(r"[A-Za-z0-9._:-]{1,128}")
+_DATA_MODIFYING = re.compile(r"\b(INSERT|UPDATE|DELETE|MERGE)\b")
+
+
+def requested_trace_mode(
+    headers: Mapping[str, str], query_params: Mapping[str, str]
+) -> Optional[str]:
+    """Returns "trace", "explain" or None from the header or query flag."""
+    value = (
+        headers.get(TRACE_HEADER) or query_params.get(TRACE_QUERY_PARAM) or ""
+    ).lower()
+    if value not in _TRACE_VALUES:
+        return None
+    return "explain" if value == "explain" else "trace"
+
+
+def jsonable_parameters(value: Any) -> Any:
+    """DBAPI parameters as JSON-compatible values, with credential keys masked."""
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, Mapping):
+        return {
+            str(k): jsonable_parameters(v) for k, v in redact_mapping(value).items()
+        }
+    if isinstance(value, (list, tuple)):
+        return [jsonable_parameters(v) for v in value]
+    return str(value)
+
+
+def is_read_only(statement: str) -> bool:
+    """Only these are safe to EXPLAIN ANALYZE (which executes the statement)."""
+    normalized = " ".join(statement.split()).upper()
+    if normalized.startswith("SELECT"):
+        return " FOR UPDATE" not in normalized and " FOR SHARE" not in normalized
+    if normalized.startswith("WITH"):
+        return _DATA_MODIFYING.search(normalized) is None
+    return False
+
+
+class SqlTrace:
+    """Statements of one traced request."""
+
+    def __init__(
+        self,
+        request_id: str,
+        method: str,
+        path: str,
+        explain: bool,
+        max_statements: int,
+    ):
+        self.request_id = request_id
+        self.method = method
+        self.path = path
+        self.explain = explain
+        self.max_statements = max_statements
+        self.captured_at = dt.datetime.now(dt.timezone.utc)
+        self.started = time.perf_counter()
+        self.statements: List[Dict[str, Any]] = []
+        self.statement_count = 0
+        self.db_seconds = 0.0
+        # Slowest read-only statement: (duration, index, engine, statement, parameters)
+        self._slowest: Optional[tuple] = None
+
+    def record(self, executed: ExecutedStatement) -> None:
+        self.statement_count += 1
+        self.db_seconds += executed.duration
+        if len(self.statements) >= self.max_statements:
+            return
+        index = len(self.statements)
+        self.statements.append(
+            {
+                "sql": executed.statement,
+                "parameters": jsonable_parameters(executed.parameters),
+                "executemany": executed.executemany,
+                "offset_ms": round((executed.started_at - self.started) * 1000, 3),
+                "duration_ms": round(executed.duration * 1000, 3),
+                "rowcount": executed.rowcount,
+            }
+        )
+        if (
+            self.explain
+            and not executed.executemany
+            and is_read_only(executed.statement)
+            and (self._slowest is None or executed.duration > self._slowest[0])
+        ):
+            self._slowest = (
+                executed.duration,
+                index,
+                executed.connection.engine,
+                executed.statement,
+                executed.parameters,
+            )
+
+    def finish(self, status_code: Optional[int], duration: float) -> Dict[str, Any]:
+        """Builds the stored document; runs EXPLAIN if requested (blocking)."""
+        explain = None
+        if self._slowest is not None:
+            _, index, engine, statement, parameters = self._slowest
+            explain = {"statement_index": index}
+            try:
+                explain["plan"] = explain_statement(engine, statement, parameters)
+            except Exception as e:
+                logger.warning("EXPLAIN for trace %s failed: %s", self.request_id, e)
+                explain["error"] = str(e)
+        return {
+            "request_id": self.request_id,
+            "method": self.method,
+            "path": self.path,
+            "status": status_code,
+            "captured_at": self.captured_at.isoformat(),
+            "duration_ms": round(duration * 1000, 3),
+            "statement_count": self.statement_count,
+            "db_ms": round(self.db_seconds * 1000, 3),
+            "truncated": self.statement_count > len(self.statements),
+            "statements": self.statements,
+            "explain": explain,
+        }
+
+
+def explain_statement(
+    engine: Engine, statement: str, parameters: Any, analyze: bool = True
+) -> Optional[str]:
+    """
+    Returns the plan of a statement as text, using a separate connection and
+    a transaction that is always rolled back. None for unsupported dialects.
+    With ``analyze`` (PostgreSQL) the statement is executed, so only pass
+    read-only statements.
+    """
+    dialect = engine.dialect.name
+    if dialect == "postgresql":
+        prefix = "EXPLAIN (ANALYZE, BUFFERS) " if analyze else "EXPLAIN "
+    elif dialect == "sqlite":
+        prefix = "EXPLAIN QUERY PLAN "
+    else:
+        return None
+    # Keep the EXPLAIN itself out of the request's metrics and trace.
+    token = current_request_stats.set(None)
+    try:
+        with engine.connect() as conn:
+            transaction = conn.begin()
+            try:
+                if dialect == "postgresql":
+                    conn.exec_driver_sql(
+                        f"SET LOCAL statement_timeout = {EXPLAIN_TIMEOUT_MS}"
+                    )
+                rows = conn.exec_driver_sql(prefix + statement, parameters).all()
+            finally:
+                transaction.rollback()
+    finally:
+        current_request_stats.reset(token)
+    return "\n".join(" | ".join(str(column) for column in row) for row in rows)
+
+
+def start_trace(request_id: str, method: str, path: str, mode: str) -> SqlTrace:
+    return SqlTrace(
+        request_id,
+        method,
+        path,
+        explain=mode == "explain" and settings.SQL_TRACE_EXPLAIN,
+        max_statements=settings.SQL_TRACE_MAX_STATEMENTS,
+    )
+
+
+def record_trace_statement(executed: ExecutedStatement) -> None:
+    """Statement observer: feeds the current request's trace, if any."""
+    stats = current_request_stats.get()
+    if stats is not None and stats.trace is not None:
+        stats.trace.record(executed)
+
+
+class TraceStore:
+    """
+    Keeps the most recent per-request debug documents (keyed by their
+    ``request_id``) in memory, and in ``directory`` when set so that any
+    worker process can serve them. Also used for profiles.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        directory: Optional[str] = None,
+        prefix: str = "sqltrace",
+    ):
+        self.max_entries = max_entries
+        self.directory = directory
+        self.prefix = prefix
+        self._traces: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _path(self, request_id: str) -> str:
+        assert self.directory is not None
+        return os.path.join(self.directory, f"{self.prefix}-{request_id}.json")
+
+    def save(
+        self, trace: SqlTrace, status_code: Optional[int], duration: float
+    ) -> None:
+        """Finishes and stores a trace (blocking: may run EXPLAIN and write a file)."""
+        self.put(trace.finish(status_code, duration))
+
+    def put(self, trace: Dict[str, Any]) -> None:
+        request_id = trace["request_id"]
+        with self._lock:
+            self._traces[request_id] = trace
+            self._traces.move_to_end(request_id)
+            while len(self._traces) > self.max_entries:
+                self._traces.popitem(last=False)
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp_path = f"{self._path(request_id)}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(trace, f)
+            os.replace(tmp_path, self._path(request_id))
+            self._prune_directory()
+
+    def _prune_directory(self) -> None:
+        assert self.directory is not None
+        files = [
+            os.path.join(self.directory, name)
+            for name in os.listdir(self.directory)
+            if name.startswith(f"{self.prefix}-") and name.endswith(".json")
+        ]
+        if len(files) <= self.max_entries:
+            return
+        files.sort(key=os.path.getmtime)
+        for path in files[: len(files) - self.max_entries]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def get(self, request_id: str) -> Optional[Dict[str, Any]]:
+        if not _VALID_TRACE_ID.fullmatch(request_id):
+            return None
+        with self._lock:
+            trace = self._traces.get(request_id)
+        if trace is not None or not self.directory:
+            return trace
+        try:
+            with open(self._path(request_id)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+
+trace_store = TraceStore(settings.SQL_TRACE_MAX_STORED, settings.SQL_TRACE_DIR)
@@ -0,0 +1,206 @@
+"""
+Per-request timing breakdown, reported as a ``Server-Timing`` header.
+
+Spans are accumulated on the request's `RequestStats` (see
+`server.core.metrics`), which `RequestContextMiddleware` creates for every
+request and turns into the header when the response starts:
+
+- ``deps``: request parsing and dependency resolution, before the endpoint
+  runs (includes ``auth``, `get_current_user`);
+- ``queue``: wait for a worker thread (sync endpoints only);
+- ``endpoint``: the endpoint itself, with ``svc.<Service>.<method>`` for
+  each service call made inside it;
+- ``db`` (time and statement count) and ``pool`` (connection checkout);
+- ``serialize``: response model validation and JSON encoding;
+- ``total``: time until the response headers were sent.
+
+Routers opt in with ``APIRouter(route_class=TimedRoute)`` (or
+``AnalyticsRoute``, which runs sync endpoints on the analytics bulkhead,
+see `server.core.bulkheads`); services with
+the `timed_service` class decorator. Without an active `RequestStats`
+(scripts, tests calling services directly) the wrappers only add a
+contextvar lookup.
+"""
+
+import inspect
+import time
+from functools import wraps
+from typing import Any, Callable, List, Optional, TypeVar
+
+from fastapi.routing import APIRoute
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+from starlette.responses import Response
+
+from server.config import settings
+from server.core.bulkheads import Bulkhead, analytics_bulkhead
+from server.core.deadlines import current_deadline
+from server.core.metrics import RequestStats, current_request_stats
+
+F = TypeVar("F", bound=Callable[..., Any])
+T = TypeVar("T", bound=type)
+
+SERVER_TIMING_HEADER = "server-timing"
+
+
+def timed_function(name: str) -> Callable[[F], F]:
+    """Adds the duration of each call to the ``name`` span of the current request."""
+
+    def decorator(func: F) -> F:
+        if inspect.iscoroutinefunction(func):
+
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                stats = current_request_stats.get()
+                if stats is None:
+                    return await func(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    stats.add_timing(name, time.perf_counter() - start)
+
+            return async_wrapper  # type: ignore[return-value]
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            stats = current_request_stats.get()
+            if stats is None:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                stats.add_timing(name, time.perf_counter() - start)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
+
+
+def timed_service(cls: T) -> T:
+    """Times every public method of a service class as ``svc.<Class>.<method>``."""
+    for attribute, member in list(vars(cls).items()):
+        if (
+            attribute.startswith("_")
+            or not inspect.isfunction(member)
+            or inspect.isgeneratorfunction(member)
+        ):
+            continue
+        setattr(
+            cls, attribute, timed_function(f"svc.{cls.__name__}.{attribute}")(member)
+        )
+    return cls
+
+
+def _timed_endpoint(
+    endpoint: Callable[..., Any], bulkhead: Optional[Bulkhead] = None
+) -> Callable[..., Any]:
+    """
+    Records the endpoint span (and, for sync endpoints, the threadpool wait).
+
+    Sync endpoints are wrapped in a coroutine that hands them to the
+    threadpool itself, exactly as FastAPI would, so the queue time can be
+    measured; with a ``bulkhead``, to that bulkhead's threads instead.
+    Streaming (generator) endpoints are left alone.
+    """
+    run_sync = bulkhead.run_sync if bulkhead is not None else run_in_threadpool
+    if inspect.isgeneratorfunction(endpoint) or inspect.isasyncgenfunction(endpoint):
+        return endpoint
+
+    if inspect.iscoroutinefunction(endpoint):
+
+        @wraps(endpoint)
+        async def async_wrapper(*args, **kwargs):
+            stats = current_request_stats.get()
+            if stats is None:
+                return await endpoint(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                stats.mark_endpoint(start, start, time.perf_counter())
+
+        return async_wrapper
+
+    @wraps(endpoint)
+    async def wrapper(*args, **kwargs):
+        stats = current_request_stats.get()
+        if stats is None:
+            return await run_sync(endpoint, *args, **kwargs)
+        queued = time.perf_counter()
+
+        def call():
+            start = time.perf_counter()
+            stats.add_timing("queue", start - queued)
+            profile = stats.profile
+            if profile is not None:
+                profile.enter_thread()
+            try:
+                return endpoint(*args, **kwargs)
+            finally:
+                stats.mark_endpoint(queued, start, time.perf_counter())
+                if profile is not None:
+                    profile.exit_thread()
+
+        return await run_sync(call)
+
+    return wrapper
+
+
+class TimedRoute(APIRoute):
+    """APIRoute that splits handler time into deps / endpoint / serialize spans."""
+
+    # Threads that run sync endpoints; None means the default threadpool.
+    bulkhead: Optional[Bulkhead] = None
+    # Default request deadline in seconds (see server.core.deadlines).
+    deadline: Optional[float] = settings.REQUEST_DEADLINE_SECONDS
+
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs: Any):
+        super().__init__(path, _timed_endpoint(endpoint, self.bulkhead), **kwargs)
+
+    def get_route_handler(self) -> Callable[[Request], Any]:
+        handler = super().get_route_handler()
+
+        async def timed_handler(request: Request) -> Response:
+            deadline = current_deadline.get()
+            if deadline is not None:
+                deadline.limit(self.deadline)
+            stats = current_request_stats.get()
+            if stats is None:
+                return await handler(request)
+            stats.endpoint_span = None
+            start = time.perf_counter()
+            try:
+                return await handler(request)
+            finally:
+                end = time.perf_counter()
+                span = stats.endpoint_span
+                if span is None:
+                    # Stopped during dependency resolution (401, 304, validation)
+                    stats.add_timing("deps", end - start)
+                else:
+                    stats.add_timing("deps", span[0] - start)
+                    stats.add_timing("serialize", end - span[1])
+
+        return timed_handler
+
+
+class AnalyticsRoute(TimedRoute):
+    """TimedRoute running sync endpoints on the analytics bulkhead."""
+
+    bulkhead = analytics_bulkhead
+    deadline = settings.ANALYTICS_REQUEST_DEADLINE_SECONDS
+
+
+def format_server_timing(stats: RequestStats, total: float) -> str:
+    """Renders the collected spans (seconds) as a Server-Timing header value."""
+    entries: List[str] = [
+        f"{name};dur={seconds * 1000:.1f}" for name, seconds in stats.timings.items()
+    ]
+    if stats.db_statements:
+        entries.append(
+            f'db;dur={stats.db_seconds * 1000:.1f};desc="{stats.db_statements} queries"'
+        )
+    entries.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(entries)
@@ -0,0 +1,293 @@
+"""
+Signed access tokens (JWT, HS256) for strict auth mode.
+
+Keys come from a local JWKS file (JWT_KEYS_FILE, symmetric ``"kty": "oct"``
+keys, each with a ``kid``) or a single raw secret (JWT_SECRET_FILE, kid
+``default``). Tokens are signed with JWT_SIGNING_KID, or the first key.
+
+`KeyStore` caches the parsed key set and re-reads the file at most every
+JWT_KEYS_REFRESH_SECONDS (and only if it changed), or early when a token
+names an unknown kid. So rotating keys only needs the file replaced.
+
+`TokenVerifier` keeps a bounded LRU of tokens whose signature and claims
+already checked out. A repeat request with the same token skips the
+HMAC and JSON decoding until the token expires. Entries are keyed by the
+whole token, never the signature alone, and the cache is cleared when a
+key disappears from the key set.
+"""
+
+import base64
+import binascii
+import hashlib
+import hmac
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from server.config import settings
+
+logger = logging.getLogger(__name__)
+
+ALGORITHM = "HS256"
+
+
+class InvalidToken(Exception):
+    """The token is malformed, badly signed, expired or not meant for this API."""
+
+
+def _b64url_encode(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _b64url_decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+class KeyStore:
+    """Signing keys loaded from a local file, cached with a refresh interval."""
+
+    def __init__(
+        self,
+        keys_file: Optional[str],
+        secret_file: Optional[str],
+        signing_kid: Optional[str],
+        refresh_seconds: float,
+    ):
+        self.keys_file = keys_file
+        self.secret_file = secret_file
+        self.signing_kid = signing_kid
+        self.refresh_seconds = refresh_seconds
+        self._keys: Dict[str, bytes] = {}
+        self._order: List[str] = []
+        self._loaded_at = float("-inf")
+        self._mtime: Optional[float] = None
+        self._lock = threading.Lock()
+        self.on_keys_removed: List[Any] = []
+
+    @property
+    def path(self) -> Optional[str]:
+        return self.keys_file or self.secret_file
+
+    def _read(self) -> Tuple[Dict[str, bytes], List[str]]:
+        if self.keys_file:
+            with open(self.keys_file) as f:
+                document = json.load(f)
+            keys: Dict[str, bytes] = {}
+            order: List[str] = []
+            for jwk in document.get("keys", []):
+                if jwk.get("kty") != "oct" or jwk.get("alg", ALGORITHM) != ALGORITHM:
+                    continue
+                keys[jwk["kid"]] = _b64url_decode(jwk["k"])
+                order.append(jwk["kid"])
+            return keys, order
+        if self.secret_file:
+            with open(self.secret_file, "rb") as f:
+                return {"default": f.read().strip()}, ["default"]
+        return {}, []
+
+    def refresh(self, force: bool = False) -> None:
+        """
+        Re-reads the key file if the refresh interval passed (or ``force``)
+        and it changed.
+        """
+        now = time.monotonic()
+        if not force and now - self._loaded_at < self.refresh_seconds:
+            return
+        with self._lock:
+            if not force and now - self._loaded_at < self.refresh_seconds:
+                return
+            self._loaded_at = now
+            path = self.path
+            if path is None:
+                return
+            try:
+                mtime = os.stat(path).st_mtime
+                if mtime == self._mtime:
+                    return
+                keys, order = self._read()
+            except (OSError, ValueError, KeyError, binascii.Error) as e:
+                # Keep serving the last good key set.
+                logger.error("Could not load JWT keys from %s: %s", path, e)
+                return
+            removed = set(self._keys) - set(keys)
+            self._keys, self._order, self._mtime = keys, order, mtime
+            logger.info("Loaded %d JWT key(s) from %s", len(keys), path)
+        if removed:
+            for callback in self.on_keys_removed:
+                callback()
+
+    def get(self, kid: str) -> Optional[bytes]:
+        self.refresh()
+        key = self._keys.get(kid)
+        if key is None and time.monotonic() - self._loaded_at > 1.0:
+            # Possibly a key added since the last refresh; re-read at most
+            # once a second.
+            self.refresh(force=True)
+            key = self._keys.get(kid)
+        return key
+
+    def signing_key(self) -> Tuple[str, bytes]:
+        self.refresh()
+        kid = self.signing_kid or (self._order[0] if self._order else None)
+        if kid is None or kid not in self._keys:
+            raise RuntimeError(self._missing_key_reason(kid))
+        return kid, self._keys[kid]
+
+    def check(self) -> str:
+        """
+        Loads the key set now and returns the signing kid. Raises
+        RuntimeError, saying what to configure, when tokens could not be
+        signed; called at startup so strict mode fails fast instead of
+        answering logins with 500.
+        """
+        self.refresh(force=True)
+        return self.signing_key()[0]
+
+    def _missing_key_reason(self, kid: Optional[str]) -> str:
+        if self.path is None:
+            return (
+                "AUTH_MODE=strict needs a JWT signing key: set JWT_KEYS_FILE or "
+                "JWT_SECRET_FILE (or AUTH_MODE=dev for local development)"
+            )
+        if kid is None:
+            return f"No usable JWT signing key in {self.path}"
+        return f"JWT signing key {kid!r} not found in {self.path}"
+
+
+def encode_token(claims: Dict[str, Any], kid: str, key: bytes) -> str:
+    header = {"alg": ALGORITHM, "typ": "JWT", "kid": kid}
+    signing_input = (
+        _b64url_encode(json.dumps(header, separators=(",", ":")).encode())
+        + "."
+        + _b64url_encode(json.dumps(claims, separators=(",", ":")).encode())
+    )
+    signature = hmac.new(key, signing_input.encode(), hashlib.sha256).digest()
+    return f"{signing_input}.{_b64url_encode(signature)}"
+
+
+class TokenVerifier:
+    """Checks signature and claims, remembering tokens that already passed."""
+
+    def __init__(
+        self,
+        keys: KeyStore,
+        issuer: str,
+        audience: str,
+        leeway: float,
+        cache_size: int,
+    ):
+        self.keys = keys
+        self.issuer = issuer
+        self.audience = audience
+        self.leeway = leeway
+        self.cache_size = cache_size
+        self._verified: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        keys.on_keys_removed.append(self.clear)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._verified.clear()
+
+    def verify(self, token: str) -> Dict[str, Any]:
+        """Returns the token's claims or raises `InvalidToken`."""
+        now = time.time()
+        if self.cache_size:
+            self.keys.refresh()  # may clear the cache when a key was removed
+            with self._lock:
+                claims = self._verified.get(token)
+                if claims is not None:
+                    if claims["exp"] + self.leeway > now:
+                        self._verified.move_to_end(token)
+                        return claims
+                    del self._verified[token]
+        claims = self._decode(token, now)
+        if self.cache_size:
+            with self._lock:
+                self._verified[token] = claims
+                if len(self._verified) > self.cache_size:
+                    self._verified.popitem(last=False)
+        return claims
+
+    def _decode(self, token: str, now: float) -> Dict[str, Any]:
+        try:
+            header_b64, payload_b64, signature_b64 = token.split(".")
+            header = json.loads(_b64url_decode(header_b64))
+            signature = _b64url_decode(signature_b64)
+        except (ValueError, binascii.Error):
+            raise InvalidToken("Malformed token")
+        if not isinstance(header, dict) or header.get("alg") != ALGORITHM:
+            raise InvalidToken("Unsupported token algorithm")
+        key = self.keys.get(str(header.get("kid", "default")))
+        if key is None:
+            raise InvalidToken("Unknown signing key")
+        expected = hmac.new(
+            key, f"{header_b64}.{payload_b64}".encode(), hashlib.sha256
+        ).digest()
+        if not hmac.compare_digest(signature, expected):
+            raise InvalidToken("Invalid token signature")
+        try:
+            claims = json.loads(_b64url_decode(payload_b64))
+        except (ValueError, binascii.Error):
+            raise InvalidToken("Malformed token")
+        if not isinstance(claims, dict) or not isinstance(claims.get("sub"), str):
+            raise InvalidToken("Token has no subject")
+        if (
+            not isinstance(claims.get("exp"), (int, float))
+            or claims["exp"] + self.leeway <= now
+        ):
+            raise InvalidToken("Token has expired")
+        if claims.get("nbf", 0) - self.leeway > now:
+            raise InvalidToken("Token is not valid yet")
+        if claims.get("iss") != self.issuer:
+            raise InvalidToken("Token was issued by someone else")
+        audience = claims.get("aud")
+        if audience != self.audience and not (
+            isinstance(audience, list) and self.audience in audience
+        ):
+            raise InvalidToken("Token is meant for another audience")
+        return claims
+
+
+key_store = KeyStore(
+    settings.JWT_KEYS_FILE,
+    settings.JWT_SECRET_FILE,
+    settings.JWT_SIGNING_KID,
+    settings.JWT_KEYS_REFRESH_SECONDS,
+)
+token_verifier = TokenVerifier(
+    key_store,
+    settings.JWT_ISSUER,
+    settings.JWT_AUDIENCE,
+    settings.JWT_LEEWAY_SECONDS,
+    settings.JWT_CACHE_SIZE,
+)
+
+
+def create_access_token(
+    user_id: str,
+    roles: List[str],
+    email: Optional[str] = None,
+    name: Optional[str] = None,
+    ttl: Optional[int] = None,
+) -> str:
+    """Issues a signed access token with the current signing key."""
+    kid, key = key_store.signing_key()
+    now = int(time.time())
+    claims = {
+        "iss": settings.JWT_ISSUER,
+        "aud": settings.JWT_AUDIENCE,
+        "sub": user_id,
+        "iat": now,
+        "exp": now + (ttl or settings.JWT_ACCESS_TOKEN_TTL),
+        "jti": uuid.uuid4().hex,
+        "roles": roles,
+        "email": email,
+        "name": name,
+    }
+    return encode_token(claims, kid, key)
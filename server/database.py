@@ -5,13 +5,15 @@ Handles SQLAlchemy engine configuration, session lifecycle, and database events.
 
 import logging
 from contextlib import contextmanager
-from typing import Generator
+from contextvars import ContextVar
+from typing import Generator, Optional
 
 from sqlalchemy import create_engine, event, text
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session, declarative_base, sessionmaker
 
 from server.config import settings
+from server.core.metrics import InstrumentedQueuePool, watch_pool
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -19,6 +21,22 @@ logger = logging.getLogger(__name__)
 # Create SQLAlchemy base for model definitions
 Base = declarative_base()
 
+# Session shared by all `get_db` calls in the current context (batch
+# transaction mode). None means every request gets its own session.
+shared_session: ContextVar[Optional[Session]] = ContextVar(
+    "shared_session", default=None
+)
+
+
+def _set_search_path(dbapi_conn, conn_record):
+    """Set PostgreSQL search path to ops schema for all connections."""
+    try:
+        with dbapi_conn.cursor() as cur:
+            cur.execute("SET search_path TO ops, public;")
+        logger.debug("Search path set to 'ops, public' for new connection")
+    except Exception as e:
+        logger.warning(f"Failed to set search path: {e}")
+
 
 class DatabaseManager:
     """Manages database connections and sessions."""
@@ -26,24 +44,73 @@ class DatabaseManager:
     def __init__(self):
         self.engine = None
         self.SessionLocal = None
+        # Reports and exports (see server.core.bulkheads)
+        self.analytics_engine = None
+        self.AnalyticsSessionLocal = None
         self.Base = Base  # Make Base accessible through the manager
         self._initialize_engine()
         self._setup_events()
 
+    @staticmethod
+    def _create_engine(
+        pool_name: str,
+        pool_size: int,
+        max_overflow: int,
+        pool_timeout: float,
+        statement_timeout_ms: int,
+        work_mem: Optional[str] = None,
+    ):
+        # Session settings sent by libpq when each connection is opened
+        options = []
+        if statement_timeout_ms:
+            options.append(f"-c statement_timeout={statement_timeout_ms}")
+        if work_mem:
+            options.append(f"-c work_mem={work_mem}")
+        engine = create_engine(
+            settings.DATABASE_URL,
+            future=True,
+            echo=settings.DB_ECHO,
+            pool_pre_ping=settings.DB_POOL_PRE_PING,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_timeout=pool_timeout,
+            poolclass=InstrumentedQueuePool,
+            connect_args={"options": " ".join(options)} if options else {},
+            # Ceiling for the per-request timeout, see server.core.deadlines
+            execution_options={"statement_timeout_ms": statement_timeout_ms},
+        )
+        watch_pool(pool_name, engine.pool)
+        return engine
+
     def _initialize_engine(self) -> None:
-        """Initialize SQLAlchemy engine with configuration."""
+        """Initialize the OLTP and analytics SQLAlchemy engines with configuration."""
         try:
-            self.engine = create_engine(
-                settings.DATABASE_URL,
-                future=True,
-                echo=settings.DB_ECHO,
-                pool_pre_ping=settings.DB_POOL_PRE_PING,
-                pool_recycle=settings.DB_POOL_RECYCLE,
+            self.engine = self._create_engine(
+                "default",
+                settings.DB_POOL_SIZE,
+                settings.DB_MAX_OVERFLOW,
+                settings.DB_POOL_TIMEOUT,
+                settings.DB_STATEMENT_TIMEOUT_MS,
+            )
+            self.analytics_engine = self._create_engine(
+                "analytics",
+                settings.ANALYTICS_DB_POOL_SIZE,
+                settings.ANALYTICS_DB_MAX_OVERFLOW,
+                settings.ANALYTICS_DB_POOL_TIMEOUT,
+                settings.ANALYTICS_DB_STATEMENT_TIMEOUT_MS,
+                settings.ANALYTICS_DB_WORK_MEM,
             )
 
             self.SessionLocal = sessionmaker(
                 bind=self.engine, autoflush=False, autocommit=False, future=True
             )
+            self.AnalyticsSessionLocal = sessionmaker(
+                bind=self.analytics_engine,
+                autoflush=False,
+                autocommit=False,
+                future=True,
+            )
 
             logger.info(
                 "Database engine initialized successfully",
@@ -62,17 +129,9 @@ class DatabaseManager:
 
     def _setup_events(self) -> None:
         """Set up database event listeners."""
-        if self.engine:
-
-            @event.listens_for(self.engine, "connect")
-            def _set_search_path(dbapi_conn, conn_record):
-                """Set PostgreSQL search path to ops schema for all connections."""
-                try:
-                    with dbapi_conn.cursor() as cur:
-                        cur.execute("SET search_path TO ops, public;")
-                    logger.debug("Search path set to 'ops, public' for new connection")
-                except Exception as e:
-                    logger.warning(f"Failed to set search path: {e}")
+        for engine in (self.engine, self.analytics_engine):
+            if engine:
+                event.listen(engine, "connect", _set_search_path)
 
     @contextmanager
     def get_session(self) -> Generator[Session, None, None]:
@@ -83,7 +142,22 @@ class DatabaseManager:
         if not self.SessionLocal:
             raise RuntimeError("Database not initialized")
 
-        session = self.SessionLocal()
+        with self._session_scope(self.SessionLocal) as session:
+            yield session
+
+    @contextmanager
+    def get_analytics_session(self) -> Generator[Session, None, None]:
+        """`get_session` on the analytics engine (reports, exports)."""
+        if not self.AnalyticsSessionLocal:
+            raise RuntimeError("Database not initialized")
+
+        with self._session_scope(self.AnalyticsSessionLocal) as session:
+            yield session
+
+    @staticmethod
+    @contextmanager
+    def _session_scope(factory: sessionmaker) -> Generator[Session, None, None]:
+        session = factory()
         try:
             yield session
         except SQLAlchemyError as e:
@@ -97,6 +171,32 @@ class DatabaseManager:
         finally:
             session.close()
 
+    @contextmanager
+    def shared_transaction(self) -> Generator[Session, None, None]:
+        """
+        Opens one connection-level transaction and a session joined to it.
+
+        Commits issued through the session (e.g. by services) only release a
+        SAVEPOINT; the outer transaction is committed when the block exits
+        normally and rolled back if it raises.
+        """
+        if not self.SessionLocal:
+            raise RuntimeError("Database not initialized")
+
+        with self.engine.connect() as connection:
+            transaction = connection.begin()
+            session = self.SessionLocal(
+                bind=connection, join_transaction_mode="create_savepoint"
+            )
+            try:
+                yield session
+            except Exception:
+                session.close()
+                transaction.rollback()
+                raise
+            session.close()
+            transaction.commit()
+
     def health_check(self) -> bool:
         """
         Check database connectivity and basic functionality.
@@ -145,9 +245,10 @@ class DatabaseManager:
 
     def close(self) -> None:
         """Close database connections and clean up resources."""
-        if self.engine:
-            self.engine.dispose()
-            logger.info("Database connections closed")
+        for engine in (self.engine, self.analytics_engine):
+            if engine:
+                engine.dispose()
+        logger.info("Database connections closed")
 
 
 # Create global database manager instance
@@ -157,19 +258,36 @@ db_manager = DatabaseManager()
 # Convenience function for FastAPI dependency injection
 def get_db():
     """Database session dependency for FastAPI endpoints."""
+    yield from _yield_session(db_manager.SessionLocal)
+
+
+def get_analytics_db():
+    """`get_db` for reports and exports: a session on the analytics engine."""
+    yield from _yield_session(db_manager.AnalyticsSessionLocal)
+
+
+def _yield_session(factory: Optional[sessionmaker]):
     logger.debug("Database session requested.")
-    if not db_manager.SessionLocal:
+    session = shared_session.get()
+    if session is not None:
+        # The owner of the shared transaction commits or rolls back.
+        yield session
+        return
+
+    if not factory:
         logger.error("Database not initialized, cannot create session.")
         raise RuntimeError("Database not initialized")
 
-    session = db_manager.SessionLocal()
+    session = factory()
     try:
-        logger.debug(f"Database session {id(session)} created and yielded.")
+        logger.debug("Database session %s created and yielded.", id(session))
         yield session
     except Exception as e:
-        logger.error(f"Error in DB session {id(session)}, rolling back.", exc_info=True)
+        logger.error(
+            "Error in DB session %s, rolling back.", id(session), exc_info=True
+        )
         session.rollback()
         raise
     finally:
-        logger.debug(f"Closing database session {id(session)}.")
+        logger.debug("Closing database session %s.", id(session))
         session.close()
@@ -6,11 +6,13 @@ Defines all database tables and their relationships in the ops schema.
 import uuid
 
 from sqlalchemy import (
+    BigInteger,
     Boolean,
     Column,
     Date,
     DateTime,
     Enum,
+    Float,
     ForeignKey,
     Integer,
     String,
@@ -59,6 +61,42 @@ class User(Base, TimestampMixin):
         return f"<User(id={self.id}, email={self.email}, role={self.role})>"
 
 
+class RevokedToken(Base):
+    """Access tokens revoked before they expire (e.g. at logout), by JWT id."""
+
+    __tablename__ = "revoked_tokens"
+    __table_args__ = {"schema": "ops"}
+
+    # Increasing id, the high-water mark workers poll from
+    id = Column(
+        BigInteger().with_variant(Integer, "sqlite"),
+        primary_key=True,
+        autoincrement=True,
+    )
+    jti = Column(String, unique=True, nullable=False)
+    user_id = Column(String)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    revoked_at = Column(DateTime, default=func.now(), nullable=False, index=True)
+
+    def __repr__(self) -> str:
+        return f"<RevokedToken(jti={self.jti}, user_id={self.user_id})>"
+
+
+class RateLimitBucket(Base):
+    """
+    Token buckets shared by all workers (UNLOGGED on PostgreSQL), see
+    server.api.rate_limits.
+    """
+
+    __tablename__ = "rate_limit_buckets"
+    __table_args__ = {"schema": "ops"}
+
+    key = Column(String, primary_key=True)
+    tokens = Column(Float, nullable=False)
+    updated_at = Column(Float, nullable=False)  # epoch seconds
+    allowed = Column(Boolean, nullable=False)  # outcome of the last take
+
+
 class Org(Base, TimestampMixin):
     """Organization model for crane owners and manufacturers."""
 
@@ -0,0 +1,168 @@
+"""
+Read-only row DTOs for list queries.
+
+List endpoints only serialize what they read, so they do not need full ORM
+instances (instance state, identity-map entries, attribute instrumentation).
+These classes are filled straight from Core ``select()`` rows and are small,
+``__slots__``-based objects that the response schemas can validate with
+``from_attributes``.
+"""
+
+from typing import (
+    AbstractSet,
+    Any,
+    ClassVar,
+    Dict,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+)
+
+from sqlalchemy.orm import InstrumentedAttribute
+
+from server.database import Base
+from server.domain.models import Crane, CraneModel, Request, Site
+
+
+class ReadRow:
+    """
+    Base class for slotted, read-only row DTOs.
+
+    Subclasses declare ``__slots__`` with the response fields and point
+    ``orm_model`` at the mapped class the columns are read from. Slots listed
+    in ``nested`` are filled from the columns of another ``ReadRow`` class
+    (e.g. a crane's ``model``), which the caller must join.
+
+    A DTO can also be built from a subset of its fields (sparse fieldsets);
+    the slots that were not selected are simply left unset.
+    """
+
+    __slots__ = ()
+    orm_model: ClassVar[Type[Base]]
+    nested: ClassVar[Dict[str, Type["ReadRow"]]] = {}
+
+    def __init__(self, *values: Any):
+        for name, value in zip(self.__slots__, values):
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f"{type(self).__name__} is read-only")
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__}(id={getattr(self, 'id', None)})>"
+
+    @classmethod
+    def field_names(cls, fields: Optional[AbstractSet[str]] = None) -> Tuple[str, ...]:
+        """Returns the selected slot names in declaration order (all if None)."""
+        if fields is None:
+            return cls.__slots__
+        return tuple(name for name in cls.__slots__ if name in fields)
+
+    @classmethod
+    def columns(
+        cls, names: Optional[Sequence[str]] = None
+    ) -> Tuple[InstrumentedAttribute, ...]:
+        """Returns the columns to select for the given slot names."""
+        columns: Tuple[InstrumentedAttribute, ...] = ()
+        for name in cls.__slots__ if names is None else names:
+            if name in cls.nested:
+                columns += cls.nested[name].columns()
+            else:
+                columns += (getattr(cls.orm_model, name),)
+        return columns
+
+    @classmethod
+    def from_row(
+        cls, row: Sequence[Any], names: Optional[Sequence[str]] = None
+    ) -> "ReadRow":
+        """Builds a DTO from a Core result row selected with ``cls.columns(names)``."""
+        if names is None and not cls.nested:
+            return cls(*row)
+        obj = cls.__new__(cls)
+        position = 0
+        for name in cls.__slots__ if names is None else names:
+            nested = cls.nested.get(name)
+            if nested is None:
+                value = row[position]
+                position += 1
+            else:
+                width = len(nested.__slots__)
+                value = nested(*row[position : position + width])
+                position += width
+            object.__setattr__(obj, name, value)
+        return obj
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Returns the populated fields of the DTO as a plain dictionary."""
+        return {
+            name: getattr(self, name) for name in self.__slots__ if hasattr(self, name)
+        }
+
+
+class SiteRow(ReadRow):
+    """Row DTO matching ``SiteOut``."""
+
+    __slots__ = (
+        "id",
+        "name",
+        "address",
+        "start_date",
+        "end_date",
+        "status",
+        "requested_by_id",
+        "approved_by_id",
+        "requested_at",
+        "approved_at",
+        "created_at",
+        "updated_at",
+    )
+    orm_model = Site
+
+
+class CraneModelRow(ReadRow):
+    """Row DTO matching ``CraneModelOut``."""
+
+    __slots__ = (
+        "id",
+        "model_name",
+        "max_lifting_capacity_ton_m",
+        "max_working_height_m",
+        "max_working_radius_m",
+        "optional_specs",
+    )
+    orm_model = CraneModel
+
+
+class CraneRow(ReadRow):
+    """Row DTO matching ``CraneOut``. ``model`` requires a join on crane_models."""
+
+    __slots__ = (
+        "id",
+        "owner_org_id",
+        "serial_no",
+        "status",
+        "model",
+        "created_at",
+        "updated_at",
+    )
+    orm_model = Crane
+    nested = {"model": CraneModelRow}
+
+
+class RequestRow(ReadRow):
+    """Row DTO matching ``RequestOut``."""
+
+    __slots__ = (
+        "id",
+        "type",
+        "status",
+        "requester_id",
+        "approver_id",
+        "target_entity_id",
+        "related_entity_id",
+        "notes",
+        "requested_at",
+        "responded_at",
+    )
+    orm_model = Request
@@ -1,13 +1,25 @@
-import hashlib
 import logging
-from typing import Any, Dict, Generic, List, Optional, Type, TypeVar, Union, cast
+from typing import (
+    AbstractSet,
+    Any,
+    Dict,
+    Generic,
+    List,
+    Optional,
+    Type,
+    TypeVar,
+    Union,
+    cast,
+)
 
 from fastapi import HTTPException, status
 from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel
+from sqlalchemy import select
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
 
+from server.core.security import password_hasher
 from server.domain.models import (
     DriverAttendance,
     Base,
@@ -20,6 +32,7 @@ from server.domain.models import (
     SiteCraneAssignment,
     User,
 )
+from server.domain.read_models import CraneModelRow, CraneRow, SiteRow
 from server.domain.schemas import (
     AttendanceCreate,
     AttendanceUpdate,
@@ -76,7 +89,7 @@ class BaseRepository(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         Returns:
             The model instance if found, otherwise None.
         """
-        logger.debug(f"Getting {self.model.__name__} with id: {id}")
+        logger.debug("Getting %s with id: %s", self.model.__name__, id)
         return cast(
             Optional[ModelType],
             db.query(self.model).filter(self.model.id == id).first(),
@@ -112,7 +125,7 @@ class BaseRepository(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         Returns:
             The newly created model instance.
         """
-        logger.debug(f"Creating new {self.model.__name__}")
+        logger.debug("Creating new %s", self.model.__name__)
         obj_in_data = obj_in.model_dump()
         db_obj = self.model(**obj_in_data)
         try:
@@ -146,7 +159,7 @@ class BaseRepository(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         Returns:
             The updated model instance.
         """
-        logger.debug(f"Updating {self.model.__name__} with id: {db_obj.id}")
+        logger.debug("Updating %s with id: %s", self.model.__name__, db_obj.id)
         obj_data = jsonable_encoder(db_obj)
         if isinstance(obj_in, dict):
             update_data = obj_in
@@ -172,7 +185,7 @@ class BaseRepository(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         Returns:
             The removed model instance.
         """
-        logger.debug(f"Removing {self.model.__name__} with id: {id}")
+        logger.debug("Removing %s with id: %s", self.model.__name__, id)
         obj = db.query(self.model).get(id)
         db.delete(obj)
         db.commit()
@@ -196,11 +209,28 @@ class SiteRepository(BaseRepository[Site, SiteCreate, SiteUpdate]):
             query = query.filter(self.model.requested_by_id == user_id)
         return cast(List[Site], query.all())
 
+    def list_rows_for_user(
+        self,
+        db: Session,
+        *,
+        user_id: Optional[str] = None,
+        fields: Optional[AbstractSet[str]] = None,
+    ) -> List[SiteRow]:
+        """
+        Read-only variant of `get_multi_for_user`.
+        Selects only the `SiteOut` columns (or the requested `fields`) and
+        returns `SiteRow` DTOs, bypassing the ORM identity map.
+        """
+        names = None if fields is None else SiteRow.field_names(fields)
+        stmt = select(*SiteRow.columns(names))
+        if user_id:
+            stmt = stmt.where(self.model.requested_by_id == user_id)
+        return [SiteRow.from_row(row, names) for row in db.execute(stmt)]
+
 
 class UserRepository(BaseRepository[User, UserCreate, UserUpdate]):
     def create(self, db: Session, *, obj_in: UserCreate) -> User:
-        # A real implementation would use a proper password hashing library like passlib
-        hashed_password = hashlib.sha256(obj_in.password.encode()).hexdigest()
+        hashed_password = password_hasher.hash(obj_in.password)
         create_data = obj_in.model_dump(exclude={"password"})
         create_data["hashed_password"] = hashed_password
 
@@ -213,6 +243,14 @@ class UserRepository(BaseRepository[User, UserCreate, UserUpdate]):
     def get_by_email(self, db: Session, *, email: str) -> Optional[User]:
         return cast(Optional[User], db.query(User).filter(User.email == email).first())
 
+    def set_password_hash(
+        self, db: Session, *, user: User, hashed_password: str
+    ) -> None:
+        user.hashed_password = hashed_password
+        db.add(user)
+        db.commit()
+        db.refresh(user)
+
 
 from sqlalchemy.orm import joinedload
 
@@ -243,6 +281,69 @@ class CraneRepository(BaseRepository[Crane, CraneCreate, CraneUpdate]):
             )
         return cast(List[Crane], query.all())
 
+    def list_rows_by_owner(
+        self,
+        db: Session,
+        *,
+        owner_org_id: str,
+        status: Optional[CraneStatus] = None,
+        model_name: Optional[str] = None,
+        min_capacity: Optional[int] = None,
+        fields: Optional[AbstractSet[str]] = None,
+    ) -> List[CraneRow]:
+        """
+        Read-only variant of `get_by_owner`.
+        Selects only the requested `fields` (all `CraneOut` fields by default)
+        and returns `CraneRow` DTOs, bypassing the ORM identity map.
+        crane_models is joined only when `model` is requested or a model
+        filter is applied.
+        """
+        names = None if fields is None else CraneRow.field_names(fields)
+        stmt = select(*CraneRow.columns(names)).where(
+            *self.owner_criteria(
+                owner_org_id=owner_org_id,
+                status=status,
+                model_name=model_name,
+                min_capacity=min_capacity,
+            )
+        )
+        if names is None or "model" in names or model_name or min_capacity:
+            stmt = stmt.join(CraneModel, Crane.model_id == CraneModel.id)
+        return [CraneRow.from_row(row, names) for row in db.execute(stmt)]
+
+    @staticmethod
+    def owner_criteria(
+        *,
+        owner_org_id: Optional[str],
+        status: Optional[CraneStatus] = None,
+        model_name: Optional[str] = None,
+        min_capacity: Optional[int] = None,
+    ) -> List[Any]:
+        """
+        WHERE criteria for an owner's cranes with the list filters applied.
+        `model_name` / `min_capacity` require a join on crane_models.
+        """
+        return [Crane.owner_org_id == owner_org_id] + CraneRepository.filter_criteria(
+            status=status, model_name=model_name, min_capacity=min_capacity
+        )
+
+    @staticmethod
+    def filter_criteria(
+        *,
+        status: Optional[CraneStatus] = None,
+        model_name: Optional[str] = None,
+        min_capacity: Optional[int] = None,
+    ) -> List[Any]:
+        """WHERE criteria for the crane list filters, without the owner scope."""
+        criteria: List[Any] = []
+        if status:
+            criteria.append(Crane.status == status)
+        if model_name:
+            criteria.append(CraneModel.model_name.ilike(f"%{model_name}%"))
+        if min_capacity:
+            criteria.append(CraneModel.max_lifting_capacity_ton_m >= min_capacity)
+        return criteria
+
 
 class SiteCraneAssignmentRepository(
     BaseRepository[
@@ -279,7 +380,22 @@ class AttendanceRepository(
 
 
 class CraneModelRepository(BaseRepository[CraneModel, CraneModelCreate, CraneModelUpdate]):
-    pass
+    def list_rows(
+        self,
+        db: Session,
+        *,
+        skip: int = 0,
+        limit: int = 100,
+        fields: Optional[AbstractSet[str]] = None,
+    ) -> List[CraneModelRow]:
+        """
+        Read-only variant of `get_multi`.
+        Selects only the requested `fields` (all `CraneModelOut` fields by
+        default) and returns `CraneModelRow` DTOs.
+        """
+        names = None if fields is None else CraneModelRow.field_names(fields)
+        stmt = select(*CraneModelRow.columns(names)).offset(skip).limit(limit)
+        return [CraneModelRow.from_row(row, names) for row in db.execute(stmt)]
 
 
 site_repo = SiteRepository(Site)
@@ -0,0 +1,176 @@
+"""
+Revoked access tokens.
+
+Logout writes the token's ``jti`` to ``ops.revoked_tokens``. Every worker
+mirrors the unexpired revoked ids into an in-memory dict, so checking a
+token on each request is a dict lookup with no I/O.
+
+Each worker polls for rows above the highest id it has seen (the
+high-water mark) every REVOCATION_POLL_SECONDS. Ids come from a sequence
+that is allocated at insert time, not at commit time, so a slow
+transaction can commit an id below the mark. Each poll therefore also
+re-reads the rows revoked in the last REVOCATION_LOOKBACK_SECONDS.
+Entries are dropped from memory once the token would have expired anyway,
+and expired rows are deleted about once an hour.
+
+The worker that handles the logout adds the jti at once. Other workers
+pick it up on their next poll. If the database cannot be reached, the
+last known set keeps being enforced and the failure is logged.
+"""
+
+import asyncio
+import datetime as dt
+import logging
+import threading
+import time
+from typing import Dict, Optional
+
+from sqlalchemy import delete, or_, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from server.config import settings
+from server.database import db_manager
+from server.domain.models import RevokedToken
+
+logger = logging.getLogger(__name__)
+
+_PURGE_INTERVAL_SECONDS = 3600.0
+
+
+def _utc(epoch: float) -> dt.datetime:
+    """Naive UTC datetime, as stored by the ORM's DateTime columns."""
+    return dt.datetime.fromtimestamp(epoch, dt.timezone.utc).replace(tzinfo=None)
+
+
+def _epoch(value: dt.datetime) -> float:
+    return value.replace(tzinfo=dt.timezone.utc).timestamp()
+
+
+class RevocationList:
+    """In-memory mirror of ``ops.revoked_tokens``: jti -> expiry (epoch seconds)."""
+
+    def __init__(
+        self, poll_seconds: float, lookback_seconds: float, leeway_seconds: float
+    ):
+        self.poll_seconds = poll_seconds
+        self.lookback_seconds = lookback_seconds
+        self.leeway_seconds = leeway_seconds
+        self._expiry: Dict[str, float] = {}
+        self._high_water = 0
+        self._last_poll: Optional[float] = (
+            None  # wall-clock start of the last successful poll
+        )
+        self._last_purge = time.monotonic()
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._expiry)
+
+    def is_revoked(self, jti: Optional[str]) -> bool:
+        return jti is not None and jti in self._expiry
+
+    def revoke(
+        self, db: Session, jti: str, expires_at: float, user_id: Optional[str] = None
+    ) -> None:
+        """Persists the revocation and applies it to this worker at once."""
+        db.add(
+            RevokedToken(
+                jti=jti,
+                user_id=user_id,
+                expires_at=_utc(expires_at),
+                revoked_at=_utc(time.time()),
+            )
+        )
+        try:
+            db.commit()
+        except IntegrityError:
+            db.rollback()  # already revoked
+        with self._lock:
+            self._expiry[jti] = expires_at
+
+    def poll(self, db: Session) -> int:
+        """Loads revocations added since the last poll; returns how many were new."""
+        started = time.time()
+        query = select(
+            RevokedToken.id, RevokedToken.jti, RevokedToken.expires_at
+        ).where(RevokedToken.expires_at > _utc(started - self.leeway_seconds))
+        if self._last_poll is not None:
+            query = query.where(
+                or_(
+                    RevokedToken.id > self._high_water,
+                    RevokedToken.revoked_at
+                    >= _utc(self._last_poll - self.lookback_seconds),
+                )
+            )
+        rows = db.execute(query).all()
+        db.rollback()  # end the read transaction; the session may be reused
+        added = 0
+        with self._lock:
+            for row in rows:
+                if row.jti not in self._expiry:
+                    self._expiry[row.jti] = _epoch(row.expires_at)
+                    added += 1
+                self._high_water = max(self._high_water, row.id)
+            cutoff = started - self.leeway_seconds
+            for jti in [
+                jti for jti, expires in self._expiry.items() if expires <= cutoff
+            ]:
+                del self._expiry[jti]
+            self._last_poll = started
+        return added
+
+    def purge_expired(self, db: Session) -> int:
+        """Deletes rows of tokens that have expired; returns the number deleted."""
+        result = db.execute(
+            delete(RevokedToken).where(
+                RevokedToken.expires_at <= _utc(time.time() - self.leeway_seconds)
+            )
+        )
+        db.commit()
+        return result.rowcount
+
+    def clear(self) -> None:
+        with self._lock:
+            self._expiry.clear()
+            self._high_water = 0
+            self._last_poll = None
+
+    # --- Background polling ----------------------------------------------------
+
+    def _poll_once(self) -> None:
+        try:
+            with db_manager.SessionLocal() as db:
+                added = self.poll(db)
+                if time.monotonic() - self._last_purge > _PURGE_INTERVAL_SECONDS:
+                    self._last_purge = time.monotonic()
+                    self.purge_expired(db)
+        except Exception as e:
+            logger.error("Could not poll revoked tokens: %s", e)
+            return
+        if added:
+            logger.info("Loaded %d revoked token(s)", added)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.poll_seconds)
+            await run_in_threadpool(self._poll_once)
+
+    async def start(self) -> None:
+        """Loads the current revocations, then keeps polling in the background."""
+        await run_in_threadpool(self._poll_once)
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+revoked_tokens = RevocationList(
+    settings.REVOCATION_POLL_SECONDS,
+    settings.REVOCATION_LOOKBACK_SECONDS,
+    settings.JWT_LEEWAY_SECONDS,
+)
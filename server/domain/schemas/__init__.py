@@ -7,6 +7,7 @@ from .enums import (
     RequestType,
     RequestStatus,
     OrgType,
+    ExportFormat,
 )
 from .user import UserBase, UserCreate, UserUpdate
 from .site import SiteCreate, SiteUpdate, SiteOut
@@ -51,6 +52,7 @@ from .attendance import (
 from .request import RequestCreate, RequestUpdate, RequestOut
 from .owner import OwnerStatsOut
 from .health import HealthCheckResponse
+from .batch import BatchIn, BatchOut, BatchSubRequest, BatchSubResponse
 
 
 __all__ = [
@@ -63,6 +65,7 @@ __all__ = [
     "RequestType",
     "RequestStatus",
     "OrgType",
+    "ExportFormat",
     # User
     "UserBase",
     "UserCreate",
@@ -113,4 +116,9 @@ __all__ = [
     "OwnerStatsOut",
     # Health
     "HealthCheckResponse",
+    # Batch
+    "BatchIn",
+    "BatchOut",
+    "BatchSubRequest",
+    "BatchSubResponse",
 ]
@@ -0,0 +1,52 @@
+from typing import Any, Dict, List, Literal, Optional, Tuple
+
+from pydantic import BaseModel, Field
+
+
+class BatchSubRequest(BaseModel):
+    """One call inside a batch. Paths are relative to the API root (`/api/v1`)."""
+
+    id: Optional[str] = Field(
+        None, description="Name used to reference this result, e.g. `${site.body.id}`"
+    )
+    method: Literal["GET", "POST", "PUT", "PATCH", "DELETE"] = "GET"
+    path: str = Field(..., description="Route path, e.g. `/org/sites/${0.body.id}`")
+    query: Optional[Dict[str, Any]] = None
+    headers: Optional[Dict[str, str]] = None
+    body: Optional[Any] = None
+
+
+class BatchIn(BaseModel):
+    """Schema for a batch of sub-requests executed in order."""
+
+    requests: List[BatchSubRequest] = Field(..., min_length=1)
+    transaction: bool = Field(
+        False,
+        description=(
+            "Run all sub-requests in one DB transaction. The batch stops at the "
+            "first failure and nothing is committed."
+        ),
+    )
+
+
+class BatchSubResponse(BaseModel):
+    """Result of one sub-request."""
+
+    id: Optional[str] = None
+    status: int
+    headers: List[Tuple[str, str]] = Field(
+        default_factory=list, description="Response headers as [name, value] pairs"
+    )
+    body: Optional[Any] = None
+
+
+class BatchOut(BaseModel):
+    """Schema for the batch response."""
+
+    responses: List[BatchSubResponse]
+    committed: Optional[bool] = Field(
+        None,
+        description=(
+            "Whether the shared transaction was committed (transaction mode only)"
+        ),
+    )
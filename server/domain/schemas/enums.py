@@ -62,3 +62,10 @@ class OrgType(str, Enum):
 
     OWNER = "OWNER"  # Construction company owning cranes
     MANUFACTURER = "MANUFACTURER"  # Crane manufacturer providing approval
+
+
+class ExportFormat(str, Enum):
+    """Output formats for bulk export endpoints."""
+
+    NDJSON = "ndjson"
+    CSV = "csv"
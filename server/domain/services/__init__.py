@@ -7,6 +7,7 @@ from .attendance_service import attendance_service
 from .request_service import request_service
 from .owner_service import owner_service
 from .crane_model_service import crane_model_service
+from .export_service import export_service
 
 __all__ = [
     "user_service",
@@ -18,4 +19,5 @@ __all__ = [
     "request_service",
     "owner_service",
     "crane_model_service",
+    "export_service",
 ]
@@ -2,6 +2,7 @@ import logging
 
 from sqlalchemy.orm import Session
 
+from server.core.timing import timed_service
 from server.domain.models import DriverAttendance
 from server.domain.repositories import attendance_repo
 from server.domain.schemas import AttendanceCreate, AttendanceIn
@@ -9,6 +10,7 @@ from server.domain.schemas import AttendanceCreate, AttendanceIn
 logger = logging.getLogger(__name__)
 
 
+@timed_service
 class AttendanceService:
     def record_attendance(
         self, db: Session, *, attendance_in: AttendanceIn
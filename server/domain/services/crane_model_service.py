@@ -1,21 +1,32 @@
 import logging
-from typing import List, Optional
+from typing import AbstractSet, List, Optional
 
 from sqlalchemy.orm import Session
 
+from server.core.timing import timed_service
 from server.domain.models import CraneModel
+from server.domain.read_models import CraneModelRow
 from server.domain.repositories import crane_model_repo
 
 logger = logging.getLogger(__name__)
 
 
+@timed_service
 class CraneModelService:
-    def get_models(self, db: Session, *, skip: int = 0, limit: int = 100) -> List[CraneModel]:
+    def get_models(
+        self,
+        db: Session,
+        *,
+        skip: int = 0,
+        limit: int = 100,
+        fields: Optional[AbstractSet[str]] = None,
+    ) -> List[CraneModelRow]:
         """
         Retrieves a list of crane models.
+        If `fields` is given, only those `CraneModelOut` fields are loaded.
         """
         logger.info("Fetching list of crane models")
-        return crane_model_repo.get_multi(db, skip=skip, limit=limit)
+        return crane_model_repo.list_rows(db, skip=skip, limit=limit, fields=fields)
 
     def get_model(self, db: Session, model_id: str) -> Optional[CraneModel]:
         """
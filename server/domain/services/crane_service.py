@@ -1,15 +1,17 @@
 import logging
-from typing import List, Optional
+from typing import AbstractSet, List, Optional
 
 from sqlalchemy.orm import Session
 
-from server.domain.models import Crane
+from server.core.timing import timed_service
+from server.domain.read_models import CraneRow
 from server.domain.repositories import crane_repo
 from server.domain.schemas import CraneStatus
 
 logger = logging.getLogger(__name__)
 
 
+@timed_service
 class CraneService:
     def list_owner_cranes(
         self,
@@ -19,17 +21,20 @@ class CraneService:
         status: Optional[CraneStatus] = None,
         model_name: Optional[str] = None,
         min_capacity: Optional[int] = None,
-    ) -> List[Crane]:
+        fields: Optional[AbstractSet[str]] = None,
+    ) -> List[CraneRow]:
         """
         List all cranes owned by a specific organization, with optional filters.
+        If `fields` is given, only those `CraneOut` fields are loaded.
         """
         logger.info(f"Listing cranes for org: {owner_org_id} with filters")
-        cranes = crane_repo.get_by_owner(
+        cranes = crane_repo.list_rows_by_owner(
             db,
             owner_org_id=owner_org_id,
             status=status,
             model_name=model_name,
             min_capacity=min_capacity,
+            fields=fields,
         )
         logger.info(f"Found {len(cranes)} cranes for organization: {owner_org_id}")
         return cranes
@@ -4,6 +4,7 @@ import logging
 from fastapi import HTTPException
 from sqlalchemy.orm import Session
 
+from server.core.timing import timed_service
 from server.domain.models import DriverDocumentItem, DriverDocumentRequest
 from server.domain.repositories import document_item_repo, document_request_repo
 from server.domain.schemas import (
@@ -21,6 +22,7 @@ from .user_service import UserService, user_service
 logger = logging.getLogger(__name__)
 
 
+@timed_service
 class DocumentService:
     def __init__(self, user_service: UserService):
         self.user_service = user_service
@@ -0,0 +1,263 @@
+import csv
+import datetime as dt
+import decimal
+import enum
+import io
+import json
+import logging
+from contextlib import AbstractContextManager
+from typing import Any, Callable, Iterator, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import Select, select
+from sqlalchemy.orm import Session
+
+from server.database import db_manager
+from server.domain.models import (
+    Crane,
+    CraneModel,
+    DriverAttendance,
+    DriverDocumentItem,
+    Site,
+    SiteCraneAssignment,
+)
+from server.domain.repositories import crane_repo
+from server.domain.schemas import (
+    AssignmentStatus,
+    CraneStatus,
+    DocItemStatus,
+    ExportFormat,
+)
+
+logger = logging.getLogger(__name__)
+
+# (label, column) pairs: labels become the CSV header / NDJSON keys.
+ExportColumns = Sequence[Tuple[str, Any]]
+
+CRANE_COLUMNS: ExportColumns = (
+    ("id", Crane.id),
+    ("owner_org_id", Crane.owner_org_id),
+    ("serial_no", Crane.serial_no),
+    ("status", Crane.status),
+    ("model_id", CraneModel.id),
+    ("model_name", CraneModel.model_name),
+    ("max_lifting_capacity_ton_m", CraneModel.max_lifting_capacity_ton_m),
+    ("max_working_height_m", CraneModel.max_working_height_m),
+    ("max_working_radius_m", CraneModel.max_working_radius_m),
+    ("created_at", Crane.created_at),
+    ("updated_at", Crane.updated_at),
+)
+SITE_COLUMNS: ExportColumns = tuple(
+    (name, getattr(Site, name))
+    for name in (
+        "id",
+        "name",
+        "address",
+        "start_date",
+        "end_date",
+        "status",
+        "requested_by_id",
+        "approved_by_id",
+        "requested_at",
+        "approved_at",
+        "created_at",
+        "updated_at",
+    )
+)
+CRANE_ASSIGNMENT_COLUMNS: ExportColumns = tuple(
+    (name, getattr(SiteCraneAssignment, name))
+    for name in (
+        "id",
+        "site_id",
+        "crane_id",
+        "assigned_by",
+        "start_date",
+        "end_date",
+        "status",
+        "created_at",
+        "updated_at",
+    )
+)
+ATTENDANCE_COLUMNS: ExportColumns = tuple(
+    (name, getattr(DriverAttendance, name))
+    for name in (
+        "id",
+        "driver_assignment_id",
+        "work_date",
+        "check_in_at",
+        "check_out_at",
+        "created_at",
+        "updated_at",
+    )
+)
+DOCUMENT_ITEM_COLUMNS: ExportColumns = tuple(
+    (name, getattr(DriverDocumentItem, name))
+    for name in (
+        "id",
+        "request_id",
+        "doc_type",
+        "file_url",
+        "status",
+        "reviewer_id",
+        "submitted_at",
+        "reviewed_at",
+        "created_at",
+        "updated_at",
+    )
+)
+
+
+def _plain(value: Any) -> Any:
+    """Converts a column value to a JSON/CSV friendly scalar."""
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, (dt.date, dt.datetime)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    return value
+
+
+class ExportService:
+    """
+    Streams table exports as NDJSON or CSV.
+
+    Rows are read through a server-side cursor (`yield_per`) on a session
+    owned by the generator itself, so the export outlives the request
+    handler and memory stays constant regardless of the row count.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], AbstractContextManager[Session]],
+        batch_size: int = 1000,
+    ):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+
+    def stream(
+        self, stmt: Select, columns: ExportColumns, export_format: ExportFormat
+    ) -> Iterator[bytes]:
+        """Yields the encoded export, one chunk per `batch_size` rows."""
+        labels = [label for label, _ in columns]
+        encode = (
+            self._encode_csv
+            if export_format == ExportFormat.CSV
+            else self._encode_ndjson
+        )
+        if export_format == ExportFormat.CSV:
+            yield self._encode_csv(labels, [labels])
+        exported = 0
+        with self.session_factory() as db:
+            result = db.execute(stmt.execution_options(yield_per=self.batch_size))
+            for batch in result.partitions():
+                exported += len(batch)
+                yield encode(labels, batch)
+        logger.info(f"Export finished: {exported} rows ({export_format.value})")
+
+    @staticmethod
+    def _encode_ndjson(labels: List[str], rows: Sequence[Sequence[Any]]) -> bytes:
+        lines = [
+            json.dumps(dict(zip(labels, map(_plain, row))), separators=(",", ":"))
+            for row in rows
+        ]
+        lines.append("")
+        return "\n".join(lines).encode()
+
+    @staticmethod
+    def _encode_csv(labels: List[str], rows: Sequence[Sequence[Any]]) -> bytes:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerows([_plain(value) for value in row] for row in rows)
+        return buffer.getvalue().encode()
+
+    # --- Export statements (filters mirror the list endpoints) ---
+
+    def cranes_stmt(
+        self,
+        *,
+        owner_org_id: Optional[str] = None,
+        crane_status: Optional[CraneStatus] = None,
+        model_name: Optional[str] = None,
+        min_capacity: Optional[int] = None,
+    ) -> Tuple[Select, ExportColumns]:
+        if owner_org_id is None:
+            criteria = crane_repo.filter_criteria(
+                status=crane_status, model_name=model_name, min_capacity=min_capacity
+            )
+        else:
+            criteria = crane_repo.owner_criteria(
+                owner_org_id=owner_org_id,
+                status=crane_status,
+                model_name=model_name,
+                min_capacity=min_capacity,
+            )
+        stmt = (
+            select(*(column for _, column in CRANE_COLUMNS))
+            .join(CraneModel, Crane.model_id == CraneModel.id)
+            .where(*criteria)
+        )
+        return stmt, CRANE_COLUMNS
+
+    def sites_stmt(
+        self, *, mine: Optional[bool] = None, user_id: Optional[str] = None
+    ) -> Tuple[Select, ExportColumns]:
+        if mine and not user_id:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="user_id is required when 'mine' is true",
+            )
+        stmt = select(*(column for _, column in SITE_COLUMNS))
+        if mine:
+            stmt = stmt.where(Site.requested_by_id == user_id)
+        return stmt, SITE_COLUMNS
+
+    def crane_assignments_stmt(
+        self,
+        *,
+        site_id: Optional[str] = None,
+        crane_id: Optional[str] = None,
+        assignment_status: Optional[AssignmentStatus] = None,
+    ) -> Tuple[Select, ExportColumns]:
+        stmt = select(*(column for _, column in CRANE_ASSIGNMENT_COLUMNS))
+        if site_id:
+            stmt = stmt.where(SiteCraneAssignment.site_id == site_id)
+        if crane_id:
+            stmt = stmt.where(SiteCraneAssignment.crane_id == crane_id)
+        if assignment_status:
+            stmt = stmt.where(SiteCraneAssignment.status == assignment_status)
+        return stmt, CRANE_ASSIGNMENT_COLUMNS
+
+    def attendance_stmt(
+        self,
+        *,
+        driver_assignment_id: Optional[str] = None,
+        work_date_from: Optional[dt.date] = None,
+        work_date_to: Optional[dt.date] = None,
+    ) -> Tuple[Select, ExportColumns]:
+        stmt = select(*(column for _, column in ATTENDANCE_COLUMNS))
+        if driver_assignment_id:
+            stmt = stmt.where(
+                DriverAttendance.driver_assignment_id == driver_assignment_id
+            )
+        if work_date_from:
+            stmt = stmt.where(DriverAttendance.work_date >= work_date_from)
+        if work_date_to:
+            stmt = stmt.where(DriverAttendance.work_date <= work_date_to)
+        return stmt, ATTENDANCE_COLUMNS
+
+    def document_items_stmt(
+        self,
+        *,
+        request_id: Optional[str] = None,
+        item_status: Optional[DocItemStatus] = None,
+    ) -> Tuple[Select, ExportColumns]:
+        stmt = select(*(column for _, column in DOCUMENT_ITEM_COLUMNS))
+        if request_id:
+            stmt = stmt.where(DriverDocumentItem.request_id == request_id)
+        if item_status:
+            stmt = stmt.where(DriverDocumentItem.status == item_status)
+        return stmt, DOCUMENT_ITEM_COLUMNS
+
+
+export_service = ExportService(session_factory=db_manager.get_analytics_session)
@@ -1,10 +1,12 @@
 import logging
 from typing import List, Optional
 
-from sqlalchemy import case, func
+from sqlalchemy import case, func, select
 from sqlalchemy.orm import Session
 
-from server.domain.models import Crane, Org, Request, UserOrg
+from server.core.timing import timed_service
+from server.domain.models import Crane, Org, Request
+from server.domain.read_models import RequestRow
 from server.domain.schemas import (
     CraneStatus,
     OrgType,
@@ -12,10 +14,12 @@ from server.domain.schemas import (
     RequestStatus,
     RequestType,
 )
+from server.domain.user_cache import user_contexts
 
 logger = logging.getLogger(__name__)
 
 
+@timed_service
 class OwnerService:
     def get_owners_with_stats(self, db: Session) -> List[OwnerStatsOut]:
         results = (
@@ -42,21 +46,22 @@ class OwnerService:
         user_id: str,
         type: Optional[RequestType] = None,
         status: Optional[RequestStatus] = None,
-    ) -> List[Request]:
-        user_org = db.query(UserOrg).filter(UserOrg.user_id == user_id).first()
-        if not user_org:
+    ) -> List[RequestRow]:
+        user = user_contexts.get(db, user_id)
+        if user is None or not user.org_ids:
             return []
-        owner_org_id = user_org.org_id
-        query = (
-            db.query(Request)
+        owner_org_id = user.org_ids[0]
+        stmt = (
+            select(*RequestRow.columns())
             .join(Crane, Request.target_entity_id == Crane.id)
-            .filter(Crane.owner_org_id == owner_org_id)
+            .where(Crane.owner_org_id == owner_org_id)
         )
         if type:
-            query = query.filter(Request.type == type)
+            stmt = stmt.where(Request.type == type)
         if status:
-            query = query.filter(Request.status == status)
-        return query.order_by(Request.requested_at.desc()).all()
+            stmt = stmt.where(Request.status == status)
+        stmt = stmt.order_by(Request.requested_at.desc())
+        return [RequestRow.from_row(row) for row in db.execute(stmt)]
 
 
 owner_service = OwnerService()
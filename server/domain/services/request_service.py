@@ -3,6 +3,7 @@ import logging
 from sqlalchemy import func
 from sqlalchemy.orm import Session
 
+from server.core.timing import timed_service
 from server.domain.models import Request
 from server.domain.repositories import user_repo
 from server.domain.schemas import (
@@ -15,6 +16,7 @@ from server.domain.schemas import (
 logger = logging.getLogger(__name__)
 
 
+@timed_service
 class RequestService:
     def create_request(self, db: Session, request_in: RequestCreate) -> Request:
         requester = user_repo.get(db, id=request_in.requester_id)
@@ -1,11 +1,13 @@
 import datetime as dt
 import logging
-from typing import List, Optional
+from typing import AbstractSet, List, Optional
 
 from fastapi import HTTPException, status
 from sqlalchemy.orm import Session
 
+from server.core.timing import timed_service
 from server.domain.models import Site
+from server.domain.read_models import SiteRow
 from server.domain.repositories import site_repo
 from server.domain.schemas import SiteCreate, SiteUpdate, SiteStatus, UserRole
 from .user_service import UserService, user_service
@@ -13,6 +15,7 @@ from .user_service import UserService, user_service
 logger = logging.getLogger(__name__)
 
 
+@timed_service
 class SiteService:
     def __init__(self, user_service: UserService):
         self.user_service = user_service
@@ -75,11 +78,17 @@ class SiteService:
         return updated_site
 
     def list_sites(
-        self, db: Session, *, mine: Optional[bool], user_id: Optional[str]
-    ) -> List[Site]:
+        self,
+        db: Session,
+        *,
+        mine: Optional[bool],
+        user_id: Optional[str],
+        fields: Optional[AbstractSet[str]] = None,
+    ) -> List[SiteRow]:
         """
         Lists construction sites. If 'mine' is True, filters for sites
-        relevant to the given user_id.
+        relevant to the given user_id. If `fields` is given, only those
+        `SiteOut` fields are loaded.
         """
         if mine and not user_id:
             raise HTTPException(
@@ -88,7 +97,9 @@ class SiteService:
             )
 
         logger.info(f"Listing sites with mine={mine} for user_id={user_id}")
-        return site_repo.get_multi_for_user(db, user_id=user_id if mine else None)
+        return site_repo.list_rows_for_user(
+            db, user_id=user_id if mine else None, fields=fields
+        )
 
 
 site_service = SiteService(user_service=user_service)
@@ -2,6 +2,7 @@ import logging
 from fastapi import HTTPException, status
 from sqlalchemy.orm import Session
 
+from server.core.timing import timed_service
 from server.domain.models import User
 from server.domain.repositories import user_repo
 from server.domain.schemas import UserRole
@@ -9,6 +10,7 @@ from server.domain.schemas import UserRole
 logger = logging.getLogger(__name__)
 
 
+@timed_service
 class UserService:
     def get_user_and_validate_role(
         self, db: Session, *, user_id: str, expected_role: UserRole
@@ -16,7 +18,7 @@ class UserService:
         """
         Retrieves a user by ID and validates their role.
         """
-        logger.debug(f"Validating user {user_id} for role {expected_role.value}")
+        logger.debug("Validating user %s for role %s", user_id, expected_role.value)
         user = user_repo.get(db, id=user_id)
         if not user:
             raise HTTPException(
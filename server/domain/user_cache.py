@@ -0,0 +1,189 @@
+"""
+Per-user cache of the facts authorization needs: role, active flag, name,
+email and org memberships.
+
+`get_current_user` and services such as `OwnerService.get_my_requests`
+read these on every request; the cache loads them with one query per user
+and keeps them for USER_CACHE_TTL_SECONDS. Unknown user ids are cached too,
+so dev users without a row do not query on every request.
+
+Writes through any ORM session invalidate the affected users when the
+transaction commits: inserts, updates and deletes of `User` and `UserOrg`
+objects drop those users, and bulk ``update()``/``delete()``/``insert()``
+statements on either table drop everything. Writes that bypass the ORM
+(raw SQL, ``ON DELETE CASCADE`` from ``ops.orgs``) and writes made by other
+worker processes are picked up when the TTL expires.
+
+Users loaded inside a batch's shared transaction are not stored: the
+transaction may still roll back what they were read from.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from itertools import chain
+from typing import Iterable, Optional, Set, Tuple
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from server.config import settings
+from server.core.metrics import cache_requests
+from server.database import shared_session
+from server.domain.models import User, UserOrg
+
+_PENDING_KEY = "user_cache_invalidations"
+_CLEAR_ALL = "*"
+
+
+class CachedUser:
+    """Authorization facts of one user, as stored in ``ops.users``/``ops.user_orgs``."""
+
+    __slots__ = ("id", "role", "is_active", "email", "name", "org_ids")
+
+    def __init__(
+        self,
+        id: str,
+        role: str,
+        is_active: bool,
+        email: str,
+        name: str,
+        org_ids: Tuple[str, ...],
+    ):
+        self.id = id
+        self.role = role
+        self.is_active = is_active
+        self.email = email
+        self.name = name
+        self.org_ids = org_ids
+
+
+class UserContextCache:
+    """TTL + LRU cache of `CachedUser` by user id."""
+
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, Optional[CachedUser]]]" = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+        # Bumped by every invalidation; a load that raced one is not stored.
+        self._generation = 0
+
+    def get(self, db: Session, user_id: str) -> Optional[CachedUser]:
+        """The user's cached facts, loading them on a miss; None for unknown ids."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(user_id)
+                cache_requests.inc("user_context", "hit")
+                return entry[1]
+            generation = self._generation
+        cache_requests.inc("user_context", "miss")
+        user = self._load(db, user_id)
+        if shared_session.get() is not None:
+            return user
+        with self._lock:
+            if generation == self._generation:
+                self._entries[user_id] = (now + self.ttl, user)
+                self._entries.move_to_end(user_id)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return user
+
+    def peek(self, user_id: str) -> Optional[CachedUser]:
+        """The cached facts if present and fresh; never queries."""
+        entry = self._entries.get(user_id)
+        if entry is not None and entry[0] > time.monotonic():
+            return entry[1]
+        return None
+
+    @staticmethod
+    def _load(db: Session, user_id: str) -> Optional[CachedUser]:
+        rows = db.execute(
+            select(User.role, User.is_active, User.email, User.name, UserOrg.org_id)
+            .outerjoin(UserOrg, UserOrg.user_id == User.id)
+            .where(User.id == user_id)
+        ).all()
+        if not rows:
+            return None
+        role, is_active, email, name, _ = rows[0]
+        org_ids = tuple(sorted(row.org_id for row in rows if row.org_id is not None))
+        return CachedUser(
+            user_id, getattr(role, "value", role), is_active, email, name, org_ids
+        )
+
+    def invalidate(self, user_ids: Iterable[str]) -> None:
+        with self._lock:
+            self._generation += 1
+            for user_id in user_ids:
+                self._entries.pop(user_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+
+user_contexts = UserContextCache(
+    settings.USER_CACHE_TTL_SECONDS, settings.USER_CACHE_MAX_ENTRIES
+)
+
+
+# --- Invalidation -------------------------------------------------------------
+
+
+def _pending(session: Session) -> Set[str]:
+    return session.info.setdefault(_PENDING_KEY, set())
+
+
+def _collect_flushed_users(session: Session, flush_context) -> None:
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if isinstance(obj, User) and obj.id is not None:
+            _pending(session).add(obj.id)
+        elif isinstance(obj, UserOrg) and obj.user_id is not None:
+            _pending(session).add(obj.user_id)
+
+
+def _collect_bulk_statements(orm_execute_state) -> None:
+    if not (
+        orm_execute_state.is_insert
+        or orm_execute_state.is_update
+        or orm_execute_state.is_delete
+    ):
+        return
+    if any(
+        mapper.class_ in (User, UserOrg) for mapper in orm_execute_state.all_mappers
+    ):
+        _pending(orm_execute_state.session).add(_CLEAR_ALL)
+
+
+def _apply_invalidations(session: Session) -> None:
+    user_ids = session.info.pop(_PENDING_KEY, None)
+    if not user_ids:
+        return
+    if _CLEAR_ALL in user_ids:
+        user_contexts.clear()
+    else:
+        user_contexts.invalidate(user_ids)
+
+
+def _discard_invalidations(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+
+
+_installed = False
+
+
+def install_invalidation_hooks() -> None:
+    """Registers the session listeners (once) on the `Session` class."""
+    global _installed
+    if _installed:
+        return
+    event.listen(Session, "after_flush", _collect_flushed_users)
+    event.listen(Session, "do_orm_execute", _collect_bulk_statements)
+    event.listen(Session, "after_commit", _apply_invalidations)
+    event.listen(Session, "after_rollback", _discard_invalidations)
+    _installed = True
@@ -4,37 +4,56 @@ Configures FastAPI app, logging, and starts the development server.
 """
 
 import logging
+import os
 import sys
 from contextlib import asynccontextmanager
 
+import anyio.to_thread
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import RedirectResponse, JSONResponse
+from fastapi.responses import RedirectResponse
 
+from server.api.rate_limits import shared_buckets
+from server.api.routers import metrics
 from server.api.routes import api_router
 from server.config import settings
+from server.core.bulkheads import analytics_bulkhead, watch_bulkheads
+from server.core.deadlines import (
+    DeadlineExceeded,
+    DeadlineMiddleware,
+    deadline_exceeded_handler,
+    install_deadline_hooks,
+)
+from server.core.db_instrumentation import (
+    add_statement_observer,
+    install_statement_hooks,
+)
+from server.core.logging import setup_logging, shutdown_logging
+from server.core.loop_watchdog import loop_watchdog, record_loop_statement
+from server.core.metrics import SnapshotWriter, record_statement, watch_threadpool
+from server.core.query_audit import QueryAuditor, record_request_query
+from server.core.slow_queries import slow_query_log
+from server.core.sql_trace import record_trace_statement, trace_store
+from server.core.tokens import key_store
 from server.database import db_manager
+from server.domain.revocations import revoked_tokens
+from server.domain.user_cache import install_invalidation_hooks
+from server.middleware.compression import CompressionMiddleware
+from server.middleware.concurrency import (
+    AIMDLimit,
+    ConcurrencyLimiter,
+    ConcurrencyLimitMiddleware,
+    watch_concurrency,
+)
+from server.middleware.request_context import RequestContextMiddleware
 
 
 def configure_logging():
-    """Configure application logging with appropriate formatters and levels."""
-
-    # Create formatter
-    formatter = logging.Formatter(settings.LOG_FORMAT)
-
-    # Configure root logger
-    root_logger = logging.getLogger()
-    root_logger.setLevel(settings.get_log_level())
-
-    # Clear existing handlers to avoid duplication
-    for handler in root_logger.handlers[:]:
-        root_logger.removeHandler(handler)
-
-    # Console handler with formatting
-    console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setLevel(settings.get_log_level())
-    console_handler.setFormatter(formatter)
-    root_logger.addHandler(console_handler)
+    """
+    Configure application logging. Records are queued and written as JSON
+    (or LOG_FORMAT text) by a background thread; see server.core.logging.
+    """
+    setup_logging()
 
     # Set specific logger levels
     logging.getLogger("uvicorn").setLevel(logging.INFO)
@@ -48,10 +67,10 @@ def configure_logging():
     # Log startup configuration
     logger = logging.getLogger(__name__)
     logger.info(
-        (
-            f"Logging configured - Level: {settings.LOG_LEVEL}, Environment: "
-            f"{settings.is_development() and 'development' or 'production'}"
-        )
+        "Logging configured - Level: %s, Environment: %s, JSON: %s",
+        settings.LOG_LEVEL,
+        settings.is_development() and "development" or "production",
+        settings.LOG_JSON,
     )
 
 
@@ -68,6 +87,10 @@ async def lifespan(app: FastAPI):
     logger.info(f"Starting {settings.APP_NAME} v{settings.APP_VERSION}")
     logger.info("=" * 60)
 
+    # Strict auth cannot issue tokens without a signing key; refuse to start.
+    if settings.AUTH_MODE != "dev":
+        logger.info("JWT signing key: %s", key_store.check())
+
     # Database health check
     if db_manager.health_check():
         logger.info("Database connectivity verified")
@@ -75,6 +98,26 @@ async def lifespan(app: FastAPI):
         logger.error("Database connectivity check failed")
         logger.warning("Application starting anyway - check database configuration")
 
+    snapshot_writer = None
+    if settings.METRICS_ENABLED:
+        watch_threadpool(anyio.to_thread.current_default_thread_limiter())
+        watch_bulkheads(
+            anyio.to_thread.current_default_thread_limiter(), analytics_bulkhead
+        )
+        if settings.METRICS_MULTIPROC_DIR:
+            snapshot_writer = SnapshotWriter(
+                settings.METRICS_MULTIPROC_DIR, settings.METRICS_FLUSH_INTERVAL
+            )
+            snapshot_writer.start()
+
+    if settings.LOOP_WATCHDOG_ENABLED:
+        loop_watchdog.start()
+    if settings.AUTH_MODE != "dev":
+        await revoked_tokens.start()
+    rate_limit_buckets = shared_buckets()
+    if rate_limit_buckets is not None:
+        rate_limit_buckets.start()
+
     logger.info(f"API server ready at http://{settings.API_HOST}:{settings.API_PORT}")
     logger.info(
         f"Documentation available at http://{settings.API_HOST}:{settings.API_PORT}/docs"
@@ -84,8 +127,22 @@ async def lifespan(app: FastAPI):
 
     # Shutdown
     logger.info("Shutting down application...")
+    if settings.LOOP_WATCHDOG_ENABLED:
+        loop_watchdog.stop()
+    revoked_tokens.stop()
+    if rate_limit_buckets is not None:
+        rate_limit_buckets.stop()
+    if snapshot_writer is not None:
+        snapshot_writer.stop()
+    if settings.SLOW_QUERY_ENABLED:
+        slow_query_log.stop()
+        dump_path = settings.SLOW_QUERY_DUMP_PATH
+        if dump_path:
+            dump_path = dump_path.replace("{pid}", str(os.getpid()))
+        slow_query_log.dump(dump_path)
     db_manager.close()
     logger.info("Application shutdown complete")
+    shutdown_logging()
 
 
 def create_app() -> FastAPI:
@@ -105,6 +162,12 @@ def create_app() -> FastAPI:
         redoc_url="/redoc" if settings.is_development() else None,
     )
 
+    # Request deadlines: statement_timeout per transaction, cancel on
+    # disconnect, 504 on expiry. Innermost, next to the routes.
+    app.add_middleware(DeadlineMiddleware)
+    app.add_exception_handler(DeadlineExceeded, deadline_exceeded_handler)
+    install_deadline_hooks()
+
     # CORS middleware for development
     if settings.is_development():
         app.add_middleware(
@@ -115,34 +178,82 @@ def create_app() -> FastAPI:
             allow_headers=["*"],
         )
 
-    # Logging middleware to trace requests
-    @app.middleware("http")
-    async def log_requests(request, call_next):
-        logger = logging.getLogger(__name__)
-        logger.info(f"--> Request: {request.method} {request.url.path}")
-        logger.info(f"    Headers: {request.headers}")
-        response = await call_next(request)
-        logger.info(f"<-- Response: {response.status_code}")
-        return response
-
-    # Global error handling middleware
-    @app.middleware("http")
-    async def log_server_errors(request, call_next):
-        logger = logging.getLogger(__name__)
-        try:
-            return await call_next(request)
-        except Exception as e:
-            logger.error("="*30)
-            logger.error(f"Unhandled server error: {e}", exc_info=True)
-            logger.error("="*30)
-            return JSONResponse(
-                status_code=500,
-                content={"detail": "An internal server error occurred."},
-            )
+    # Response compression (gzip / brotli / zstd)
+    if settings.COMPRESSION_ENABLED:
+        app.add_middleware(
+            CompressionMiddleware,
+            minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+            gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+            brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+            zstd_level=settings.COMPRESSION_ZSTD_LEVEL,
+        )
+
+    # Adaptive concurrency limit: sheds excess load with 503 before it queues.
+    # Inside the request-context middleware, so shed requests are logged.
+    if settings.CONCURRENCY_LIMIT_ENABLED:
+        concurrency_limiter = ConcurrencyLimiter(
+            AIMDLimit(
+                settings.CONCURRENCY_LIMIT_INITIAL,
+                settings.CONCURRENCY_LIMIT_MIN,
+                settings.CONCURRENCY_LIMIT_MAX,
+                settings.CONCURRENCY_LATENCY_THRESHOLD_MS / 1000,
+            ),
+            settings.CONCURRENCY_FAIR_SHARE_AT,
+        )
+        app.add_middleware(
+            ConcurrencyLimitMiddleware,
+            limiter=concurrency_limiter,
+            exempt_paths=[
+                p.strip()
+                for p in settings.CONCURRENCY_EXEMPT_PATHS.split(",")
+                if p.strip()
+            ]
+            # Batches are admitted per sub-request (server.api.batch).
+            + ["/api/v1/batch"],
+        )
+        if settings.METRICS_ENABLED:
+            watch_concurrency(concurrency_limiter)
+
+    # Request id, access logging, timing and the catch-all 500 handler.
+    # Added last so it wraps everything else.
+    query_auditor = None
+    if settings.QUERY_AUDIT_SAMPLE_RATE > 0:
+        query_auditor = QueryAuditor(
+            settings.QUERY_AUDIT_SAMPLE_RATE,
+            settings.QUERY_AUDIT_MAX_QUERIES,
+            settings.QUERY_AUDIT_REPEAT_THRESHOLD,
+        )
+    app.add_middleware(
+        RequestContextMiddleware,
+        record_metrics=settings.METRICS_ENABLED,
+        server_timing=settings.SERVER_TIMING,
+        query_auditor=query_auditor,
+        trace_store=trace_store if settings.SQL_TRACE_ENABLED else None,
+        profiling=settings.PROFILER_ENABLED,
+    )
+
+    # Drop cached user contexts when users or memberships change
+    install_invalidation_hooks()
+
+    # SQL timing hooks shared by metrics and diagnostics
+    install_statement_hooks()
+    if query_auditor is not None:
+        add_statement_observer(record_request_query)
+    if settings.SQL_TRACE_ENABLED:
+        add_statement_observer(record_trace_statement)
+    if settings.SLOW_QUERY_ENABLED:
+        add_statement_observer(slow_query_log)
+    if settings.LOOP_WATCHDOG_ENABLED:
+        add_statement_observer(record_loop_statement)
 
     # Include API routes
     app.include_router(api_router)
 
+    # Prometheus metrics
+    if settings.METRICS_ENABLED:
+        add_statement_observer(record_statement)
+        app.include_router(metrics.router, include_in_schema=False)
+
     # Root redirect to documentation
     @app.get("/", include_in_schema=False)
     async def root():
@@ -182,6 +293,7 @@ def main():
             host=settings.API_HOST,
             port=settings.API_PORT,
             log_level=settings.LOG_LEVEL.lower(),
+            log_config=None,  # uvicorn's loggers propagate to our pipeline
             reload=settings.API_RELOAD,
             access_log=settings.is_development(),
         )
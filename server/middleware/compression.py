@@ -0,0 +1,266 @@
+"""
+Negotiated response compression (zstd / brotli / gzip) as pure ASGI middleware.
+
+- The encoding is picked from ``Accept-Encoding`` (q-values respected) among
+  those available: gzip always, brotli if the ``brotli`` package is
+  installed, zstd if ``zstandard`` is installed.
+- Single-body responses are compressed only when they are at least
+  ``minimum_size`` bytes; large bodies are compressed in a worker thread.
+- Streaming responses (``more_body``) are compressed chunk by chunk and
+  flushed per chunk, so NDJSON/CSV exports stay streaming.
+- Responses that already carry a ``Content-Encoding``, bodiless responses
+  and non-compressible media types are passed through untouched.
+"""
+
+import logging
+import zlib
+from typing import Dict, List, Optional, Protocol, Tuple
+
+import anyio.to_thread
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:  # Optional dependency
+    import brotli
+except ImportError:  # pragma: no cover - depends on environment
+    brotli = None
+
+try:  # Optional dependency
+    import zstandard
+except ImportError:  # pragma: no cover - depends on environment
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+EXCLUDED_CONTENT_TYPES = (
+    "application/gzip",
+    "application/x-gzip",
+    "application/zip",
+    "application/zstd",
+    "audio/",
+    "font/woff",
+    "image/",
+    "text/event-stream",
+    "video/",
+)
+
+
+class Compressor(Protocol):
+    def compress(self, data: bytes) -> bytes: ...
+
+    def flush(self) -> bytes: ...
+
+    def finish(self) -> bytes: ...
+
+
+class _GzipCompressor:
+    def __init__(self, level: int):
+        self._obj = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.compress(data)
+
+    def flush(self) -> bytes:
+        return self._obj.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._obj.flush(zlib.Z_FINISH)
+
+
+class _BrotliCompressor:
+    def __init__(self, quality: int):
+        self._obj = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.process(data)
+
+    def flush(self) -> bytes:
+        return self._obj.flush()
+
+    def finish(self) -> bytes:
+        return self._obj.finish()
+
+
+class _ZstdCompressor:
+    def __init__(self, level: int):
+        self._obj = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.compress(data)
+
+    def flush(self) -> bytes:
+        return self._obj.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self._obj.flush(zstandard.COMPRESSOBJ_FLUSH_FINISH)
+
+
+def available_encodings() -> List[str]:
+    """Returns the supported encodings in server preference order."""
+    encodings = []
+    if zstandard is not None:
+        encodings.append("zstd")
+    if brotli is not None:
+        encodings.append("br")
+    encodings.append("gzip")
+    return encodings
+
+
+def make_compressor(encoding: str, levels: Dict[str, int]) -> Compressor:
+    """Creates a streaming compressor for the given content-coding."""
+    if encoding == "zstd":
+        return _ZstdCompressor(levels["zstd"])
+    if encoding == "br":
+        return _BrotliCompressor(levels["br"])
+    return _GzipCompressor(levels["gzip"])
+
+
+def negotiate_encoding(accept_encoding: str, supported: List[str]) -> Optional[str]:
+    """
+    Picks the best supported content-coding from an Accept-Encoding header.
+    Ties on q-value are broken by the server preference order in `supported`.
+    """
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[token] = q
+    wildcard = weights.get("*", 0.0)
+    best: Optional[Tuple[float, int, str]] = None
+    for rank, encoding in enumerate(supported):
+        q = weights.get(encoding, wildcard)
+        if q <= 0:
+            continue
+        candidate = (q, -rank, encoding)
+        if best is None or candidate > best:
+            best = candidate
+    return best[2] if best else None
+
+
+class CompressionMiddleware:
+    """ASGI middleware that compresses HTTP responses per Accept-Encoding."""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        *,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+        zstd_level: int = 3,
+        thread_minimum_size: int = 256 * 1024,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.thread_minimum_size = thread_minimum_size
+        self.levels = {"gzip": gzip_level, "br": brotli_quality, "zstd": zstd_level}
+        self.supported = available_encodings()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(
+            Headers(scope=scope).get("accept-encoding", ""), self.supported
+        )
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        responder = _CompressionResponder(self, encoding, send)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressionResponder:
+    """Per-request state: holds the start message until the first body chunk."""
+
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send: Send):
+        self.middleware = middleware
+        self.encoding = encoding
+        self.downstream = send
+        self.start_message: Optional[Message] = None
+        self.compressor: Optional[Compressor] = None
+        self.passthrough = False
+
+    def _is_compressible(self, headers: Headers) -> bool:
+        if "content-encoding" in headers:
+            return False
+        content_type = headers.get("content-type", "")
+        return not content_type.startswith(EXCLUDED_CONTENT_TYPES)
+
+    async def send(self, message: Message) -> None:
+        message_type = message["type"]
+        if message_type == "http.response.start":
+            self.start_message = message
+            self.passthrough = not self._is_compressible(
+                Headers(raw=message["headers"])
+            )
+            return
+        if message_type != "http.response.body":
+            await self.downstream(message)
+            return
+        if self.passthrough:
+            await self._flush_start()
+            await self.downstream(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.compressor is None:
+            if not more_body:
+                await self._send_single(body)
+                return
+            # First chunk of a streaming response: switch to streamed encoding.
+            self.compressor = make_compressor(self.encoding, self.middleware.levels)
+            headers = MutableHeaders(raw=self.start_message["headers"])
+            del headers["content-length"]
+            self._mark_encoded(headers)
+            await self._flush_start()
+
+        chunk = self.compressor.compress(body)
+        chunk += self.compressor.flush() if more_body else self.compressor.finish()
+        await self.downstream(
+            {"type": "http.response.body", "body": chunk, "more_body": more_body}
+        )
+
+    async def _send_single(self, body: bytes) -> None:
+        headers = MutableHeaders(raw=self.start_message["headers"])
+        if len(body) < self.middleware.minimum_size:
+            await self._flush_start()
+            await self.downstream({"type": "http.response.body", "body": body})
+            return
+        if len(body) >= self.middleware.thread_minimum_size:
+            compressed = await anyio.to_thread.run_sync(self._compress_all, body)
+        else:
+            compressed = self._compress_all(body)
+        self._mark_encoded(headers)
+        headers["content-length"] = str(len(compressed))
+        await self._flush_start()
+        await self.downstream({"type": "http.response.body", "body": compressed})
+
+    def _mark_encoded(self, headers: MutableHeaders) -> None:
+        headers["content-encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        # The encoded bytes differ from the identity representation, so a
+        # strong validator no longer holds (RFC 9110 8.8.1).
+        etag = headers.get("etag")
+        if etag and not etag.startswith("W/"):
+            headers["etag"] = f"W/{etag}"
+
+    def _compress_all(self, body: bytes) -> bytes:
+        compressor = make_compressor(self.encoding, self.middleware.levels)
+        return compressor.compress(body) + compressor.finish()
+
+    async def _flush_start(self) -> None:
+        if self.start_message is not None:
+            await self.downstream(self.start_message)
+            self.start_message = None
@@ -0,0 +1,234 @@
+"""
+Adaptive concurrency limit with load shedding (pure ASGI).
+
+When the database slows down, requests would otherwise queue for worker
+threads and pool connections until they time out: every request is late,
+including the ones that eventually succeed. Instead, at most ``limit``
+requests are in progress at once, and the rest are answered at once with
+``503 Service Unavailable`` and ``Retry-After``.
+
+The limit adapts with AIMD (additive increase, multiplicative decrease):
+
+- a response that started within the latency threshold, while at least
+  half the limit was in use, raises the limit by ``1 / limit``, i.e. about
+  one per round of requests;
+- a slower response multiplies it by ``backoff``, at most once per
+  threshold interval so that one slow batch counts once.
+
+Fair share: once ``fair_share_at`` of the limit is in use, a tenant
+already holding ``limit / active tenants`` slots is shed, so one heavy
+owner org cannot take every slot from the others. Tenants are the user's
+first org, if it is already in the user cache, else the user (from a
+verified token or the dev headers), else the client IP.
+
+Health, metrics and debug endpoints (``exempt_paths``) bypass the limit.
+So does ``POST /api/v1/batch`` itself: the middleware is stored in the
+scope under ``"concurrency_limit"`` and the batch runner admits each
+sub-request through `ConcurrencyLimitMiddleware.admit`, one slot and one
+latency sample per sub-request.
+"""
+
+import json
+import logging
+import threading
+import time
+from typing import Dict, Optional, Sequence
+
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from server.config import settings
+from server.core.metrics import Counter, registry
+from server.core.tokens import InvalidToken, token_verifier
+from server.domain.user_cache import user_contexts
+
+logger = logging.getLogger(__name__)
+
+requests_shed = Counter(
+    "requests_shed_total",
+    "Requests answered with 503 by the concurrency limiter",
+    ["reason"],
+)
+
+
+class AIMDLimit:
+    """Concurrency limit adjusted from response latency."""
+
+    def __init__(
+        self,
+        initial: int,
+        min_limit: int,
+        max_limit: int,
+        latency_threshold: float,
+        backoff: float = 0.9,
+    ):
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_threshold = latency_threshold
+        self.backoff = backoff
+        self._last_decrease = float("-inf")
+
+    def on_sample(self, latency: float, inflight: int, now: float) -> None:
+        if latency > self.latency_threshold:
+            if now - self._last_decrease >= self.latency_threshold:
+                self.limit = max(self.min_limit, self.limit * self.backoff)
+                self._last_decrease = now
+        elif inflight * 2 >= self.limit:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+
+class ConcurrencyLimiter:
+    """Admits requests up to the adaptive limit, with per-tenant fair shares."""
+
+    def __init__(self, limit: AIMDLimit, fair_share_at: float):
+        self.limit = limit
+        self.fair_share_at = fair_share_at
+        self.inflight = 0
+        self._tenants: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def try_acquire(self, tenant: str) -> Optional[str]:
+        """Takes a slot for ``tenant``; returns why the request must be shed, if so."""
+        with self._lock:
+            limit = int(self.limit.limit)
+            if self.inflight >= limit:
+                return "limit"
+            held = self._tenants.get(tenant, 0)
+            if self.inflight >= limit * self.fair_share_at:
+                active = len(self._tenants) + (0 if held else 1)
+                if held >= max(1.0, limit / active):
+                    return "fair_share"
+            self.inflight += 1
+            self._tenants[tenant] = held + 1
+            return None
+
+    def release(self, tenant: str, latency: float) -> None:
+        with self._lock:
+            self.inflight -= 1
+            held = self._tenants[tenant] - 1
+            if held:
+                self._tenants[tenant] = held
+            else:
+                del self._tenants[tenant]
+            self.limit.on_sample(latency, self.inflight + 1, time.monotonic())
+
+    def tenants(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._tenants)
+
+
+def watch_concurrency(limiter: ConcurrencyLimiter) -> None:
+    """Reports the current limit and requests in progress."""
+
+    def collect():
+        yield (
+            "concurrency_limit",
+            "gauge",
+            "Current adaptive concurrency limit.",
+            {},
+            int(limiter.limit.limit),
+        )
+        yield (
+            "concurrency_inflight",
+            "gauge",
+            "Requests holding a concurrency slot.",
+            {},
+            limiter.inflight,
+        )
+
+    registry.add_collector(collect)
+
+
+def tenant_of(scope: Scope) -> str:
+    """Fairness key of a request, derived without I/O."""
+    headers = Headers(scope=scope)
+    authorization = headers.get("authorization", "")
+    user_id = None
+    if settings.AUTH_MODE == "dev":
+        if authorization.lower().startswith("bearer dev:"):
+            user_id = authorization.split(":", 2)[1] or None
+        else:
+            user_id = headers.get("x-dev-user")
+    elif authorization.lower().startswith("bearer "):
+        try:
+            user_id = token_verifier.verify(authorization[7:].strip())["sub"]
+        except InvalidToken:
+            pass
+    if user_id:
+        cached = user_contexts.peek(user_id)
+        if cached is not None and cached.org_ids:
+            return f"org:{cached.org_ids[0]}"
+        return f"user:{user_id}"
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}"
+
+
+class ConcurrencyLimitMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        limiter: ConcurrencyLimiter,
+        exempt_paths: Sequence[str] = (),
+        retry_after: int = 1,
+    ):
+        self.app = app
+        self.limiter = limiter
+        self.exempt_paths = tuple(exempt_paths)
+        self.retry_after = retry_after
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        scope["concurrency_limit"] = self
+        await self.admit(scope, receive, send, self.app)
+
+    async def admit(
+        self, scope: Scope, receive: Receive, send: Send, app: ASGIApp
+    ) -> None:
+        """Runs ``app`` for the request while holding a slot, or sheds it."""
+        if scope["path"].startswith(self.exempt_paths):
+            await app(scope, receive, send)
+            return
+
+        tenant = tenant_of(scope)
+        reason = self.limiter.try_acquire(tenant)
+        if reason is not None:
+            requests_shed.inc(reason)
+            await self._shed(send)
+            return
+
+        started = time.perf_counter()
+        latency: Optional[float] = None
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal latency
+            if message["type"] == "http.response.start":
+                latency = time.perf_counter() - started
+            await send(message)
+
+        try:
+            await app(scope, receive, send_wrapper)
+        finally:
+            # The slot is held until the body is sent (exports keep their
+            # connection); the latency sample is the time to the first byte.
+            self.limiter.release(
+                tenant,
+                latency if latency is not None else time.perf_counter() - started,
+            )
+
+    async def _shed(self, send: Send) -> None:
+        body = json.dumps({"detail": "Server is busy, please retry"}).encode()
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 503,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"retry-after", str(self.retry_after).encode()),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
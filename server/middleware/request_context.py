@@ -0,0 +1,193 @@
+"""
+Request context middleware (pure ASGI).
+
+Replaces the two ``@app.middleware("http")`` layers (request logging and
+the catch-all 500 handler). Those ran through ``BaseHTTPMiddleware``,
+which spawns a task and an in-memory stream per request and buffers the
+interaction with streaming responses and background tasks. This version
+wraps ``send`` instead:
+
+- assigns a request id (a valid incoming ``X-Request-ID`` or a new one),
+  exposes it to logging via `request_id_var` and echoes it in the response;
+- logs the request line, and the status and duration once the last body
+  chunk has been sent (so streaming responses are timed to completion);
+- turns unhandled exceptions into a JSON 500 if the response has not
+  started yet;
+- records request and per-route DB metrics (`server.core.metrics`) and,
+  when allowed, reports the request's timing breakdown as a
+  ``Server-Timing`` header (`server.core.timing`);
+- audits a sample of requests for query budgets and N+1 patterns
+  (`server.core.query_audit`);
+- captures on-demand SQL traces and CPU profiles for debug requests
+  (`server.core.sql_trace`, `server.core.profiler`);
+- measures per-route allocations while the test harness in
+  `server.core.memory` is recording.
+"""
+
+import logging
+import re
+import time
+import uuid
+from typing import Optional
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders, QueryParams
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from server.core import memory
+from server.core.logging import request_id_var
+from server.core.metrics import (
+    RequestStats,
+    current_request_stats,
+    observe_request,
+    route_template,
+)
+from server.core.profiler import (
+    PROFILE_HEADER,
+    PROFILE_PATH,
+    finish_profile,
+    sampler,
+    start_request_profile,
+)
+from server.core.query_audit import QueryAuditor
+from server.core.security import is_debug_request
+from server.core.sql_trace import (
+    TRACE_HEADER,
+    TRACE_PATH,
+    TraceStore,
+    requested_trace_mode,
+    start_trace,
+)
+from server.core.timing import SERVER_TIMING_HEADER, format_server_timing
+
+logger = logging.getLogger(__name__)
+
+REQUEST_ID_HEADER = "x-request-id"
+_VALID_REQUEST_ID = re.compile(r"[A-Za-z0-9._:-]{1,128}")
+
+
+def resolve_request_id(incoming: Optional[str]) -> str:
+    """Reuses a well-formed client/proxy request id, otherwise makes a new one."""
+    if incoming and _VALID_REQUEST_ID.fullmatch(incoming):
+        return incoming
+    return uuid.uuid4().hex
+
+
+class RequestContextMiddleware:
+    """Request id, access logging, timing and last-resort error handling."""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        record_metrics: bool = True,
+        server_timing: str = "off",
+        query_auditor: Optional[QueryAuditor] = None,
+        trace_store: Optional[TraceStore] = None,
+        profiling: bool = False,
+    ):
+        self.app = app
+        self.record_metrics = record_metrics
+        self.server_timing = server_timing
+        self.query_auditor = query_auditor
+        self.trace_store = trace_store
+        self.profiling = profiling
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        request_id = resolve_request_id(headers.get(REQUEST_ID_HEADER))
+        expose_timing = self.server_timing == "always" or (
+            self.server_timing == "debug" and is_debug_request(headers)
+        )
+        token = request_id_var.set(request_id)
+        stats = RequestStats()
+        stats_token = current_request_stats.set(stats)
+        if self.query_auditor is not None:
+            self.query_auditor.start(stats)
+        scope.setdefault("state", {})["request_id"] = request_id
+        method, path = scope["method"], scope["path"]
+        if self.trace_store is not None:
+            trace_mode = requested_trace_mode(
+                headers, QueryParams(scope["query_string"])
+            )
+            if trace_mode is not None and is_debug_request(headers):
+                stats.trace = start_trace(request_id, method, path, trace_mode)
+        if (
+            self.profiling
+            and headers.get(PROFILE_HEADER, "").lower() in ("1", "true")
+            and is_debug_request(headers)
+        ):
+            stats.profile = start_request_profile(request_id)
+        allocations = memory.route_recorder
+        allocated_before = allocations.start() if allocations is not None else 0
+        start = time.perf_counter()
+        status_code: Optional[int] = None
+        logger.info("--> Request: %s %s", method, path)
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                response_headers = MutableHeaders(scope=message)
+                response_headers.append(REQUEST_ID_HEADER, request_id)
+                if expose_timing:
+                    response_headers.append(
+                        SERVER_TIMING_HEADER,
+                        format_server_timing(stats, time.perf_counter() - start),
+                    )
+                if stats.trace is not None:
+                    response_headers.append(
+                        TRACE_HEADER, TRACE_PATH.format(request_id=request_id)
+                    )
+                if stats.profile is not None:
+                    response_headers.append(
+                        PROFILE_HEADER, PROFILE_PATH.format(profile_id=request_id)
+                    )
+            final = message["type"] == "http.response.body" and not message.get(
+                "more_body", False
+            )
+            if final and stats.trace is not None and self.trace_store is not None:
+                # Stored before the last chunk goes out, so the client can
+                # fetch it right away.
+                trace, stats.trace = stats.trace, None
+                await run_in_threadpool(
+                    self.trace_store.save,
+                    trace,
+                    status_code,
+                    time.perf_counter() - start,
+                )
+            if final and stats.profile is not None:
+                profile, stats.profile = stats.profile, None
+                await run_in_threadpool(finish_profile, profile)
+            await send(message)
+            if final:
+                duration = time.perf_counter() - start
+                logger.info("<-- Response: %s (%.1f ms)", status_code, duration * 1000)
+                if self.record_metrics:
+                    observe_request(scope, status_code, duration, stats)
+                if self.query_auditor is not None and stats.queries is not None:
+                    self.query_auditor.finish(route_template(scope), stats)
+                if allocations is not None:
+                    allocations.finish(route_template(scope), allocated_before)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception as e:
+            logger.error("Unhandled server error: %s", e, exc_info=True)
+            if status_code is not None:
+                # Headers are already on the wire; let the server close the connection.
+                raise
+            response = JSONResponse(
+                status_code=500,
+                content={"detail": "An internal server error occurred."},
+            )
+            await response(scope, receive, send_wrapper)
+        finally:
+            if stats.profile is not None:
+                sampler.remove(stats.profile)
+            current_request_stats.reset(stats_token)
+            request_id_var.reset(token)
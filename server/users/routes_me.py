@@ -1,17 +1,18 @@
 from fastapi import APIRouter, Depends
 
 from server.auth.context import UserContext, get_current_user
+from server.auth.policy import policy
+from server.core.timing import TimedRoute
 from server.domain.schemas.user import Bootstrap, Permissions, User
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
 
 @router.get("", response_model=User)
 async def read_current_user(current_user: UserContext = Depends(get_current_user)):
     """
-    Get the profile of the currently authenticated user.
-    TODO(strict): Enrich user profile with details from the database
-    (e.g., ops.users, user_orgs) to include organization info.
+    Get the profile of the currently authenticated user, including the
+    organizations they belong to.
     """
     return User(
         id=current_user.id,
@@ -28,28 +29,11 @@ async def read_current_user_permissions(
     current_user: UserContext = Depends(get_current_user),
 ):
     """
-    Get the permissions (scopes) for the currently authenticated user.
-    DEV: This is a simple hardcoded role-to-scope mapping.
-    TODO(strict): Replace with a proper policy/permissions service that
-    can map roles and user attributes to a fine-grained list of scopes.
+    Get the permissions (scopes) for the currently authenticated user: every
+    scope their roles grant at any level (see server.auth.policy), computed
+    once per user and policy version.
     """
-    # DEV mode: Hardcoded role -> scope mapping
-    scope_map = {
-        "DRIVER": ["site:read", "assignment:read"],
-        "OWNER": ["crane:read", "assignment:read", "maintenance:read"],
-        "SAFETY_MANAGER": [
-            "site:read",
-            "crane:assign",
-            "driver:assign",
-            "request:review",
-        ],
-    }
-
-    user_scopes = set()
-    for role in current_user.roles:
-        user_scopes.update(scope_map.get(role, []))
-
-    return Permissions(scopes=list(user_scopes))
+    return Permissions(scopes=policy.scopes_for(current_user))
 
 
 @router.get("/bootstrap", response_model=Bootstrap)
@@ -95,6 +95,24 @@ CREATE TABLE ops.users (
   updated_at  TIMESTAMPTZ NOT NULL DEFAULT now()
 );
 
+-- Access tokens revoked before they expire (logout), see server.domain.revocations
+CREATE TABLE ops.revoked_tokens (
+  id          BIGSERIAL PRIMARY KEY,
+  jti         TEXT UNIQUE NOT NULL,
+  user_id     TEXT,
+  expires_at  TIMESTAMPTZ NOT NULL,
+  revoked_at  TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+-- Rate limit token buckets shared by all workers, see server.api.rate_limits.
+-- Unlogged: losing them in a crash only resets the limits.
+CREATE UNLOGGED TABLE ops.rate_limit_buckets (
+  key         TEXT PRIMARY KEY,
+  tokens      DOUBLE PRECISION NOT NULL,
+  updated_at  DOUBLE PRECISION NOT NULL,
+  allowed     BOOLEAN NOT NULL
+);
+
 -- Organizations (crane owners, manufacturers)
 CREATE TABLE ops.orgs (
   id          TEXT PRIMARY KEY DEFAULT uuid_generate_v4()::text,
@@ -257,6 +275,10 @@ CREATE TABLE ops.requests (
 CREATE INDEX idx_users_role ON ops.users(role);
 CREATE INDEX idx_users_active ON ops.users(is_active);
 
+-- Revoked tokens
+CREATE INDEX idx_revoked_tokens_expires ON ops.revoked_tokens(expires_at);
+CREATE INDEX idx_revoked_tokens_revoked ON ops.revoked_tokens(revoked_at);
+
 -- User-org relationships
 CREATE INDEX idx_user_orgs_org ON ops.user_orgs(org_id);
 
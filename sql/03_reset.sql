@@ -16,7 +16,9 @@ cranes,
 user_orgs,
 sites,
 orgs,
-users
+users,
+revoked_tokens,
+rate_limit_buckets
 RESTART IDENTITY CASCADE;
 
 
@@ -1,6 +1,23 @@
+from contextlib import contextmanager
+
 import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from server.api.rate_limits import reset_rate_limits
+from server.config import settings
+from server.core.loop_watchdog import BlockingCallRecorder
+from server.core.memory import record_route_allocations
+from server.core.query_audit import QueryRecorder
+from server.core.tokens import key_store
+from server.database import get_db
+from server.domain.models import Base
+from server.main import app
 from tests.e2e.client import ApiClient
 
+
 @pytest.fixture(scope="session")
 def api_client() -> ApiClient:
     """
@@ -8,3 +25,117 @@ def api_client() -> ApiClient:
     This ensures that all tests in a session share the same client instance.
     """
     return ApiClient()
+
+
+@pytest.fixture
+def sqlite_engine():
+    """
+    A fresh in-memory SQLite database with every table created. Tables of
+    the ``ops`` schema are created without a schema.
+    """
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+        execution_options={"schema_translate_map": {"ops": None}},
+    )
+    Base.metadata.create_all(bind=engine)
+    try:
+        yield engine
+    finally:
+        engine.dispose()
+
+
+@pytest.fixture
+def sqlite_sessions(sqlite_engine):
+    """Session factory bound to `sqlite_engine`."""
+    return sessionmaker(autocommit=False, autoflush=False, bind=sqlite_engine)
+
+
+@pytest.fixture
+def sqlite_db(sqlite_sessions):
+    """A session on the test database, closed after the test."""
+    with sqlite_sessions() as session:
+        yield session
+
+
+@pytest.fixture
+def client(sqlite_db):
+    """A client for the app whose `get_db` yields `sqlite_db`."""
+    app.dependency_overrides[get_db] = lambda: sqlite_db
+    try:
+        yield TestClient(app)
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+
+
+@pytest.fixture
+def query_budget():
+    """
+    Records the SQL statements executed inside the block and fails on an
+    N+1 pattern or when more than `max_queries` statements ran:
+
+        with query_budget(max_queries=2):
+            client.get("/api/v1/org/cranes")
+    """
+
+    @contextmanager
+    def budget(max_queries=None, n_plus_one_threshold=3):
+        with QueryRecorder() as recorder:
+            yield recorder
+        recorder.assert_budget(max_queries, n_plus_one_threshold)
+
+    return budget
+
+
+@pytest.fixture
+def route_allocations():
+    """
+    Measures the net and peak traced memory of every request made during
+    the test, per route template:
+
+        client.get("/api/v1/org/cranes")
+        route_allocations.assert_budget("/api/v1/org/cranes", max_peak_bytes=2_000_000)
+    """
+    with record_route_allocations() as recorder:
+        yield recorder
+
+
+@pytest.fixture
+def strict_event_loop():
+    """
+    Fails the test if a blocking call runs on the event loop during it, e.g.
+    an ``async def`` route or dependency called the sync Session directly,
+    ``time.sleep`` or ``open``.
+    """
+    with BlockingCallRecorder() as recorder:
+        yield recorder
+    recorder.assert_clean()
+
+
+@pytest.fixture(autouse=True)
+def fresh_rate_limits():
+    """Starts every test with full rate-limit buckets."""
+    reset_rate_limits()
+    yield
+
+
+@pytest.fixture
+def debug_headers(monkeypatch):
+    """Configures a DEBUG_TOKEN and returns the headers that unlock debug output."""
+    monkeypatch.setattr(settings, "DEBUG_TOKEN", "s3cret")
+    return {"X-Debug-Token": "s3cret"}
+
+
+@pytest.fixture
+def jwt_signing_key(tmp_path, monkeypatch):
+    """Runs the test in strict auth mode with a raw JWT secret file."""
+    path = tmp_path / "jwt-secret"
+    path.write_bytes(b"test-secret-" * 4)
+    monkeypatch.setattr(settings, "AUTH_MODE", "strict")
+    monkeypatch.setattr(key_store, "keys_file", None)
+    monkeypatch.setattr(key_store, "secret_file", str(path))
+    monkeypatch.setattr(key_store, "signing_kid", None)
+    monkeypatch.setattr(key_store, "_loaded_at", float("-inf"))
+    monkeypatch.setattr(key_store, "_mtime", None)
+    return path
@@ -0,0 +1,165 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event, func, select
+
+from server.config import settings
+from server.database import db_manager
+from server.domain.models import Site, User
+from server.domain.schemas import UserRole
+from server.main import app
+
+
+@pytest.fixture
+def sqlite_engine(sqlite_engine):
+    # pysqlite needs explicit BEGIN for SAVEPOINT-based nesting to work.
+    with sqlite_engine.connect() as connection:
+        connection.connection.driver_connection.isolation_level = None
+    event.listen(sqlite_engine, "begin", lambda conn: conn.exec_driver_sql("BEGIN"))
+    return sqlite_engine
+
+
+@pytest.fixture
+def client(sqlite_engine, sqlite_sessions, monkeypatch):
+    with sqlite_sessions() as db:
+        db.add_all(
+            [
+                User(
+                    id="sm1",
+                    email="sm@example.com",
+                    name="SM",
+                    hashed_password="x",
+                    role=UserRole.SAFETY_MANAGER,
+                ),
+                User(
+                    id="mfr1",
+                    email="mfr@example.com",
+                    name="MFR",
+                    hashed_password="x",
+                    role=UserRole.MANUFACTURER,
+                ),
+            ]
+        )
+        db.commit()
+    monkeypatch.setattr(db_manager, "engine", sqlite_engine)
+    monkeypatch.setattr(db_manager, "SessionLocal", sqlite_sessions)
+    return TestClient(app)
+
+
+def site_count(sessions):
+    with sessions() as db:
+        return db.scalar(select(func.count()).select_from(Site))
+
+
+SITE_BODY = {
+    "name": "Batch Site",
+    "start_date": "2025-01-01",
+    "end_date": "2025-06-30",
+    "requested_by_id": "sm1",
+}
+
+
+@pytest.mark.parametrize("transaction", [False, True])
+def test_batch_resolves_references(client, sqlite_sessions, transaction):
+    # Arrange
+    payload = {
+        "transaction": transaction,
+        "requests": [
+            {"id": "site", "method": "POST", "path": "/org/sites", "body": SITE_BODY},
+            {
+                "method": "PATCH",
+                "path": "/org/sites/${site.body.id}",
+                "body": {"status": "ACTIVE", "approved_by_id": "mfr1"},
+            },
+            {
+                "path": "/org/sites",
+                "query": {"mine": True, "user_id": "sm1", "fields": "id,status"},
+            },
+        ],
+    }
+
+    # Act
+    response = client.post("/api/v1/batch", json=payload)
+
+    # Assert
+    assert response.status_code == 200
+    data = response.json()
+    statuses = [item["status"] for item in data["responses"]]
+    assert statuses == [201, 200, 200]
+    site_id = data["responses"][0]["body"]["id"]
+    assert data["responses"][1]["body"]["status"] == "ACTIVE"
+    assert data["responses"][2]["body"] == [{"id": site_id, "status": "ACTIVE"}]
+    assert data["committed"] is (True if transaction else None)
+    assert site_count(sqlite_sessions) == 1
+
+
+def test_batch_transaction_rolls_back_on_failure(client, sqlite_sessions):
+    # Arrange
+    payload = {
+        "transaction": True,
+        "requests": [
+            {"id": "site", "method": "POST", "path": "/org/sites", "body": SITE_BODY},
+            {
+                "method": "PATCH",
+                "path": "/org/sites/${site.body.id}",
+                "body": {"status": "ACTIVE", "approved_by_id": "sm1"},
+            },
+            {"path": "/org/sites"},
+        ],
+    }
+
+    # Act
+    response = client.post("/api/v1/batch", json=payload)
+
+    # Assert
+    data = response.json()
+    assert [item["status"] for item in data["responses"]] == [201, 403, 424]
+    assert data["committed"] is False
+    assert site_count(sqlite_sessions) == 0
+
+
+def test_batch_reports_unroutable_and_unresolved(client):
+    # Arrange
+    payload = {
+        "requests": [
+            {"path": "/does-not-exist"},
+            {"method": "DELETE", "path": "/org/sites"},
+            {"path": "/org/sites/${0.body.id}"},
+            {
+                "method": "POST",
+                "path": "/batch",
+                "body": {"requests": [{"path": "/org/sites"}]},
+            },
+        ],
+    }
+
+    # Act
+    response = client.post("/api/v1/batch", json=payload)
+
+    # Assert
+    assert [item["status"] for item in response.json()["responses"]] == [
+        404,
+        405,
+        424,
+        400,
+    ]
+
+
+def test_batch_caps_buffered_responses_and_keeps_header_pairs(client, monkeypatch):
+    # Arrange
+    monkeypatch.setattr(settings, "BATCH_MAX_RESPONSE_BYTES", 400)
+    payload = {
+        "requests": [
+            {"method": "POST", "path": "/org/sites", "body": SITE_BODY},
+            {"method": "POST", "path": "/org/sites", "body": SITE_BODY},
+            {"path": "/org/sites"},
+        ],
+    }
+
+    # Act
+    response = client.post("/api/v1/batch", json=payload)
+
+    # Assert
+    created, _, listed = response.json()["responses"]
+    assert [created["status"], listed["status"]] == [201, 413]
+    assert ["content-type", "application/json"] in created["headers"]
+    assert listed["body"]["detail"].startswith("Response too large")
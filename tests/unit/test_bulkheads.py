@@ -0,0 +1,114 @@
+import threading
+import time
+
+import anyio
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+
+from server.core.bulkheads import Bulkhead, saturation, watch_bulkheads
+from server.core.timing import TimedRoute
+
+
+def test_saturated_bulkhead_does_not_block_other_routes():
+    # Arrange
+    reports = Bulkhead("reports-test", threads=1)
+
+    class ReportRoute(TimedRoute):
+        bulkhead = reports
+
+    release = threading.Event()
+    app = FastAPI()
+    report_router = APIRouter(route_class=ReportRoute)
+
+    @report_router.get("/report")
+    def report():
+        release.wait(5)
+        return {"busy": reports.limiter.borrowed_tokens}
+
+    @app.get("/check-in")
+    def check_in():
+        return {"ok": True}
+
+    app.include_router(report_router)
+    watch_bulkheads(anyio.CapacityLimiter(4), reports)
+    responses = []
+
+    # Act
+    with TestClient(app) as client:  # one event loop for all callers
+        callers = [
+            threading.Thread(target=lambda: responses.append(client.get("/report")))
+            for _ in range(2)
+        ]
+        try:
+            for caller in callers:
+                caller.start()
+            deadline = time.monotonic() + 5
+            while (
+                reports.limiter.statistics().tasks_waiting < 1
+                and time.monotonic() < deadline
+            ):
+                time.sleep(0.01)
+            check_in_response = client.get("/check-in")
+            samples = [
+                (name, labels["bulkhead"], value)
+                for name, _, _, labels, value in saturation()
+            ]
+        finally:
+            release.set()
+            for caller in callers:
+                caller.join(5)
+
+    # Assert
+    assert check_in_response.status_code == 200
+    assert ("bulkhead_threads_busy", "reports-test", 1) in samples
+    assert ("bulkhead_tasks_waiting", "reports-test", 1) in samples
+    assert ("bulkhead_threads_max", "oltp", 4) in samples
+    assert [r.json() for r in responses] == [{"busy": 1}, {"busy": 1}]
+
+
+def test_iterate_pulls_each_item_on_the_bulkhead_threads():
+    # Arrange
+    exports = Bulkhead("exports-test", threads=1)
+    seen = []
+
+    def chunks():
+        for chunk in (b"a", b"b"):
+            seen.append(exports.limiter.borrowed_tokens)
+            yield chunk
+
+    async def collect():
+        return [chunk async for chunk in exports.iterate(chunks())]
+
+    # Act
+    result = anyio.run(collect)
+
+    # Assert
+    assert result == [b"a", b"b"]
+    assert seen == [1, 1]
+    assert exports.limiter.borrowed_tokens == 0
+
+
+def test_iterate_closes_the_iterator_on_the_bulkhead_when_cancelled():
+    # Arrange
+    exports = Bulkhead("exports-test", threads=1)
+    closed = []
+
+    def chunks():
+        try:
+            yield b"a"
+            time.sleep(0.2)
+            yield b"b"
+        finally:
+            closed.append(exports.limiter.borrowed_tokens)
+
+    async def consume():
+        with anyio.move_on_after(0.05):
+            async for _ in exports.iterate(chunks()):
+                pass
+
+    # Act
+    anyio.run(consume)
+
+    # Assert
+    assert closed == [1]
+    assert exports.limiter.borrowed_tokens == 0
@@ -0,0 +1,87 @@
+import gzip
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from fastapi.testclient import TestClient
+
+from server.middleware.compression import CompressionMiddleware, negotiate_encoding
+
+BIG = "x" * 4096
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=1024)
+
+    @app.get("/big")
+    def big():
+        return PlainTextResponse(BIG)
+
+    @app.get("/small")
+    def small():
+        return PlainTextResponse("tiny")
+
+    @app.get("/encoded")
+    def encoded():
+        return Response(
+            gzip.compress(BIG.encode()), headers={"Content-Encoding": "gzip"}
+        )
+
+    @app.get("/stream")
+    def stream():
+        return StreamingResponse(
+            (f"{i}\n" * 100 for i in range(10)), media_type="application/x-ndjson"
+        )
+
+    @app.get("/tagged")
+    def tagged():
+        return PlainTextResponse(BIG, headers={"ETag": '"v1"'})
+
+    @app.get("/tagged-stream")
+    def tagged_stream():
+        return StreamingResponse(iter([BIG, BIG]), headers={"ETag": '"v1"'})
+
+    return TestClient(app)
+
+
+def test_negotiate_encoding():
+    assert negotiate_encoding("gzip, br", ["zstd", "br", "gzip"]) == "br"
+    assert negotiate_encoding("gzip;q=1, br;q=0.5", ["br", "gzip"]) == "gzip"
+    assert negotiate_encoding("br;q=0", ["br"]) is None
+    assert negotiate_encoding("*", ["zstd", "gzip"]) == "zstd"
+    assert negotiate_encoding("", ["gzip"]) is None
+
+
+def test_compresses_above_threshold(client):
+    response = client.get("/big", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert int(response.headers["content-length"]) < len(BIG)
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert response.text == BIG
+
+
+def test_skips_small_and_already_encoded(client):
+    small = client.get("/small", headers={"Accept-Encoding": "gzip"})
+    encoded = client.get("/encoded", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in small.headers
+    assert small.text == "tiny"
+    assert encoded.headers["content-encoding"] == "gzip"
+    assert encoded.text == BIG
+
+
+def test_streams_generator_responses(client):
+    response = client.get("/stream", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert response.text == "".join(f"{i}\n" * 100 for i in range(10))
+
+
+def test_weakens_strong_etag_only_when_encoding(client):
+    single = client.get("/tagged", headers={"Accept-Encoding": "gzip"})
+    streamed = client.get("/tagged-stream", headers={"Accept-Encoding": "gzip"})
+    identity = client.get("/tagged", headers={"Accept-Encoding": "identity"})
+    assert single.headers["etag"] == 'W/"v1"'
+    assert streamed.headers["etag"] == 'W/"v1"'
+    assert identity.headers["etag"] == '"v1"'
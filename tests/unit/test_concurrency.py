@@ -0,0 +1,126 @@
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+
+from server.api.routers import batch
+from server.config import settings
+from server.middleware.concurrency import (
+    AIMDLimit,
+    ConcurrencyLimiter,
+    ConcurrencyLimitMiddleware,
+    tenant_of,
+)
+
+
+def test_aimd_limit_backs_off_once_per_interval_and_grows_when_busy():
+    # Arrange
+    limit = AIMDLimit(initial=10, min_limit=2, max_limit=11, latency_threshold=0.5)
+
+    # Act
+    limit.on_sample(0.9, inflight=10, now=100.0)
+    after_slow = limit.limit
+    limit.on_sample(0.9, inflight=10, now=100.1)  # same slow batch
+    limit.on_sample(0.01, inflight=1, now=101.0)  # mostly idle: no growth
+    idle = limit.limit
+    for _ in range(50):
+        limit.on_sample(0.01, inflight=9, now=101.0)
+
+    # Assert
+    assert after_slow == 9.0
+    assert idle == 9.0
+    assert limit.limit == 11  # capped at max_limit
+
+
+def test_heavy_tenant_is_held_to_its_fair_share():
+    # Arrange
+    limiter = ConcurrencyLimiter(
+        AIMDLimit(4, 1, 4, latency_threshold=1.0), fair_share_at=0.5
+    )
+
+    # Act
+    heavy = [limiter.try_acquire("org:heavy") for _ in range(3)]
+    light = limiter.try_acquire("org:light")
+    over_limit = limiter.try_acquire("org:light")
+    limiter.release("org:heavy", latency=0.01)
+    heavy_again = limiter.try_acquire("org:heavy")
+    light_again = limiter.try_acquire("org:light")
+
+    # Assert
+    assert heavy == [None, None, None] and light is None
+    assert over_limit == "limit"
+    assert heavy_again == "fair_share"
+    assert light_again is None
+    assert limiter.tenants() == {"org:heavy": 2, "org:light": 2}
+
+
+def test_excess_requests_are_shed_with_503_and_retry_after(monkeypatch):
+    # Arrange
+    monkeypatch.setattr(settings, "AUTH_MODE", "dev")
+    limiter = ConcurrencyLimiter(
+        AIMDLimit(1, 1, 1, latency_threshold=1.0), fair_share_at=1.0
+    )
+    app = FastAPI()
+    app.add_middleware(
+        ConcurrencyLimitMiddleware, limiter=limiter, exempt_paths=["/health"]
+    )
+
+    @app.get("/work")
+    def work():
+        return {"ok": True}
+
+    @app.get("/health")
+    def health():
+        return {"ok": True}
+
+    client = TestClient(app)
+
+    # Act
+    served = client.get("/work", headers={"X-Dev-User": "u1"})
+    limiter.try_acquire("user:u2")  # another request in progress
+    shed = client.get("/work", headers={"X-Dev-User": "u1"})
+    health_response = client.get("/health")
+
+    # Assert
+    assert served.status_code == 200
+    assert shed.status_code == 503 and shed.headers["Retry-After"] == "1"
+    assert health_response.status_code == 200
+    assert limiter.inflight == 1
+    assert (
+        tenant_of(
+            {"type": "http", "headers": [(b"authorization", b"Bearer dev:u3:OWNER")]}
+        )
+        == "user:u3"
+    )
+
+
+def test_batch_sub_requests_are_admitted_one_slot_each(monkeypatch):
+    # Arrange
+    monkeypatch.setattr(settings, "AUTH_MODE", "dev")
+    limiter = ConcurrencyLimiter(
+        AIMDLimit(2, 2, 2, latency_threshold=1.0), fair_share_at=1.0
+    )
+    app = FastAPI()
+    app.add_middleware(
+        ConcurrencyLimitMiddleware, limiter=limiter, exempt_paths=["/api/v1/batch"]
+    )
+    api = APIRouter(prefix="/api/v1")
+
+    @api.get("/work")
+    def work():
+        return {"inflight": limiter.inflight}
+
+    api.include_router(batch.router, prefix="/batch")
+    app.include_router(api)
+    client = TestClient(app)
+    payload = {"requests": [{"method": "GET", "path": "/work"}] * 3}
+
+    # Act
+    admitted = client.post("/api/v1/batch", json=payload)
+    limiter.try_acquire("user:u2")
+    limiter.try_acquire("user:u2")  # the limit is in use by other requests
+    shed = client.post("/api/v1/batch", json=payload)
+
+    # Assert
+    assert admitted.status_code == 200
+    assert [r["body"] for r in admitted.json()["responses"]] == [{"inflight": 1}] * 3
+    assert [r["status"] for r in shed.json()["responses"]] == [503] * 3
+    assert limiter.inflight == 2
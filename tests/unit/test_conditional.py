@@ -0,0 +1,95 @@
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from server.api.conditional import scope_version
+from server.domain.models import CraneModel
+
+
+@pytest.fixture
+def db_session(sqlite_db):
+    sqlite_db.add(
+        CraneModel(id="m1", model_name="SS1926", max_lifting_capacity_ton_m=18)
+    )
+    sqlite_db.commit()
+    return sqlite_db
+
+
+@pytest.fixture
+def client(client, db_session):
+    return client
+
+
+def test_etag_and_not_modified(client):
+    # Arrange
+    first = client.get("/api/v1/catalog/crane-models")
+    etag = first.headers["ETag"]
+
+    with patch(
+        "server.api.routers.crane_models.crane_model_service.get_models"
+    ) as mock_get:
+        # Act
+        second = client.get(
+            "/api/v1/catalog/crane-models", headers={"If-None-Match": etag}
+        )
+
+        # Assert
+        assert first.status_code == 200
+        assert first.headers["Cache-Control"] == "public, no-cache"
+        assert "Last-Modified" in first.headers
+        assert second.status_code == 304
+        assert second.content == b""
+        assert second.headers["ETag"] == etag
+        mock_get.assert_not_called()
+
+
+def test_etag_changes_with_data_and_representation(client, db_session):
+    # Arrange
+    etag = client.get("/api/v1/catalog/crane-models").headers["ETag"]
+
+    # Act
+    sparse = client.get(
+        "/api/v1/catalog/crane-models",
+        params={"fields": "id"},
+        headers={"If-None-Match": etag},
+    )
+    db_session.add(CraneModel(id="m2", model_name="ST2217"))
+    db_session.commit()
+    changed = client.get(
+        "/api/v1/catalog/crane-models", headers={"If-None-Match": etag}
+    )
+
+    # Assert
+    assert sparse.status_code == 200
+    assert sparse.headers["ETag"] != etag
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert len(changed.json()) == 2
+
+
+def test_if_modified_since(client):
+    # Arrange
+    last_modified = client.get("/api/v1/catalog/crane-models").headers["Last-Modified"]
+
+    # Act
+    response = client.get(
+        "/api/v1/catalog/crane-models", headers={"If-Modified-Since": last_modified}
+    )
+
+    # Assert
+    assert response.status_code == 304
+
+
+def test_etag_version_does_not_depend_on_commit_order():
+    # Arrange
+    stmt = scope_version(CraneModel)
+
+    # Act
+    sql = str(stmt.compile(dialect=postgresql.dialect()))
+
+    # Assert
+    # xmin changes on every write, whatever the commit order; updated_at
+    # (transaction start time) only feeds Last-Modified.
+    assert "sum(xmin::text::bigint)" in sql
+    assert "max(ops.crane_models.updated_at)" in sql
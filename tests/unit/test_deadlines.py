@@ -0,0 +1,232 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import anyio
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+
+from server.core.deadlines import (
+    Deadline,
+    DeadlineExceeded,
+    DeadlineMiddleware,
+    _start_transaction,
+    _translate_cancel,
+    current_deadline,
+    deadline_exceeded_handler,
+)
+from server.core.timing import AnalyticsRoute, TimedRoute
+
+
+def _app() -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(DeadlineMiddleware)
+    app.add_exception_handler(DeadlineExceeded, deadline_exceeded_handler)
+    oltp = APIRouter(route_class=TimedRoute)
+    reports = APIRouter(route_class=AnalyticsRoute)
+
+    @oltp.get("/check-in")
+    def check_in():
+        return {"remaining": current_deadline.get().remaining()}
+
+    @oltp.get("/slow")
+    def slow():
+        raise DeadlineExceeded("Request deadline exceeded")
+
+    @reports.get("/report")
+    def report():
+        return {"remaining": current_deadline.get().remaining()}
+
+    app.include_router(oltp)
+    app.include_router(reports)
+    return app
+
+
+def test_route_default_is_shortened_by_the_client_header(monkeypatch):
+    # Arrange
+    monkeypatch.setattr(TimedRoute, "deadline", 10.0)
+    monkeypatch.setattr(AnalyticsRoute, "deadline", 120.0)
+    client = TestClient(_app())
+
+    # Act
+    route_default = client.get("/check-in").json()["remaining"]
+    from_header = client.get("/check-in", headers={"X-Request-Timeout-Ms": "2500"})
+    longer_header = client.get("/check-in", headers={"X-Request-Timeout-Ms": "60000"})
+    malformed = client.get("/check-in", headers={"X-Request-Timeout-Ms": "soon"})
+    report = client.get("/report").json()["remaining"]
+    expired = client.get("/slow")
+
+    # Assert
+    assert 9 < route_default <= 10
+    assert 2 < from_header.json()["remaining"] <= 2.5
+    assert 9 < longer_header.json()["remaining"] <= 10
+    assert 9 < malformed.json()["remaining"] <= 10
+    assert 119 < report <= 120
+    assert expired.status_code == 504
+    assert expired.json() == {"detail": "Request deadline exceeded"}
+
+
+class _DBAPIConnection:
+    """Records ``cancel()`` calls; blocks them until ``release`` is set."""
+
+    def __init__(self, release=None):
+        self.release = release
+        self.cancelled = 0
+
+    def cancel(self):
+        if self.release is not None:
+            self.release.wait(5)
+        self.cancelled += 1
+
+
+def _connection(dbapi_connection):
+    return SimpleNamespace(
+        info={}, connection=SimpleNamespace(dbapi_connection=dbapi_connection)
+    )
+
+
+class _RecordingConnection:
+    """Stands in for a PostgreSQL connection; records the statement timeout."""
+
+    dialect = SimpleNamespace(name="postgresql")
+
+    def __init__(self, statement_timeout_ms):
+        self.options = {"statement_timeout_ms": statement_timeout_ms}
+        self.info = {}
+        self.connection = SimpleNamespace(dbapi_connection=_DBAPIConnection())
+        self.timeouts = []
+
+    def get_execution_options(self):
+        return self.options
+
+    def execute(self, statement, params):
+        self.timeouts.append(int(params["ms"]))
+
+
+def test_deadline_only_tightens_the_engine_statement_timeout():
+    # Arrange
+    oltp = _RecordingConnection(statement_timeout_ms=5000)
+    unlimited = _RecordingConnection(statement_timeout_ms=0)
+    request_deadline = Deadline(10.0)
+    tight_deadline = Deadline(2.0)
+
+    # Act
+    for deadline, connection in (
+        (request_deadline, oltp),
+        (tight_deadline, oltp),
+        (request_deadline, unlimited),
+    ):
+        token = current_deadline.set(deadline)
+        try:
+            _start_transaction(None, None, connection)
+        finally:
+            current_deadline.reset(token)
+
+    # Assert
+    assert oltp.timeouts[0] == 5000  # the OLTP limit is kept
+    assert 1900 < oltp.timeouts[1] <= 2000
+    assert 9900 < unlimited.timeouts[0] <= 10000
+
+
+def test_query_canceled_is_raised_as_deadline_exceeded():
+    # Arrange
+    canceled = SimpleNamespace(
+        original_exception=SimpleNamespace(pgcode="57014"),
+        sqlalchemy_exception=Exception("canceling statement due to statement timeout"),
+    )
+    other = SimpleNamespace(
+        original_exception=SimpleNamespace(pgcode="23505"), sqlalchemy_exception=None
+    )
+
+    # Act
+    translated = _translate_cancel(canceled)
+    untouched = _translate_cancel(other)
+
+    # Assert
+    assert isinstance(translated, DeadlineExceeded)
+    assert translated.__cause__ is canceled.sqlalchemy_exception
+    assert untouched is None
+
+
+async def _call(app, messages):
+    """Drives one request through the ASGI app; returns the sent messages."""
+    incoming = iter(messages)
+    sent = []
+
+    async def receive():
+        message = next(incoming, None)
+        if message is None:
+            await anyio.sleep_forever()
+        return message
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "GET", "path": "/", "headers": []}
+    await DeadlineMiddleware(app)(scope, receive, send)
+    return sent
+
+
+def test_client_disconnect_cancels_the_running_query():
+    # Arrange
+    busy_connection = _DBAPIConnection()
+    finished_connection = _DBAPIConnection()
+
+    async def busy_endpoint(scope, receive, send):
+        deadline = current_deadline.get()
+        deadline.attach(_connection(busy_connection))
+        with anyio.fail_after(5):
+            while not deadline.client_gone:
+                await anyio.sleep(0.01)
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def quick_endpoint(scope, receive, send):
+        current_deadline.get().attach(_connection(finished_connection))
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    request = {"type": "http.request", "body": b"", "more_body": False}
+    disconnect = {"type": "http.disconnect"}
+
+    # Act
+    anyio.run(_call, busy_endpoint, [request, disconnect])
+    anyio.run(_call, quick_endpoint, [request])
+
+    # Assert
+    assert busy_connection.cancelled == 1
+    assert finished_connection.cancelled == 0  # that response was complete
+
+
+def test_cancel_holds_no_lock_while_the_cancel_is_in_flight():
+    # Arrange
+    release = threading.Event()
+    connection = _connection(_DBAPIConnection(release))
+    deadline = Deadline()
+    deadline.attach(connection)
+    canceller = threading.Thread(target=deadline.cancel)
+    detached = threading.Event()
+
+    def finish_transaction():
+        deadline.detach(connection.info)
+        detached.set()
+
+    # Act
+    canceller.start()
+    while not deadline.client_gone:
+        time.sleep(0.01)
+    lock_free = deadline._lock.acquire(timeout=1)
+    if lock_free:
+        deadline._lock.release()
+    finisher = threading.Thread(target=finish_transaction)
+    finisher.start()
+    detached_before_cancel = detached.wait(0.2)
+    release.set()
+    canceller.join(5)
+    finisher.join(5)
+
+    # Assert
+    assert lock_free
+    assert not detached_before_cancel  # waits for the cancel to land
+    assert detached.is_set()
+    assert connection.connection.dbapi_connection.cancelled == 1
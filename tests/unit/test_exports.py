@@ -0,0 +1,94 @@
+import csv
+import datetime as dt
+import io
+import json
+from contextlib import contextmanager
+
+import pytest
+
+from server.config import settings
+from server.domain.models import Crane, CraneModel, DriverAttendance
+from server.domain.services import export_service
+
+
+@pytest.fixture
+def client(client, sqlite_db, sqlite_sessions, monkeypatch):
+    sqlite_db.add(
+        CraneModel(id="m1", model_name="SS1926", max_lifting_capacity_ton_m=18)
+    )
+    sqlite_db.add_all(
+        Crane(id=f"c{i}", owner_org_id="org1", model_id="m1", serial_no=f"SN{i}")
+        for i in range(3)
+    )
+    sqlite_db.add_all(
+        DriverAttendance(
+            driver_assignment_id="da1",
+            work_date=dt.date(2024, 1, 1) + dt.timedelta(days=i),
+            check_in_at=dt.datetime(2024, 1, 1, 8) + dt.timedelta(days=i),
+        )
+        for i in range(25)
+    )
+    sqlite_db.commit()
+
+    @contextmanager
+    def export_session():
+        with sqlite_sessions() as session:
+            yield session
+
+    monkeypatch.setattr(export_service, "session_factory", export_session)
+    monkeypatch.setattr(export_service, "batch_size", 10)
+    monkeypatch.setattr(settings, "AUTH_MODE", "dev")
+    client.headers["Authorization"] = "Bearer dev:owner-1:OWNER"
+    return client
+
+
+def test_export_attendance_ndjson_with_filters(client):
+    # Act
+    response = client.get(
+        "/api/v1/exports/driver-attendance-logs",
+        params={"work_date_from": "2024-01-06", "work_date_to": "2024-01-20"},
+    )
+
+    # Assert
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert "attachment" in response.headers["content-disposition"]
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert len(rows) == 15
+    assert {row["work_date"] for row in rows} >= {"2024-01-06", "2024-01-20"}
+    assert rows[0]["check_in_at"].startswith("2024-01-")
+
+
+def test_export_cranes_csv(client):
+    # Act
+    response = client.get(
+        "/api/v1/exports/cranes", params={"format": "csv", "owner_org_id": "org1"}
+    )
+
+    # Assert
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    reader = list(csv.reader(io.StringIO(response.text)))
+    assert reader[0][:4] == ["id", "owner_org_id", "serial_no", "status"]
+    assert len(reader) == 4
+    assert {row[5] for row in reader[1:]} == {"SS1926"}
+
+
+def test_export_is_compressed_when_accepted(client):
+    # Act
+    response = client.get(
+        "/api/v1/exports/driver-attendance-logs", headers={"Accept-Encoding": "gzip"}
+    )
+
+    # Assert
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert len(response.text.splitlines()) == 25
+
+
+def test_export_sites_mine_requires_user_id(client):
+    # Act
+    response = client.get("/api/v1/exports/sites", params={"mine": True})
+
+    # Assert
+    assert response.status_code == 400
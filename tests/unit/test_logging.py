@@ -0,0 +1,121 @@
+import io
+import json
+import logging
+import queue
+
+from server.core.logging import (
+    AsyncQueueHandler,
+    JsonFormatter,
+    LogPipeline,
+    SamplingFilter,
+    redact,
+    request_id_var,
+)
+
+
+def make_record(msg, *args, level=logging.INFO, name="server.test", **extra):
+    record = logging.LogRecord(name, level, __file__, 1, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_pipeline_writes_json_with_request_id_and_redaction():
+    # Arrange
+    stream = io.StringIO()
+    output = logging.StreamHandler(stream)
+    output.setFormatter(JsonFormatter())
+    pipeline = LogPipeline(output, queue_size=100, sampling={})
+    logger = logging.getLogger("server.test.pipeline")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    logger.addHandler(pipeline.queue_handler)
+    pipeline.start()
+    token = request_id_var.set("req-123")
+
+    # Act
+    try:
+        logger.info(
+            "Login for %s with Authorization: Bearer abc.def",
+            "sm1",
+            extra={"password": "pw", "site": "s1"},
+        )
+        logger.debug("not enabled %s", "x")
+    finally:
+        request_id_var.reset(token)
+        pipeline.stop()
+        logger.removeHandler(pipeline.queue_handler)
+
+    # Assert
+    lines = stream.getvalue().splitlines()
+    assert len(lines) == 1
+    entry = json.loads(lines[0])
+    assert entry["request_id"] == "req-123"
+    assert entry["level"] == "INFO"
+    assert entry["msg"] == "Login for sm1 with Authorization: [REDACTED]"
+    assert entry["password"] == "[REDACTED]"
+    assert entry["site"] == "s1"
+
+
+def test_pipeline_stop_is_safe_before_start_and_when_repeated():
+    # Arrange
+    pipeline = LogPipeline(logging.NullHandler(), queue_size=10, sampling={})
+
+    # Act
+    pipeline.stop()
+    pipeline.start()
+    pipeline.stop()
+    pipeline.stop()
+
+    # Assert
+    assert pipeline.queue.empty()
+
+
+def test_queue_handler_defers_only_plain_arguments():
+    # Arrange
+    handler = AsyncQueueHandler(queue.Queue())
+
+    class Model:
+        def __repr__(self):
+            return "<Model>"
+
+    # Act
+    deferred = handler.prepare(make_record("user %s (%d)", "u1", 3))
+    eager = handler.prepare(make_record("loaded %r", Model()))
+
+    # Assert
+    assert deferred.args == ("u1", 3)
+    assert eager.args is None
+    assert eager.msg == "loaded <Model>"
+
+
+def test_queue_handler_drops_when_full():
+    # Arrange
+    handler = AsyncQueueHandler(queue.Queue(maxsize=1))
+
+    # Act
+    handler.handle(make_record("first"))
+    handler.handle(make_record("second"))
+
+    # Assert
+    assert handler.queue.qsize() == 1
+    assert handler.dropped == 1
+
+
+def test_sampling_filter_uses_longest_prefix_and_keeps_warnings():
+    # Arrange
+    sampler = SamplingFilter({"server": 1.0, "server.database": 0.0})
+
+    # Act / Assert
+    assert sampler.filter(make_record("x", name="server.api"))
+    assert not sampler.filter(make_record("x", name="server.database"))
+    assert sampler.filter(
+        make_record("x", name="server.database", level=logging.WARNING)
+    )
+    assert sampler.rate_for("server.databases") == 1.0
+
+
+def test_redact_masks_common_secret_shapes():
+    # Act / Assert
+    assert redact("password=hunter2&x=1") == "password=[REDACTED]&x=1"
+    assert redact("{'token': 'abc'}") == "{'token': '[REDACTED]'}"
+    assert redact("Basic dXNlcjpwYXNz") == "Basic [REDACTED]"
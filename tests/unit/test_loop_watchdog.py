@@ -0,0 +1,140 @@
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+
+import pytest
+from fastapi import APIRouter, Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from server.core import loop_watchdog as loop_watchdog_module
+from server.core.loop_watchdog import (
+    BlockingCallOnEventLoop,
+    BlockingCallRecorder,
+    LoopWatchdog,
+    _first_report,
+)
+from server.core.timing import TimedRoute
+from server.domain.models import User
+from server.domain.schemas.enums import UserRole
+
+
+@pytest.fixture
+def checked_client(sqlite_sessions):
+    router = APIRouter(route_class=TimedRoute)
+
+    def session():
+        with sqlite_sessions() as db:
+            yield db
+
+    @router.get("/async-db")
+    async def async_db(db: Session = Depends(session)):
+        return {"one": db.execute(text("SELECT 1")).scalar()}
+
+    @router.get("/async-sleep")
+    async def async_sleep():
+        time.sleep(0.001)
+        with open(__file__, "rb") as f:
+            return {"size": len(f.read())}
+
+    @router.get("/sync-db")
+    def sync_db(db: Session = Depends(session)):
+        return {"one": db.execute(text("SELECT 1")).scalar()}
+
+    checked = FastAPI()
+    checked.include_router(router)
+    return TestClient(checked)
+
+
+def test_sql_on_the_event_loop_fails_strict_mode(checked_client):
+    # Act
+    with BlockingCallRecorder() as sync_calls:
+        checked_client.get("/sync-db")
+    with BlockingCallRecorder() as async_calls:
+        checked_client.get("/async-db")
+
+    # Assert
+    sync_calls.assert_clean()
+    assert [call["site"] for call in async_calls.calls] == [
+        "tests/unit/test_loop_watchdog.py:async_db"
+    ]
+    with pytest.raises(BlockingCallOnEventLoop, match="SELECT 1"):
+        async_calls.assert_clean()
+
+
+def test_sleep_and_file_reads_on_the_event_loop_are_recorded(checked_client):
+    # Act
+    with BlockingCallRecorder() as calls:
+        checked_client.get("/async-sleep")
+
+    # Assert
+    assert [(call["kind"], call["site"]) for call in calls.calls] == [
+        ("sleep", "tests/unit/test_loop_watchdog.py:async_sleep"),
+        ("file", "tests/unit/test_loop_watchdog.py:async_sleep"),
+    ]
+
+
+def test_reported_sites_are_bounded(monkeypatch):
+    # Arrange
+    monkeypatch.setattr(loop_watchdog_module, "_reported_sites", OrderedDict())
+    monkeypatch.setattr(loop_watchdog_module, "_MAX_REPORTED_SITES", 2)
+
+    # Act
+    first = [_first_report(site) for site in ("a", "b", "a", "c", "a")]
+
+    # Assert
+    assert first == [True, True, False, True, True]
+    assert list(loop_watchdog_module._reported_sites) == ["c", "a"]
+
+
+def test_login_does_not_block_the_event_loop(
+    strict_event_loop, jwt_signing_key, client, sqlite_db
+):
+    # Arrange
+    sqlite_db.add(
+        User(
+            id="u1",
+            email="a@example.com",
+            name="A",
+            hashed_password=hashlib.sha256(b"password1").hexdigest(),
+            role=UserRole.OWNER,
+        )
+    )
+    sqlite_db.commit()
+
+    # Act
+    response = client.post(
+        "/api/v1/auth/login",
+        json={"email": "a@example.com", "password": "password1"},
+    )
+
+    # Assert
+    assert response.status_code == 200
+    assert strict_event_loop.calls == []
+
+
+def test_watchdog_captures_the_stack_holding_the_loop():
+    # Arrange
+    watchdog = LoopWatchdog(interval_ms=10, threshold_ms=50)
+
+    async def hold_the_loop():
+        time.sleep(0.2)
+
+    async def scenario():
+        watchdog.start()
+        await asyncio.sleep(0.05)
+        await hold_the_loop()
+        await asyncio.sleep(0.1)
+        watchdog.stop()
+
+    # Act
+    asyncio.run(scenario())
+
+    # Assert
+    stalls = watchdog.recent_stalls()
+    assert len(stalls) == 1
+    assert stalls[0]["site"] == "tests/unit/test_loop_watchdog.py:hold_the_loop"
+    assert stalls[0]["blocked_ms"] >= 150
+    assert "time.sleep(0.2)" in stalls[0]["stack"]
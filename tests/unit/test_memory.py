@@ -0,0 +1,80 @@
+import tracemalloc
+
+import pytest
+
+from server.config import settings
+from server.core.memory import snapshot_store
+from server.domain.models import Crane, CraneModel
+
+
+@pytest.fixture
+def client(client, sqlite_db):
+    sqlite_db.add(
+        CraneModel(id="m1", model_name="SS1926", max_lifting_capacity_ton_m=18)
+    )
+    sqlite_db.add_all(
+        Crane(id=f"c{i}", owner_org_id="o1", model_id="m1", serial_no=f"S-{i}")
+        for i in range(20)
+    )
+    sqlite_db.commit()
+    return client
+
+
+def test_allocations_are_recorded_per_route(client, route_allocations):
+    # Act
+    for _ in range(3):
+        client.get("/api/v1/org/cranes", params={"owner_org_id": "o1"})
+
+    # Assert
+    stats = route_allocations.routes["/api/v1/org/cranes"]
+    assert stats.requests == 3
+    assert stats.peak_bytes_max > 0
+    route_allocations.assert_budget("/api/v1/org/cranes", max_peak_bytes=5_000_000)
+    with pytest.raises(AssertionError, match="budget is 1"):
+        route_allocations.assert_budget("/api/v1/org/cranes", max_peak_bytes=1)
+
+
+def test_snapshots_and_diff_endpoints(client, debug_headers):
+    # Arrange
+    snapshot_store.clear()
+    client.headers.update(debug_headers)
+
+    # Act
+    not_started = client.post("/api/v1/system/memory/snapshots")
+    started = client.post("/api/v1/system/memory/start", params={"frames": 5})
+    client.post("/api/v1/system/memory/snapshots", params={"name": "before"})
+    retained = [bytearray(4096) for _ in range(200)]
+    client.post("/api/v1/system/memory/snapshots", params={"name": "after"})
+    top = client.get("/api/v1/system/memory/snapshots/after", params={"limit": 5})
+    diff = client.get(
+        "/api/v1/system/memory/diff", params={"base": "before", "target": "after"}
+    )
+    stopped = client.post("/api/v1/system/memory/stop")
+    missing = client.get("/api/v1/system/memory/snapshots/nope")
+
+    # Assert
+    assert not_started.status_code == 409
+    assert started.json()["tracing"] is True
+    assert len(top.json()["top"]) == 5
+    grown = diff.json()["top"][0]
+    assert "test_memory.py" in grown["location"]
+    assert grown["size_diff_bytes"] >= 200 * 4096
+    assert stopped.json()["tracing"] is False
+    assert [s["name"] for s in stopped.json()["snapshots"]] == ["before", "after"]
+    assert missing.status_code == 404
+    del retained
+
+
+def test_memory_endpoints_require_debug_access(client, monkeypatch):
+    # Arrange
+    monkeypatch.setattr(settings, "ENVIRONMENT", "production")
+    monkeypatch.setattr(settings, "DEBUG_TOKEN", "s3cret")
+
+    # Act
+    denied = client.post("/api/v1/system/memory/start")
+    allowed = client.get("/api/v1/system/memory", headers={"X-Debug-Token": "s3cret"})
+
+    # Assert
+    assert denied.status_code == 404
+    assert allowed.status_code == 200
+    assert tracemalloc.is_tracing() is False
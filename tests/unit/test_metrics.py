@@ -0,0 +1,185 @@
+import json
+import os
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+from server.api.routers import metrics as metrics_router
+from server.core.db_instrumentation import (
+    add_statement_observer,
+    install_statement_hooks,
+    remove_statement_observer,
+)
+from server.core.metrics import (
+    InstrumentedQueuePool,
+    exposition,
+    fold_exited_snapshots,
+    merge_snapshots,
+    read_snapshots,
+    record_statement,
+    render,
+)
+from server.middleware.request_context import RequestContextMiddleware
+
+
+@pytest.fixture
+def client():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=InstrumentedQueuePool,
+    )
+    install_statement_hooks()
+    add_statement_observer(record_statement)
+
+    app = FastAPI()
+    app.add_middleware(RequestContextMiddleware)
+    app.include_router(metrics_router.router)
+
+    @app.get("/metrics-test/items/{item_id}")
+    def item(item_id: int):
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            conn.execute(text("SELECT 2"))
+        return {"id": item_id}
+
+    @app.get("/metrics-test/sites/{site_id}")
+    def site(site_id: str):
+        return {"id": site_id}
+
+    @app.get("/metrics-test/files/{file_path:path}")
+    def file(file_path: str):
+        return {"path": file_path}
+
+    yield TestClient(app)
+    remove_statement_observer(record_statement)
+    engine.dispose()
+
+
+def test_requests_are_recorded_per_route_template_with_db_counts(client):
+    # Act
+    client.get("/metrics-test/items/7")
+    client.get("/metrics-test/items/8")
+    client.get("/metrics-test/missing")
+    body = client.get("/metrics").text
+
+    # Assert
+    route = 'route="/metrics-test/items/{item_id}"'
+    assert f'http_requests_total{{method="GET",{route},status="200"}} 2' in body
+    assert (
+        'http_requests_total{method="GET",route="<unmatched>",status="404"} 1' in body
+    )
+    assert f'http_request_duration_seconds_count{{method="GET",{route}}} 2' in body
+    assert (
+        f'http_request_duration_seconds_bucket{{le="+Inf",method="GET",{route}}} 2'
+        in body
+    )
+    assert f"db_statements_total{{{route}}} 4" in body
+    assert "db_pool_checkout_wait_seconds_count" in body
+    assert "# TYPE http_request_duration_seconds histogram" in body
+
+
+def test_route_label_is_the_template_whatever_the_values(client):
+    # Act
+    client.get("/metrics-test/sites/sites")  # value equal to a literal segment
+    client.get("/metrics-test/files/a/b/c.txt")
+    client.get("/metrics-test/files/d/e.txt")
+    body = client.get("/metrics").text
+
+    # Assert
+    sites = 'route="/metrics-test/sites/{site_id}"'
+    files = 'route="/metrics-test/files/{file_path}"'
+    assert f'http_requests_total{{method="GET",{sites},status="200"}} 1' in body
+    assert f'http_requests_total{{method="GET",{files},status="200"}} 2' in body
+    assert "c.txt" not in body
+
+
+def test_snapshots_merge_counters_and_keep_gauges_of_live_workers():
+    # Arrange
+    exited = {
+        "pid": 2**22 + 17,  # above the default pid_max, so never alive
+        "families": {
+            "jobs_total": {
+                "type": "counter",
+                "help": "Jobs.",
+                "samples": [[{"route": "/x"}, 3.0]],
+            },
+            "jobs_running": {
+                "type": "gauge",
+                "help": "Running.",
+                "samples": [[{}, 5.0]],
+            },
+        },
+    }
+    live = json.loads(json.dumps(exited))
+    live["pid"] = os.getpid()
+
+    # Act
+    body = render(merge_snapshots([exited, live], multiprocess=True))
+
+    # Assert
+    assert 'jobs_total{route="/x"} 6' in body
+    assert f'jobs_running{{pid="{os.getpid()}"}} 5' in body
+    assert f'pid="{exited["pid"]}"' not in body
+
+
+def test_exposition_reads_every_worker_snapshot_in_shared_directory(tmp_path):
+    # Arrange
+    other = {
+        "pid": 2**22 + 18,
+        "families": {
+            "other_worker_total": {
+                "type": "counter",
+                "help": "Other.",
+                "samples": [[{}, 2.0]],
+            }
+        },
+    }
+    (tmp_path / f"metrics-{other['pid']}.json").write_text(json.dumps(other))
+
+    # Act
+    body = exposition(str(tmp_path))
+
+    # Assert
+    assert "other_worker_total 2" in body
+    assert "# TYPE http_requests_total counter" in body
+    assert len(list(tmp_path.glob(f"metrics-{os.getpid()}-*.json"))) == 1
+    # The exited worker's counters live on in the folded file
+    assert not (tmp_path / f"metrics-{other['pid']}.json").exists()
+    assert "other_worker_total 2" in exposition(str(tmp_path))
+
+
+def test_exited_workers_are_folded_into_one_file(tmp_path):
+    # Arrange
+    for offset in (20, 21):
+        exited = {
+            "pid": 2**22 + offset,
+            "families": {
+                "jobs_total": {
+                    "type": "counter",
+                    "help": "Jobs.",
+                    "samples": [[{}, 3.0]],
+                },
+                "jobs_running": {
+                    "type": "gauge",
+                    "help": "Running.",
+                    "samples": [[{}, 5.0]],
+                },
+            },
+        }
+        (tmp_path / f"metrics-{exited['pid']}-abc.json").write_text(json.dumps(exited))
+
+    # Act
+    first = fold_exited_snapshots(str(tmp_path))
+    second = fold_exited_snapshots(str(tmp_path))
+
+    # Assert
+    assert (first, second) == (2, 0)
+    assert sorted(path.name for path in tmp_path.glob("metrics-*.json")) == [
+        "metrics-exited.json"
+    ]
+    body = render(merge_snapshots(read_snapshots(str(tmp_path)), multiprocess=True))
+    assert "jobs_total 6" in body
+    assert "jobs_running" not in body
@@ -0,0 +1,128 @@
+import asyncio
+import hashlib
+
+import pytest
+from fastapi.testclient import TestClient
+
+from server.config import settings
+from server.core.security import PasswordHasher, PasswordHashingBusy, password_hasher
+from server.core.tokens import key_store
+from server.domain.models import User
+from server.domain.schemas.enums import UserRole
+from server.main import app
+
+LEGACY_HASH = hashlib.sha256(b"password1").hexdigest()
+
+
+@pytest.fixture
+def db(sqlite_db):
+    sqlite_db.add(
+        User(
+            id="u1",
+            email="driver@example.com",
+            name="Driver",
+            hashed_password=LEGACY_HASH,
+            role=UserRole.DRIVER,
+        )
+    )
+    sqlite_db.commit()
+    return sqlite_db
+
+
+def test_scrypt_hashes_verify_and_are_salted():
+    # Arrange
+    hasher = PasswordHasher(n=1024, r=8, p=1, workers=1, max_pending=1)
+
+    # Act
+    first, second = hasher.hash("password1"), hasher.hash("password1")
+
+    # Assert
+    assert first != second and first.startswith("scrypt$1024$8$1$")
+    assert hasher.verify("password1", first)
+    assert not hasher.verify("password2", first)
+    assert not hasher.needs_rehash(first)
+    assert PasswordHasher(n=2048, r=8, p=1, workers=1, max_pending=1).needs_rehash(
+        first
+    )
+    assert not hasher.verify("password1", "scrypt$broken")
+    assert not hasher.verify("password1", None)
+
+
+def test_legacy_sha256_hashes_verify_and_need_rehash():
+    # Act / Assert
+    assert password_hasher.verify("password1", LEGACY_HASH)
+    assert not password_hasher.verify("password2", LEGACY_HASH)
+    assert password_hasher.needs_rehash(LEGACY_HASH)
+
+
+def test_hashing_queue_is_bounded():
+    # Arrange
+    hasher = PasswordHasher(n=1024, r=8, p=1, workers=1, max_pending=0)
+
+    # Act / Assert
+    with pytest.raises(PasswordHashingBusy):
+        asyncio.run(hasher.verify_async("password1", LEGACY_HASH))
+
+
+def test_login_verifies_password_and_upgrades_legacy_hash(client, db, jwt_signing_key):
+    # Act
+    wrong = client.post(
+        "/api/v1/auth/login",
+        json={"email": "driver@example.com", "password": "password2"},
+    )
+    unknown = client.post(
+        "/api/v1/auth/login",
+        json={"email": "nobody@example.com", "password": "password1"},
+    )
+    first = client.post(
+        "/api/v1/auth/login",
+        json={"email": "driver@example.com", "password": "password1"},
+    )
+    upgraded = db.get(User, "u1").hashed_password
+    second = client.post(
+        "/api/v1/auth/login",
+        json={"email": "driver@example.com", "password": "password1"},
+    )
+
+    me = client.get(
+        "/api/v1/me",
+        headers={"Authorization": f"Bearer {second.json()['access_token']}"},
+    )
+
+    # Assert
+    assert wrong.status_code == unknown.status_code == 401
+    assert first.status_code == second.status_code == 200
+    assert me.status_code == 200 and me.json()["id"] == "u1"
+    assert (
+        upgraded.startswith("scrypt$")
+        and db.get(User, "u1").hashed_password == upgraded
+    )
+
+
+def test_login_sheds_load_when_hashing_pool_is_saturated(client, db, monkeypatch):
+    # Arrange
+    monkeypatch.setattr(password_hasher, "max_pending", 0)
+
+    # Act
+    response = client.post(
+        "/api/v1/auth/login",
+        json={"email": "driver@example.com", "password": "password1"},
+    )
+
+    # Assert
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+
+
+def test_strict_mode_refuses_to_start_without_a_signing_key(monkeypatch):
+    # Arrange
+    monkeypatch.setattr(settings, "AUTH_MODE", "strict")
+    monkeypatch.setattr(key_store, "keys_file", None)
+    monkeypatch.setattr(key_store, "secret_file", None)
+    monkeypatch.setattr(key_store, "_keys", {})
+    monkeypatch.setattr(key_store, "_order", [])
+
+    # Act / Assert
+    with pytest.raises(RuntimeError, match="JWT_KEYS_FILE or JWT_SECRET_FILE"):
+        with TestClient(app):
+            pass
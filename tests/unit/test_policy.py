@@ -0,0 +1,116 @@
+import pytest
+
+from server.auth.context import UserContext
+from server.auth.policy import PolicyEngine, Resource, require_scopes
+from server.config import settings
+from server.domain.user_cache import user_contexts
+
+RULES = {
+    "DRIVER": {"assignment:read": "self"},
+    "OWNER": {"crane:read": "org", "assignment:read": "org"},
+    "SAFETY_MANAGER": {"crane:read": "any"},
+}
+
+
+@pytest.fixture
+def client(client, monkeypatch):
+    monkeypatch.setattr(settings, "AUTH_MODE", "dev")
+    user_contexts.clear()
+    return client
+
+
+def test_scopes_are_checked_at_their_level():
+    # Arrange
+    engine_ = PolicyEngine(RULES)
+    driver = UserContext(id="d1", roles=["DRIVER"])
+    owner = UserContext(id="u1", roles=["OWNER"], org_ids=["o1"])
+    manager = UserContext(id="m1", roles=["SAFETY_MANAGER"])
+
+    # Act / Assert
+    assert engine_.check(driver, "assignment:read", Resource(user_id="d1"))
+    assert not engine_.check(driver, "assignment:read", Resource(user_id="d2"))
+    assert engine_.check(owner, "crane:read", Resource(org_id="o1"))
+    assert not engine_.check(owner, "crane:read", Resource(org_id="o2"))
+    assert engine_.check(owner, "crane:read")  # list endpoints scope their own query
+    assert engine_.check(manager, "crane:read", Resource(org_id="o2"))
+    assert not engine_.check(manager, "assignment:read")
+    assert not engine_.check(manager, "no:such-scope")
+    assert not engine_.check_mask(
+        owner,
+        engine_.scope_mask(["crane:read", "assignment:read"]),
+        Resource(org_id="o2"),
+    )
+
+
+def test_effective_permissions_are_cached_until_inputs_or_policy_change():
+    # Arrange
+    engine_ = PolicyEngine(RULES)
+    owner = UserContext(id="u1", roles=["OWNER"], org_ids=["o1"])
+    crane_read = engine_.scope_mask(["crane:read"])
+
+    # Act
+    first = engine_.effective(owner)
+    same_request_shape = engine_.effective(
+        UserContext(id="u1", roles=["OWNER"], org_ids=["o1"])
+    )
+    moved = engine_.effective(UserContext(id="u1", roles=["OWNER"], org_ids=["o2"]))
+    engine_.load({"OWNER": {"crane:read": "any"}})
+    after_reload = engine_.effective(owner)
+
+    # Assert
+    assert same_request_shape is first
+    assert moved is not first and moved.org_ids == {"o2"}
+    assert after_reload.any == crane_read  # bit survived recompilation
+    assert engine_.scopes_for(owner) == ["crane:read"]
+
+
+def test_role_interned_after_caching_is_granted_to_cached_users():
+    # Arrange
+    engine_ = PolicyEngine(RULES)
+    auditor = UserContext(id="a1", roles=["AUDITOR"])
+    cached = engine_.effective(auditor)
+
+    # Act
+    auditor_mask = engine_.role_mask(["AUDITOR"])
+    known_mask = engine_.role_mask(["AUDITOR"])
+    recompiled = engine_.effective(auditor)
+
+    # Assert
+    assert cached.roles == 0
+    assert recompiled is not cached and recompiled.roles & auditor_mask
+    assert known_mask == auditor_mask
+    assert engine_.effective(auditor) is recompiled  # no new role, cache kept
+
+
+def test_unknown_scopes_and_levels_fail_at_definition_time():
+    # Act / Assert
+    with pytest.raises(ValueError):
+        require_scopes("crane:fly")
+    with pytest.raises(ValueError):
+        PolicyEngine({"OWNER": {"crane:read": "everywhere"}})
+
+
+def test_routes_enforce_scopes_and_roles(client):
+    # Arrange
+    driver = {"X-Dev-User": "d1", "X-Dev-Roles": "DRIVER"}
+    owner = {"X-Dev-User": "u1", "X-Dev-Roles": "OWNER"}
+
+    # Act
+    own = client.get("/api/v1/drivers/d1/active-assignments-sample", headers=driver)
+    other = client.get("/api/v1/drivers/d2/active-assignments-sample", headers=driver)
+    owner_sample = client.get("/api/v1/owners/o1/cranes-summary-sample", headers=owner)
+    driver_on_owner_sample = client.get(
+        "/api/v1/owners/o1/cranes-summary-sample", headers=driver
+    )
+    permissions = client.get("/api/v1/me/permissions", headers=owner)
+
+    # Assert
+    assert own.status_code == 200
+    assert other.status_code == 403
+    assert owner_sample.status_code == 200
+    assert driver_on_owner_sample.status_code == 403
+    assert sorted(permissions.json()["scopes"]) == [
+        "assignment:read",
+        "crane:read",
+        "maintenance:read",
+    ]
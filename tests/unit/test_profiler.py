@@ -0,0 +1,149 @@
+import asyncio
+import sys
+import threading
+import time
+
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+
+from server.core.profiler import (
+    collapsed_stacks,
+    profile_store,
+    render_flamegraph,
+    sampler,
+    start_process_profile,
+    start_request_profile,
+)
+from server.core.timing import TimedRoute
+from server.main import app
+from server.middleware.request_context import RequestContextMiddleware
+
+
+def burn_cpu(seconds):
+    deadline = time.perf_counter() + seconds
+    total = 0
+    while time.perf_counter() < deadline:
+        total += sum(range(200))
+    return total
+
+
+def make_client():
+    router = APIRouter(route_class=TimedRoute)
+
+    @router.get("/sync-work")
+    def sync_work():
+        return {"total": burn_cpu(0.15)}
+
+    @router.get("/async-work")
+    async def async_work():
+        return {"total": burn_cpu(0.15)}
+
+    profiled = FastAPI()
+    profiled.add_middleware(RequestContextMiddleware, profiling=True)
+    profiled.include_router(router)
+    return TestClient(profiled)
+
+
+def test_sync_and_async_requests_are_profiled_on_demand(debug_headers):
+    # Arrange
+    client = make_client()
+    client.headers.update(debug_headers)
+
+    # Act
+    sync_response = client.get(
+        "/sync-work", headers={"X-Debug-Profile": "1", "X-Request-ID": "prof-sync"}
+    )
+    async_response = client.get(
+        "/async-work", headers={"X-Debug-Profile": "1", "X-Request-ID": "prof-async"}
+    )
+    plain = client.get("/sync-work")
+
+    # Assert
+    assert sync_response.status_code == 200
+    assert async_response.status_code == 200
+    assert (
+        sync_response.headers["x-debug-profile"] == "/api/v1/system/profiles/prof-sync"
+    )
+    assert (
+        async_response.headers["x-debug-profile"]
+        == "/api/v1/system/profiles/prof-async"
+    )
+    assert "x-debug-profile" not in plain.headers
+    for profile_id, endpoint in (
+        ("prof-sync", "sync_work"),
+        ("prof-async", "async_work"),
+    ):
+        document = profile_store.get(profile_id)
+        assert document["kind"] == "request"
+        assert document["samples"] > 0
+        hot = [s for s in document["stacks"] if "burn_cpu" in s]
+        assert hot and all(f"{endpoint} (" in s for s in hot)
+    assert not sampler.running
+
+
+def test_process_profile_covers_all_threads_and_renders():
+    # Arrange
+    worker = threading.Thread(target=burn_cpu, args=(0.3,), name="burner")
+    worker.start()
+
+    # Act
+    started = start_process_profile("prof-process", 0.2)
+    rejected = start_process_profile("prof-process-2", 0.2)
+    worker.join()
+    deadline = time.time() + 2
+    while profile_store.get("prof-process") is None and time.time() < deadline:
+        time.sleep(0.01)
+    document = profile_store.get("prof-process")
+
+    # Assert
+    assert started and not rejected
+    assert any(
+        stack.startswith("burner;") and "burn_cpu" in stack
+        for stack in document["stacks"]
+    )
+    assert collapsed_stacks(document).splitlines()[0].rsplit(" ", 1)[1].isdigit()
+    page = render_flamegraph(document)
+    assert page.startswith("<!DOCTYPE html>") and "burn_cpu" in page
+
+
+def test_profile_endpoints(debug_headers):
+    # Arrange
+    client = TestClient(app, headers=debug_headers)
+
+    # Act
+    started = client.post("/api/v1/system/profiler/start", params={"seconds": 0.05})
+    time.sleep(0.3)
+    html = client.get(started.json()["url"])
+    collapsed = client.get(started.json()["url"], params={"format": "collapsed"})
+    missing = client.get("/api/v1/system/profiles/nope")
+
+    # Assert
+    assert started.status_code == 202
+    assert html.headers["content-type"].startswith("text/html")
+    assert collapsed.headers["content-type"].startswith("text/plain")
+    assert missing.status_code == 404
+
+
+def test_request_profile_matches_the_loop_only_while_its_task_runs():
+    # Arrange
+    seen = {}
+
+    def sample(name, profile):
+        frame = sys._current_frames()[threading.get_ident()]
+        seen[name] = profile.wants(threading.get_ident(), frame)
+
+    async def scenario():
+        profile = start_request_profile("prof-task")
+        sampler.remove(profile)
+
+        async def other_task():
+            sample("other", profile)
+
+        await asyncio.get_running_loop().create_task(other_task())
+        sample("own", profile)
+
+    # Act
+    asyncio.run(scenario())
+
+    # Assert
+    assert seen == {"other": False, "own": True}
@@ -0,0 +1,107 @@
+import logging
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from server.core.db_instrumentation import (
+    add_statement_observer,
+    install_statement_hooks,
+    remove_statement_observer,
+)
+from server.core.query_audit import (
+    QueryAuditor,
+    QueryBudgetExceeded,
+    QueryRecorder,
+    record_request_query,
+)
+from server.domain.models import Crane, CraneModel
+from server.domain.repositories import crane_repo
+from server.middleware.request_context import RequestContextMiddleware
+
+
+@pytest.fixture
+def db_session(sqlite_db):
+    for i in range(4):
+        sqlite_db.add(
+            CraneModel(id=f"m{i}", model_name=f"SS19{i}", max_lifting_capacity_ton_m=18)
+        )
+        sqlite_db.add(
+            Crane(id=f"c{i}", owner_org_id="o1", model_id=f"m{i}", serial_no=f"S-{i}")
+        )
+    sqlite_db.commit()
+    sqlite_db.expunge_all()
+    return sqlite_db
+
+
+def test_lazy_relationship_per_row_is_flagged_as_n_plus_one(db_session):
+    # Act
+    with QueryRecorder() as queries:
+        names = [crane.model.model_name for crane in db_session.query(Crane).all()]
+
+    # Assert
+    assert len(names) == 4
+    assert queries.count == 5
+    [repeated] = queries.n_plus_one()
+    assert repeated.executions == 4
+    assert "crane_models" in repeated.statement
+    with pytest.raises(QueryBudgetExceeded, match="N\\+1: 4x"):
+        queries.assert_budget()
+
+
+def test_joinedload_keeps_owner_cranes_within_budget(db_session, query_budget):
+    # Act
+    with query_budget(max_queries=1):
+        cranes = crane_repo.get_by_owner(db_session, owner_org_id="o1")
+        models = [crane.model.model_name for crane in cranes]
+
+    # Assert
+    assert len(models) == 4
+
+
+def test_list_cranes_endpoint_query_budget(client, db_session, query_budget):
+    # Act
+    with query_budget(max_queries=1):
+        response = client.get("/api/v1/org/cranes", params={"owner_org_id": "o1"})
+
+    # Assert
+    assert response.status_code == 200
+    assert len(response.json()) == 4
+
+
+def test_sampled_request_with_n_plus_one_is_logged(db_session, caplog):
+    # Arrange
+    install_statement_hooks()
+    add_statement_observer(record_request_query)
+    audited = FastAPI()
+    audited.add_middleware(
+        RequestContextMiddleware,
+        query_auditor=QueryAuditor(
+            sample_rate=1.0, max_queries=30, n_plus_one_threshold=3
+        ),
+    )
+
+    @audited.get("/models")
+    def models():
+        return [
+            db_session.execute(
+                text("SELECT model_name FROM crane_models WHERE id = :id"),
+                {"id": f"m{i}"},
+            ).scalar()
+            for i in range(4)
+        ]
+
+    # Act
+    try:
+        with caplog.at_level(logging.WARNING, logger="server.core.query_audit"):
+            response = TestClient(audited).get("/models")
+    finally:
+        remove_statement_observer(record_request_query)
+
+    # Assert
+    assert response.status_code == 200
+    [record] = [r for r in caplog.records if r.name == "server.core.query_audit"]
+    assert record.route == "/models"
+    assert record.query_count == 4
+    assert "4x SELECT model_name FROM crane_models" in record.getMessage()
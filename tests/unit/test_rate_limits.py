@@ -0,0 +1,113 @@
+import time
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select
+
+from server.api.rate_limits import (
+    DatabaseBuckets,
+    MemoryBuckets,
+    Rate,
+    RateLimiter,
+    UserRateLimit,
+)
+from server.api.routers.exports import exports_limit
+from server.api.routers.owners import owner_stats_limit
+from server.auth.context import UserContext
+from server.auth.routes import login_account_limit
+from server.domain.models import RateLimitBucket
+
+
+def test_token_bucket_allows_a_burst_then_refills():
+    # Arrange
+    buckets = MemoryBuckets(max_keys=10)
+    rate = Rate.parse("2/second")
+
+    # Act
+    burst = [buckets.take("k", rate, now=100.0) for _ in range(3)]
+    refilled = buckets.take("k", rate, now=100.5)
+    other_key = buckets.take("other", rate, now=100.5)
+
+    # Assert
+    assert rate == Rate(2.0, 2.0)
+    assert burst == [0.0, 0.0, 0.5]
+    assert refilled == 0.0 and other_key == 0.0
+    with pytest.raises(ValueError):
+        Rate.parse("10/fortnight")
+
+
+def test_database_buckets_share_one_limit_between_workers(sqlite_engine):
+    # Arrange
+    shared = DatabaseBuckets(sqlite_engine)
+    rate = Rate.parse("3/minute")
+    worker_a = RateLimiter("shared-test", rate, shared)
+    worker_b = RateLimiter("shared-test", rate, shared)
+
+    # Act
+    worker_a.hit("ip:1")
+    worker_b.hit("ip:1")
+    worker_a.hit("ip:1")
+    with pytest.raises(HTTPException) as rejected:
+        worker_b.hit("ip:1")
+    worker_b.hit("ip:2")
+
+    # Assert
+    assert rejected.value.status_code == 429
+    assert rejected.value.headers["Retry-After"] == "20"
+    # worker_b's local token was refunded: only the shared bucket said no
+    assert worker_b.local.take("ip:1", rate, now=time.time()) == 0.0
+
+
+def test_database_buckets_purge_only_refilled_rows(sqlite_engine):
+    # Arrange
+    shared = DatabaseBuckets(sqlite_engine)
+    RateLimiter("purge-fast", Rate.parse("6/minute"), shared)
+    RateLimiter("purge-slow", Rate.parse("2/hour"), shared)
+    now = time.time()
+    shared.take("purge-slow:old", Rate.parse("2/hour"), now - 3601)
+    shared.take("purge-slow:recent", Rate.parse("2/hour"), now - 120)
+
+    # Act
+    deleted = shared.purge_idle(now)
+
+    # Assert
+    assert deleted == 1
+    with sqlite_engine.connect() as connection:
+        keys = connection.scalars(select(RateLimitBucket.key)).all()
+    assert keys == ["purge-slow:recent"]
+
+
+def test_login_is_limited_per_account(client, monkeypatch):
+    # Arrange
+    monkeypatch.setattr(login_account_limit, "rate", Rate.parse("2/minute"))
+    attempt = {"email": "nobody@example.com", "password": "password1"}
+
+    # Act
+    responses = [client.post("/api/v1/auth/login", json=attempt) for _ in range(3)]
+    other_account = client.post(
+        "/api/v1/auth/login", json={**attempt, "email": "someone@example.com"}
+    )
+
+    # Assert
+    assert [r.status_code for r in responses] == [401, 401, 429]
+    assert int(responses[2].headers["Retry-After"]) >= 1
+    assert other_account.status_code == 401
+
+
+def test_org_limits_share_one_bucket_per_organization():
+    # Arrange
+    limit = UserRateLimit("org-test", "2/minute", key="org")
+    alice = UserContext(id="alice", roles=["OWNER"], org_ids=["org-1"])
+    bob = UserContext(id="bob", roles=["OWNER"], org_ids=["org-1"])
+    carol = UserContext(id="carol", roles=["OWNER"], org_ids=["org-2"])
+
+    # Act
+    limit(alice)
+    limit(bob)
+    with pytest.raises(HTTPException) as rejected:
+        limit(alice)
+    limit(carol)
+
+    # Assert
+    assert rejected.value.status_code == 429
+    assert owner_stats_limit.key == exports_limit.key == "org"
@@ -1,13 +1,21 @@
 import pytest
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, Session
-from server.domain.models import Base, Site, User, UserRole
-from server.domain.repositories import site_repo, user_repo
-from server.domain.schemas import SiteCreate, UserCreate
+from server.domain.models import Base, Crane, CraneModel, Org, Site, User, UserRole
+from server.domain.read_models import CraneRow, SiteRow
+from server.domain.repositories import crane_repo, site_repo, user_repo
+from server.domain.schemas import (
+    CraneOut, CraneStatus, OrgType, SiteCreate, SiteOut, UserCreate
+)
 
 # Use an in-memory SQLite database for testing
 SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
-engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+# The ops schema is mapped to SQLite's main schema at execution time.
+engine = create_engine(
+    SQLALCHEMY_DATABASE_URL,
+    connect_args={"check_same_thread": False},
+    execution_options={"schema_translate_map": {"ops": None}},
+)
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 @pytest.fixture(scope="function")
@@ -15,9 +23,6 @@ def db_session() -> Session:
     """
     Creates a new database session for a test.
     """
-    # Set schema to None for all tables for SQLite compatibility
-    for table in Base.metadata.tables.values():
-        table.schema = None
     Base.metadata.create_all(bind=engine)
     db = TestingSessionLocal()
     try:
@@ -102,3 +107,87 @@ def test_get_user_by_email(db_session: Session):
     # Assert
     assert retrieved_user is not None
     assert retrieved_user.email == "test@example.com"
+
+def test_list_rows_for_user(db_session: Session):
+    # Arrange
+    for user_id in ("user1", "user2"):
+        db_session.add(User(
+            id=user_id, name=user_id, email=f"{user_id}@test.com",
+            role=UserRole.SAFETY_MANAGER, is_active=True, hashed_password="password",
+        ))
+    db_session.commit()
+    for user_id in ("user1", "user1", "user2"):
+        site_repo.create(db=db_session, obj_in=SiteCreate(
+            name="Site", start_date="2025-01-01", end_date="2025-12-31",
+            requested_by_id=user_id,
+        ))
+    db_session.expunge_all()
+
+    # Act
+    all_rows = site_repo.list_rows_for_user(db=db_session)
+    mine = site_repo.list_rows_for_user(db=db_session, user_id="user1")
+
+    # Assert
+    assert len(all_rows) == 3
+    assert len(mine) == 2
+    assert all(isinstance(row, SiteRow) for row in mine)
+    assert len(db_session.identity_map) == 0
+    assert SiteOut.model_validate(mine[0]).requested_by_id == "user1"
+
+def test_list_rows_by_owner(db_session: Session):
+    # Arrange
+    db_session.add(Org(id="org1", name="Owner", type=OrgType.OWNER))
+    db_session.add(
+        CraneModel(id="m1", model_name="SS1926", max_lifting_capacity_ton_m=18)
+    )
+    db_session.add(
+        CraneModel(id="m2", model_name="ST2217", max_lifting_capacity_ton_m=22)
+    )
+    db_session.add(Crane(
+        id="c1", owner_org_id="org1", model_id="m1", serial_no="S1",
+        status=CraneStatus.NORMAL,
+    ))
+    db_session.add(Crane(
+        id="c2", owner_org_id="org1", model_id="m2", serial_no="S2",
+        status=CraneStatus.REPAIR,
+    ))
+    db_session.commit()
+    db_session.expunge_all()
+
+    # Act
+    rows = crane_repo.list_rows_by_owner(db=db_session, owner_org_id="org1")
+    filtered = crane_repo.list_rows_by_owner(
+        db=db_session, owner_org_id="org1", min_capacity=20
+    )
+
+    # Assert
+    assert {row.id for row in rows} == {"c1", "c2"}
+    assert all(isinstance(row, CraneRow) for row in rows)
+    assert [row.model.model_name for row in filtered] == ["ST2217"]
+    assert CraneOut.model_validate(filtered[0]).model.id == "m2"
+    assert len(db_session.identity_map) == 0
+
+def test_list_rows_by_owner_sparse_fields(db_session: Session):
+    # Arrange
+    db_session.add(Org(id="org1", name="Owner", type=OrgType.OWNER))
+    db_session.add(
+        CraneModel(id="m1", model_name="SS1926", max_lifting_capacity_ton_m=18)
+    )
+    db_session.add(Crane(
+        id="c1", owner_org_id="org1", model_id="m1", serial_no="S1",
+        status=CraneStatus.NORMAL,
+    ))
+    db_session.commit()
+
+    # Act
+    rows = crane_repo.list_rows_by_owner(
+        db=db_session, owner_org_id="org1", fields={"id", "status"}
+    )
+    with_model = crane_repo.list_rows_by_owner(
+        db=db_session, owner_org_id="org1", fields={"id", "model"}
+    )
+
+    # Assert
+    assert rows[0].as_dict() == {"id": "c1", "status": CraneStatus.NORMAL}
+    assert not hasattr(rows[0], "model")
+    assert with_model[0].model.model_name == "SS1926"
@@ -0,0 +1,79 @@
+import logging
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from server.core.logging import request_id_var
+from server.middleware.request_context import RequestContextMiddleware
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.add_middleware(RequestContextMiddleware)
+
+    @app.get("/ok")
+    def ok():
+        return {"request_id": request_id_var.get()}
+
+    @app.get("/boom")
+    def boom():
+        raise RuntimeError("boom")
+
+    @app.get("/stream")
+    def stream():
+        return StreamingResponse(
+            (f"{i}\n".encode() for i in range(3)), media_type="text/plain"
+        )
+
+    return TestClient(app)
+
+
+def test_request_id_is_generated_and_echoed(client):
+    # Act
+    response = client.get("/ok")
+
+    # Assert
+    request_id = response.headers["x-request-id"]
+    assert len(request_id) == 32
+    assert response.json() == {"request_id": request_id}
+
+
+def test_valid_incoming_request_id_is_reused(client):
+    # Act
+    reused = client.get("/ok", headers={"X-Request-ID": "edge-abc.123"})
+    replaced = client.get("/ok", headers={"X-Request-ID": "bad id\n"})
+
+    # Assert
+    assert reused.headers["x-request-id"] == "edge-abc.123"
+    assert replaced.headers["x-request-id"] != "bad id\n"
+
+
+def test_unhandled_error_becomes_json_500(client, caplog):
+    # Act
+    with caplog.at_level(logging.INFO, logger="server.middleware.request_context"):
+        response = client.get("/boom")
+
+    # Assert
+    assert response.status_code == 500
+    assert response.json() == {"detail": "An internal server error occurred."}
+    assert "x-request-id" in response.headers
+    assert any(r.levelno == logging.ERROR and r.exc_info for r in caplog.records)
+
+
+def test_streaming_response_is_logged_after_last_chunk(client, caplog):
+    # Act
+    with caplog.at_level(logging.INFO, logger="server.middleware.request_context"):
+        response = client.get("/stream")
+
+    # Assert
+    assert response.text == "0\n1\n2\n"
+    messages = [
+        r.getMessage()
+        for r in caplog.records
+        if r.name == "server.middleware.request_context"
+    ]
+    assert messages[0] == "--> Request: GET /stream"
+    assert messages[-1].startswith("<-- Response: 200 (")
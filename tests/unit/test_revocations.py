@@ -0,0 +1,100 @@
+import base64
+import json
+import time
+
+from server.config import settings
+from server.core.query_audit import QueryRecorder
+from server.core.tokens import create_access_token, key_store
+from server.domain.models import RevokedToken, User
+from server.domain.revocations import RevocationList, _utc, revoked_tokens
+from server.domain.schemas.enums import UserRole
+from server.domain.user_cache import user_contexts
+
+
+def test_revocations_reach_other_workers_on_their_next_poll(sqlite_db):
+    # Arrange
+    worker_a = RevocationList(poll_seconds=5, lookback_seconds=60, leeway_seconds=0)
+    worker_b = RevocationList(poll_seconds=5, lookback_seconds=60, leeway_seconds=0)
+    worker_b.poll(sqlite_db)
+    expires = time.time() + 600
+
+    # Act
+    worker_a.revoke(sqlite_db, "jti-1", expires, "u1")
+    before_poll = worker_b.is_revoked("jti-1")
+    first = worker_b.poll(sqlite_db)
+    # A transaction that took id 0 before jti-1 committed but only commits now
+    sqlite_db.add(
+        RevokedToken(
+            id=0, jti="jti-late", expires_at=_utc(expires), revoked_at=_utc(time.time())
+        )
+    )
+    sqlite_db.commit()
+    late = worker_b.poll(sqlite_db)
+    worker_a.revoke(sqlite_db, "jti-1", expires, "u1")  # revoking twice is harmless
+
+    # Assert
+    assert worker_a.is_revoked("jti-1")
+    assert before_poll is False
+    assert first == 1 and worker_b.is_revoked("jti-1")
+    assert late == 1 and worker_b.is_revoked("jti-late")
+    assert not worker_b.is_revoked("jti-other") and not worker_b.is_revoked(None)
+
+
+def test_expired_revocations_are_dropped(sqlite_db):
+    # Arrange
+    worker = RevocationList(poll_seconds=5, lookback_seconds=60, leeway_seconds=0)
+    worker.revoke(sqlite_db, "expired", time.time() - 1)
+    worker.revoke(sqlite_db, "live", time.time() + 600)
+
+    # Act
+    worker.poll(sqlite_db)
+    purged = worker.purge_expired(sqlite_db)
+
+    # Assert
+    assert not worker.is_revoked("expired") and worker.is_revoked("live")
+    assert purged == 1
+    assert [row.jti for row in sqlite_db.query(RevokedToken)] == ["live"]
+
+
+def test_logout_revokes_the_token_without_queries_on_later_checks(
+    client, sqlite_db, tmp_path, monkeypatch
+):
+    # Arrange
+    path = tmp_path / "jwks.json"
+    key = base64.urlsafe_b64encode(b"k1" * 16).decode().rstrip("=")
+    path.write_text(json.dumps({"keys": [{"kty": "oct", "kid": "k1", "k": key}]}))
+    monkeypatch.setattr(settings, "AUTH_MODE", "strict")
+    monkeypatch.setattr(key_store, "keys_file", str(path))
+    monkeypatch.setattr(key_store, "_loaded_at", float("-inf"))
+    sqlite_db.add(
+        User(
+            id="u1",
+            email="driver@example.com",
+            name="Driver",
+            hashed_password="x",
+            role=UserRole.DRIVER,
+        )
+    )
+    sqlite_db.commit()
+    user_contexts.clear()
+    revoked_tokens.clear()
+    token = create_access_token("u1", ["DRIVER"])
+    headers = {"Authorization": f"Bearer {token}"}
+
+    # Act
+    try:
+        client.get("/api/v1/me", headers=headers)
+        with QueryRecorder() as checks:
+            before = client.get("/api/v1/me", headers=headers)
+        logout = client.post("/api/v1/auth/logout", headers=headers)
+        after = client.get("/api/v1/me", headers=headers)
+    finally:
+        revoked_tokens.clear()
+
+    # Assert
+    assert before.status_code == 200 and checks.count == 0
+    assert logout.status_code == 204
+    assert (
+        after.status_code == 401 and after.json()["detail"] == "Token has been revoked"
+    )
+    assert sqlite_db.query(RevokedToken).one().user_id == "u1"
@@ -67,3 +67,36 @@ def test_update_site_router(client):
         assert response.json()["status"] == "ACTIVE"
         assert response.json()["approved_by_id"] == "user-approver-id"
         mock_update.assert_called_once()
+
+def test_list_cranes_sparse_fields(client):
+    # Arrange
+    from server.domain.read_models import CraneRow
+    row = CraneRow.from_row(
+        ("crane-1", "S-001", "NORMAL"), ("id", "serial_no", "status")
+    )
+
+    with patch(
+        "server.api.routers.cranes.crane_service.list_owner_cranes",
+        return_value=[row],
+    ) as mock_list:
+        # Act
+        response = client.get(
+            "/api/v1/org/cranes",
+            params={"owner_org_id": "org-1", "fields": "id,serial_no,status"},
+        )
+
+        # Assert
+        assert response.status_code == 200
+        assert response.json() == [
+            {"id": "crane-1", "serial_no": "S-001", "status": "NORMAL"}
+        ]
+        fields = mock_list.call_args.kwargs["fields"]
+        assert fields == frozenset({"id", "serial_no", "status"})
+
+def test_list_cranes_unknown_field(client):
+    # Act
+    response = client.get("/api/v1/org/cranes", params={"fields": "id,password"})
+
+    # Assert
+    assert response.status_code == 400
+    assert "password" in response.json()["detail"]
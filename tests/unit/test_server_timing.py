@@ -0,0 +1,107 @@
+import pytest
+from fastapi import APIRouter, Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import StaticPool
+
+from server.config import settings
+from server.core.db_instrumentation import (
+    add_statement_observer,
+    install_statement_hooks,
+    remove_statement_observer,
+)
+from server.core.metrics import record_statement
+from server.core.timing import TimedRoute, timed_function, timed_service
+from server.middleware.request_context import RequestContextMiddleware
+
+
+def make_client(server_timing):
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+
+    @timed_service
+    class ReportService:
+        def totals(self):
+            with engine.connect() as conn:
+                return (
+                    conn.execute(text("SELECT 1")).scalar()
+                    + conn.execute(text("SELECT 2")).scalar()
+                )
+
+    @timed_function("auth")
+    def current_user():
+        return "sm1"
+
+    router = APIRouter(route_class=TimedRoute)
+
+    @router.get("/report")
+    def report(user: str = Depends(current_user)):
+        return {"user": user, "total": ReportService().totals()}
+
+    @router.get("/async-report")
+    async def async_report():
+        return {"ok": True}
+
+    app = FastAPI()
+    app.add_middleware(RequestContextMiddleware, server_timing=server_timing)
+    app.include_router(router)
+    return TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def statement_observer():
+    install_statement_hooks()
+    add_statement_observer(record_statement)
+    yield
+    remove_statement_observer(record_statement)
+
+
+def parse(header):
+    entries = {}
+    for entry in header.split(", "):
+        name, *params = entry.split(";")
+        entries[name] = dict(param.split("=", 1) for param in params)
+    return entries
+
+
+def test_server_timing_breaks_down_sync_request():
+    # Arrange
+    client = make_client("always")
+
+    # Act
+    response = client.get("/report")
+
+    # Assert
+    assert response.json() == {"user": "sm1", "total": 3}
+    entries = parse(response.headers["server-timing"])
+    assert {"deps", "auth", "queue", "endpoint", "serialize", "total"} <= set(entries)
+    assert "svc.ReportService.totals" in entries
+    assert entries["db"]["desc"] == '"2 queries"'
+    assert float(entries["total"]["dur"]) >= float(entries["endpoint"]["dur"])
+
+
+def test_async_endpoint_has_no_queue_span():
+    # Act
+    response = make_client("always").get("/async-report")
+
+    # Assert
+    entries = parse(response.headers["server-timing"])
+    assert "endpoint" in entries and "queue" not in entries
+
+
+def test_debug_mode_requires_token_outside_development(monkeypatch):
+    # Arrange
+    monkeypatch.setattr(settings, "ENVIRONMENT", "production")
+    monkeypatch.setattr(settings, "DEBUG_TOKEN", "s3cret")
+    client = make_client("debug")
+
+    # Act
+    anonymous = client.get("/report")
+    wrong = client.get("/report", headers={"X-Debug-Token": "nope"})
+    debug = client.get("/report", headers={"X-Debug-Token": "s3cret"})
+
+    # Assert
+    assert "server-timing" not in anonymous.headers
+    assert "server-timing" not in wrong.headers
+    assert "total;dur=" in debug.headers["server-timing"]
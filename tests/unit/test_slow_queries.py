@@ -0,0 +1,85 @@
+import json
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import StaticPool
+
+from server.core.db_instrumentation import (
+    add_statement_observer,
+    install_statement_hooks,
+    remove_statement_observer,
+)
+from server.core.slow_queries import SlowQueryLog, fingerprint
+from server.main import app
+
+
+def test_fingerprint_normalizes_literals_parameters_and_in_lists():
+    # Act / Assert
+    assert fingerprint(
+        "SELECT * FROM ops.cranes WHERE serial_no = 'S-1' AND id > 10"
+    ) == ("SELECT * FROM ops.cranes WHERE serial_no = ? AND id > ?")
+    assert fingerprint(
+        "SELECT crane_models_1.id FROM crane_models AS crane_models_1\n"
+        "WHERE lower(model_name) LIKE lower(%(model_name_1)s) "
+        "AND status IN (%(s_1)s, %(s_2)s)"
+    ) == (
+        "SELECT crane_models_1.id FROM crane_models AS crane_models_1 "
+        "WHERE lower(model_name) LIKE lower(?) AND status IN (...)"
+    )
+    assert fingerprint("SELECT x::int FROM t WHERE a = :a LIMIT $1") == (
+        "SELECT x::int FROM t WHERE a = ? LIMIT ?"
+    )
+
+
+def test_slow_statements_are_aggregated_and_explained_once(tmp_path):
+    # Arrange
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE cranes (id INTEGER PRIMARY KEY, model TEXT)"))
+    log = SlowQueryLog(threshold_ms=0, max_fingerprints=2, explain=True)
+    install_statement_hooks()
+    add_statement_observer(log)
+
+    # Act
+    try:
+        with engine.connect() as conn:
+            for term in ("%SS%", "%ST%", "%GT%"):
+                conn.execute(
+                    text("SELECT id FROM cranes WHERE model LIKE :m"), {"m": term}
+                )
+            conn.execute(text("SELECT id FROM cranes WHERE id = 3"))
+            conn.execute(text("SELECT count(*) FROM cranes"))
+        log.wait_for_plans()
+    finally:
+        remove_statement_observer(log)
+        log.stop()
+    log.dump(str(tmp_path / "slow.json"))
+
+    # Assert
+    entries = log.entries()
+    like = next(e for e in entries if "LIKE" in e["fingerprint"])
+    assert like["count"] == 3
+    assert like["sample_parameters"] == ["%SS%"]
+    assert "SCAN" in like["plan"]
+    assert len(entries) == 2
+    assert log.dropped == 1
+    dumped = json.loads((tmp_path / "slow.json").read_text())
+    assert dumped["dropped"] == 1 and len(dumped["entries"]) == 2
+
+
+def test_slow_query_endpoint_requires_debug_access(debug_headers):
+    # Arrange
+    client = TestClient(app)
+
+    # Act
+    allowed = client.get(
+        "/api/v1/system/slow-queries", params={"limit": 5}, headers=debug_headers
+    )
+    denied = client.get("/api/v1/system/slow-queries")  # development, no token
+
+    # Assert
+    assert allowed.status_code == 200
+    assert set(allowed.json()) == {"threshold_ms", "dropped", "entries"}
+    assert denied.status_code == 404
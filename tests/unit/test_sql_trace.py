@@ -0,0 +1,102 @@
+import pytest
+
+from server.config import settings
+from server.core.sql_trace import TraceStore, is_read_only
+from server.domain.models import Crane, CraneModel
+
+
+@pytest.fixture
+def client(client, sqlite_db):
+    sqlite_db.add(
+        CraneModel(id="m1", model_name="SS1926", max_lifting_capacity_ton_m=18)
+    )
+    sqlite_db.add(Crane(id="c1", owner_org_id="o1", model_id="m1", serial_no="S-1"))
+    sqlite_db.commit()
+    return client
+
+
+def test_traced_request_can_be_fetched_with_plan(client, debug_headers):
+    # Act
+    response = client.get(
+        "/api/v1/org/cranes",
+        params={"owner_org_id": "o1", "model_name": "SS"},
+        headers={
+            **debug_headers,
+            "X-Debug-Trace": "explain",
+            "X-Request-ID": "trace-test-1",
+        },
+    )
+    trace = client.get(response.headers["x-debug-trace"], headers=debug_headers).json()
+
+    # Assert
+    assert response.status_code == 200
+    assert response.headers["x-debug-trace"] == "/api/v1/system/traces/trace-test-1"
+    assert trace["request_id"] == "trace-test-1"
+    assert trace["status"] == 200
+    assert trace["statement_count"] == len(trace["statements"]) >= 1
+    statement = trace["statements"][trace["explain"]["statement_index"]]
+    assert "FROM main.cranes" in statement["sql"]
+    assert "%SS%" in statement["parameters"]
+    assert "SCAN" in trace["explain"]["plan"] or "SEARCH" in trace["explain"]["plan"]
+
+
+def test_untraced_requests_store_nothing(client):
+    # Act
+    response = client.get(
+        "/api/v1/org/cranes", headers={"X-Request-ID": "trace-test-2"}
+    )
+    trace = client.get("/api/v1/system/traces/trace-test-2")
+
+    # Assert
+    assert "x-debug-trace" not in response.headers
+    assert trace.status_code == 404
+
+
+def test_trace_requires_debug_access_outside_development(client, monkeypatch):
+    # Arrange
+    monkeypatch.setattr(settings, "ENVIRONMENT", "production")
+    monkeypatch.setattr(settings, "DEBUG_TOKEN", "s3cret")
+
+    # Act
+    denied = client.get("/api/v1/org/cranes", params={"debug_trace": "1"})
+    allowed = client.get(
+        "/api/v1/org/cranes",
+        params={"debug_trace": "1"},
+        headers={"X-Debug-Token": "s3cret", "X-Request-ID": "trace-test-3"},
+    )
+    anonymous_fetch = client.get("/api/v1/system/traces/trace-test-3")
+    debug_fetch = client.get(
+        "/api/v1/system/traces/trace-test-3", headers={"X-Debug-Token": "s3cret"}
+    )
+
+    # Assert
+    assert "x-debug-trace" not in denied.headers
+    assert "x-debug-trace" in allowed.headers
+    assert anonymous_fetch.status_code == 404
+    assert debug_fetch.json()["explain"] is None
+
+
+def test_trace_store_is_bounded_and_shared_through_directory(tmp_path):
+    # Arrange
+    writer = TraceStore(max_entries=2, directory=str(tmp_path))
+    reader = TraceStore(max_entries=2, directory=str(tmp_path))
+
+    # Act
+    for request_id in ("a", "b", "c"):
+        writer.put({"request_id": request_id})
+
+    # Assert
+    assert writer.get("a") is None
+    assert reader.get("c") == {"request_id": "c"}
+    assert reader.get("../c") is None
+
+
+def test_only_read_only_statements_are_explained():
+    # Act / Assert
+    assert is_read_only("SELECT * FROM cranes")
+    assert is_read_only("WITH x AS (SELECT 1) SELECT * FROM x")
+    assert not is_read_only("SELECT * FROM cranes FOR UPDATE")
+    assert not is_read_only(
+        "WITH d AS (DELETE FROM cranes RETURNING id) SELECT * FROM d"
+    )
+    assert not is_read_only("UPDATE cranes SET status = 'NORMAL'")
@@ -0,0 +1,141 @@
+import base64
+import json
+import os
+import time
+
+import pytest
+
+from server.config import settings
+from server.core.tokens import (
+    InvalidToken,
+    KeyStore,
+    TokenVerifier,
+    create_access_token,
+    encode_token,
+    key_store,
+    token_verifier,
+)
+from server.domain.models import User
+from server.domain.schemas.enums import UserRole
+
+
+def write_jwks(path, *kids):
+    keys = [
+        {
+            "kty": "oct",
+            "kid": kid,
+            "k": base64.urlsafe_b64encode(kid.encode() * 8).decode().rstrip("="),
+        }
+        for kid in kids
+    ]
+    path.write_text(json.dumps({"keys": keys}))
+
+
+def make_verifier(path, cache_size=16):
+    keys = KeyStore(str(path), None, None, refresh_seconds=0)
+    return keys, TokenVerifier(
+        keys, settings.JWT_ISSUER, settings.JWT_AUDIENCE, 0, cache_size
+    )
+
+
+def claims(**overrides):
+    now = int(time.time())
+    base = {
+        "iss": settings.JWT_ISSUER,
+        "aud": settings.JWT_AUDIENCE,
+        "sub": "u1",
+        "iat": now,
+        "exp": now + 60,
+        "roles": ["DRIVER"],
+    }
+    return {**base, **overrides}
+
+
+def test_valid_tokens_verify_and_tampered_ones_do_not(tmp_path):
+    # Arrange
+    path = tmp_path / "jwks.json"
+    write_jwks(path, "k1")
+    keys, verifier = make_verifier(path)
+    kid, key = keys.signing_key()
+    token = encode_token(claims(), kid, key)
+    header, payload, signature = token.split(".")
+    forged_payload = (
+        base64.urlsafe_b64encode(json.dumps(claims(sub="admin")).encode())
+        .decode()
+        .rstrip("=")
+    )
+
+    # Act / Assert
+    assert verifier.verify(token)["sub"] == "u1"
+    with pytest.raises(InvalidToken, match="signature"):
+        verifier.verify(f"{header}.{forged_payload}.{signature}")
+    with pytest.raises(InvalidToken, match="expired"):
+        verifier.verify(encode_token(claims(exp=int(time.time()) - 5), kid, key))
+    with pytest.raises(InvalidToken, match="audience"):
+        verifier.verify(encode_token(claims(aud="other"), kid, key))
+    with pytest.raises(InvalidToken, match="algorithm"):
+        none_header = base64.urlsafe_b64encode(b'{"alg":"none"}').decode().rstrip("=")
+        verifier.verify(f"{none_header}.{payload}.")
+    with pytest.raises(InvalidToken, match="Malformed"):
+        verifier.verify("not-a-token")
+
+
+def test_verified_tokens_are_cached_until_keys_rotate(tmp_path):
+    # Arrange
+    path = tmp_path / "jwks.json"
+    write_jwks(path, "k1", "k2")
+    keys, verifier = make_verifier(path)
+    token = encode_token(claims(), "k1", keys.get("k1"))
+    verifier.verify(token)
+
+    # Act
+    cached = verifier.verify(token)
+    write_jwks(path, "k2")
+    os.utime(path, (time.time() + 5, time.time() + 5))
+
+    # Assert
+    assert cached["sub"] == "u1"
+    with pytest.raises(InvalidToken, match="Unknown signing key"):
+        verifier.verify(token)
+
+
+def test_strict_mode_login_issues_a_jwt_accepted_by_protected_routes(
+    client, sqlite_db, tmp_path, monkeypatch
+):
+    # Arrange
+    path = tmp_path / "jwks.json"
+    write_jwks(path, "k1")
+    monkeypatch.setattr(settings, "AUTH_MODE", "strict")
+    monkeypatch.setattr(key_store, "keys_file", str(path))
+    monkeypatch.setattr(key_store, "_loaded_at", float("-inf"))
+    token = create_access_token(
+        "u1", ["DRIVER"], email="driver@example.com", name="Driver"
+    )
+    sqlite_db.add(
+        User(
+            id="u1",
+            email="driver@example.com",
+            name="Driver",
+            hashed_password="x",
+            role=UserRole.DRIVER,
+        )
+    )
+    sqlite_db.commit()
+
+    # Act
+    refreshed = client.post(
+        "/api/v1/auth/refresh", headers={"Authorization": f"Bearer {token}"}
+    )
+    anonymous = client.post("/api/v1/auth/refresh")
+    forged = client.post(
+        "/api/v1/auth/refresh", headers={"Authorization": "Bearer dev:u1:ADMIN"}
+    )
+
+    # Assert
+    assert refreshed.status_code == 200
+    assert (
+        token_verifier.verify(refreshed.json()["access_token"])["email"]
+        == "driver@example.com"
+    )
+    assert refreshed.json()["user"]["roles"] == ["DRIVER"]
+    assert anonymous.status_code == forged.status_code == 401
@@ -0,0 +1,108 @@
+import pytest
+from sqlalchemy import update
+
+from server.config import settings
+from server.core.query_audit import QueryRecorder
+from server.database import shared_session
+from server.domain.models import Org, User, UserOrg
+from server.domain.schemas.enums import OrgType, UserRole
+from server.domain.user_cache import UserContextCache, user_contexts
+
+
+@pytest.fixture
+def db(sqlite_db):
+    sqlite_db.add_all(
+        [
+            Org(id="o1", name="Owner One", type=OrgType.OWNER),
+            Org(id="o2", name="Owner Two", type=OrgType.OWNER),
+            User(
+                id="u1",
+                email="owner@example.com",
+                name="Owner",
+                hashed_password="x",
+                role=UserRole.OWNER,
+            ),
+            UserOrg(user_id="u1", org_id="o1"),
+        ]
+    )
+    sqlite_db.commit()
+    user_contexts.clear()
+    return sqlite_db
+
+
+def test_user_is_loaded_once_and_invalidated_on_commit(db):
+    # Act
+    with QueryRecorder() as first:
+        loaded = user_contexts.get(db, "u1")
+    with QueryRecorder() as second:
+        user_contexts.get(db, "u1")
+    db.add(UserOrg(user_id="u1", org_id="o2"))
+    db.commit()
+    after_membership = user_contexts.get(db, "u1")
+    db.execute(update(User).where(User.id == "u1").values(is_active=False))
+    db.commit()
+    after_bulk_update = user_contexts.get(db, "u1")
+
+    # Assert
+    assert first.count == 1 and second.count == 0
+    assert (loaded.role, loaded.is_active, loaded.org_ids) == ("OWNER", True, ("o1",))
+    assert after_membership.org_ids == ("o1", "o2")
+    assert after_bulk_update.is_active is False
+
+
+def test_entries_expire_and_unknown_users_are_cached(db):
+    # Arrange
+    expiring = UserContextCache(ttl_seconds=0, max_entries=10)
+
+    # Act
+    with QueryRecorder() as expired:
+        expiring.get(db, "u1")
+        expiring.get(db, "u1")
+    with QueryRecorder() as unknown:
+        assert user_contexts.get(db, "nobody") is None
+        assert user_contexts.get(db, "nobody") is None
+
+    # Assert
+    assert expired.count == 2
+    assert unknown.count == 1
+
+
+def test_current_user_is_enriched_and_inactive_users_rejected(client, db, monkeypatch):
+    # Arrange
+    monkeypatch.setattr(settings, "AUTH_MODE", "dev")
+
+    # Act
+    me = client.get("/api/v1/me", headers={"X-Dev-User": "u1"})
+    acting = client.get(
+        "/api/v1/me", headers={"X-Dev-User": "u1", "X-Dev-Roles": "DRIVER"}
+    )
+    stranger = client.get(
+        "/api/v1/me", headers={"X-Dev-User": "dev-1", "X-Dev-Roles": "DRIVER"}
+    )
+    db.get(User, "u1").is_active = False
+    db.commit()
+    inactive = client.get("/api/v1/me", headers={"X-Dev-User": "u1"})
+
+    # Assert
+    assert me.json()["roles"] == ["OWNER"]
+    assert me.json()["org_ids"] == ["o1"]
+    # Roles from the header are kept; the rest is filled in from the row
+    assert acting.json()["roles"] == ["DRIVER"]
+    assert acting.json()["email"] == "owner@example.com"
+    assert stranger.json()["roles"] == ["DRIVER"] and stranger.json()["org_ids"] == []
+    assert inactive.status_code == 401
+
+
+def test_users_loaded_in_a_shared_transaction_are_not_cached(db):
+    # Arrange
+    cache = UserContextCache(ttl_seconds=60, max_entries=10)
+    token = shared_session.set(db)
+
+    # Act
+    try:
+        cache.get(db, "u1")
+    finally:
+        shared_session.reset(token)
+
+    # Assert
+    assert cache.peek("u1") is None